@@ -5,16 +5,14 @@ import sqlite3
 import hashlib
 import secrets
 import string
-import os
+import threading
 from datetime import datetime, timedelta
 from typing import Optional, Tuple
 import streamlit as st
+import dashboards
+import db
 from utils import load_css, load_all_styles
 
-# Получаем путь к директории, где находится этот файл
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, 'users.db')
-
 # Роли пользователей
 ROLES = {
     'superadmin': 'Суперадминистратор',
@@ -30,9 +28,31 @@ ADMIN_ROLES = ['superadmin', 'admin']
 REPORT_ROLES = ['manager', 'analyst', 'admin', 'superadmin']
 
 
+# Схема базы применяется один раз на процесс (см. init_db)
+_db_initialized = False
+_db_init_lock = threading.Lock()
+
+
 def init_db():
-    """Инициализация базы данных пользователей"""
-    conn = sqlite3.connect(DB_PATH)
+    """
+    Инициализация базы данных пользователей
+
+    Миграции из MIGRATIONS и проверка суперадминистратора выполняются один
+    раз на процесс; повторные вызовы (каждый перезапуск скрипта) ничего не делают.
+    """
+    global _db_initialized
+    if _db_initialized:
+        return
+    with _db_init_lock:
+        if _db_initialized:
+            return
+        db.migrate(MIGRATIONS)
+        _ensure_superadmin()
+        _db_initialized = True
+
+
+def _migration_initial_schema(conn):
+    """Версия 1: таблицы пользователей, токенов, настроек, логов и параметров"""
     cursor = conn.cursor()
 
     # Таблица пользователей
@@ -133,22 +153,47 @@ def init_db():
         )
     ''')
 
-    conn.commit()
 
-    # Создаем дефолтного суперадминистратора, если его нет
-    cursor.execute('SELECT COUNT(*) FROM users WHERE role = ?', ('superadmin',))
-    if cursor.fetchone()[0] == 0:
+def _migration_log_and_token_indexes(conn):
+    """
+    Версия 2: индексы для журнала действий и токенов восстановления
+
+    Поиск токена по значению уже покрыт индексом UNIQUE(token); отдельный
+    индекс нужен для удаления старых токенов пользователя.
+    """
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_user_activity_logs_username_created_at
+        ON user_activity_logs (username, created_at)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_user_activity_logs_action
+        ON user_activity_logs (action)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_password_reset_tokens_username_used
+        ON password_reset_tokens (username, used)
+    ''')
+
+
+# Миграции схемы: (версия, функция); новые версии добавляются в конец
+MIGRATIONS = [
+    (1, _migration_initial_schema),
+    (2, _migration_log_and_token_indexes),
+]
+
+
+def _ensure_superadmin():
+    """Создает дефолтного суперадминистратора, если его нет"""
+    if db.fetch_one('SELECT COUNT(*) FROM users WHERE role = ?', ('superadmin',))[0] == 0:
         default_password = hash_password('admin123')
-        cursor.execute('''
-            INSERT INTO users (username, password_hash, role, email)
+        # OR IGNORE: другой процесс мог создать пользователя одновременно
+        created = db.execute('''
+            INSERT OR IGNORE INTO users (username, password_hash, role, email)
             VALUES (?, ?, ?, ?)
         ''', ('admin', default_password, 'superadmin', 'admin@example.com'))
-        conn.commit()
-        if 'st' in globals():
+        if created and 'st' in globals():
             st.info("⚠️ Создан дефолтный пользователь: admin / admin123")
 
-    conn.close()
-
 
 def hash_password(password: str) -> str:
     """Хеширование пароля"""
@@ -163,18 +208,12 @@ def verify_password(password: str, password_hash: str) -> bool:
 def create_user(username: str, password: str, role: str, email: Optional[str] = None, created_by: Optional[str] = None) -> bool:
     """Создание нового пользователя"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
         password_hash = hash_password(password)
-        cursor.execute('''
+        db.execute('''
             INSERT INTO users (username, password_hash, role, email)
             VALUES (?, ?, ?, ?)
         ''', (username, password_hash, role, email))
 
-        conn.commit()
-        conn.close()
-
         # Логируем создание пользователя
         try:
             from logger import log_action
@@ -192,30 +231,22 @@ def create_user(username: str, password: str, role: str, email: Optional[str] =
 
 def authenticate(username: str, password: str) -> Tuple[bool, Optional[dict]]:
     """Аутентификация пользователя"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute('''
+    user = db.fetch_one('''
         SELECT id, username, password_hash, role, email, is_active
         FROM users
         WHERE username = ?
     ''', (username,))
 
-    user = cursor.fetchone()
-
     if user and user[5] == 1:  # is_active
         user_id, username_db, password_hash, role, email, is_active = user
 
         if verify_password(password, password_hash):
             # Обновляем время последнего входа
-            cursor.execute('''
+            db.execute('''
                 UPDATE users
                 SET last_login = ?
                 WHERE id = ?
             ''', (datetime.now(), user_id))
-            conn.commit()
-
-            conn.close()
 
             # Логируем вход
             try:
@@ -231,24 +262,17 @@ def authenticate(username: str, password: str) -> Tuple[bool, Optional[dict]]:
                 'email': email
             }
 
-    conn.close()
     return False, None
 
 
 def get_user_by_username(username: str) -> Optional[dict]:
     """Получение пользователя по имени"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute('''
+    user = db.fetch_one('''
         SELECT id, username, role, email, is_active
         FROM users
         WHERE username = ?
     ''', (username,))
 
-    user = cursor.fetchone()
-    conn.close()
-
     if user:
         return {
             'id': user[0],
@@ -269,42 +293,31 @@ def generate_reset_token(username: str) -> Optional[str]:
     # Генерируем случайный токен
     token = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(32))
 
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with db.connection() as conn:
+        # Удаляем старые неиспользованные токены для этого пользователя
+        conn.execute('''
+            DELETE FROM password_reset_tokens
+            WHERE username = ? AND used = 0
+        ''', (username,))
 
-    # Удаляем старые неиспользованные токены для этого пользователя
-    cursor.execute('''
-        DELETE FROM password_reset_tokens
-        WHERE username = ? AND used = 0
-    ''', (username,))
-
-    # Создаем новый токен (действителен 1 час)
-    expires_at = datetime.now() + timedelta(hours=1)
-    cursor.execute('''
-        INSERT INTO password_reset_tokens (username, token, expires_at)
-        VALUES (?, ?, ?)
-    ''', (username, token, expires_at))
-
-    conn.commit()
-    conn.close()
+        # Создаем новый токен (действителен 1 час)
+        expires_at = datetime.now() + timedelta(hours=1)
+        conn.execute('''
+            INSERT INTO password_reset_tokens (username, token, expires_at)
+            VALUES (?, ?, ?)
+        ''', (username, token, expires_at))
 
     return token
 
 
 def verify_reset_token(token: str) -> Optional[str]:
     """Проверка токена восстановления пароля"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute('''
+    result = db.fetch_one('''
         SELECT username, expires_at, used
         FROM password_reset_tokens
         WHERE token = ?
     ''', (token,))
 
-    result = cursor.fetchone()
-    conn.close()
-
     if result:
         username, expires_at, used = result
         expires_at = datetime.fromisoformat(expires_at)
@@ -321,26 +334,21 @@ def reset_password(token: str, new_password: str) -> bool:
     if not username:
         return False
 
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    # Обновляем пароль
-    password_hash = hash_password(new_password)
-    cursor.execute('''
-        UPDATE users
-        SET password_hash = ?
-        WHERE username = ?
-    ''', (password_hash, username))
-
-    # Помечаем токен как использованный
-    cursor.execute('''
-        UPDATE password_reset_tokens
-        SET used = 1
-        WHERE token = ?
-    ''', (token,))
-
-    conn.commit()
-    conn.close()
+    with db.connection() as conn:
+        # Обновляем пароль
+        password_hash = hash_password(new_password)
+        conn.execute('''
+            UPDATE users
+            SET password_hash = ?
+            WHERE username = ?
+        ''', (password_hash, username))
+
+        # Помечаем токен как использованный
+        conn.execute('''
+            UPDATE password_reset_tokens
+            SET used = 1
+            WHERE token = ?
+        ''', (token,))
 
     return True
 
@@ -394,36 +402,27 @@ def change_password(username: str, old_password: str, new_password: str) -> Tupl
     Returns:
         Tuple[bool, str]: (успех, сообщение)
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
     # Проверяем текущий пароль
-    cursor.execute('''
+    result = db.fetch_one('''
         SELECT password_hash FROM users
         WHERE username = ? AND is_active = 1
     ''', (username,))
 
-    result = cursor.fetchone()
     if not result:
-        conn.close()
         return False, "Пользователь не найден"
 
     password_hash = result[0]
     if not verify_password(old_password, password_hash):
-        conn.close()
         return False, "Неверный текущий пароль"
 
     # Обновляем пароль
     new_password_hash = hash_password(new_password)
-    cursor.execute('''
+    db.execute('''
         UPDATE users
         SET password_hash = ?
         WHERE username = ?
     ''', (new_password_hash, username))
 
-    conn.commit()
-    conn.close()
-
     return True, "Пароль успешно изменен"
 
 
@@ -438,30 +437,22 @@ def update_user_email(username: str, new_email: Optional[str]) -> Tuple[bool, st
     Returns:
         Tuple[bool, str]: (успех, сообщение)
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
     # Проверяем существование пользователя
-    cursor.execute('''
+    result = db.fetch_one('''
         SELECT id FROM users
         WHERE username = ? AND is_active = 1
     ''', (username,))
 
-    result = cursor.fetchone()
     if not result:
-        conn.close()
         return False, "Пользователь не найден"
 
     # Обновляем email
-    cursor.execute('''
+    db.execute('''
         UPDATE users
         SET email = ?
         WHERE username = ?
     ''', (new_email, username))
 
-    conn.commit()
-    conn.close()
-
     return True, "Email успешно обновлен"
 
 
@@ -525,50 +516,21 @@ def render_sidebar_menu(current_page: str = "reports"):
 
             # Список отчетов под кнопкой "Отчеты"
             if current_page == "reports":
-                # Группируем отчеты по категориям
-                reason_reports = ["Динамика отклонений по месяцам", "Динамика отклонений", "Динамика причин отклонений"]
-                budget_reports = ["БДДС по месяцам", "БДДС по лотам", "Бюджет план/факт", "Утвержденный бюджет", "Прогнозный бюджет"]
-                plan_fact_reports = ["Отклонение текущего срока от базового плана", "Значения отклонений от базового плана"]
-                other_reports = ["Выдача рабочей/проектной документации", "Аналитика по технике", "График движения рабочей силы", "СКУД стройка"]
-
                 st.markdown("---")
                 st.markdown("#### 📋 Список отчетов")
 
                 # Получаем текущий выбранный отчет для подсветки
                 current_dashboard = st.session_state.get('current_dashboard', '')
 
-                # Категория: Причины отклонений
-                with st.expander("🔍 Причины отклонений", expanded=False):
-                    for report in reason_reports:
-                        # Определяем стиль кнопки (активная/неактивная)
-                        button_type = "primary" if current_dashboard == report else "secondary"
-                        if st.button(f"• {report}", use_container_width=True, key=f"menu_report_{report}", type=button_type):
-                            st.session_state.current_dashboard = report
-                            st.rerun()
-
-                # Категория: Аналитика по финансам
-                with st.expander("💰 Аналитика по финансам", expanded=False):
-                    for report in budget_reports:
-                        button_type = "primary" if current_dashboard == report else "secondary"
-                        if st.button(f"• {report}", use_container_width=True, key=f"menu_report_{report}", type=button_type):
-                            st.session_state.current_dashboard = report
-                            st.rerun()
-
-                # Категория: Отклонения от базового плана
-                with st.expander("📅 Отклонения от базового плана", expanded=False):
-                    for report in plan_fact_reports:
-                        button_type = "primary" if current_dashboard == report else "secondary"
-                        if st.button(f"• {report}", use_container_width=True, key=f"menu_report_{report}", type=button_type):
-                            st.session_state.current_dashboard = report
-                            st.rerun()
-
-                # Категория: Прочее
-                with st.expander("🔧 Прочее", expanded=False):
-                    for report in other_reports:
-                        button_type = "primary" if current_dashboard == report else "secondary"
-                        if st.button(f"• {report}", use_container_width=True, key=f"menu_report_{report}", type=button_type):
-                            st.session_state.current_dashboard = report
-                            st.rerun()
+                # Отчеты по категориям из реестра дашбордов
+                for _, title, reports in dashboards.menu():
+                    with st.expander(title, expanded=False):
+                        for report in reports:
+                            # Определяем стиль кнопки (активная/неактивная)
+                            button_type = "primary" if current_dashboard == report else "secondary"
+                            if st.button(f"• {report}", use_container_width=True, key=f"menu_report_{report}", type=button_type):
+                                st.session_state.current_dashboard = report
+                                st.rerun()
 
         # 2. Настройки
         if has_admin_access(user['role']):
@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+Замеры производительности загрузки и расчетов
+
+Запуск:
+    python benchmarks.py csv_sniffer [--size-mb 8] [--repeat 5]
+    python benchmarks.py query_engine [--rows 2000000] [--repeat 5]
+    python benchmarks.py approved_budget [--rows 100000] [--repeat 3]
+    python benchmarks.py forecast_edit [--rows 5000] [--repeat 5]
+    python benchmarks.py ingest [--rows 200000] [--repeat 3]
+    python benchmarks.py gantt [--rows 10000] [--repeat 5]
+    python benchmarks.py labels [--rows 1000000] [--repeat 3]
+    python benchmarks.py budget_cube [--rows 2000000] [--repeat 5]
+    python benchmarks.py budget_cumulative [--rows 2000000] [--repeat 5]
+    python benchmarks.py period_labels [--rows 1000000] [--repeat 3]
+    python benchmarks.py startup [--app project_visualization_app.py] [--repeat 5]
+"""
+import argparse
+import ast
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import budget_cube
+import budget_engine
+import chart_window
+import dashboards
+import data_loader
+import figure_cache
+import gantt_engine
+import label_format
+import period_labels
+import query_engine
+
+
+def _best_time(func, repeat):
+    """Лучшее время из repeat запусков (секунды) и результат последнего"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _best_times_interleaved(funcs, repeat):
+    """
+    Как _best_time для нескольких функций, запускаемых поочередно
+
+    Для сравнения близких по времени вариантов: последовательные серии
+    смещают результат в пользу первой (состояние аллокатора и кешей).
+    """
+    best = [None] * len(funcs)
+    results = [None] * len(funcs)
+    for _ in range(repeat):
+        for i, func in enumerate(funcs):
+            start = time.perf_counter()
+            results[i] = func()
+            elapsed = time.perf_counter() - start
+            best[i] = elapsed if best[i] is None else min(best[i], elapsed)
+    return list(zip(best, results))
+
+
+def _make_cp1251_export(source_path, size_mb, ascii_share=0.0):
+    """
+    Размножает строки образца до нужного объема (кодировка исходника сохраняется)
+
+    ascii_share - доля файла в начале, где кириллица заменена на '?'
+    (выгрузки, в которых кириллица встречается не с первых строк)
+    """
+    with open(source_path, 'rb') as f:
+        lines = f.read().splitlines(keepends=True)
+    header, rows = lines[0], lines[1:]
+    body = b''.join(rows)
+    repeats = max(1, size_mb * 1024 * 1024 // len(body))
+    ascii_repeats = int(repeats * ascii_share)
+    ascii_body = body.decode('cp1251').encode('ascii', errors='replace')
+    if ascii_repeats:
+        header = header.decode('cp1251').encode('ascii', errors='replace')
+    return header + ascii_body * ascii_repeats + body * (repeats - ascii_repeats)
+
+
+def bench_csv_sniffer(args):
+    """
+    Перебор кодировок/разделителей против одного прохода после sniff_csv
+
+    Если кириллица есть с первой строки, неудачные попытки перебора (utf-8)
+    обрываются на первом блоке декодирования, и перебор тоже читает файл
+    один раз: выигрыш есть только при кириллице далеко от начала файла.
+    """
+    scenarios = [
+        ('кириллица с первой строки', 0.0),
+        ('кириллица во второй половине файла', 0.5),
+    ]
+    for title, ascii_share in scenarios:
+        data = _make_cp1251_export(args.source, args.size_mb, ascii_share)
+        print(f"== {args.source}, {title}: {len(data) / 1024 / 1024:.1f} МБ")
+        print(f"Диалект: {data_loader.sniff_csv(data)}")
+
+        (probing_time, probing_df), (sniffed_time, sniffed_df) = _best_times_interleaved(
+            [lambda: data_loader.read_csv_probing(data), lambda: data_loader.read_csv_sniffed(data)], args.repeat)
+
+        assert probing_df.equals(sniffed_df), "Результаты разбора различаются"
+        print(f"Перебор (read_csv_probing):     {probing_time * 1000:8.1f} мс")
+        print(f"Один проход (read_csv_sniffed): {sniffed_time * 1000:8.1f} мс")
+        print(f"Ускорение: x{probing_time / sniffed_time:.2f}")
+        print()
+
+
+def _make_project_frame(source_path, rows):
+    """Нормализованная выгрузка проекта, размноженная до rows строк"""
+    with open(source_path, 'rb') as f:
+        df = data_loader.load_file(f.read(), source_path)
+    repeats = max(1, rows // len(df))
+    return pd.concat([df] * repeats, ignore_index=True)
+
+
+def _pandas_budget_by_period(df, filters):
+    """Исходная цепочка дашборда 'БДДС по месяцам': copy, фильтры, to_numeric, groupby"""
+    filtered_df = df.copy()
+    for column, value in filters.items():
+        filtered_df = filtered_df[filtered_df[column].astype(str).str.strip() == str(value).strip()]
+    filtered_df['budget plan'] = pd.to_numeric(filtered_df['budget plan'], errors='coerce')
+    filtered_df['budget fact'] = pd.to_numeric(filtered_df['budget fact'], errors='coerce')
+    filtered_df['reserve budget'] = filtered_df['budget plan'] - filtered_df['budget fact']
+    agg_dict = {'budget plan': 'sum', 'budget fact': 'sum', 'reserve budget': 'sum'}
+    return filtered_df.groupby(['plan_month', 'project name']).agg(agg_dict).reset_index()
+
+
+def bench_query_engine(args):
+    """Цепочка pandas в дашборде против query_engine (pandas и DuckDB)"""
+    df = _make_project_frame(args.project_source, args.rows)
+    project = df['project name'].dropna().iloc[0]
+    sums = ('budget plan', 'budget fact', 'reserve budget')
+    print(f"== {len(df):,} строк задач, DuckDB: {'есть' if query_engine.DUCKDB_AVAILABLE else 'нет'}")
+
+    engines = [('pandas', float('inf'))]
+    if query_engine.DUCKDB_AVAILABLE:
+        engines.append(('duckdb', 0))
+    default_min_rows = query_engine.DUCKDB_MIN_ROWS
+
+    for title, filters in [('без фильтров', {}), ('фильтр по проекту', {'project name': project})]:
+        print(f"-- {title}")
+        baseline_time, expected = _best_time(lambda: _pandas_budget_by_period(df, filters), args.repeat)
+        print(f"Исходная цепочка pandas:      {baseline_time * 1000:8.1f} мс")
+        for engine, min_rows in engines:
+            query_engine.DUCKDB_MIN_ROWS = min_rows
+            engine_time, result = _best_time(
+                lambda: query_engine.aggregate(df, ['plan_month', 'project name'], filters, sums=sums),
+                args.repeat
+            )
+            pd.testing.assert_frame_equal(expected, result)
+            print(f"query_engine ({engine}):{' ' * (13 - len(engine))}{engine_time * 1000:8.1f} мс"
+                  f"  (x{baseline_time / engine_time:.1f})")
+        query_engine.DUCKDB_MIN_ROWS = default_min_rows
+        print()
+
+
+def bench_approved_budget(args):
+    """Цикл по группам и месяцам против раскладки интервалов массивами"""
+    from test_approved_budget import calculate_approved_budget_reference, make_tasks
+
+    df = make_tasks(args.rows)
+    print(f"== {len(df):,} задач")
+    reference_time, (expected, _) = _best_time(
+        lambda: calculate_approved_budget_reference(df), 1)
+
+    def vectorized_cold():
+        budget_engine.clear_month_grid_cache()
+        return budget_engine.calculate_approved_budget(df)
+
+    vectorized_time, (result, _) = _best_time(vectorized_cold, args.repeat)
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+    print(f"Цикл (calculate_approved_budget_reference): {reference_time * 1000:9.1f} мс")
+    print(f"Массивы (calculate_approved_budget):        {vectorized_time * 1000:9.1f} мс")
+    print(f"Ускорение: x{reference_time / vectorized_time:.1f}")
+
+    # Сравнение правил: раскладка по месяцам строится один раз, правила - векторы долей
+    rule_names = list(budget_engine.get_budget_rules())
+
+    def all_rules_cold():
+        budget_engine.clear_month_grid_cache()
+        return budget_engine.calculate_approved_budget_for_rules(df, rule_names)
+
+    cold_time, _ = _best_time(all_rules_cold, args.repeat)
+    warm_time, _ = _best_time(lambda: budget_engine.calculate_approved_budget(df, rule_names[-1]), args.repeat)
+    print(f"Все правила ({len(rule_names)}) за один расчет:          {cold_time * 1000:9.1f} мс")
+    print(f"Смена правила (сетка из кеша):              {warm_time * 1000:9.1f} мс")
+
+
+def bench_forecast_edit(args):
+    """Правка даты одной задачи: полный пересчет против IncrementalApprovedBudget"""
+    from test_approved_budget import make_tasks
+
+    df = make_tasks(args.rows)
+    df['project name'] = 'Проект А'
+    df['task name'] = [f'Задача {i}' for i in range(len(df))]
+    print(f"== проект из {len(df):,} задач, изменена дата окончания одной задачи")
+    tracker = budget_engine.IncrementalApprovedBudget(df)
+
+    edits = []
+    editable_rows = df.index[df['plan end'].notna() & df['section'].notna() & (df['budget plan'] > 0)][:args.repeat]
+    for shift, row in enumerate(editable_rows):
+        edited = df.copy()
+        edited.loc[row, 'plan end'] = edited.loc[row, 'plan end'] + pd.Timedelta(days=45 * (shift + 1))
+        edits.append(edited)
+
+    def full():
+        budget_engine.clear_month_grid_cache()
+        return budget_engine.calculate_approved_budget(edits[-1])
+
+    full_time, (expected, _) = _best_time(full, args.repeat)
+    incremental_times = []
+    for edited in edits:
+        start = time.perf_counter()
+        result, _ = tracker.update(edited)
+        incremental_times.append(time.perf_counter() - start)
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+    incremental_time = min(incremental_times)
+    print(f"Полный пересчет:        {full_time * 1000:8.1f} мс")
+    print(f"Инкрементальный:        {incremental_time * 1000:8.1f} мс (групп пересчитано: {tracker.last_changed_groups})")
+    print(f"Ускорение: x{full_time / incremental_time:.1f}")
+
+
+def _masked_period_columns(df):
+    """Прежний вывод периодов: маскированные присваивания dt.date / dt.to_period (сверка - test_period_columns.py)"""
+    for date_col, prefix in [('plan start', 'plan_start'), ('plan end', 'plan'),
+                             ('base start', 'base_start'), ('base end', 'base')]:
+        mask = df[date_col].notna()
+        df.loc[mask, f'{prefix}_day'] = df.loc[mask, date_col].dt.date
+        for level, freq in [('month', 'M'), ('quarter', 'Q'), ('year', 'Y')]:
+            df.loc[mask, f'{prefix}_{level}'] = df.loc[mask, date_col].dt.to_period(freq)
+    mask = df['base end'].notna()
+    for level, freq in [('month', 'M'), ('quarter', 'Q'), ('year', 'Y')]:
+        df.loc[mask, f'actual_{level}'] = df.loc[mask, 'base end'].dt.to_period(freq)
+    return df
+
+
+def bench_ingest(args):
+    """Разбор выгрузки: периоды из целых ключей и уменьшение объема памяти"""
+    with open(args.project_source, 'rb') as f:
+        lines = f.read().splitlines(keepends=True)
+    repeats = max(1, args.rows // (len(lines) - 1))
+    data = lines[0] + b''.join(lines[1:]) * repeats
+    table = data_loader.read_table(data, args.project_source)
+    print(f"== {len(table):,} строк, {len(table.columns)} колонок")
+
+    normalized_time, df = _best_time(lambda: data_loader.normalize_frame(table.copy()), args.repeat)
+    masked_time, masked = _best_time(
+        lambda: _masked_period_columns(data_loader.normalize_frame(table.copy())), args.repeat)
+    print(f"Периоды масками (все колонки):  {masked_time * 1000:8.1f} мс, "
+          f"{masked.memory_usage(deep=True).sum() / 1024 / 1024:7.1f} МБ")
+    print(f"Периоды из ключей (по запросу): {normalized_time * 1000:8.1f} мс, "
+          f"{df.memory_usage(deep=True).sum() / 1024 / 1024:7.1f} МБ")
+
+    optimize_time, optimized = _best_time(lambda: data_loader.optimize_frame(df.copy()), args.repeat)
+    memory = optimized.attrs['memory']
+    print(f"Уменьшение объема: {optimize_time * 1000:.1f} мс, "
+          f"{memory['before'] / 1024 / 1024:.1f} -> {memory['after'] / 1024 / 1024:.1f} МБ")
+
+
+def _loop_gantt_bars(filtered_df):
+    """Прежнее построение полос: цикл по задачам с повторной фильтрацией и iterrows"""
+    bar_data = []
+    for task_name in filtered_df['task name'].unique().tolist():
+        task_rows = filtered_df[filtered_df['task name'] == task_name]
+        for _, row in task_rows.iterrows():
+            display_name = f"{task_name} ({row.get('project name', 'Неизвестно')})"
+            for kind, start_col, end_col in gantt_engine.BAR_KINDS:
+                start, end = row.get(start_col), row.get(end_col)
+                if pd.notna(start) and pd.notna(end):
+                    bar_data.append({
+                        'Задача': display_name,
+                        'Тип': kind,
+                        'Дата начала': start,
+                        'Дата окончания': end,
+                        'Длительность': (end - start).days,
+                        'Отклонение': row.get('total_diff_days', 0)
+                    })
+    bar_df = pd.DataFrame(bar_data)
+    task_start_dates = bar_df.groupby('Задача')['Дата начала'].min().sort_values()
+    bar_df['sort_order'] = bar_df['Задача'].map({task: idx for idx, task in enumerate(task_start_dates.index)})
+    return bar_df.sort_values(['sort_order', 'Тип']).drop('sort_order', axis=1).reset_index(drop=True)
+
+
+def bench_gantt(args):
+    """Полосы диаграммы Ганта: цикл по задачам против длинной таблицы и кеша фигур"""
+    df = _make_project_frame(args.project_source, args.rows)
+    df['task name'] = [f'Задача {i}' for i in range(len(df))]
+    print(f"== {len(df):,} задач")
+
+    tasks = gantt_engine.prepare_tasks(df)
+    loop_time, expected = _best_time(lambda: _loop_gantt_bars(tasks), 1)
+    bars_time, bars = _best_time(lambda: gantt_engine.bar_frame(tasks), args.repeat)
+    columns = list(bars.columns)
+    pd.testing.assert_frame_equal(
+        expected.sort_values(columns, kind='stable').reset_index(drop=True),
+        bars.sort_values(columns, kind='stable').reset_index(drop=True),
+        check_dtype=False
+    )
+    print(f"Цикл по задачам (iterrows):  {loop_time * 1000:9.1f} мс")
+    print(f"Длинная таблица (bar_frame): {bars_time * 1000:9.1f} мс  (x{loop_time / bars_time:.0f})")
+
+    def cold():
+        gantt_engine._registry.clear()
+        return gantt_engine.get_schedule(df, {}).figure('Срок работ план/факт')
+
+    def cached():
+        return figure_cache.cached_figure(
+            df, 'plan_fact_dates', {}, 'gantt',
+            lambda: gantt_engine.get_schedule(df, {}).figure('Срок работ план/факт'))
+
+    cold_time, _ = _best_time(cold, args.repeat)
+    cached()
+    warm_time, _ = _best_time(cached, args.repeat)
+    print(f"Фильтр + полосы + фигура:    {cold_time * 1000:9.1f} мс")
+    print(f"Повтор (кеш фигур):          {warm_time * 1000:9.1f} мс")
+
+    # Объем фигуры: все задачи против страницы задач и сводки по разделам (chart_window)
+    schedule = gantt_engine.get_schedule(df, {})
+    for title, level, page in [('все задачи', None, None), ('страница задач', None, 0), ('сводка по разделам', 'section', None)]:
+        build_time, fig = _best_time(lambda: schedule.figure(title, level=level, page=page), 1)
+        payload = len(fig.to_json())
+        print(f"Фигура ({title}): {schedule.n_items(level) if page is None else chart_window.MAX_CHART_ROWS:6} строк, "
+              f"{payload / 1024:8.1f} КБ JSON, {build_time * 1000:7.1f} мс")
+
+
+def _apply_labels(values, decimals):
+    """Прежнее форматирование подписей: Series.apply с f-строкой для каждого значения"""
+    def label(x):
+        # round(...) + 0.0 убирает "-0" у значений, округляющихся до нуля
+        text = f'{round(x, decimals) + 0.0:,.{decimals}f}'.replace(',', label_format.THOUSANDS_SEPARATOR)
+        return text.replace('.', label_format.DECIMAL_SEPARATOR) if decimals else text
+    return values.apply(lambda x: label(x) if pd.notna(x) else '').to_numpy(dtype=object)
+
+
+def bench_labels(args):
+    """Подписи графиков: Series.apply против векторного format_numbers"""
+    rng = np.random.default_rng(0)
+    values = pd.Series(rng.lognormal(12, 3, args.rows) * rng.choice([-1, 1], args.rows))
+    values[rng.random(args.rows) < 0.1] = np.nan
+    print(f"== {len(values):,} значений")
+
+    for decimals in (0, 2):
+        # Суммы с копейками: на половинах последнего знака f-строка и rint могут разойтись
+        values = values.round(decimals) if decimals else values
+        apply_time, expected = _best_time(lambda: _apply_labels(values, decimals), args.repeat)
+        vector_time, labels = _best_time(lambda: label_format.format_numbers(values, decimals=decimals), args.repeat)
+        assert (labels == expected).all()
+        print(f"Знаков после запятой: {decimals}")
+        print(f"  Series.apply:   {apply_time * 1000:8.1f} мс")
+        print(f"  format_numbers: {vector_time * 1000:8.1f} мс  (x{apply_time / vector_time:.1f})")
+
+
+def bench_budget_cube(args):
+    """Срезы бюджета по периоду: query_engine.aggregate по строкам против куба бюджета"""
+    df = _make_project_frame(args.project_source, args.rows)
+    project = df['project name'].dropna().iloc[0]
+    sums = ['budget plan', 'budget fact', 'reserve budget']
+    print(f"== {len(df):,} строк задач")
+    build_time, cube = _best_time(lambda: budget_cube.BudgetCube(df), args.repeat)
+    print(f"Построение куба: {build_time * 1000:8.1f} мс ({len(cube.cells):,} ячеек)")
+
+    for period_col in budget_cube.PERIOD_LEVELS:
+        for dimension in ('project name', 'section'):
+            for title, filters in [('без фильтров', {}), ('фильтр по проекту', {'project name': project})]:
+                engine_time, expected = _best_time(
+                    lambda: query_engine.aggregate(df, [period_col, dimension], filters, sums=tuple(sums)),
+                    args.repeat
+                )
+                cube_time, result = _best_time(
+                    lambda: cube.slice([dimension], period_col, filters, measures=sums), args.repeat
+                )
+                pd.testing.assert_frame_equal(expected, result)
+                print(f"{period_col} x {dimension}, {title}:")
+                print(f"  query_engine: {engine_time * 1000:8.1f} мс")
+                print(f"  куб:          {cube_time * 1000:8.1f} мс  (x{engine_time / cube_time:.1f})")
+
+
+def _pandas_budget_cumulative(df, period_col, filters, start):
+    """Накопительные суммы цепочкой pandas: фильтры, группировка по периоду и проекту, cumsum"""
+    filtered_df = query_engine.filter_frame(df, filters)
+    sums = ['budget plan', 'budget fact']
+    for column in sums:
+        filtered_df[column] = pd.to_numeric(filtered_df[column], errors='coerce')
+    by_project = filtered_df.groupby([period_col, 'project name'], observed=True)[sums].sum()
+    by_period = by_project.groupby(level=0).sum().astype(float)
+    if start is not None:
+        by_period = by_period[by_period.index >= start]
+    return by_period.cumsum().reset_index()
+
+
+def bench_budget_cumulative(args):
+    """Накопительные суммы бюджета: cumsum по строкам против префиксных сумм куба"""
+    df = _make_project_frame(args.project_source, args.rows)
+    project = df['project name'].dropna().iloc[0]
+    sums = ['budget plan', 'budget fact']
+    print(f"== {len(df):,} строк задач")
+    cube = budget_cube.get_cube(df)
+    build_time, prefix = _best_time(lambda: budget_cube.PrefixSums(cube), args.repeat)
+    print(f"Префиксные суммы: {build_time * 1000:8.1f} мс (ряды x месяцы x меры: {prefix.values.shape})")
+
+    for period_col in budget_cube.PERIOD_LEVELS:
+        periods = cube.cumulative(period_col, measures=sums)[period_col]
+        for title, filters, start in [('без фильтров', {}, None),
+                                      ('фильтр по проекту', {'project name': project}, None),
+                                      ('с середины периода', {}, periods.iloc[len(periods) // 2])]:
+            pandas_time, expected = _best_time(
+                lambda: _pandas_budget_cumulative(df, period_col, filters, start), args.repeat
+            )
+            prefix_time, result = _best_time(
+                lambda: cube.cumulative(period_col, filters, sums, start=start), args.repeat
+            )
+            pd.testing.assert_frame_equal(expected, result)
+            print(f"{period_col}, {title}:")
+            print(f"  pandas:           {pandas_time * 1000:8.1f} мс")
+            print(f"  префиксные суммы: {prefix_time * 1000:8.1f} мс  (x{pandas_time / prefix_time:.1f})")
+
+
+def _apply_period_labels(periods):
+    """Исходное форматирование: Series.apply с ветвлением по freqstr на каждую строку"""
+    months = period_labels.RUSSIAN_MONTHS
+
+    def format_period_display(period_val):
+        if pd.isna(period_val):
+            return 'Н/Д'
+        if period_val.freqstr.startswith('M'):
+            return f"{months[period_val.month]} {period_val.year}"
+        if period_val.freqstr.startswith('Q'):
+            return f"Q{period_val.quarter} {period_val.year}"
+        return str(period_val.year)
+
+    return periods.apply(format_period_display).to_numpy(dtype=object)
+
+
+def bench_period_labels(args):
+    """Подписи периодов: Series.apply против таблицы подписей period_labels"""
+    rng = np.random.default_rng(0)
+    months = pd.Series(pd.PeriodIndex.from_ordinals(rng.integers(600, 700, args.rows), freq='M'))
+    months[rng.random(args.rows) < 0.01] = pd.NaT
+    print(f"== {args.rows:,} периодов")
+    for title, freq in [('месяцы', 'M'), ('кварталы', 'Q'), ('годы', 'Y')]:
+        periods = months.dt.asfreq(freq)
+        apply_time, expected = _best_time(lambda: _apply_period_labels(periods), args.repeat)
+        table_time, labels = _best_time(lambda: period_labels.format_periods(periods), args.repeat)
+        assert (labels == expected).all()
+        print(f"{title}:")
+        print(f"  Series.apply:   {apply_time * 1000:8.1f} мс")
+        print(f"  format_periods: {table_time * 1000:8.1f} мс  (x{apply_time / table_time:.1f})")
+
+
+# Этапы холодного старта: модули, импортируемые на каждом этапе (нарастающим итогом)
+STARTUP_STAGES = [
+    ('страница входа', ['streamlit', 'auth', 'utils']),
+    ('после входа', ['ai_assistant', 'data_loader', 'dataset_store', 'dashboards']),
+    ('первый дашборд', ['dashboards.budget_by_period']),
+    ('все дашборды', [f'dashboards.{dashboard.module}' for dashboard in dashboards.DASHBOARDS.values()]),
+]
+
+# Импорт этапов в чистом интерпретаторе: время этапа и тяжелые пакеты, загруженные к его концу
+_STARTUP_PROBE = """
+import importlib, json, sys, time
+result = []
+for modules in json.loads(sys.argv[1]):
+    start = time.perf_counter()
+    for module in modules:
+        importlib.import_module(module)
+    result.append([time.perf_counter() - start, [m for m in ('pandas', 'plotly.express') if m in sys.modules]])
+print(json.dumps(result))
+"""
+
+
+def _script_definitions(path):
+    """Код верхнего уровня скрипта без вызовов: импорты и определения функций, выполняемые на каждом перезапуске"""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    tree.body = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef))]
+    return compile(tree, path, 'exec')
+
+
+def bench_startup(args):
+    """Импорт страницы входа и дашбордов в чистом интерпретаторе, определения скрипта приложения на перезапуск"""
+    stages = json.dumps([modules for _, modules in STARTUP_STAGES])
+    best = [None] * len(STARTUP_STAGES)
+    for _ in range(args.repeat):
+        output = subprocess.run([sys.executable, '-c', _STARTUP_PROBE, stages], check=True,
+                                capture_output=True, text=True).stdout
+        for i, (elapsed, loaded) in enumerate(json.loads(output.splitlines()[-1])):
+            best[i] = (elapsed, loaded) if best[i] is None or elapsed < best[i][0] else best[i]
+    print("Импорт (лучшее из запусков, нарастающим итогом):")
+    total = 0.0
+    for (title, _), (elapsed, loaded) in zip(STARTUP_STAGES, best):
+        total += elapsed
+        print(f"  {title:15} +{elapsed * 1000:7.1f} мс  = {total * 1000:7.1f} мс  "
+              f"загружены: {', '.join(loaded) or '-'}")
+
+    code = _script_definitions(args.app)
+    exec(code, {'__name__': 'benchmark'})
+    rerun_time, _ = _best_time(lambda: [exec(code, {'__name__': 'benchmark'}) for _ in range(100)], args.repeat)
+    print(f"Определения {args.app} на перезапуск: {rerun_time * 10:.3f} мс")
+
+
+BENCHMARKS = {
+    'csv_sniffer': bench_csv_sniffer,
+    'query_engine': bench_query_engine,
+    'approved_budget': bench_approved_budget,
+    'forecast_edit': bench_forecast_edit,
+    'ingest': bench_ingest,
+    'gantt': bench_gantt,
+    'labels': bench_labels,
+    'budget_cube': bench_budget_cube,
+    'budget_cumulative': bench_budget_cumulative,
+    'period_labels': bench_period_labels,
+    'startup': bench_startup,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности")
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--size-mb', type=int, default=8)
+    parser.add_argument('--source', default='sample_resources_data.csv')
+    parser.add_argument('--project-source', default='sample_project_data_fixed.csv')
+    parser.add_argument('--app', default='project_visualization_app.py')
+    parser.add_argument('--rows', type=int, default=None,
+                        help="Число строк (по умолчанию 2 000 000 для query_engine, 100 000 для approved_budget, "
+                             "5 000 для forecast_edit, 200 000 для ingest, 10 000 для gantt, "
+                             "1 000 000 для labels и period_labels)")
+    args = parser.parse_args()
+    if args.rows is None:
+        args.rows = {'approved_budget': 100_000, 'forecast_edit': 5_000,
+                     'ingest': 200_000, 'gantt': 10_000,
+                     'labels': 1_000_000, 'period_labels': 1_000_000}.get(args.benchmark, 2_000_000)
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == '__main__':
+    main()
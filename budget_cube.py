@@ -0,0 +1,310 @@
+"""
+Материализованный куб бюджета для дашбордов БДДС
+
+Бюджетные дашборды на каждом перезапуске фильтровали строки задач и
+группировали их по периоду и проекту или разделу. Куб строится один раз
+на набор данных: суммы плана, факта, резерва (план - факт по строке) и
+скорректированного бюджета по ячейкам (месяц, проект, раздел, блок,
+задача). Значения измерений хранятся целыми кодами, поэтому срез по
+фильтрам и группировка выполняются по ячейкам куба без сравнения строк.
+
+Кварталы и годы сворачиваются из месяцев: ординал квартала равен
+ординалу месяца // 3, года - // 12 (периоды plan_quarter и plan_year
+строятся из той же даты, что и plan_month).
+
+Для накопительных графиков по кубу строятся префиксные суммы рядов
+(проект, раздел) по сплошной оси месяцев: P[i] - сумма месяцев до i-го.
+Накопленная сумма к концу периода с начала месяца s равна P[конец] - P[s],
+поэтому любая выборка проектов и разделов и любое начало накопления
+считаются сложением рядов и разностью двух строк без пересчета.
+"""
+import threading
+import weakref
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+import query_engine
+
+MONTH_COLUMN = 'plan_month'
+DIMENSIONS = ('project name', 'section', 'block', 'task name')
+# Колонка периода -> (частота, число месяцев в периоде)
+PERIOD_LEVELS = {
+    'plan_month': ('M', 1),
+    'plan_quarter': ('Q', 3),
+    'plan_year': ('Y', 12),
+}
+BASE_MEASURES = ('budget plan', 'budget fact', 'reserve budget')
+# Ряды префиксных сумм
+SERIES_DIMENSIONS = ('project name', 'section')
+# Число строк задач в ячейке (какие периоды есть в выборке)
+ROW_COUNT = 'row count'
+ADJUSTED_COLUMNS = ('budget adjusted', 'adjusted budget')
+# Измерения, строки с пропуском в которых не входят в накопительные суммы
+CUMULATIVE_REQUIRED = ('project name',)
+
+# Ординал месяца для строк без даты
+_NO_MONTH = np.iinfo(np.int64).min
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def adjusted_column(df: pd.DataFrame) -> Optional[str]:
+    """Колонка скорректированного бюджета (None, если ее нет)"""
+    return next((column for column in ADJUSTED_COLUMNS if column in df.columns), None)
+
+
+class BudgetCube:
+    """Суммы бюджета по ячейкам (месяц, проект, раздел, блок, задача)"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df_ref = weakref.ref(df)
+        self.n_rows = len(df)
+        self.columns = tuple(df.columns)
+        self.dimensions = [column for column in DIMENSIONS if column in df.columns]
+        adjusted = adjusted_column(df)
+        self.measures = list(BASE_MEASURES) + ([adjusted] if adjusted else [])
+
+        self._prefix = None
+        self._lock = threading.Lock()
+
+        view = query_engine.get_view(df)
+        data = {}
+        if MONTH_COLUMN in df.columns:
+            data['month'] = view.array(f'period:{MONTH_COLUMN}').to_numpy(dtype=np.int64, na_value=_NO_MONTH)
+        else:
+            data['month'] = np.full(len(df), _NO_MONTH, dtype=np.int64)
+
+        # Коды по возрастанию значений: порядок групп как у groupby(sort=True)
+        self._dtypes = {}
+        self._values = {}
+        self._keys = {}
+        for column in self.dimensions:
+            codes, values = pd.factorize(df[column], sort=True)
+            data[column] = codes
+            self._dtypes[column] = df[column].dtype
+            self._values[column] = values
+            # Ключи фильтра, как в query_engine: строка после strip
+            self._keys[column] = pd.Index(np.asarray(values, dtype=object)).astype(str).str.strip()
+        for measure in self.measures:
+            data[measure] = view.array(f'num:{measure}')
+        data[ROW_COUNT] = np.ones(len(df), dtype=np.int64)
+
+        self.cells = pd.DataFrame(data).groupby(['month'] + self.dimensions, sort=True).sum().reset_index()
+
+    def matches(self, df: pd.DataFrame) -> bool:
+        return self.df_ref() is df and len(df) == self.n_rows and tuple(df.columns) == self.columns
+
+    def _mask(self, filters: Optional[dict]) -> np.ndarray:
+        """Ячейки, прошедшие фильтры {измерение: значение}"""
+        mask = np.ones(len(self.cells), dtype=bool)
+        for column, value in (filters or {}).items():
+            if column not in self._keys:
+                raise KeyError(f"Фильтр по колонке '{column}' не поддерживается кубом бюджета")
+            allowed = np.flatnonzero(self._keys[column] == str(value).strip())
+            mask &= np.isin(self.cells[column].to_numpy(), allowed)
+        return mask
+
+    def slice(self, group_by: list, period_col: Optional[str] = None, filters: Optional[dict] = None,
+              measures: Optional[list] = None) -> pd.DataFrame:
+        """
+        Суммы бюджета по периоду и измерениям
+
+        Результат совпадает с query_engine.aggregate(df, [period_col] + group_by,
+        filters, sums=measures): ячейки с пропуском в ключах отбрасываются,
+        группы отсортированы по ключам.
+
+        Args:
+            group_by: Измерения группировки (из DIMENSIONS)
+            period_col: plan_month, plan_quarter, plan_year или None (без периода)
+            filters: {измерение: значение}; строки сравниваются после strip
+            measures: Суммы (по умолчанию все меры куба)
+
+        Returns:
+            DataFrame: период, измерения, суммы (float64)
+        """
+        measures = list(measures or self.measures)
+        mask = self._mask(filters)
+        keys = {}
+        month = self.cells['month'].to_numpy()
+        if period_col is not None:
+            freq, months = PERIOD_LEVELS[period_col]
+            mask &= month != _NO_MONTH
+        for column in group_by:
+            codes = self.cells[column].to_numpy()
+            mask &= codes >= 0
+        # Ключи берутся после всех условий: ячейки с пропуском в любом ключе отброшены
+        if period_col is not None:
+            keys[period_col] = month[mask] // months
+        for column in group_by:
+            keys[column] = self.cells[column].to_numpy()[mask]
+
+        frame = pd.DataFrame(keys)
+        for measure in measures:
+            frame[measure] = self.cells[measure].to_numpy()[mask]
+        if keys:
+            result = frame.groupby(list(keys), sort=True)[measures].sum().reset_index()
+        else:
+            result = frame[measures].sum().to_frame().T
+
+        if period_col is not None:
+            ordinals = result[period_col].to_numpy(dtype=np.int64)
+            result[period_col] = pd.PeriodIndex.from_ordinals(ordinals, freq=freq)
+        for column in group_by:
+            values = self._values[column].take(result[column].to_numpy())
+            result[column] = pd.Series(values, index=result.index).astype(self._dtypes[column])
+        for measure in measures:
+            result[measure] = result[measure].astype(np.float64)
+        return result
+
+    def prefix_sums(self) -> 'PrefixSums':
+        """Префиксные суммы рядов (проект, раздел) по месяцам (строятся при первом обращении)"""
+        with self._lock:
+            if self._prefix is None:
+                self._prefix = PrefixSums(self)
+            return self._prefix
+
+    def cumulative(self, period_col: str = MONTH_COLUMN, filters: Optional[dict] = None,
+                   measures: Optional[list] = None, start: Optional[pd.Period] = None) -> pd.DataFrame:
+        """
+        Накопленные суммы бюджета к концу каждого периода
+
+        Фильтры по проекту и разделу выбирают ряды готовых префиксных сумм;
+        при фильтрах по другим измерениям префиксные суммы считаются по
+        отобранным ячейкам куба. Строки без проекта не учитываются, как в
+        исходной группировке по периоду и проекту.
+
+        Args:
+            period_col: plan_month, plan_quarter или plan_year
+            filters: {измерение: значение}; строки сравниваются после strip
+            measures: Суммы (по умолчанию все меры куба)
+            start: Период period_col, с начала которого идет накопление (None - с первого)
+
+        Returns:
+            DataFrame: период (только периоды со строками выборки начиная со start), суммы (float64)
+        """
+        measures = list(measures or self.measures)
+        prefix = self.prefix_sums()
+        required = [column for column in CUMULATIVE_REQUIRED if column in self.dimensions]
+        if all(column in prefix.series_codes for column in (filters or {})):
+            totals = prefix.totals(filters, required)
+        else:
+            mask = self._mask(filters)
+            for column in required:
+                mask &= self.cells[column].to_numpy() >= 0
+            cells = self.cells[mask]
+            totals = _month_prefix(cells['month'].to_numpy(), None, 1, cells[prefix.measures].to_numpy(dtype=np.float64),
+                                   prefix.first_month, prefix.n_months)[0]
+        return prefix.periods(totals, period_col, measures, start)
+
+
+class PrefixSums:
+    """Префиксные суммы мер куба по рядам (проект, раздел) и сплошной оси месяцев"""
+
+    def __init__(self, cube: BudgetCube):
+        self.measures = list(cube.measures) + [ROW_COUNT]
+        cells = cube.cells[cube.cells['month'] != _NO_MONTH]
+        month = cells['month'].to_numpy()
+        self.first_month = int(month.min()) if len(month) else 0
+        self.n_months = int(month.max()) - self.first_month + 1 if len(month) else 0
+
+        # Ряд - уникальное сочетание кодов проекта и раздела (пропуски - отдельный код -1)
+        dimensions = [column for column in SERIES_DIMENSIONS if column in cube.dimensions]
+        combined = np.zeros(len(cells), dtype=np.int64)
+        for column in dimensions:
+            combined = combined * (len(cube._values[column]) + 1) + cells[column].to_numpy() + 1
+        keys, series = np.unique(combined, return_inverse=True)
+        n_series = len(keys)
+        self.series_codes = {}
+        for column in reversed(dimensions):
+            size = len(cube._values[column]) + 1
+            keys, codes = np.divmod(keys, size)
+            self.series_codes[column] = codes - 1
+        self._keys = {column: cube._keys[column] for column in dimensions}
+        self.values = _month_prefix(month, series, n_series, cells[self.measures].to_numpy(dtype=np.float64),
+                                    self.first_month, self.n_months)
+
+    def totals(self, filters: Optional[dict] = None, required: tuple = ()) -> np.ndarray:
+        """
+        Префиксные суммы выборки рядов: массив (месяцы + 1, меры)
+
+        Args:
+            filters: {измерение ряда: значение}; строки сравниваются после strip
+            required: Измерения ряда, ряды с пропуском в которых не учитываются
+        """
+        selected = np.ones(len(self.values), dtype=bool)
+        for column, value in (filters or {}).items():
+            allowed = np.flatnonzero(self._keys[column] == str(value).strip())
+            selected &= np.isin(self.series_codes[column], allowed)
+        for column in required:
+            selected &= self.series_codes[column] >= 0
+        return self.values[selected].sum(axis=0)
+
+    def periods(self, totals: np.ndarray, period_col: str, measures: list,
+                start: Optional[pd.Period] = None) -> pd.DataFrame:
+        """Накопленные суммы к концу периодов period_col по префиксным суммам выборки"""
+        freq, months = PERIOD_LEVELS[period_col]
+        last_month = self.first_month + self.n_months - 1
+        ordinals = np.arange(self.first_month // months, last_month // months + 1, dtype=np.int64)
+        # Границы периодов на оси месяцев (индексы строк префиксных сумм)
+        begin = np.clip(ordinals * months - self.first_month, 0, self.n_months)
+        end = np.clip(ordinals * months + months - self.first_month, 0, self.n_months)
+        count = self.measures.index(ROW_COUNT)
+        present = totals[end, count] - totals[begin, count] > 0
+        origin = 0
+        if start is not None:
+            start_ordinal = start.ordinal
+            present &= ordinals >= start_ordinal
+            origin = int(np.clip(start_ordinal * months - self.first_month, 0, self.n_months))
+
+        columns = [self.measures.index(measure) for measure in measures]
+        values = totals[end[present]][:, columns] - totals[origin, columns]
+        result = pd.DataFrame({period_col: pd.PeriodIndex.from_ordinals(ordinals[present], freq=freq)})
+        for position, measure in enumerate(measures):
+            result[measure] = values[:, position]
+        return result
+
+
+def _month_prefix(month: np.ndarray, series: Optional[np.ndarray], n_series: int, values: np.ndarray,
+                  first_month: int, n_months: int) -> np.ndarray:
+    """
+    Префиксные суммы значений ячеек по месяцам
+
+    Returns:
+        Массив (ряды, месяцы + 1, меры); строка 0 каждого ряда - нули
+    """
+    prefix = np.zeros((n_series, n_months + 1, values.shape[1]), dtype=np.float64)
+    valid = month != _NO_MONTH
+    series = np.zeros(len(month), dtype=np.int64) if series is None else series
+    np.add.at(prefix, (series[valid], month[valid] - first_month + 1), values[valid])
+    return np.cumsum(prefix, axis=1, out=prefix)
+
+
+def _unregister(key, cube):
+    with _registry_lock:
+        if _registry.get(key) is cube:
+            del _registry[key]
+
+
+def get_cube(df: pd.DataFrame) -> BudgetCube:
+    """
+    Куб бюджета набора данных (строится при первом обращении, пока жив DataFrame)
+
+    Args:
+        df: Нормализованный DataFrame из session_state
+
+    Returns:
+        BudgetCube
+    """
+    key = id(df)
+    with _registry_lock:
+        cube = _registry.get(key)
+        if cube is not None and cube.matches(df):
+            return cube
+    cube = BudgetCube(df)
+    with _registry_lock:
+        _registry[key] = cube
+    weakref.finalize(df, _unregister, key, cube)
+    return cube
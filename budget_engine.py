@@ -0,0 +1,556 @@
+"""
+Расчет утвержденного бюджета по правилам распределения
+
+Задачи раскладываются по месяцам своих интервалов (план. начало - план. окончание)
+массивами NumPy в сетку (группа, месяц). Правило распределения компилируется
+в вектор долей для каждого числа месяцев этапа и применяется к сетке как
+арифметика над массивами, поэтому смена или сравнение правил не требует
+повторной раскладки задач.
+
+Правила хранятся в таблице report_parameters (отчет 'Утвержденный бюджет',
+ключ 'budget_rule:<имя>', значение - JSON); встроенные правила из
+BUDGET_RULES доступны всегда.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+import db
+
+try:
+    import pyarrow as pa
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+# Встроенный справочник правил распределения бюджета
+BUDGET_RULES = {
+    'default': {
+        'kind': 'first_middle_last',
+        'first_month_percent': 0.50,  # 50% на первый месяц
+        'middle_months_percent': 0.45,  # 45% на промежуточные месяцы
+        'last_month_percent': 0.05,  # 5% на последний месяц
+        'description': '50% - первый месяц, 45% - равномерно по промежуточным месяцам, 5% - последний месяц'
+    },
+    'uniform': {
+        'kind': 'uniform',
+        'description': 'Равномерно по всем месяцам этапа'
+    },
+}
+
+# Типы правил: имя -> обязательные параметры
+RULE_KINDS = {
+    'first_middle_last': ('first_month_percent', 'middle_months_percent', 'last_month_percent'),
+    'uniform': (),
+}
+
+# Допустимое отклонение суммы долей правила от 1
+RULE_SHARES_TOLERANCE = 1e-6
+
+# Колонки задачи, от которых зависит расчет, и колонки группировки этапов
+TASK_INPUT_COLS = ['budget plan', 'plan start', 'plan end']
+GROUPING_COLS = ['project name', 'section', 'task name']
+
+BUDGET_RULES_REPORT = 'Утвержденный бюджет'
+BUDGET_RULE_PREFIX = 'budget_rule:'
+
+# Число сеток (группа, месяц), которые держатся в памяти для повторных расчетов
+MONTH_GRID_CACHE_SIZE = 8
+
+_grid_cache = OrderedDict()
+_grid_cache_lock = threading.Lock()
+
+
+def get_budget_rules() -> dict:
+    """
+    Справочник правил: встроенные правила и правила из report_parameters
+
+    Returns:
+        Словарь {имя правила: параметры}; правило из базы перекрывает встроенное
+    """
+    rules = {name: dict(spec) for name, spec in BUDGET_RULES.items()}
+    # Только чтение: отсутствующая база не создается
+    if not db.database_exists():
+        return rules
+    try:
+        rows = db.fetch_all(
+            'SELECT parameter_key, parameter_value FROM report_parameters '
+            'WHERE report_name = ? AND parameter_key LIKE ?',
+            (BUDGET_RULES_REPORT, BUDGET_RULE_PREFIX + '%')
+        )
+    except sqlite3.Error:
+        return rules
+
+    for parameter_key, parameter_value in rows:
+        try:
+            spec = json.loads(parameter_value)
+            compile_rule(spec)
+        except ValueError:
+            # Некорректное правило в базе не должно ломать отчет (JSONDecodeError - тоже ValueError)
+            continue
+        rules[parameter_key[len(BUDGET_RULE_PREFIX):]] = spec
+    return rules
+
+
+def save_budget_rule(rule_name: str, spec: dict, updated_by: Optional[str] = None) -> bool:
+    """
+    Сохраняет правило распределения в report_parameters
+
+    Args:
+        rule_name: Имя правила
+        spec: Параметры правила ('kind', доли, 'description')
+        updated_by: Пользователь, изменивший правило
+
+    Returns:
+        True при успехе
+
+    Raises:
+        ValueError: Некорректное правило (см. compile_rule)
+    """
+    compile_rule(spec)
+    try:
+        db.execute('''
+            INSERT INTO report_parameters
+                (report_name, parameter_key, parameter_value, parameter_type, description, updated_by)
+            VALUES (?, ?, ?, 'json', ?, ?)
+            ON CONFLICT(report_name, parameter_key) DO UPDATE SET
+                parameter_value = excluded.parameter_value,
+                description = excluded.description,
+                updated_at = CURRENT_TIMESTAMP,
+                updated_by = excluded.updated_by
+        ''', (BUDGET_RULES_REPORT, BUDGET_RULE_PREFIX + rule_name,
+              json.dumps(spec, ensure_ascii=False), spec.get('description', ''), updated_by))
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def delete_budget_rule(rule_name: str) -> bool:
+    """Удаляет правило из report_parameters (встроенные правила остаются)"""
+    try:
+        db.execute('DELETE FROM report_parameters WHERE report_name = ? AND parameter_key = ?',
+                   (BUDGET_RULES_REPORT, BUDGET_RULE_PREFIX + rule_name))
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def compile_rule(spec: dict) -> tuple:
+    """
+    Компилирует правило в хешируемый ключ ядра (тип, параметры)
+
+    Raises:
+        ValueError: Правило не словарь, неизвестный тип правила, нет доли,
+            доли отрицательные или в сумме не равны 1
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("Правило должно быть JSON-объектом")
+    kind = spec.get('kind', 'first_middle_last')
+    if kind not in RULE_KINDS:
+        raise ValueError(f"Неизвестный тип правила: {kind}")
+    missing = [key for key in RULE_KINDS[kind] if key not in spec]
+    if missing:
+        raise ValueError(f"В правиле нет долей: {', '.join(missing)}")
+    try:
+        params = tuple(float(spec[key]) for key in RULE_KINDS[kind])
+    except (TypeError, ValueError):
+        raise ValueError("Доли правила должны быть числами")
+    if any(value < 0 for value in params):
+        raise ValueError("Доли правила не могут быть отрицательными")
+    # Доли распределяют весь бюджет этапа: иначе правило добавляет или теряет бюджет
+    if params and not np.isclose(sum(params), 1.0, rtol=0, atol=RULE_SHARES_TOLERANCE):
+        raise ValueError(f"Сумма долей правила должна быть равна 1 (сейчас {sum(params):g})")
+    return (kind,) + params
+
+
+@lru_cache(maxsize=4096)
+def rule_weights(rule_key: tuple, num_months: int) -> np.ndarray:
+    """
+    Вектор долей бюджета по месяцам этапа для правила и числа месяцев
+
+    Args:
+        rule_key: Результат compile_rule
+        num_months: Число месяцев этапа
+
+    Returns:
+        Массив длины num_months (только для чтения, кешируется)
+    """
+    kind = rule_key[0]
+    if kind == 'uniform':
+        weights = np.full(num_months, 1.0 / num_months)
+    else:
+        first_month_percent, middle_months_percent, last_month_percent = rule_key[1:]
+        if num_months == 1:
+            # Если только один месяц, весь бюджет идет туда
+            weights = np.array([1.0])
+        elif num_months == 2:
+            # Если два месяца: первый месяц и (промежуточные + последний)
+            weights = np.array([first_month_percent, middle_months_percent + last_month_percent])
+        else:
+            weights = np.full(num_months, middle_months_percent / (num_months - 2))
+            weights[0] = first_month_percent
+            weights[-1] = last_month_percent
+    weights.setflags(write=False)
+    return weights
+
+
+def _cell_weights(rule_key: tuple, cell_index: np.ndarray, cell_num_months: np.ndarray) -> np.ndarray:
+    """Доли для ячеек сетки: векторы правила склеиваются в одну таблицу поиска"""
+    lengths = np.unique(cell_num_months)
+    table = np.concatenate([rule_weights(rule_key, int(n)) for n in lengths])
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return table[offsets[np.searchsorted(lengths, cell_num_months)] + cell_index]
+
+
+class MonthGrid:
+    """Плановый бюджет активных задач по (группа, месяц) - 100% для месяца"""
+
+    def __init__(self, grouping_cols, group_keys, cell_group, cell_index, cell_month, month_total, group_months):
+        self.grouping_cols = grouping_cols
+        self.group_keys = group_keys
+        self.cell_group = cell_group
+        self.cell_index = cell_index
+        self.cell_month = cell_month
+        self.month_total = month_total
+        self.cell_num_months = group_months[cell_group]
+
+
+def _grid_fingerprint(df: pd.DataFrame, columns: list) -> str:
+    """
+    Отпечаток содержимого колонок для кеша сеток
+
+    Хешируются буферы данных (numpy / Arrow) без поэлементного обхода;
+    для прочих колонок используется hash_pandas_object.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(repr([(col, str(df[col].dtype)) for col in columns]).encode('utf-8'))
+    for col in columns:
+        values = df[col].array
+        if isinstance(values.dtype, np.dtype) and values.dtype != object:
+            digest.update(np.ascontiguousarray(values.to_numpy()).view(np.uint8))
+        elif ARROW_AVAILABLE and hasattr(values, '__arrow_array__'):
+            arrow_values = pa.array(values)
+            chunks = arrow_values.chunks if isinstance(arrow_values, pa.ChunkedArray) else [arrow_values]
+            for chunk in chunks:
+                digest.update(f'{chunk.offset}:{len(chunk)}'.encode('ascii'))
+                for buffer in chunk.buffers():
+                    if buffer is not None:
+                        digest.update(buffer)
+        else:
+            digest.update(pd.util.hash_pandas_object(df[col], index=False).to_numpy().view(np.uint8))
+    return digest.hexdigest()
+
+
+def build_month_grid(df):
+    """
+    Раскладывает задачи по месяцам этапов своих групп
+
+    Результат кешируется по содержимому нужных колонок, поэтому повторный
+    расчет с другим правилом использует готовую сетку.
+
+    Args:
+        df: DataFrame с данными проектов
+
+    Returns:
+        (MonthGrid или None, сообщение об ошибке или None)
+    """
+    # Проверяем наличие необходимых колонок
+    missing_cols = [col for col in TASK_INPUT_COLS if col not in df.columns]
+    if missing_cols:
+        return None, f"Отсутствуют необходимые колонки: {', '.join(missing_cols)}"
+
+    grouping_cols = [col for col in GROUPING_COLS if col in df.columns]
+    key = _grid_fingerprint(df, TASK_INPUT_COLS + grouping_cols)
+    with _grid_cache_lock:
+        if key in _grid_cache:
+            _grid_cache.move_to_end(key)
+            return _grid_cache[key]
+
+    result = _build_month_grid(_prepare_tasks(df, grouping_cols), grouping_cols)
+    with _grid_cache_lock:
+        _grid_cache[key] = result
+        while len(_grid_cache) > MONTH_GRID_CACHE_SIZE:
+            _grid_cache.popitem(last=False)
+    return result
+
+
+def clear_month_grid_cache():
+    """Очищает кеш сеток (группа, месяц)"""
+    with _grid_cache_lock:
+        _grid_cache.clear()
+
+
+def _prepare_tasks(df, grouping_cols):
+    """Колонки расчета с датами и бюджетом, приведенными к datetime / числу"""
+    work_df = df[TASK_INPUT_COLS + grouping_cols].copy()
+
+    # Конвертируем даты (уже приведенные колонки не разбираются повторно)
+    for col in ['plan start', 'plan end']:
+        if not pd.api.types.is_datetime64_any_dtype(work_df[col]):
+            work_df[col] = pd.to_datetime(work_df[col], errors='coerce', dayfirst=True)
+    if not pd.api.types.is_float_dtype(work_df['budget plan']):
+        work_df['budget plan'] = pd.to_numeric(work_df['budget plan'], errors='coerce')
+    return work_df
+
+
+def _build_month_grid(work_df, grouping_cols):
+    # Фильтруем строки с валидными данными
+    valid_mask = (
+        work_df['plan start'].notna() &
+        work_df['plan end'].notna() &
+        work_df['budget plan'].notna() &
+        (work_df['budget plan'] > 0) &
+        (work_df['plan start'] <= work_df['plan end'])
+    )
+    work_df = work_df[valid_mask]
+
+    if work_df.empty:
+        return None, "Нет данных с валидными датами и бюджетом"
+
+    # Номер группы для каждой задачи (строки с пропуском в ключе не входят ни в одну группу)
+    if grouping_cols:
+        grouped = work_df.groupby(grouping_cols, sort=True, observed=True)
+        group_ids = grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+        group_keys = grouped.size().index.to_frame(index=False)
+        # Ключи category возвращаются значениями, как в построчном расчете
+        group_keys = group_keys.astype({col: dtype.categories.dtype for col, dtype in group_keys.dtypes.items()
+                                        if isinstance(dtype, pd.CategoricalDtype)})
+        in_group = group_ids >= 0
+        work_df = work_df[in_group]
+        group_ids = group_ids[in_group]
+        n_groups = len(group_keys)
+    else:
+        group_ids = np.zeros(len(work_df), dtype=np.int64)
+        group_keys = pd.DataFrame(index=range(1))
+        n_groups = 1
+
+    if len(work_df) == 0:
+        return None, "Нет данных для расчета утвержденного бюджета"
+
+    # Месяцы как целые ординалы: задача активна в месяцах [start_month, end_month]
+    start_month = work_df['plan start'].dt.to_period('M').array.asi8
+    end_month = work_df['plan end'].dt.to_period('M').array.asi8
+    budget = work_df['budget plan'].to_numpy(dtype=np.float64)
+
+    group_first = np.full(n_groups, np.iinfo(np.int64).max)
+    group_last = np.full(n_groups, np.iinfo(np.int64).min)
+    np.minimum.at(group_first, group_ids, start_month)
+    np.maximum.at(group_last, group_ids, end_month)
+    group_months = group_last - group_first + 1
+    group_offset = np.concatenate(([0], np.cumsum(group_months)[:-1]))
+
+    # Раскладываем каждую задачу по месяцам ее интервала в общую сетку (группа, месяц)
+    task_months = end_month - start_month + 1
+    task_first_cell = group_offset[group_ids] + (start_month - group_first[group_ids])
+    task_starts = np.repeat(task_first_cell - np.cumsum(task_months) + task_months, task_months)
+    cells = np.arange(task_months.sum()) + task_starts
+    n_cells = int(group_months.sum())
+    month_total = np.bincount(cells, weights=np.repeat(budget, task_months), minlength=n_cells)
+    month_active = np.bincount(cells, minlength=n_cells)
+
+    # Координаты ячеек сетки: группа, номер месяца в этапе, месяц
+    cell_group = np.repeat(np.arange(n_groups), group_months)
+    cell_index = np.arange(n_cells) - group_offset[cell_group]
+    cell_month = group_first[cell_group] + cell_index
+
+    # Месяцы без активных задач пропускаются (бюджет задач строго больше нуля)
+    keep = month_active > 0
+    grid = MonthGrid(grouping_cols, group_keys, cell_group[keep], cell_index[keep],
+                     cell_month[keep], month_total[keep], group_months)
+    return grid, None
+
+
+def apply_rule(grid: MonthGrid, rule_name: str, rule: dict) -> pd.DataFrame:
+    """
+    Распределяет бюджет сетки по правилу
+
+    Args:
+        grid: Результат build_month_grid
+        rule_name: Имя правила (попадает в колонку rule_name)
+        rule: Параметры правила
+
+    Returns:
+        DataFrame с распределением утвержденного бюджета по месяцам
+    """
+    weights = _cell_weights(compile_rule(rule), grid.cell_index, grid.cell_num_months)
+    approved_budget_df = pd.DataFrame({
+        'month': pd.PeriodIndex.from_ordinals(grid.cell_month, freq='M'),
+        'approved budget': grid.month_total * weights,
+        'budget plan': grid.month_total,  # Плановый бюджет для месяца (100%)
+        'rule_name': rule_name,
+    })
+    for col in grid.grouping_cols:
+        approved_budget_df[col] = grid.group_keys[col].iloc[grid.cell_group].reset_index(drop=True)
+    return approved_budget_df
+
+
+def calculate_approved_budget(df, rule_name='default'):
+    """
+    Рассчитывает утвержденный бюджет на основе правил распределения.
+
+    Логика расчета:
+    1. Группируем задачи по проекту/разделу/задаче
+    2. Этап группы - все месяцы от минимальной даты начала до максимальной даты окончания
+    3. Каждая задача раскладывается на месяцы своего интервала, бюджеты суммируются
+       по (группа, месяц) - это 100% для месяца
+    4. Распределяем эту сумму по правилу между месяцами этапа
+
+    Для правила default результат совпадает с исходным построчным расчетом
+    (calculate_approved_budget_reference в test_approved_budget.py).
+
+    Args:
+        df: DataFrame с данными проектов
+        rule_name: название правила из справочника (get_budget_rules)
+
+    Returns:
+        DataFrame с распределением утвержденного бюджета по месяцам
+    """
+    return calculate_approved_budget_for_rules(df, [rule_name])[rule_name]
+
+
+def calculate_approved_budget_for_rules(df, rule_names):
+    """
+    Утвержденный бюджет сразу по нескольким правилам (сетка строится один раз)
+
+    Args:
+        df: DataFrame с данными проектов
+        rule_names: Имена правил; неизвестные заменяются на default
+
+    Returns:
+        Словарь {имя правила: (DataFrame, сообщение об ошибке или None)}
+    """
+    rules = get_budget_rules()
+    grid, error = build_month_grid(df)
+    results = {}
+    for requested_name in rule_names:
+        rule_name = requested_name if requested_name in rules else 'default'
+        if error:
+            results[requested_name] = (pd.DataFrame(), error)
+        else:
+            results[requested_name] = (apply_rule(grid, rule_name, rules[rule_name]), None)
+    return results
+
+
+
+class IncrementalApprovedBudget:
+    """
+    Утвержденный бюджет с пересчетом только измененных этапов
+
+    Хранит последние входные данные и результат. При update строки сравниваются
+    с сохраненными, заново раскладываются только группы (проект/раздел/задача),
+    в которых изменились даты или бюджет, и их строки заменяются в результате.
+    Результат совпадает с calculate_approved_budget на тех же данных.
+    """
+
+    def __init__(self, df, rule_name='default'):
+        rules = get_budget_rules()
+        self.rule_name = rule_name if rule_name in rules else 'default'
+        self.rule = rules[self.rule_name]
+        self.last_changed_groups = 0
+        self._reset(df)
+
+    def _reset(self, df):
+        """Полный расчет: запоминает входные данные, коды групп и результат"""
+        self.grouping_cols = [col for col in GROUPING_COLS if col in df.columns]
+        self.columns = tuple(df.columns)
+        self.result, self.error = calculate_approved_budget_for_rules(df, [self.rule_name])[self.rule_name]
+        if any(col not in df.columns for col in TASK_INPUT_COLS):
+            self.inputs = None
+            return
+        self.inputs = _prepare_tasks(df, self.grouping_cols).reset_index(drop=True)
+        if self.grouping_cols:
+            grouped = self.inputs.groupby(self.grouping_cols, sort=True, observed=True)
+            self.group_codes = grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+            self.group_index = grouped.size().index
+        else:
+            self.group_codes = np.zeros(len(self.inputs), dtype=np.int64)
+            self.group_index = None
+        self.result_codes = self._codes_of(self.result)
+
+    def _codes_of(self, result):
+        """Код группы (в порядке сортировки всех групп) для каждой строки результата"""
+        if result.empty:
+            return np.empty(0, dtype=np.int64)
+        if self.group_index is None:
+            return np.zeros(len(result), dtype=np.int64)
+        if isinstance(self.group_index, pd.MultiIndex):
+            keys = pd.MultiIndex.from_frame(result[self.grouping_cols])
+        else:
+            keys = pd.Index(result[self.grouping_cols[0]])
+        return self.group_index.get_indexer(keys)
+
+    def _same_shape(self, df) -> bool:
+        if self.inputs is None or tuple(df.columns) != self.columns or len(df) != len(self.inputs):
+            return False
+        # Ключи групп не редактируются; если они изменились, нужен полный пересчет
+        for col in self.grouping_cols:
+            if not df[col].reset_index(drop=True).equals(self.inputs[col]):
+                return False
+        return True
+
+    def update(self, df):
+        """
+        Пересчитывает бюджет для новых данных
+
+        Args:
+            df: Данные проекта после редактирования (те же строки в том же порядке)
+
+        Returns:
+            (DataFrame, сообщение об ошибке или None) - как calculate_approved_budget
+        """
+        if not self._same_shape(df):
+            self._reset(df)
+            self.last_changed_groups = -1
+            return self.result, self.error
+
+        new_inputs = _prepare_tasks(df, self.grouping_cols).reset_index(drop=True)
+        changed = np.zeros(len(new_inputs), dtype=bool)
+        for col in TASK_INPUT_COLS:
+            old_values, new_values = self.inputs[col], new_inputs[col]
+            changed |= ~((old_values == new_values) | (old_values.isna() & new_values.isna())).to_numpy()
+
+        affected = np.unique(self.group_codes[changed])
+        affected = affected[affected >= 0]
+        self.inputs = new_inputs
+        self.last_changed_groups = len(affected)
+        if len(affected) == 0:
+            return self.result, self.error
+        if self.error:
+            self._reset(df)
+            return self.result, self.error
+
+        # Заново раскладываем только затронутые группы
+        grid, error = _build_month_grid(new_inputs[np.isin(self.group_codes, affected)], self.grouping_cols)
+        patch = apply_rule(grid, self.rule_name, self.rule) if grid is not None else self.result.iloc[:0]
+        if patch.empty and np.isin(self.result_codes, affected).all():
+            # Не осталось данных: сообщение об ошибке берем из полного расчета
+            self._reset(df)
+            return self.result, self.error
+
+        # Результат отсортирован по коду группы: строки затронутых групп занимают
+        # непрерывные диапазоны и заменяются срезами патча без пересортировки
+        patch_codes = self._codes_of(patch)
+        old_bounds = np.searchsorted(self.result_codes, affected, side='left')
+        old_ends = np.searchsorted(self.result_codes, affected, side='right')
+        patch_bounds = np.searchsorted(patch_codes, affected, side='left')
+        patch_ends = np.searchsorted(patch_codes, affected, side='right')
+
+        pieces, code_pieces = [], []
+        position = 0
+        for old_start, old_end, patch_start, patch_end in zip(old_bounds, old_ends, patch_bounds, patch_ends):
+            pieces += [self.result.iloc[position:old_start], patch.iloc[patch_start:patch_end]]
+            code_pieces += [self.result_codes[position:old_start], patch_codes[patch_start:patch_end]]
+            position = old_end
+        pieces.append(self.result.iloc[position:])
+        code_pieces.append(self.result_codes[position:])
+
+        self.result = pd.concat(pieces, ignore_index=True)
+        self.result_codes = np.concatenate(code_pieces)
+        return self.result, None
@@ -0,0 +1,57 @@
+"""
+Окно по оси категорий для графиков с длинными списками задач
+
+Графики "одна полоса на задачу" при тысячах задач упираются в размер
+JSON фигуры и отрисовку в браузере. Выше порога MAX_CHART_ROWS график
+показывает страницу задач (по убыванию отклонения) или сводку по
+разделам / блокам, поэтому объем фигуры не зависит от размера набора.
+
+Пороги задаются переменными окружения CHART_MAX_ROWS и
+CHART_AGGREGATE_THRESHOLD.
+"""
+import os
+
+import pandas as pd
+
+# Число категорий на оси графика (размер страницы)
+MAX_CHART_ROWS = int(os.getenv('CHART_MAX_ROWS', '100'))
+# Выше этого числа задач по умолчанию показывается сводка, а не страницы задач
+AGGREGATE_THRESHOLD = int(os.getenv('CHART_AGGREGATE_THRESHOLD', '1000'))
+
+
+def page_count(n_items: int, page_size: int = MAX_CHART_ROWS) -> int:
+    """Число страниц для n_items категорий (не меньше одной)"""
+    return max(1, -(-n_items // page_size))
+
+
+def page_bounds(page: int, n_items: int, page_size: int = MAX_CHART_ROWS) -> tuple:
+    """
+    Границы страницы [start, end) в списке категорий
+
+    Args:
+        page: Номер страницы с нуля (приводится к допустимому диапазону)
+        n_items: Число категорий
+        page_size: Размер страницы
+
+    Returns:
+        (start, end)
+    """
+    page = min(max(page, 0), page_count(n_items, page_size) - 1)
+    start = page * page_size
+    return start, min(start + page_size, n_items)
+
+
+def top_window(keys: pd.Series, scores: pd.Series, page: int, page_size: int = MAX_CHART_ROWS) -> pd.Index:
+    """
+    Ключи категорий страницы при ранжировании по убыванию score
+
+    Для повторяющихся ключей берется максимальный score; при равенстве
+    сохраняется порядок первого появления ключа.
+
+    Returns:
+        Index ключей страницы (в порядке ранга)
+    """
+    best = scores.groupby(keys, sort=False, observed=True).max()
+    ranked = best.sort_values(ascending=False, kind='stable').index
+    start, end = page_bounds(page, len(ranked), page_size)
+    return ranked[start:end]
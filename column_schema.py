@@ -0,0 +1,138 @@
+"""
+Сопоставление ожидаемых колонок с фактическими заголовками файла
+
+Выгрузки приходят с разными вариантами заголовков ("Старт План" /
+"План Старт", переносы строк, опечатки, английские названия). Вместо
+поиска по всем колонкам при каждом перезапуске дашборда схема набора
+строится один раз: каждому каноническому имени колонки сопоставляется
+фактическая колонка или None. Схема зависит только от списка колонок,
+поэтому кешируется по нему и строится при загрузке файла (data_loader).
+
+Правила сопоставления для канонического имени:
+1. точное совпадение с каноническим именем или одним из синонимов (по порядку);
+2. первая колонка, совпадающая с синонимом без учета регистра или
+   содержащая его / содержащаяся в нем (для имен из WORD_MATCH - также
+   колонка, содержащая все слова синонима длиннее двух букв);
+3. первая колонка, содержащая все ключевые слова одного из наборов
+   KEYWORD_FALLBACKS.
+
+Дополнительные синонимы задаются JSON-файлом {каноническое имя: [синонимы]}
+по пути из переменной окружения COLUMN_SYNONYMS_FILE.
+"""
+import json
+import os
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+import pandas as pd
+
+COLUMN_SYNONYMS = {
+    # Данные проекта (нормализованные колонки data_loader)
+    'project name': ['Проект', 'project'],
+    'section': ['Раздел', 'section'],
+    'task name': ['Задача', 'task'],
+    'plan start': ['Старт План', 'План Старт'],
+    'plan end': ['Конец План', 'План Конец'],
+    'base start': ['Старт Факт', 'Факт Старт'],
+    'base end': ['Конец Факт', 'Факт Конец'],
+    # Документация
+    'Отклонение разделов РД': ['Отклонение разделов рд', 'Отклон. Количества разделов РД',
+                               'Отклонение количества разделов РД', 'Отклон. разделов РД',
+                               'Отклонение разделов РД по Договору'],
+    'Количество разделов РД по Договору': ['Количество разделов РД', 'разделов РД',
+                                           'Количетсов разделов РД по Договору'],
+    'РД по Договору': [],
+    'На согласовании': ['согласовании'],
+    'Выдано в производство работ': ['производство работ', 'в производство'],
+    'Выдана подрядчику': ['подрядчику'],
+    'На доработке': ['доработке'],
+    # Ресурсы и техника
+    'Проект': ['project'],
+    'Контрагент': ['Подразделение', 'contractor'],
+    'Период': ['period', 'Месяц', 'month'],
+    'Среднее': ['Среднее за неделю', 'Среднее за месяц', 'среднее', 'average'],
+    'Дельта': ['delta', 'Дельта (без %)'],
+    'Дельта (%)': ['Дельта %', 'Delta %', 'Дельта(%)', 'Дельта%'],
+    **{f'{week} неделя': [f'{week} недел', f'недел {week}', f'week {week}'] for week in range(1, 6)},
+}
+
+# Имена, для которых колонка подходит и по набору слов синонима
+WORD_MATCH = {
+    'project name', 'section', 'task name', 'plan start', 'plan end', 'base start', 'base end',
+    'Отклонение разделов РД', 'Количество разделов РД по Договору', 'РД по Договору',
+    'На согласовании', 'Выдано в производство работ', 'Выдана подрядчику', 'На доработке',
+}
+
+# Наборы ключевых слов, если ни один синоним не подошел
+_RD_COUNT_KEYWORDS = ['разделов', 'договор', 'количество']
+KEYWORD_FALLBACKS = {
+    'Количество разделов РД по Договору': [_RD_COUNT_KEYWORDS],
+    'Отклонение разделов РД': [_RD_COUNT_KEYWORDS, ['отклон', 'раздел']],
+}
+
+
+def _load_extra_synonyms(path: Optional[str]) -> dict:
+    """Дополнительные синонимы из JSON-файла (пустой словарь, если файла нет)"""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+for _name, _synonyms in _load_extra_synonyms(os.getenv('COLUMN_SYNONYMS_FILE')).items():
+    COLUMN_SYNONYMS.setdefault(_name, [])
+    COLUMN_SYNONYMS[_name] = COLUMN_SYNONYMS[_name] + [s for s in _synonyms if s not in COLUMN_SYNONYMS[_name]]
+
+
+def _normalize(name) -> str:
+    return str(name).replace('\n', ' ').replace('\r', ' ').strip().lower()
+
+
+def _match(name: str, columns: list, normalized: list) -> Optional[str]:
+    """Фактическая колонка для канонического имени по правилам модуля"""
+    candidates = [name] + COLUMN_SYNONYMS.get(name, [])
+    present = set(columns)
+    for candidate in candidates:
+        if candidate in present:
+            return candidate
+
+    names = list(dict.fromkeys(_normalize(candidate) for candidate in candidates))
+    by_words = name in WORD_MATCH
+    words = [[word for word in candidate.split() if len(word) > 2] for candidate in names]
+    for column, column_lower in zip(columns, normalized):
+        for candidate, candidate_words in zip(names, words):
+            if candidate in column_lower or column_lower in candidate:
+                return column
+            if by_words and candidate_words and all(word in column_lower for word in candidate_words):
+                return column
+
+    for keywords in KEYWORD_FALLBACKS.get(name, []):
+        for column, column_lower in zip(columns, normalized):
+            if all(word in column_lower for word in keywords):
+                return column
+    return None
+
+
+@lru_cache(maxsize=256)
+def _resolve(columns: tuple) -> Mapping[str, Optional[str]]:
+    normalized = [_normalize(column) for column in columns]
+    return MappingProxyType({name: _match(name, list(columns), normalized) for name in COLUMN_SYNONYMS})
+
+
+def column_map(df: pd.DataFrame) -> Mapping[str, Optional[str]]:
+    """
+    Схема набора: каноническое имя -> фактическая колонка (или None)
+
+    Args:
+        df: Набор данных (схема строится по списку его колонок один раз)
+
+    Returns:
+        Неизменяемое отображение по всем именам COLUMN_SYNONYMS
+    """
+    return _resolve(tuple(df.columns))
+
+
+def find_column(df: pd.DataFrame, name: str) -> Optional[str]:
+    """Фактическая колонка для канонического имени (None, если не найдена)"""
+    return column_map(df).get(name)
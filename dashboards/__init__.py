@@ -0,0 +1,183 @@
+"""
+Реестр дашбордов
+
+Каждый дашборд - отдельный модуль пакета. Модуль импортируется при первом
+выборе дашборда и дальше берется из sys.modules, поэтому страница входа и
+перезапуски скрипта приложения не загружают plotly, pandas и код
+остальных дашбордов, а скрипт приложения не переопределяет функции
+дашбордов на каждом перезапуске.
+
+Дашборд объявляет название, категорию меню, наборы данных, из которых
+строится, обязательные колонки и кешируемые входные данные. По этим
+объявлениям строятся меню (главная область и боковая панель), до запуска
+проверяется наличие данных, а входные данные следующего по меню дашборда
+заранее строятся в фоне (dashboards.prefetch).
+"""
+import importlib
+from typing import Callable, Optional
+
+# Категории меню в порядке вывода: ключ (префикс ключей виджетов) -> заголовок
+CATEGORIES = {
+    'reason': "🔍 Причины отклонений",
+    'budget': "💰 Аналитика по финансам",
+    'plan_fact': "📅 Отклонения от базового плана",
+    'other': "🔧 Прочее",
+}
+
+# Наборы данных (тип файла data_loader) -> подпись в сообщениях
+DATASETS = {
+    'project': "данными проекта",
+    'resources': "данными о ресурсах",
+    'technique': "данными о технике",
+}
+
+
+class Dashboard:
+    """
+    Объявление дашборда
+
+    Args:
+        name: Название в меню
+        category: Ключ категории CATEGORIES
+        module: Модуль пакета dashboards
+        function: Функция дашборда (df) -> None
+        datasets: Наборы данных, из которых строится дашборд (нужен хотя бы один)
+        columns: Колонки, без которых дашборд не строится: имена нормализованной
+            таблицы или канонические имена column_schema
+        inputs: Кешируемые входные данные для фонового прогрева (см. dashboards.prefetch)
+    """
+
+    def __init__(self, name: str, category: str, module: str, function: str,
+                 datasets: tuple = ('project',), columns: tuple = (), inputs: tuple = ()):
+        self.name = name
+        self.category = category
+        self.module = module
+        self.function = function
+        self.datasets = datasets
+        self.columns = columns
+        self.inputs = inputs
+
+    def render_function(self) -> Callable:
+        """Функция дашборда (модуль импортируется при первом вызове)"""
+        return getattr(importlib.import_module(f'{__name__}.{self.module}'), self.function)
+
+    def frame(self, frames: dict):
+        """Первый загруженный набор данных дашборда (None, если ни одного нет)"""
+        for dataset in self.datasets:
+            df = frames.get(dataset)
+            if df is not None and not df.empty:
+                return df
+        return None
+
+    def missing_inputs(self, frames: dict) -> list:
+        """
+        Чего не хватает для построения дашборда
+
+        Args:
+            frames: {набор данных: DataFrame или None}
+
+        Returns:
+            Список описаний (пустой, если дашборд можно строить)
+        """
+        df = self.frame(frames)
+        if df is None:
+            labels = ' или '.join(DATASETS[dataset] for dataset in self.datasets)
+            return [f"необходимо загрузить файл с {labels}"]
+        from column_schema import COLUMN_SYNONYMS, find_column
+        missing = [column for column in self.columns
+                   if column not in df.columns and not (column in COLUMN_SYNONYMS and find_column(df, column))]
+        return [f"отсутствуют необходимые колонки: {', '.join(missing)}"] if missing else []
+
+
+_BUDGET_COLUMNS = ('budget plan', 'budget fact')
+
+DASHBOARDS = {dashboard.name: dashboard for dashboard in [
+    Dashboard("Динамика отклонений по месяцам", 'reason', 'reasons_of_deviation', 'dashboard_reasons_of_deviation',
+              inputs=('view:deviation', 'view:key:project name')),
+    Dashboard("Динамика отклонений", 'reason', 'dynamics_of_deviations', 'dashboard_dynamics_of_deviations',
+              columns=('plan end',), inputs=('view:deviation',)),
+    Dashboard("Динамика причин отклонений", 'reason', 'dynamics_of_reasons', 'dashboard_dynamics_of_reasons',
+              columns=('plan end',),
+              inputs=('view:deviation', 'view:period:plan_month', 'view:key:reason of deviation')),
+    Dashboard("БДДС по месяцам", 'budget', 'budget_by_period', 'dashboard_budget_by_period',
+              columns=_BUDGET_COLUMNS, inputs=('budget_cube',)),
+    Dashboard("БДДС по лотам", 'budget', 'budget_by_section', 'dashboard_budget_by_section',
+              columns=_BUDGET_COLUMNS, inputs=('budget_cube',)),
+    Dashboard("Бюджет план/факт", 'budget', 'budget_by_type', 'dashboard_budget_by_type',
+              columns=_BUDGET_COLUMNS, inputs=('budget_cube',)),
+    Dashboard("Утвержденный бюджет", 'budget', 'approved_budget', 'dashboard_approved_budget',
+              columns=('budget plan', 'plan start', 'plan end'), inputs=('month_grid',)),
+    Dashboard("Прогнозный бюджет", 'budget', 'forecast_budget', 'dashboard_forecast_budget',
+              columns=('project name', 'task name', 'budget plan', 'plan start', 'plan end'),
+              inputs=('view:key:project name',)),
+    Dashboard("Отклонение текущего срока от базового плана", 'plan_fact', 'plan_fact_dates',
+              'dashboard_plan_fact_dates', inputs=('gantt_schedule',)),
+    Dashboard("Значения отклонений от базового плана", 'plan_fact', 'deviation_by_tasks',
+              'dashboard_deviation_by_tasks_current_month', columns=('project name', 'deviation'),
+              inputs=('view:deviation', 'view:key:project name')),
+    Dashboard("Выдача рабочей/проектной документации", 'other', 'documentation', 'dashboard_documentation',
+              columns=('Количество разделов РД по Договору', 'На согласовании', 'Выдано в производство работ')),
+    Dashboard("Аналитика по технике", 'other', 'technique', 'dashboard_technique',
+              datasets=('technique',), columns=('Контрагент',)),
+    Dashboard("График движения рабочей силы", 'other', 'workforce_movement', 'dashboard_workforce_movement',
+              datasets=('resources', 'technique')),
+    Dashboard("СКУД стройка", 'other', 'skud_stroyka', 'dashboard_skud_stroyka',
+              datasets=('resources',), columns=('Среднее',)),
+]}
+
+
+# Дашборд по умолчанию: набор данных -> дашборд, по приоритету. Данные проекта
+# важнее остальных; техника - важнее ресурсов (порядок меню на выбор не влияет)
+DEFAULT_DASHBOARDS = [
+    ('project', "Динамика отклонений по месяцам"),
+    ('technique', "Аналитика по технике"),
+    ('resources', "График движения рабочей силы"),
+]
+
+
+def menu() -> list:
+    """Меню по категориям: [(ключ категории, заголовок, [названия дашбордов])]"""
+    return [(category, title, [name for name, dashboard in DASHBOARDS.items() if dashboard.category == category])
+            for category, title in CATEGORIES.items()]
+
+
+def default_dashboard(frames: dict) -> Optional[str]:
+    """
+    Дашборд, открываемый после загрузки данных
+
+    Args:
+        frames: {набор данных: DataFrame или None}
+
+    Returns:
+        Название дашборда первого правила DEFAULT_DASHBOARDS с загруженными
+        данными (None, если данных нет)
+    """
+    for dataset, name in DEFAULT_DASHBOARDS:
+        df = frames.get(dataset)
+        if df is not None and not df.empty:
+            return name
+    return None
+
+
+def likely_next(name: str, frames: dict) -> Optional[Dashboard]:
+    """Следующий по меню дашборд той же категории, для которого загружены данные"""
+    names = [item for item, dashboard in DASHBOARDS.items() if dashboard.category == DASHBOARDS[name].category]
+    start = names.index(name)
+    for item in names[start + 1:] + names[:start]:
+        if DASHBOARDS[item].frame(frames) is not None:
+            return DASHBOARDS[item]
+    return None
+
+
+def prefetch_next(name: str, frames: dict) -> bool:
+    """
+    Ставит в фоновую очередь входные данные следующего по меню дашборда
+
+    Returns:
+        True, если построение поставлено в очередь
+    """
+    dashboard = likely_next(name, frames)
+    if dashboard is None or not dashboard.inputs:
+        return False
+    from dashboards import prefetch
+    return prefetch.prefetch(dashboard.frame(frames), dashboard.inputs)
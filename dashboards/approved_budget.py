@@ -0,0 +1,201 @@
+"""Дашборд "Утвержденный бюджет": распределение бюджета по месяцам по правилам"""
+
+import streamlit as st
+import plotly.graph_objects as go
+
+from budget_engine import calculate_approved_budget_for_rules, get_budget_rules
+import filter_index
+from label_format import format_numbers
+import period_labels
+import query_engine
+
+
+# ==================== DASHBOARD: Approved Budget ====================
+def dashboard_approved_budget(df):
+    """Панель для отображения утвержденного бюджета"""
+    st.header("💰 Утвержденный бюджет")
+
+    budget_rules = get_budget_rules()
+
+    # Информация о правилах
+    with st.expander("ℹ️ Правила распределения бюджета", expanded=False):
+        st.markdown("""
+        **Правило по умолчанию (default):**
+        - 50% планового бюджета - на первый месяц этапа
+        - 45% планового бюджета - равномерно распределяется между промежуточными месяцами
+        - 5% планового бюджета - на последний месяц этапа
+
+        При изменении дат начала и окончания этапа бюджет автоматически пересчитывается.
+        """)
+        st.markdown("**Доступные правила:**")
+        for name, rule in budget_rules.items():
+            st.markdown(f"- `{name}` - {rule.get('description', '')}")
+
+    # Фильтры
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        if 'project name' in df.columns:
+            projects = ['Все'] + filter_index.options(df, 'project name')
+            selected_project = st.selectbox("Фильтр по проекту", projects, key='approved_budget_project')
+        else:
+            selected_project = 'Все'
+
+    with col2:
+        if 'section' in df.columns:
+            sections = ['Все'] + filter_index.options(df, 'section')
+            selected_section = st.selectbox("Фильтр по разделу", sections, key='approved_budget_section')
+        else:
+            selected_section = 'Все'
+
+    with col3:
+        if 'block' in df.columns:
+            blocks = ['Все'] + filter_index.options(df, 'block')
+            selected_block = st.selectbox("Фильтр по блоку", blocks, key='approved_budget_block')
+        else:
+            selected_block = 'Все'
+
+    with col4:
+        if 'task name' in df.columns:
+            tasks = ['Все'] + filter_index.options(df, 'task name')
+            selected_task = st.selectbox("Фильтр по задаче", tasks, key='approved_budget_task')
+        else:
+            selected_task = 'Все'
+
+    # Применяем фильтры
+    filters = {}
+    if selected_project != 'Все':
+        filters['project name'] = selected_project
+    if selected_section != 'Все':
+        filters['section'] = selected_section
+    if selected_block != 'Все':
+        filters['block'] = selected_block
+    if selected_task != 'Все':
+        filters['task name'] = selected_task
+    filtered_df = query_engine.filter_frame(df, filters)
+
+    # Выбор правила распределения и правил для сравнения
+    rule_names = list(budget_rules)
+    col5, col6 = st.columns(2)
+    with col5:
+        selected_rule = st.selectbox("Правило распределения", rule_names, key='approved_budget_rule')
+    with col6:
+        compare_rules = st.multiselect(
+            "Сравнить с правилами",
+            [name for name in rule_names if name != selected_rule],
+            max_selections=3,
+            key='approved_budget_compare_rules'
+        )
+
+    # Рассчитываем утвержденный бюджет (раскладка задач по месяцам общая для всех правил)
+    rule_results = calculate_approved_budget_for_rules(filtered_df, [selected_rule] + compare_rules)
+    approved_budget_df, error = rule_results[selected_rule]
+
+    if error:
+        st.error(error)
+        return
+
+    if approved_budget_df.empty:
+        st.info("Нет данных для построения графика утвержденного бюджета.")
+        return
+
+    # Группируем по месяцам для графика
+    monthly_approved = approved_budget_df.groupby('month').agg({
+        'approved budget': 'sum',
+        'budget plan': 'sum'  # Для сравнения
+    }).reset_index()
+
+    # Сортируем по месяцам
+    monthly_approved = monthly_approved.sort_values('month')
+
+    # Форматируем месяц для отображения
+    monthly_approved['Месяц'] = period_labels.format_periods(monthly_approved['month'])
+
+    # Создаем график
+    fig = go.Figure()
+
+    # Добавляем утвержденный бюджет
+    fig.add_trace(go.Bar(
+        x=monthly_approved['Месяц'],
+        y=monthly_approved['approved budget'],
+        name='Утвержденный бюджет',
+        marker_color='#2E86AB',
+        text=format_numbers(monthly_approved['approved budget']),
+        textposition='outside',
+        textfont=dict(size=14, color='white')
+    ))
+
+    # Добавляем плановый бюджет для сравнения (линия)
+    fig.add_trace(go.Scatter(
+        x=monthly_approved['Месяц'],
+        y=monthly_approved['budget plan'],
+        name='Плановый бюджет (сумма)',
+        mode='lines+markers',
+        line=dict(color='#F18F01', width=2),
+        marker=dict(size=8, color='#F18F01')
+    ))
+
+    fig.update_layout(
+        title='Утвержденный бюджет по месяцам',
+        xaxis_title='Месяц',
+        yaxis_title='Бюджет',
+        hovermode='x unified',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        height=600
+        # plot_bgcolor  = "hsl(216,28%,7%)",
+        # paper_bgcolor = "hsl(216,28%,7%)"
+    )
+
+    st.plotly_chart(fig, use_container_width=True, theme=None)
+
+    # Сравнение правил распределения
+    if compare_rules:
+        st.subheader("Сравнение правил распределения")
+        comparison = monthly_approved[['month', 'approved budget']].rename(columns={'approved budget': selected_rule})
+        for rule_name in compare_rules:
+            rule_df = rule_results[rule_name][0]
+            rule_monthly = rule_df.groupby('month')['approved budget'].sum().rename(rule_name).reset_index()
+            comparison = comparison.merge(rule_monthly, on='month', how='outer')
+        comparison = comparison.sort_values('month').fillna(0)
+        comparison['Месяц'] = period_labels.format_periods(comparison['month'])
+
+        compare_fig = go.Figure()
+        for rule_name in [selected_rule] + compare_rules:
+            compare_fig.add_trace(go.Bar(x=comparison['Месяц'], y=comparison[rule_name], name=rule_name))
+        compare_fig.update_layout(
+            title='Утвержденный бюджет по месяцам: сравнение правил',
+            xaxis_title='Месяц',
+            yaxis_title='Бюджет',
+            barmode='group',
+            hovermode='x unified',
+            height=500
+        )
+        st.plotly_chart(compare_fig, use_container_width=True, theme=None)
+
+        compare_table = comparison[['Месяц'] + [selected_rule] + compare_rules].copy()
+        for rule_name in [selected_rule] + compare_rules:
+            compare_table[rule_name] = format_numbers(compare_table[rule_name])
+        st.dataframe(compare_table, use_container_width=True)
+
+    # Сводная таблица
+    st.subheader("Сводная таблица утвержденного бюджета по месяцам")
+    summary_table = monthly_approved[['Месяц', 'approved budget', 'budget plan']].copy()
+    summary_table.columns = ['Месяц', 'Утвержденный бюджет', 'Плановый бюджет (сумма)']
+    summary_table['Утвержденный бюджет'] = format_numbers(summary_table['Утвержденный бюджет'], na='0')
+    summary_table['Плановый бюджет (сумма)'] = format_numbers(summary_table['Плановый бюджет (сумма)'], na='0')
+    st.dataframe(summary_table, use_container_width=True)
+
+    # Детальная таблица (опционально)
+    with st.expander("📋 Детальная таблица распределения бюджета", expanded=False):
+        detail_table = approved_budget_df[['project name', 'section', 'task name', 'month', 'budget plan', 'approved budget']].copy()
+        detail_table['month'] = period_labels.format_periods(detail_table['month'])
+        detail_table.columns = ['Проект', 'Раздел', 'Задача', 'Месяц', 'Плановый бюджет', 'Утвержденный бюджет']
+        detail_table['Плановый бюджет'] = format_numbers(detail_table['Плановый бюджет'], na='0')
+        detail_table['Утвержденный бюджет'] = format_numbers(detail_table['Утвержденный бюджет'], na='0')
+        st.dataframe(detail_table, use_container_width=True)
@@ -0,0 +1,254 @@
+"""Дашборд "БДДС по месяцам": бюджет план/факт/резерв по проектам и периодам"""
+
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+
+import budget_cube
+import filter_index
+from label_format import bar_labels
+import period_labels
+from dashboards.common import show_cached_chart
+
+
+# ==================== DASHBOARD 6: Budget Plan/Fact/Reserve by Project by Period ====================
+def dashboard_budget_by_period(df):
+    st.header("💰 БДДС по месяцам")
+
+    # Filters row 1: Period and Project
+    col1, col2 = st.columns(2)
+
+    with col1:
+        period_type = st.selectbox("Группировать по", ['Месяц', 'Квартал', 'Год'], key='budget_period')
+        period_map = {'Месяц': 'Month', 'Квартал': 'Quarter', 'Год': 'Year'}
+        period_type_en = period_map.get(period_type, 'Month')
+
+    with col2:
+        if 'project name' in df.columns:
+            projects = ['Все'] + filter_index.options(df, 'project name')
+            selected_project = st.selectbox("Фильтр по проекту", projects, key='budget_project')
+        else:
+            selected_project = 'Все'
+
+    # Filters row 2: Task and Section
+    col3, col4 = st.columns(2)
+
+    with col3:
+        # Task filter
+        if 'task name' in df.columns:
+            tasks = ['Все'] + filter_index.options(df, 'task name')
+            selected_task = st.selectbox("Фильтр по задаче", tasks, key='budget_task')
+        else:
+            selected_task = 'Все'
+
+    with col4:
+        # Section filter (блоки)
+        if 'section' in df.columns:
+            sections = ['Все'] + filter_index.options(df, 'section')
+            selected_section = st.selectbox("Фильтр по разделу", sections, key='budget_section')
+        else:
+            selected_section = 'Все'
+
+    # Filters row 3: Block
+    col5 = st.columns(1)[0]
+    with col5:
+        if 'block' in df.columns:
+            blocks = ['Все'] + filter_index.options(df, 'block')
+            selected_block = st.selectbox("Фильтр по блоку", blocks, key='budget_block')
+        else:
+            selected_block = 'Все'
+
+    # Filters row 4: View type and Hide adjusted budget
+    col6, col7 = st.columns(2)
+
+    with col6:
+        # Filter for monthly or cumulative view
+        view_type = st.selectbox("Вид отображения", ['Накопительно', 'За месяц'], key='budget_period_view')
+
+    with col7:
+        # Checkbox to hide/show adjusted budget
+        hide_adjusted = st.checkbox("Скрыть скорректированный бюджет", value=True, key='budget_period_hide_adjusted')
+
+    # Filters row 5: Hide reserve budget
+    col8, col9 = st.columns(2)
+
+    with col8:
+        # Checkbox to hide/show reserve budget
+        hide_reserve = st.checkbox("Скрыть резерв бюджета", value=True, key='budget_period_hide_reserve')
+
+    # Filters are applied by the engine (DuckDB or pandas) together with the aggregation
+    filters = {}
+    if selected_project != 'Все':
+        filters['project name'] = selected_project
+    if selected_task != 'Все':
+        filters['task name'] = selected_task
+    if selected_section != 'Все':
+        filters['section'] = selected_section
+    if selected_block != 'Все':
+        filters['block'] = selected_block
+
+    # Check for budget columns
+    has_budget = 'budget plan' in df.columns and 'budget fact' in df.columns
+
+    if not has_budget:
+        st.warning("Столбцы бюджета (budget plan, budget fact) не найдены в данных.")
+        return
+
+    # Determine adjusted budget column name
+    adjusted_budget_col = None
+    if 'budget adjusted' in df.columns:
+        adjusted_budget_col = 'budget adjusted'
+    elif 'adjusted budget' in df.columns:
+        adjusted_budget_col = 'adjusted budget'
+
+    # Determine period column
+    if period_type_en == 'Month':
+        period_col = 'plan_month'
+        period_label = 'Месяц'
+    elif period_type_en == 'Quarter':
+        period_col = 'plan_quarter'
+        period_label = 'Квартал'
+    else:
+        period_col = 'plan_year'
+        period_label = 'Год'
+
+    if period_col not in df.columns:
+        st.warning(f"Столбец периода '{period_col}' не найден.")
+        return
+
+    # Group by period and project from the budget cube; reserve budget
+    # (plan - fact, negative means over budget) is summed from row-wise values
+    agg_dict = {
+        'budget plan': 'sum',
+        'budget fact': 'sum',
+        'reserve budget': 'sum'
+    }
+    if adjusted_budget_col:
+        agg_dict[adjusted_budget_col] = 'sum'
+
+    budget_summary = budget_cube.get_cube(df).slice(['project name'], period_col, filters, measures=list(agg_dict))
+
+    # Store original period values for sorting before formatting
+    budget_summary['period_original'] = budget_summary[period_col]
+    budget_summary[period_col] = period_labels.format_periods(budget_summary[period_col])
+
+    # Chart-only aggregation: runs inside the figure build, i.e. only on a cache miss
+    def chart_data():
+        # Bar chart for selected period
+        if selected_project != 'Все':
+            project_data = budget_summary[budget_summary['project name'] == selected_project].copy()
+        else:
+            # Aggregate across all projects
+            agg_dict_all = {
+                'budget plan': 'sum',
+                'budget fact': 'sum',
+                'reserve budget': 'sum',
+                'period_original': 'first'  # Keep first period_original for sorting
+            }
+            if adjusted_budget_col:
+                agg_dict_all[adjusted_budget_col] = 'sum'
+            project_data = budget_summary.groupby(period_col, observed=True).agg(agg_dict_all).reset_index()
+
+        # Sort by original period value to ensure correct order for cumulative calculation
+        # Convert period_original to sortable format if it's Period objects
+        if project_data['period_original'].dtype == 'object':
+            # Try to convert to sortable format
+            try:
+                project_data['period_sort'] = project_data['period_original'].apply(
+                    lambda x: x if isinstance(x, pd.Period) else pd.Period(str(x), freq=period_type_en[0]) if pd.notna(x) else None
+                )
+                project_data = project_data.sort_values('period_sort').copy()
+                project_data = project_data.drop('period_sort', axis=1)
+            except:
+                # If conversion fails, try to sort by string representation
+                project_data = project_data.sort_values('period_original').copy()
+        else:
+            project_data = project_data.sort_values('period_original').copy()
+
+        # Calculate cumulative sums if "Накопительно" is selected
+        if view_type == 'Накопительно':
+            project_data['budget plan'] = project_data['budget plan'].cumsum()
+            project_data['budget fact'] = project_data['budget fact'].cumsum()
+            project_data['reserve budget'] = project_data['reserve budget'].cumsum()
+            if adjusted_budget_col and adjusted_budget_col in project_data.columns:
+                project_data[adjusted_budget_col] = project_data[adjusted_budget_col].cumsum()
+        return project_data
+
+    title_suffix = ' (накопительно)' if view_type == 'Накопительно' else ''
+
+    def build_budget_chart():
+        project_data = chart_data()
+        fig = go.Figure()
+        plan_text, plan_labels = bar_labels(project_data['budget plan'], truncate=True)
+        fig.add_trace(go.Bar(
+            x=project_data[period_col],
+            y=project_data['budget plan'],
+            name='Бюджет План',
+            marker_color='#2E86AB',
+            text=plan_text,
+            textposition='outside',
+            textfont=dict(size=14, color='white'),
+            customdata=plan_labels,
+            hovertemplate='<b>%{x}</b><br>Бюджет План: %{customdata}<br><extra></extra>'
+        ))
+        fact_text, fact_labels = bar_labels(project_data['budget fact'], truncate=True)
+        fig.add_trace(go.Bar(
+            x=project_data[period_col],
+            y=project_data['budget fact'],
+            name='Бюджет Факт',
+            marker_color='#A23B72',
+            text=fact_text,
+            textposition='outside',
+            textfont=dict(size=14, color='white'),
+            customdata=fact_labels,
+            hovertemplate='<b>%{x}</b><br>Бюджет Факт: %{customdata}<br><extra></extra>'
+        ))
+
+        # Add reserve budget only if checkbox is not checked (reserve is not hidden)
+        if not hide_reserve:
+            reserve_text, reserve_labels = bar_labels(project_data['reserve budget'], truncate=True)
+            fig.add_trace(go.Bar(
+                x=project_data[period_col],
+                y=project_data['reserve budget'],
+                name='Резерв бюджета',
+                marker_color='#06A77D',
+                text=reserve_text,
+                textposition='outside',
+                textfont=dict(size=14, color='white'),
+                customdata=reserve_labels,
+                hovertemplate='<b>%{x}</b><br>Резерв бюджета: %{customdata}<br><extra></extra>'
+            ))
+
+        # Add adjusted budget if available and not hidden
+        if adjusted_budget_col and adjusted_budget_col in project_data.columns and not hide_adjusted:
+            adjusted_text, adjusted_labels = bar_labels(project_data[adjusted_budget_col], truncate=True)
+            fig.add_trace(go.Bar(
+                x=project_data[period_col],
+                y=project_data[adjusted_budget_col],
+                name='Скорректированный бюджет',
+                marker_color='#F18F01',
+                text=adjusted_text,
+                textposition='outside',
+                textfont=dict(size=14, color='white'),
+                customdata=adjusted_labels,
+                hovertemplate='<b>%{x}</b><br>Скорректированный бюджет: %{customdata}<br><extra></extra>'
+        ))
+
+        fig.update_layout(
+            title=f'БДДС{title_suffix}',
+            xaxis_title=period_label,
+            yaxis_title='Сумма бюджета',
+            barmode='group',
+            xaxis=dict(tickangle=-45)
+            # plot_bgcolor  = "hsl(216,28%,7%)",
+            # paper_bgcolor = "hsl(216,28%,7%)"
+        )
+        return fig
+
+    chart_state = dict(filters, period=period_type, view=view_type,
+                       hide_adjusted=hide_adjusted, hide_reserve=hide_reserve)
+    show_cached_chart(df, 'budget_by_period', chart_state, 'bdds', build_budget_chart)
+
+    # Summary table
+    st.subheader(f"Сводка бюджета по {period_label.lower()}")
+    st.dataframe(budget_summary, use_container_width=True)
@@ -0,0 +1,172 @@
+"""Дашборд "БДДС по лотам": бюджет план/факт/резерв по разделам и периодам"""
+
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+
+import budget_cube
+import filter_index
+from label_format import format_numbers
+import period_labels
+
+
+# ==================== DASHBOARD 7: Budget Plan/Fact/Reserve by Section by Period ====================
+def dashboard_budget_by_section(df):
+    st.header("💰 БДДС по лотам")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        period_type = st.selectbox("Группировать по", ['Месяц', 'Квартал', 'Год'], key='budget_section_period')
+        period_map = {'Месяц': 'Month', 'Квартал': 'Quarter', 'Год': 'Year'}
+        period_type_en = period_map.get(period_type, 'Month')
+
+    with col2:
+        if 'section' in df.columns:
+            sections = ['Все'] + filter_index.options(df, 'section')
+            selected_section = st.selectbox("Фильтр по разделу", sections, key='budget_section')
+        else:
+            selected_section = 'Все'
+
+    with col3:
+        # Filter for monthly or cumulative view
+        view_type = st.selectbox("Вид отображения", ['За месяц', 'Накопительно'], key='budget_section_view')
+
+    # Additional filter row: Block
+    col4 = st.columns(1)[0]
+    with col4:
+        if 'block' in df.columns:
+            blocks = ['Все'] + filter_index.options(df, 'block')
+            selected_block = st.selectbox("Фильтр по блоку", blocks, key='budget_section_block')
+        else:
+            selected_block = 'Все'
+
+    # Apply filters
+    filters = {}
+    if selected_section != 'Все':
+        filters['section'] = selected_section
+    if selected_block != 'Все':
+        filters['block'] = selected_block
+
+    # Check for budget columns
+    has_budget = 'budget plan' in df.columns and 'budget fact' in df.columns
+
+    if not has_budget:
+        st.warning("Столбцы бюджета (budget plan, budget fact) не найдены в данных.")
+        return
+
+    # Determine period column
+    if period_type_en == 'Month':
+        period_col = 'plan_month'
+        period_label = 'Месяц'
+    elif period_type_en == 'Quarter':
+        period_col = 'plan_quarter'
+        period_label = 'Квартал'
+    else:
+        period_col = 'plan_year'
+        period_label = 'Год'
+
+    if period_col not in df.columns:
+        st.warning(f"Столбец периода '{period_col}' не найден.")
+        return
+
+    # Group by period and section from the budget cube; reserve budget
+    # (plan - fact, negative means over budget) is summed from row-wise values
+    budget_summary = budget_cube.get_cube(df).slice(
+        ['section'], period_col, filters, measures=['budget plan', 'budget fact', 'reserve budget']
+    )
+
+    # Store original period values for sorting before formatting
+    budget_summary['period_original'] = budget_summary[period_col]
+    budget_summary[period_col] = period_labels.format_periods(budget_summary[period_col])
+
+    # Checkbox to hide/show reserve budget
+    hide_reserve = st.checkbox("Скрыть резерв", value=True, key='budget_section_hide_reserve')
+
+    # Visualizations
+    # Bar chart for selected period
+    if selected_section != 'Все':
+        section_data = budget_summary[budget_summary['section'] == selected_section].copy()
+    else:
+        # Aggregate across all sections
+        section_data = budget_summary.groupby(period_col, observed=True).agg({
+            'budget plan': 'sum',
+            'budget fact': 'sum',
+            'reserve budget': 'sum',
+            'period_original': 'first'  # Keep first period_original for sorting
+        }).reset_index()
+
+    # Sort by original period value to ensure correct order for cumulative calculation
+    # Convert period_original to sortable format if it's Period objects
+    if section_data['period_original'].dtype == 'object':
+        # Try to convert to sortable format
+        try:
+            section_data['period_sort'] = section_data['period_original'].apply(
+                lambda x: x if isinstance(x, pd.Period) else pd.Period(str(x), freq=period_type_en[0]) if pd.notna(x) else None
+            )
+            section_data = section_data.sort_values('period_sort').copy()
+            section_data = section_data.drop('period_sort', axis=1)
+        except:
+            # If conversion fails, try to sort by string representation
+            section_data = section_data.sort_values('period_original').copy()
+    else:
+        section_data = section_data.sort_values('period_original').copy()
+
+    # Calculate cumulative sums if "Накопительно" is selected
+    if view_type == 'Накопительно':
+        section_data['budget plan'] = section_data['budget plan'].cumsum()
+        section_data['budget fact'] = section_data['budget fact'].cumsum()
+        section_data['reserve budget'] = section_data['reserve budget'].cumsum()
+        title_suffix = ' (накопительно)'
+    else:
+        title_suffix = ''
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=section_data[period_col],
+        y=section_data['budget plan'],
+        name='Бюджет План',
+        marker_color='#2E86AB',
+        text=format_numbers(section_data['budget plan'], truncate=True),
+        textposition='outside',
+        textfont=dict(size=18, color='white')
+    ))
+    fig.add_trace(go.Bar(
+        x=section_data[period_col],
+        y=section_data['budget fact'],
+        name='Бюджет Факт',
+        marker_color='#A23B72',
+        text=format_numbers(section_data['budget fact'], truncate=True),
+        textposition='outside',
+        textfont=dict(size=18, color='white')
+    ))
+
+    # Add reserve budget only if checkbox is not checked (reserve is not hidden)
+    if not hide_reserve:
+        fig.add_trace(go.Bar(
+            x=section_data[period_col],
+            y=section_data['reserve budget'],
+            name='Резерв бюджета',
+            marker_color='#06A77D',
+            text=format_numbers(section_data['reserve budget'], truncate=True),
+            textposition='outside',
+            textfont=dict(size=18, color='white')
+    ))
+
+    fig.update_layout(
+        title=dict(text=f'План/факт/резерв по лотам{title_suffix}', font=dict(size=24)),
+        xaxis_title=dict(text=period_label, font=dict(size=20)),
+        yaxis_title=dict(text='Сумма бюджета', font=dict(size=20)),
+        barmode='group',
+        xaxis=dict(tickangle=0, tickfont=dict(size=16)),
+        yaxis=dict(tickfont=dict(size=16)),
+        legend=dict(font=dict(size=18)),
+        height=600
+        # plot_bgcolor  = "hsl(216,28%,7%)",
+        # paper_bgcolor = "hsl(216,28%,7%)"
+    )
+    st.plotly_chart(fig, use_container_width=True, theme=None)
+
+    # Summary table
+    st.subheader("Сводка бюджета по периоду")
+    st.dataframe(budget_summary, use_container_width=True)
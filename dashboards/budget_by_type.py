@@ -0,0 +1,201 @@
+"""Дашборд "Бюджет план/факт": сравнение типов бюджета по периодам"""
+
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+
+import budget_cube
+import filter_index
+import query_engine
+
+
+# ==================== DASHBOARD 8: Budget by Type (Plan/Fact/Reserve) ====================
+def dashboard_budget_by_type(df):
+    st.header("💰 Бюджет план/факт")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        if 'project name' in df.columns:
+            projects = ['Все'] + filter_index.options(df, 'project name')
+            selected_project = st.selectbox("Фильтр по проекту", projects, key='budget_type_project')
+        else:
+            selected_project = 'Все'
+            st.info("Колонка 'project name' не найдена")
+
+    with col2:
+        if 'section' in df.columns:
+            sections = ['Все'] + filter_index.options(df, 'section')
+            selected_section = st.selectbox("Фильтр по разделу", sections, key='budget_type_section')
+        else:
+            selected_section = 'Все'
+
+    with col3:
+        if 'block' in df.columns:
+            blocks = ['Все'] + filter_index.options(df, 'block')
+            selected_block = st.selectbox("Фильтр по блоку", blocks, key='budget_type_block')
+        else:
+            selected_block = 'Все'
+
+    # Apply filters
+    filters = {}
+    if selected_project != 'Все':
+        filters['project name'] = selected_project
+    if selected_section != 'Все':
+        filters['section'] = selected_section
+    if selected_block != 'Все':
+        filters['block'] = selected_block
+
+    # Check for budget columns
+    has_budget = 'budget plan' in df.columns and 'budget fact' in df.columns
+
+    if not has_budget:
+        st.warning("Столбцы бюджета (budget plan, budget fact) не найдены в данных.")
+        return
+
+    # ========== Histogram: Budget by Project and Type ==========
+    st.subheader("📊 Гистограмма: Бюджет план/факт/корректировка/резерв по проектам")
+
+    # Check for adjusted budget column in original dataframe
+    adjusted_budget_col = None
+    if 'budget adjusted' in df.columns:
+        adjusted_budget_col = 'budget adjusted'
+    elif 'adjusted budget' in df.columns:
+        adjusted_budget_col = 'adjusted budget'
+
+    # Filters for histogram
+    col_hist1 = st.columns(1)[0]
+
+    with col_hist1:
+        # Checkbox for showing reserve
+        show_reserve = st.checkbox("Показать резерв", value=False, key='budget_show_reserve')
+
+        # Budget types to show (always show Plan and Fact, optionally Reserve)
+        selected_budget_types = ['Бюджет План', 'Бюджет Факт']
+        if adjusted_budget_col:
+            selected_budget_types.append('Бюджет Корректировка')
+        if show_reserve:
+            selected_budget_types.append('Резерв бюджета')
+
+    if not len(query_engine.filter_positions(df, filters)):
+        st.info("Нет данных для отображения гистограммы с выбранными фильтрами.")
+    else:
+        # Group by project from the budget cube (missing amounts count as 0)
+        if 'project name' in df.columns:
+            measures = ['budget plan', 'budget fact'] + ([adjusted_budget_col] if adjusted_budget_col else [])
+            budget_by_project = budget_cube.get_cube(df).slice(['project name'], None, filters, measures=measures)
+            budget_by_project['reserve budget'] = budget_by_project['budget plan'] - budget_by_project['budget fact']
+
+            # Add adjusted budget if available
+            if adjusted_budget_col:
+                budget_by_project['budget adjusted'] = budget_by_project.pop(adjusted_budget_col)
+            else:
+                budget_by_project['budget adjusted'] = 0
+
+            # Transform to long format
+            hist_melted = []
+            for idx, row in budget_by_project.iterrows():
+                project = row['project name']
+
+                if 'Бюджет План' in selected_budget_types:
+                    hist_melted.append({
+                        'project name': project,
+                        'Тип бюджета': 'Бюджет План',
+                        'Сумма': row['budget plan']
+                    })
+
+                if 'Бюджет Факт' in selected_budget_types:
+                    hist_melted.append({
+                        'project name': project,
+                        'Тип бюджета': 'Бюджет Факт',
+                        'Сумма': row['budget fact']
+                    })
+
+                if 'Бюджет Корректировка' in selected_budget_types and adjusted_budget_col:
+                    hist_melted.append({
+                        'project name': project,
+                        'Тип бюджета': 'Бюджет Корректировка',
+                        'Сумма': row['budget adjusted']
+                    })
+
+                if 'Резерв бюджета' in selected_budget_types:
+                    hist_melted.append({
+                        'project name': project,
+                        'Тип бюджета': 'Резерв бюджета',
+                        'Сумма': row['reserve budget']
+                    })
+
+            hist_by_type_df = pd.DataFrame(hist_melted)
+
+            if hist_by_type_df.empty:
+                st.info("Нет данных для отображения с выбранными типами бюджета.")
+            else:
+                # Преобразуем значения в миллионы рублей для отображения на столбцах
+                hist_by_type_df['Сумма_млн'] = hist_by_type_df['Сумма'] / 1000000
+
+                # Create histogram
+                fig_hist = px.bar(
+                    hist_by_type_df,
+                    x='project name',
+                    y='Сумма',
+                    color='Тип бюджета',
+                    title='Бюджет план/факт/корректировка/резерв по проектам',
+                    labels={'project name': 'Проект', 'Сумма': 'Сумма бюджета (руб.)'},
+                    barmode='group',
+                    text='Сумма_млн',
+                    color_discrete_map={
+                        'Бюджет План': '#2E86AB',
+                        'Бюджет Факт': '#A23B72',
+                        'Бюджет Корректировка': '#F18F01',
+                        'Резерв бюджета': '#06A77D'
+                    },
+                    template=None
+                )
+
+                # Update layout
+                fig_hist.update_layout(
+                    xaxis_title='Проект',
+                    yaxis_title='Сумма бюджета (руб.)',
+                    height=600,
+                    legend=dict(
+                        orientation="h",
+                        yanchor="bottom",
+                        y=1.02,
+                        xanchor="right",
+                        x=1
+                    ),
+                    xaxis=dict(tickangle=-45, tickfont=dict(size=12))
+                    # plot_bgcolor = "hsl(216,28%,7%)",
+                    # paper_bgcolor = "hsl(216,28%,7%)"
+                )
+
+                # Add text labels on the edge of bars (в миллионах рублей)
+                fig_hist.update_traces(
+                    textposition='outside',
+                    texttemplate='%{text:.1f} млн руб.',
+                    textfont=dict(size=12, color='white')
+                )
+
+                st.plotly_chart(fig_hist, use_container_width=True, theme=None)
+
+                # Summary table
+                with st.expander("📋 Сводная таблица по проектам", expanded=False):
+                    summary_hist = hist_by_type_df.pivot_table(
+                        index='project name',
+                        columns='Тип бюджета',
+                        values='Сумма',
+                        aggfunc='sum',
+                        fill_value=0,
+                        observed=True
+                    ).reset_index()
+
+                    # Format numbers
+                    for col in summary_hist.columns:
+                        if col != 'project name':
+                            summary_hist[col] = summary_hist[col].apply(
+                                lambda x: f"{int(x)}" if pd.notna(x) else "0"
+                            )
+
+                    st.dataframe(summary_hist, use_container_width=True)
+        else:
+            st.warning("Колонка 'project name' не найдена в данных для построения гистограммы.")
@@ -0,0 +1,160 @@
+"""Дашборд накопительного БДДС (в меню не выводится)"""
+
+import streamlit as st
+import plotly.graph_objects as go
+
+import budget_cube
+import filter_index
+from label_format import format_numbers
+import period_labels
+
+
+# ==================== DASHBOARD 6.5: Budget Cumulative ====================
+def dashboard_budget_cumulative(df):
+    st.header("💰 БДДС накопительно")
+
+    # Filters row 1: Period and Project
+    col1, col2 = st.columns(2)
+
+    with col1:
+        period_type = st.selectbox("Группировать по", ['Месяц', 'Квартал', 'Год'], key='budget_cum_period')
+        period_map = {'Месяц': 'Month', 'Квартал': 'Quarter', 'Год': 'Year'}
+        period_type_en = period_map.get(period_type, 'Month')
+
+    with col2:
+        if 'project name' in df.columns:
+            projects = ['Все'] + filter_index.options(df, 'project name')
+            selected_project = st.selectbox("Фильтр по проекту", projects, key='budget_cum_project')
+        else:
+            selected_project = 'Все'
+
+    # Filters row 2: Task and Section
+    col3, col4 = st.columns(2)
+
+    with col3:
+        # Task filter
+        if 'task name' in df.columns:
+            tasks = ['Все'] + filter_index.options(df, 'task name')
+            selected_task = st.selectbox("Фильтр по задаче", tasks, key='budget_cum_task')
+        else:
+            selected_task = 'Все'
+
+    with col4:
+        # Section filter (блоки)
+        if 'section' in df.columns:
+            sections = ['Все'] + filter_index.options(df, 'section')
+            selected_section = st.selectbox("Фильтр по разделу", sections, key='budget_cum_section')
+        else:
+            selected_section = 'Все'
+
+    # Filters row 3: Block
+    col5 = st.columns(1)[0]
+    with col5:
+        if 'block' in df.columns:
+            blocks = ['Все'] + filter_index.options(df, 'block')
+            selected_block = st.selectbox("Фильтр по блоку", blocks, key='budget_cum_block')
+        else:
+            selected_block = 'Все'
+
+    # Apply filters
+    filters = {}
+    if selected_project != 'Все':
+        filters['project name'] = selected_project
+    if selected_task != 'Все':
+        filters['task name'] = selected_task
+    if selected_section != 'Все':
+        filters['section'] = selected_section
+    if selected_block != 'Все':
+        filters['block'] = selected_block
+
+    # Check for budget columns
+    has_budget = 'budget plan' in df.columns and 'budget fact' in df.columns
+
+    if not has_budget:
+        st.warning("Столбцы бюджета (budget plan, budget fact) не найдены в данных.")
+        return
+
+    # Determine adjusted budget column name
+    adjusted_budget_col = None
+    if 'budget adjusted' in df.columns:
+        adjusted_budget_col = 'budget adjusted'
+    elif 'adjusted budget' in df.columns:
+        adjusted_budget_col = 'adjusted budget'
+
+    # Determine period column
+    if period_type_en == 'Month':
+        period_col = 'plan_month'
+        period_label = 'Месяц'
+    elif period_type_en == 'Quarter':
+        period_col = 'plan_quarter'
+        period_label = 'Квартал'
+    else:
+        period_col = 'plan_year'
+        period_label = 'Год'
+
+    if period_col not in df.columns:
+        st.warning(f"Столбец периода '{period_col}' не найден.")
+        return
+
+    # Cumulative sums from the budget cube prefix sums, in chronological period order,
+    # accumulated from the selected start period
+    measures = ['budget plan', 'budget fact'] + ([adjusted_budget_col] if adjusted_budget_col else [])
+    cube = budget_cube.get_cube(df)
+    periods = cube.cumulative(period_col, filters, measures)[period_col].tolist()
+    start_period = st.selectbox("Накопление с", periods, format_func=period_labels.format_period, key='budget_cum_start')
+
+    project_data_sorted = cube.cumulative(period_col, filters, measures, start=start_period)
+    project_data_sorted = project_data_sorted.rename(columns={measure: f'{measure}_cum' for measure in measures})
+    project_data_sorted[period_col] = period_labels.format_periods(project_data_sorted[period_col])
+
+    # Create cumulative chart
+    fig_cum = go.Figure()
+    fig_cum.add_trace(go.Bar(
+        x=project_data_sorted[period_col],
+        y=project_data_sorted['budget plan_cum'],
+        name='Бюджет План (накопительно)',
+        marker_color='#2E86AB',
+        text=format_numbers(project_data_sorted['budget plan_cum']),
+        textposition='outside',
+        textfont=dict(size=14, color='white')
+    ))
+    fig_cum.add_trace(go.Bar(
+        x=project_data_sorted[period_col],
+        y=project_data_sorted['budget fact_cum'],
+        name='Бюджет Факт (накопительно)',
+        marker_color='#A23B72',
+        text=format_numbers(project_data_sorted['budget fact_cum']),
+        textposition='outside',
+        textfont=dict(size=14, color='white')
+    ))
+
+    # Add adjusted budget cumulative if available
+    if adjusted_budget_col:
+        fig_cum.add_trace(go.Bar(
+            x=project_data_sorted[period_col],
+            y=project_data_sorted[f'{adjusted_budget_col}_cum'],
+            name='Скорректированный бюджет (накопительно)',
+            marker_color='#F18F01',
+            text=format_numbers(project_data_sorted[f'{adjusted_budget_col}_cum']),
+            textposition='outside',
+            textfont=dict(size=14, color='white')
+        ))
+
+    fig_cum.update_layout(
+        title='БДДС накопительно',
+        xaxis_title=period_label,
+        yaxis_title='Сумма бюджета (накопительно)',
+        barmode='group',
+        xaxis=dict(tickangle=-45)
+        # plot_bgcolor  = "hsl(216,28%,7%)",
+        # paper_bgcolor = "hsl(216,28%,7%)"
+    )
+    st.plotly_chart(fig_cum, use_container_width=True, theme=None)
+
+    # Summary table with cumulative data
+    st.subheader(f"Сводка бюджета (накопительно) по {period_label.lower()}")
+    summary_cum = project_data_sorted[[period_col, 'budget plan_cum', 'budget fact_cum']].copy()
+    if adjusted_budget_col and f'{adjusted_budget_col}_cum' in project_data_sorted.columns:
+        summary_cum[f'{adjusted_budget_col}_cum'] = project_data_sorted[f'{adjusted_budget_col}_cum']
+    summary_cum.columns = [period_label, 'Бюджет План (накопительно)', 'Бюджет Факт (накопительно)'] + (['Скорректированный бюджет (накопительно)'] if adjusted_budget_col and f'{adjusted_budget_col}_cum' in project_data_sorted.columns else [])
+    st.dataframe(summary_cum, use_container_width=True)
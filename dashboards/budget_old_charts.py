@@ -0,0 +1,221 @@
+"""Прежние графики бюджета (в меню не выводятся)"""
+
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+
+import budget_cube
+import filter_index
+from label_format import format_numbers
+import period_labels
+
+
+# ==================== DASHBOARD 8.1: Budget Old Charts ====================
+def dashboard_budget_old_charts(df):
+    st.header("💰 БДДС (старые графики)")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        period_type = st.selectbox("Группировать по", ['Месяц', 'Квартал', 'Год'], key='budget_old_period')
+        period_map = {'Месяц': 'Month', 'Квартал': 'Quarter', 'Год': 'Year'}
+        period_type_en = period_map.get(period_type, 'Month')
+
+    with col2:
+        if 'project name' in df.columns:
+            projects = ['Все'] + filter_index.options(df, 'project name')
+            selected_project = st.selectbox("Фильтр по проекту", projects, key='budget_old_project')
+        else:
+            selected_project = 'Все'
+
+    with col3:
+        if 'section' in df.columns:
+            sections = ['Все'] + filter_index.options(df, 'section')
+            selected_section = st.selectbox("Фильтр по разделу", sections, key='budget_old_section')
+        else:
+            selected_section = 'Все'
+
+    # Additional filter row: Block
+    col4 = st.columns(1)[0]
+    with col4:
+        if 'block' in df.columns:
+            blocks = ['Все'] + filter_index.options(df, 'block')
+            selected_block = st.selectbox("Фильтр по блоку", blocks, key='budget_old_block')
+        else:
+            selected_block = 'Все'
+
+    # Apply filters
+    filters = {}
+    if selected_project != 'Все':
+        filters['project name'] = selected_project
+    if selected_section != 'Все':
+        filters['section'] = selected_section
+    if selected_block != 'Все':
+        filters['block'] = selected_block
+
+    # Check for budget columns
+    has_budget = 'budget plan' in df.columns and 'budget fact' in df.columns
+
+    if not has_budget:
+        st.warning("Столбцы бюджета (budget plan, budget fact) не найдены в данных.")
+        return
+
+    # Determine period column
+    if period_type_en == 'Month':
+        period_col = 'plan_month'
+        period_label = 'Месяц'
+    elif period_type_en == 'Quarter':
+        period_col = 'plan_quarter'
+        period_label = 'Квартал'
+    else:
+        period_col = 'plan_year'
+        period_label = 'Год'
+
+    if period_col not in df.columns:
+        st.warning(f"Столбец периода '{period_col}' не найден.")
+        return
+
+    # Group by period first to get totals; reserve budget (plan - fact,
+    # negative means over budget) is summed from row-wise values
+    budget_by_period = budget_cube.get_cube(df).slice(
+        [], period_col, filters, measures=['budget plan', 'budget fact', 'reserve budget']
+    )
+
+    # Format period for display
+    budget_by_period[period_col] = period_labels.format_periods(budget_by_period[period_col])
+
+    # Checkbox to hide/show reserve budget (default: hidden)
+    hide_reserve = st.checkbox("Скрыть резерв", value=True, key='budget_old_hide_reserve')
+
+    # Transform data to long format - group by budget type
+    budget_melted = []
+    for idx, row in budget_by_period.iterrows():
+        period = row[period_col]
+        budget_melted.append({
+            period_col: period,
+            'Тип бюджета': 'Бюджет План',
+            'Сумма': row['budget plan']
+        })
+        budget_melted.append({
+            period_col: period,
+            'Тип бюджета': 'Бюджет Факт',
+            'Сумма': row['budget fact']
+        })
+        # Add reserve only if not hidden
+        if not hide_reserve:
+            budget_melted.append({
+                period_col: period,
+                'Тип бюджета': 'Резерв бюджета',
+                'Сумма': row['reserve budget']
+            })
+
+    budget_by_type_df = pd.DataFrame(budget_melted)
+
+    # Visualizations
+    col1, col2 = st.columns(2)
+
+    with col1:
+        # Stacked area chart showing all budget types
+        fig = px.area(
+            budget_by_type_df,
+            x=period_col,
+            y='Сумма',
+            color='Тип бюджета',
+            title='Бюджет по типам по периоду (накопительно)',
+            labels={period_col: period_label, 'Сумма': 'Сумма бюджета'},
+            text='Сумма'
+        )
+        # fig.update_layout(
+        #     plot_bgcolor = "hsl(216,28%,7%)",
+        #     paper_bgcolor = "hsl(216,28%,7%)"
+        # )
+        fig.update_xaxes(tickangle=-45)
+        fig.update_traces(textposition='top center')
+        st.plotly_chart(fig, use_container_width=True, theme=None)
+
+    with col2:
+        # Grouped bar chart
+        fig = px.bar(
+            budget_by_type_df,
+            x=period_col,
+            y='Сумма',
+            color='Тип бюджета',
+            title='Бюджет по типам по периоду',
+            labels={period_col: period_label, 'Сумма': 'Сумма бюджета'},
+            barmode='group',
+            text='Сумма',
+            color_discrete_map={
+                'Бюджет План': '#2E86AB',
+                'Бюджет Факт': '#A23B72',
+                'Резерв бюджета': '#06A77D'
+            },
+            template=None
+        )
+
+        # fig.update_layout(
+        #     plot_bgcolor = "hsl(216,28%,7%)",
+        #     paper_bgcolor = "hsl(216,28%,7%)"
+        # )
+
+        fig.update_xaxes(tickangle=-45)
+        fig.update_traces(textposition='outside', textfont=dict(size=14, color='white'))
+        st.plotly_chart(fig, use_container_width=True, theme=None)
+
+    # Line chart comparing all types
+    fig = px.line(
+        budget_by_type_df,
+        x=period_col,
+        y='Сумма',
+        color='Тип бюджета',
+        title='Сравнение типов бюджета по периоду',
+        labels={period_col: period_label, 'Сумма': 'Сумма бюджета'},
+        markers=True,
+        text='Сумма'
+    )
+
+    # fig.update_layout(
+    #     plot_bgcolor = "hsl(216,28%,7%)",
+    #     paper_bgcolor = "hsl(216,28%,7%)"
+    # )
+
+    fig.update_xaxes(tickangle=-45)
+    fig.update_traces(textposition='top center')
+    st.plotly_chart(fig, use_container_width=True, theme=None)
+
+    # Summary metrics
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        total_plan = budget_by_type_df[budget_by_type_df['Тип бюджета'] == 'Бюджет План']['Сумма'].sum()
+        st.metric("Всего План", f"{int(total_plan)}" if pd.notna(total_plan) else "Н/Д")
+    with col2:
+        total_fact = budget_by_type_df[budget_by_type_df['Тип бюджета'] == 'Бюджет Факт']['Сумма'].sum()
+        st.metric("Всего Факт", f"{int(total_fact)}" if pd.notna(total_fact) else "Н/Д")
+    with col3:
+        total_reserve = budget_by_type_df[budget_by_type_df['Тип бюджета'] == 'Резерв бюджета']['Сумма'].sum() if 'Резерв бюджета' in budget_by_type_df['Тип бюджета'].values else 0
+        st.metric("Всего Резерв", f"{int(total_reserve)}" if pd.notna(total_reserve) else "Н/Д")
+    with col4:
+        variance = total_plan - total_fact if pd.notna(total_plan) and pd.notna(total_fact) else None
+        st.metric("Отклонение", f"{int(variance)}" if variance is not None and pd.notna(variance) else "Н/Д")
+
+    # Pivot table for better readability
+    pivot_table = budget_by_type_df.pivot(
+        index=period_col,
+        columns='Тип бюджета',
+        values='Сумма'
+    ).fillna(0)
+
+    # Detailed table - format with budget types as separate columns
+    st.subheader("Детальная таблица")
+    # Use pivot table format for detailed table (same as summary but with better formatting)
+    detailed_table = pivot_table.copy()
+
+    # Format numbers in detailed table
+    for col in detailed_table.columns:
+        detailed_table[col] = format_numbers(detailed_table[col], na='0')
+
+    st.dataframe(detailed_table, use_container_width=True)
+    # Reset index to make period a column
+    detailed_table = detailed_table.reset_index()
+    # Rename columns for better readability
+    detailed_table.columns.name = None
+    st.dataframe(detailed_table, use_container_width=True)
@@ -0,0 +1,100 @@
+"""
+Общие функции дашбордов: параметры отчетов, фильтры по умолчанию и вывод графиков
+"""
+import streamlit as st
+
+import chart_window
+from figure_cache import cached_figure
+
+
+def apply_default_filters(report_name: str, user_role: str, filter_widgets: dict) -> dict:
+    """
+    Применение фильтров по умолчанию для отчета и роли
+    Args:
+        report_name: Название отчета
+        user_role: Роль пользователя
+        filter_widgets: Словарь с виджетами фильтров {filter_key: widget_value}
+    Returns:
+        Словарь с примененными фильтрами
+    """
+    try:
+        from filters import get_default_filters
+        default_filters = get_default_filters(user_role, report_name)
+        # Применяем фильтры по умолчанию, если они заданы и виджет еще не имеет значения
+        for filter_key, default_value in default_filters.items():
+            if filter_key in filter_widgets and filter_widgets[filter_key] is None:
+                filter_widgets[filter_key] = default_value
+            elif filter_key not in filter_widgets:
+                filter_widgets[filter_key] = default_value
+    except ImportError:
+        # Если модуль filters недоступен, просто возвращаем исходные виджеты
+        pass
+    return filter_widgets
+
+def get_report_param_value(report_name: str, parameter_key: str, default=None):
+    """
+    Получение значения параметра отчета
+    Args:
+        report_name: Название отчета
+        parameter_key: Ключ параметра
+        default: Значение по умолчанию
+    Returns:
+        Значение параметра или default
+    """
+    try:
+        from report_params import get_report_parameter
+        param = get_report_parameter(report_name, parameter_key)
+        if param and param.get('value') is not None:
+            return param['value']
+    except ImportError:
+        # Если модуль report_params недоступен, возвращаем значение по умолчанию
+        pass
+    return default
+
+def chart_window_controls(count_items, levels, key):
+    """
+    Режим графика с длинным списком задач: страница задач или сводка
+
+    Args:
+        count_items: Функция (уровень) -> число строк на оси графика; уровень None - задачи
+        levels: Список (подпись, колонка) доступных сводок
+        key: Префикс ключей виджетов
+
+    Returns:
+        (колонка сводки или None, номер страницы с нуля или None, если все строки помещаются)
+    """
+    n_tasks = count_items(None)
+    if n_tasks <= chart_window.MAX_CHART_ROWS:
+        return None, None
+
+    # Above the aggregate threshold the summary is shown by default
+    options = ['Задачи'] + [label for label, _ in levels]
+    default = 1 if levels and n_tasks > chart_window.AGGREGATE_THRESHOLD else 0
+    col_level, col_page = st.columns(2)
+    with col_level:
+        choice = st.radio("Детализация графика", options, index=default, horizontal=True, key=f'{key}_level')
+    level = dict(levels).get(choice)
+
+    n_items = count_items(level)
+    if n_items <= chart_window.MAX_CHART_ROWS:
+        return level, None
+    pages = chart_window.page_count(n_items)
+    with col_page:
+        page = st.number_input(f"Страница (всего {pages})", min_value=1, max_value=pages, value=1, step=1,
+                               key=f'{key}_page_{level or "tasks"}') - 1
+    start, end = chart_window.page_bounds(page, n_items)
+    st.caption(f"Показаны строки {start + 1}–{end} из {n_items}, по убыванию отклонения")
+    return level, page
+
+def show_cached_chart(df, dashboard, state, chart, build):
+    """
+    Выводит график через общий кеш фигур (build вызывается только при промахе)
+
+    Args:
+        df: Набор данных дашборда
+        dashboard: Имя дашборда
+        state: Все значения, от которых зависит график (фильтры, флажки, режимы)
+        chart: Имя графика внутри дашборда
+        build: Функция без аргументов, возвращающая go.Figure
+    """
+    st.plotly_chart(cached_figure(df, dashboard, state, chart, build), use_container_width=True, theme=None)
@@ -0,0 +1,295 @@
+"""Дашборд "Значения отклонений от базового плана": отклонения по задачам и проектам"""
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.express as px
+
+import chart_window
+import filter_index
+from label_format import format_numbers
+import query_engine
+from dashboards.common import chart_window_controls, show_cached_chart
+
+
+# ==================== DASHBOARD 4: Deviation Amount by Tasks ====================
+def dashboard_deviation_by_tasks_current_month(df):
+    st.header("📊 Значения отклонений от базового плана")
+
+    # Filters row 1: Project, Task, Section, Block
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        # Project filter - show all projects from full dataset
+        selected_project = 'Все'  # Initialize default value
+        if 'project name' in df.columns:
+            # Get all unique projects from the full dataset
+            all_projects = filter_index.options(df, 'project name')
+            if all_projects:
+                projects = ['Все'] + all_projects
+                selected_project = st.selectbox("Фильтр по проекту", projects, key='deviation_tasks_project')
+            else:
+                st.warning("Проекты не найдены в данных.")
+                return
+        else:
+            st.warning("Поле 'project name' не найдено в данных.")
+            return
+
+    with col2:
+        # Task filter - use original df to show all available tasks
+        if 'task name' in df.columns:
+            tasks = ['Все'] + filter_index.options(df, 'task name')
+            selected_task = st.selectbox("Фильтр по задаче", tasks, key='deviation_tasks_task')
+        else:
+            selected_task = 'Все'
+
+    with col3:
+        # Section filter - use original df to show all available sections
+        if 'section' in df.columns:
+            sections = ['Все'] + filter_index.options(df, 'section')
+            selected_section = st.selectbox("Фильтр по разделу", sections, key='deviation_tasks_section')
+        else:
+            selected_section = 'Все'
+
+    with col4:
+        # Block filter - use original df to show all available blocks
+        if 'block' in df.columns:
+            blocks = ['Все'] + filter_index.options(df, 'block')
+            selected_block = st.selectbox("Фильтр по блоку", blocks, key='deviation_tasks_block')
+        else:
+            selected_block = 'Все'
+
+    # Apply project, task, section and block filters (all periods, not just current month)
+    filters = {}
+    if selected_project != 'Все':
+        filters['project name'] = selected_project
+    if selected_task != 'Все':
+        filters['task name'] = selected_task
+    if selected_section != 'Все':
+        filters['section'] = selected_section
+    if selected_block != 'Все':
+        filters['block'] = selected_block
+
+    # Only tasks with deviations - deviation = 1 or True
+    if 'deviation' not in df.columns:
+        st.warning("Поле 'deviation' не найдено в данных.")
+        return
+    filtered_df = query_engine.filter_frame(df, filters, deviation_only=True)
+
+    if filtered_df.empty:
+        st.info("Отклонения не найдены для выбранных фильтров.")
+        return
+
+    # Group by project and task - aggregate across all periods
+    if 'project name' in filtered_df.columns and 'task name' in filtered_df.columns:
+        # Convert deviation in days to numeric
+        if 'deviation in days' in filtered_df.columns:
+            filtered_df['deviation in days'] = pd.to_numeric(filtered_df['deviation in days'], errors='coerce')
+
+        # Calculate completion percentage if dates are available
+        if 'plan start' in filtered_df.columns and 'plan end' in filtered_df.columns and 'base start' in filtered_df.columns and 'base end' in filtered_df.columns:
+            # Convert dates to datetime
+            for col in ['plan start', 'plan end', 'base start', 'base end']:
+                filtered_df[col] = pd.to_datetime(filtered_df[col], errors='coerce', dayfirst=True)
+
+            # Calculate completion percentage:
+            # (Планируемая дата окончания - планируемая дата начала) / (Фактическая дата окончания - фактическая дата начала) * 100
+            filtered_df['plan_duration'] = (filtered_df['plan end'] - filtered_df['plan start']).dt.days
+            filtered_df['fact_duration'] = (filtered_df['base end'] - filtered_df['base start']).dt.days
+
+            # Calculate percentage: plan_duration / fact_duration * 100
+            # Avoid division by zero
+            filtered_df['completion_percent'] = (
+                filtered_df['plan_duration'] / filtered_df['fact_duration'].replace(0, np.nan) * 100
+            ).fillna(0)
+            # Cap at reasonable values (0-200%)
+            filtered_df['completion_percent'] = filtered_df['completion_percent'].clip(0, 200)
+        else:
+            filtered_df['completion_percent'] = None
+
+        # Determine grouping level based on applied filters
+        # Priority: task > section > project
+        if selected_task != 'Все':
+            # If specific task is selected, group by task (only one task will be shown)
+            group_by_cols = ['project name', 'task name']
+            y_column = 'Задача'
+        elif selected_section != 'Все':
+            # If section is selected but not task, group by section
+            group_by_cols = ['section']
+            y_column = 'Раздел'
+        elif selected_project != 'Все':
+            # If project is selected but not task/section, group by project
+            group_by_cols = ['project name']
+            y_column = 'Проект'
+        else:
+            # If nothing is selected, group by project
+            group_by_cols = ['project name']
+            y_column = 'Проект'
+
+        # Group data based on determined grouping level
+        deviations = filtered_df.groupby(group_by_cols, observed=True).agg({
+            'deviation in days': 'sum' if 'deviation in days' in filtered_df.columns else 'count',
+            'completion_percent': 'mean' if 'completion_percent' in filtered_df.columns and filtered_df['completion_percent'].notna().any() else lambda x: None
+        }).reset_index()
+
+        # Set column names based on grouping level
+        if len(group_by_cols) == 2:  # project + task
+            deviations.columns = ['Проект', 'Задача', 'Суммарно дней отклонений', 'Процент выполнения']
+            deviations['Отображение'] = deviations['Задача'].astype(str) + ' (' + deviations['Проект'].astype(str) + ')'
+        elif 'section' in group_by_cols:
+            deviations.columns = ['Раздел', 'Суммарно дней отклонений', 'Процент выполнения']
+            deviations['Отображение'] = deviations['Раздел']
+        else:  # project only
+            deviations.columns = ['Проект', 'Суммарно дней отклонений', 'Процент выполнения']
+            deviations['Отображение'] = deviations['Проект']
+
+        # If completion percent calculation failed, set to None
+        if 'Процент выполнения' in deviations.columns:
+            deviations['Процент выполнения'] = pd.to_numeric(deviations['Процент выполнения'], errors='coerce')
+
+        # Sort by deviation amount (descending - largest first)
+        deviations = deviations.sort_values('Суммарно дней отклонений', ascending=False)
+
+        if deviations.empty:
+            st.info("Нет данных для отображения.")
+            return
+
+        # Checkboxes row 2: Top 5 and Completion percentage
+        col5, col6 = st.columns(2)
+
+        with col5:
+            # Checkbox for Top 5 filter
+            show_top5 = st.checkbox("Топ 5 отклонений", value=False, key='show_top5_deviations')
+
+        with col6:
+            # Checkbox to show/hide completion percentage
+            show_completion = st.checkbox("Показывать процент выполнения", value=False, key='show_completion_percent')
+
+        # Apply Top 5 filter if enabled
+        if show_top5:
+            deviations = deviations.head(5)
+
+        def build_deviation_chart():
+            # Visualization - horizontal bar chart
+            # Format text for display on bars
+            text_values = format_numbers(deviations['Суммарно дней отклонений'])
+            if show_completion and 'Процент выполнения' in deviations.columns:
+                completion = deviations['Процент выполнения'].to_numpy(dtype=float, na_value=np.nan)
+                has_completion = ~np.isnan(completion)
+                text_values[has_completion] = (text_values[has_completion] + ' (' +
+                                               format_numbers(completion[has_completion], decimals=1) + '%)')
+
+            fig = px.bar(
+                deviations,
+                x='Суммарно дней отклонений',
+                y='Отображение',
+                orientation='h',
+                title='Отклонения от базового плана',
+                labels={'Суммарно дней отклонений': 'Суммарно дней отклонений', 'Отображение': y_column},
+                text=text_values,
+                color_discrete_sequence=['#1f77b4'],  # Blue color for all bars
+                template=None
+            )
+
+            # Set category order to show largest values at top (descending order)
+            # For horizontal bars, reverse the list so largest is at top
+            category_list = deviations['Отображение'].tolist()
+            fig.update_layout(
+                showlegend=False,
+                yaxis=dict(
+                    categoryorder='array',
+                    categoryarray=list(reversed(category_list))  # Reverse to show largest at top
+                )
+                # plot_bgcolor  = "hsl(216,28%,7%)",
+                # paper_bgcolor = "hsl(216,28%,7%)"
+            )
+            fig.update_traces(textposition='outside', textfont=dict(size=14, color='white'))  # Show text outside bars at the end
+
+            return fig
+
+        chart_state = dict(filters, top5=show_top5, show_completion=show_completion)
+        show_cached_chart(df, 'deviation_by_tasks', chart_state, 'deviations', build_deviation_chart)
+
+        # Additional histogram with detail by section and task
+        st.subheader("📊 Детализация отклонений по разделам и задачам")
+
+        # Filter for detail histogram - only by project, only tasks with deviations
+        detail_filters = {'project name': selected_project} if selected_project != 'Все' else {}
+        detail_df = query_engine.filter_frame(df, detail_filters, deviation_only=True)
+
+        if detail_df.empty:
+            st.info("Нет данных для отображения детализации.")
+        else:
+            # Convert deviation in days to numeric
+            if 'deviation in days' in detail_df.columns:
+                detail_df['deviation in days'] = pd.to_numeric(detail_df['deviation in days'], errors='coerce')
+
+            # Group by section and task
+            if 'section' in detail_df.columns and 'task name' in detail_df.columns:
+                detail_deviations = detail_df.groupby(['section', 'task name'], observed=True).agg({
+                    'deviation in days': 'sum' if 'deviation in days' in detail_df.columns else 'count'
+                }).reset_index()
+
+                detail_deviations.columns = ['Раздел', 'Задача', 'Суммарно дней отклонений']
+                detail_deviations['Отображение'] = detail_deviations['Задача'].astype(str) + ' (' + detail_deviations['Раздел'].astype(str) + ')'
+
+                # Sort by deviation amount (descending)
+                detail_deviations = detail_deviations.sort_values('Суммарно дней отклонений', ascending=False)
+                y_label = 'Задача (Раздел)'
+
+                # Long task lists: one page of tasks (by deviation) or section/block totals
+                detail_levels = [(label, col) for label, col in [('Разделы', 'section'), ('Блоки', 'block')]
+                                 if col in detail_df.columns]
+
+                def count_detail_items(level):
+                    return len(detail_deviations) if level is None else detail_df[level].nunique()
+
+                level, page = chart_window_controls(count_detail_items, detail_levels, key='deviation_detail_chart')
+                if level is not None:
+                    y_label = dict((col, label) for label, col in detail_levels)[level]
+                    detail_deviations = detail_df.groupby(level, observed=True).agg({
+                        'deviation in days': 'sum' if 'deviation in days' in detail_df.columns else 'count'
+                    }).reset_index()
+                    detail_deviations.columns = [y_label, 'Суммарно дней отклонений']
+                    detail_deviations['Отображение'] = detail_deviations[y_label].astype(str)
+                    detail_deviations = detail_deviations.sort_values('Суммарно дней отклонений', ascending=False)
+                if page is not None:
+                    start, end = chart_window.page_bounds(page, len(detail_deviations))
+                    detail_deviations = detail_deviations.iloc[start:end]
+
+                def build_detail_chart():
+                    # Create horizontal bar chart
+                    fig_detail = px.bar(
+                        detail_deviations,
+                        x='Суммарно дней отклонений',
+                        y='Отображение',
+                        orientation='h',
+                        title='Детализация отклонений по разделам и задачам',
+                        labels={'Суммарно дней отклонений': 'Суммарно дней отклонений', 'Отображение': y_label},
+                        text=format_numbers(detail_deviations['Суммарно дней отклонений'], truncate=True),
+                        color_discrete_sequence=['#1f77b4'],
+                        template=None
+                    )
+
+                    # Set category order to show largest values at top
+                    category_list_detail = detail_deviations['Отображение'].tolist()
+                    fig_detail.update_layout(
+                        showlegend=False,
+                        yaxis=dict(
+                            categoryorder='array',
+                            categoryarray=list(reversed(category_list_detail))
+                        ),
+                        height=max(400, len(detail_deviations) * 30)  # Dynamic height based on number of items
+                        # plot_bgcolor  = "hsl(216,28%,7%)",
+                        # paper_bgcolor = "hsl(216,28%,7%)"
+                    )
+                    fig_detail.update_traces(textposition='outside', textfont=dict(size=12, color='white'))
+
+                    return fig_detail
+
+                detail_state = dict(detail_filters, level=level, page=page)
+                show_cached_chart(df, 'deviation_by_tasks', detail_state, 'detail', build_detail_chart)
+            else:
+                st.warning("Поля 'section' или 'task name' не найдены для детализации.")
+    else:
+        st.warning("Необходимые поля 'project name' или 'task name' не найдены в данных.")
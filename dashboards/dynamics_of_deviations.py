@@ -0,0 +1,447 @@
+"""Дашборд "Динамика отклонений": отклонения по месяцам, кварталам или годам"""
+
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+
+from data_loader import period_column
+import filter_index
+from label_format import format_number
+import period_labels
+import query_engine
+
+
+# ==================== DASHBOARD 2: Dynamics of Deviations ====================
+def dashboard_dynamics_of_deviations(df):
+    st.header("📈 Динамика отклонений")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        period_type = st.selectbox("Группировать по", ['День', 'Месяц', 'Квартал', 'Год'], key='dynamics_period')
+        period_map = {'День': 'Day', 'Месяц': 'Month', 'Квартал': 'Quarter', 'Год': 'Year'}
+        period_type_en = period_map.get(period_type, 'Month')
+
+    with col2:
+        if 'project name' in df.columns:
+            projects = ['Все'] + filter_index.options(df, 'project name')
+            selected_project = st.selectbox("Фильтр по проекту", projects, key='dynamics_project')
+        else:
+            selected_project = 'Все'
+
+    with col3:
+        if 'reason of deviation' in df.columns:
+            reasons = ['Все'] + filter_index.options(df, 'reason of deviation')
+            selected_reason = st.selectbox("Фильтр по причине", reasons, key='dynamics_reason')
+        else:
+            selected_reason = 'Все'
+
+    # Apply filters (row lists of the filter engine) - only tasks with deviations
+    filters = {}
+    if selected_project != 'Все':
+        filters['project name'] = selected_project
+    if selected_reason != 'Все':
+        filters['reason of deviation'] = selected_reason
+    filtered_df = query_engine.filter_frame(df, filters, deviation_only=True)
+
+    if filtered_df.empty:
+        st.info("Нет данных для выбранных фильтров.")
+        return
+
+    # Extract period from plan end dates (period columns are derived from integer keys)
+    period_column_name, period_label, period_warning = {
+        'Day': ('plan_day', 'День', 'дням'),
+        'Month': ('plan_month', 'Месяц', 'месяцам'),
+        'Quarter': ('plan_quarter', 'Квартал', 'кварталам'),
+        'Year': ('plan_year', 'Год', 'годам'),
+    }.get(period_type_en, ('plan_year', 'Год', 'годам'))
+    if 'plan end' not in filtered_df.columns:
+        st.warning(f"Поле 'plan end' не найдено для группировки по {period_warning}.")
+        return
+    period_values = period_column(filtered_df, period_column_name)
+    if period_values is None:
+        st.info("Нет данных с указанными периодами.")
+        return
+    filtered_df['period'] = period_values
+
+    # Filter out rows without period data
+    filtered_df = filtered_df[filtered_df['period'].notna()]
+
+    if filtered_df.empty:
+        st.info("Нет данных с указанными периодами.")
+        return
+
+    # Convert deviation in days to numeric
+    if 'deviation in days' in filtered_df.columns:
+        filtered_df['deviation in days'] = pd.to_numeric(filtered_df['deviation in days'], errors='coerce')
+
+    # Group by project, period, and reason - count deviation days
+    group_cols = ['period']
+    if 'project name' in filtered_df.columns:
+        group_cols.append('project name')
+    if 'reason of deviation' in filtered_df.columns:
+        group_cols.append('reason of deviation')
+
+    # Aggregate: count tasks and sum deviation days
+    # For average: sum deviation days / number of tasks (grouped by project if project is in group)
+    agg_dict = {'deviation': 'count'}  # Count tasks
+    if 'deviation in days' in filtered_df.columns:
+        agg_dict['deviation in days'] = 'sum'  # Sum deviation days
+
+    grouped_data = filtered_df.groupby(group_cols, observed=True).agg(agg_dict).reset_index()
+
+    # Ensure period column is preserved as Period type if possible
+    # After groupby, Period objects might be converted, so we need to handle this
+    if 'period' in grouped_data.columns:
+        # Try to preserve Period type or convert back if needed
+        try:
+            # Check if period values are still Period objects
+            if isinstance(grouped_data['period'].iloc[0], pd.Period):
+                # Period objects are preserved, good
+                pass
+            else:
+                # Try to convert back to Period if they're strings
+                try:
+                    # Try to convert string representations back to Period
+                    def try_convert_to_period(val):
+                        if isinstance(val, pd.Period):
+                            return val
+                        if isinstance(val, str) and '-' in val:
+                            try:
+                                parts = val.split('-')
+                                if len(parts) >= 2:
+                                    year = int(parts[0])
+                                    month = int(parts[1])
+                                    return pd.Period(f'{year}-{month:02d}', freq='M')
+                            except:
+                                pass
+                        return val
+                    grouped_data['period'] = grouped_data['period'].apply(try_convert_to_period)
+                except:
+                    pass
+        except:
+            pass
+
+    # Calculate average: sum of deviation days / number of tasks
+    if 'deviation in days' in filtered_df.columns:
+        # Rename columns
+        if 'deviation in days' in grouped_data.columns:
+            grouped_data = grouped_data.rename(columns={
+                'deviation': 'Количество задач',
+                'deviation in days': 'Всего дней отклонений'
+            })
+        else:
+            grouped_data = grouped_data.rename(columns={'deviation': 'Количество задач'})
+            grouped_data['Всего дней отклонений'] = 0
+
+        # Calculate average: sum / count of tasks
+        grouped_data['Среднее дней отклонений'] = (
+            grouped_data['Всего дней отклонений'] / grouped_data['Количество задач']
+        ).round(2)
+    else:
+        grouped_data = grouped_data.rename(columns={'deviation': 'Количество задач'})
+        grouped_data['Всего дней отклонений'] = 0
+        grouped_data['Среднее дней отклонений'] = 0
+
+    # Format period for display; labels keep the chronological order of the period keys
+    period_keys = grouped_data['period']
+    grouped_data['period'] = period_labels.label_categories(period_keys)
+
+    # Visualizations
+    if len(group_cols) == 1:  # Only period
+        col1, col2 = st.columns(2)
+
+        with col1:
+
+            fig = px.bar(
+                grouped_data,
+                x='period',
+                y='Количество задач',
+                title=f'Количество задач с отклонениями по {period_label.lower()}',
+                labels={'period': period_label, 'Количество задач': 'Количество задач'},
+                text='Количество задач',
+                template=None
+            )
+
+            fig.update_layout(
+                plot_bgcolor = "hsl(216,28%,7%)",
+                paper_bgcolor = "hsl(216,28%,7%)",
+                font_color = "hsl(210,67%,96%)",
+                title_font_color = "hsl(210,67%,96%)",
+                legend_font_color = "hsl(210,67%,96%)",
+                xaxis_tickfont_color = "hsl(210,67%,96%)",
+                yaxis_tickfont_color = "hsl(210,67%,96%)",
+                xaxis_title_font_color = "hsl(210,67%,96%)",
+                yaxis_title_font_color = "hsl(210,67%,96%)"
+            )
+
+            fig.update_xaxes(tickangle=-45)
+            fig.update_traces(textposition='outside', textfont=dict(size=14, color='hsl(210,67%,96%)'))
+            st.plotly_chart(fig, use_container_width=True, theme=None)
+
+        with col2:
+
+            if grouped_data['Всего дней отклонений'].sum() > 0:
+                fig = px.line(
+                    grouped_data,
+                    x='period',
+                    y='Всего дней отклонений',
+                    title=f'Всего дней отклонений по {period_label.lower()}',
+                    markers=True,
+                    text='Всего дней отклонений'
+                )
+
+                fig.update_layout(
+                    plot_bgcolor = "hsl(216,28%,7%)",
+                    paper_bgcolor = "hsl(216,28%,7%)",
+                    font_color = "hsl(210,67%,96%)",
+                    title_font_color = "hsl(210,67%,96%)",
+                    legend_font_color = "hsl(210,67%,96%)",
+                    xaxis_tickfont_color = "hsl(210,67%,96%)",
+                    yaxis_tickfont_color = "hsl(210,67%,96%)",
+                    xaxis_title_font_color = "hsl(210,67%,96%)",
+                    yaxis_title_font_color = "hsl(210,67%,96%)"
+                )
+
+                fig.update_xaxes(tickangle=-45)
+                fig.update_traces(textposition='top center', textfont=dict(size=14, color='hsl(210,67%,96%)'))
+                st.plotly_chart(fig, use_container_width=True, theme=None)
+            else:
+                st.info("Нет данных по дням отклонений.")
+
+    else:  # Grouped by project and/or reason
+        # Show by project if project is in group
+        if 'project name' in group_cols:
+            st.subheader("По проектам")
+            # If reason is also in group_cols, aggregate by period and project only (sum across reasons)
+            if 'reason of deviation' in group_cols:
+                project_data = grouped_data.groupby(['period', 'project name'], observed=True).agg({
+                    'Всего дней отклонений': 'sum',
+                    'Количество задач': 'sum'
+                }).reset_index()
+            else:
+                project_data = grouped_data
+
+            fig = px.bar(
+                project_data,
+                x='period',
+                y='Всего дней отклонений',
+                color='project name',
+                title='Дни отклонений по периоду',
+                labels={'period': '', 'Всего дней отклонений': 'Дни отклонений'},
+                text='Всего дней отклонений',
+                template=None
+            )
+            # Set barmode to 'group' to group bars by period
+            fig.update_layout(
+                barmode='group'
+                # plot_bgcolor  = "hsl(216,28%,7%)",
+                # paper_bgcolor = "hsl(216,28%,7%)"
+            )
+            fig.update_xaxes(tickangle=-45, title_text='')
+            # Update traces to ensure horizontal text orientation
+            fig.update_traces(
+                textposition='outside',
+                textfont=dict(size=14, color='white')
+            )
+            # Explicitly set textangle to 0 for all traces to ensure horizontal text
+            # In Plotly, textangle is set per trace
+            for i, trace in enumerate(fig.data):
+                # Update trace with textangle=0 to ensure horizontal text
+                fig.data[i].update(textangle=0)
+            st.plotly_chart(fig, use_container_width=True, theme=None)
+
+        # Show by reason if reason is in group
+        if 'reason of deviation' in group_cols:
+            st.subheader("По причинам")
+            # Агрегируем данные по периоду и причинам (один столбец за месяц с секторами по причинам)
+            if 'project name' in group_cols:
+                # Сначала суммируем по проектам и причинам, затем по периодам
+                reason_data = grouped_data.groupby(['period', 'reason of deviation'], observed=True).agg({
+                    'Всего дней отклонений': 'sum',
+                    'Количество задач': 'sum'
+                }).reset_index()
+            else:
+                reason_data = grouped_data
+
+            # Вычисляем суммарные значения по каждому периоду для отображения над столбцами
+            period_totals = reason_data.groupby('period', observed=True)['Всего дней отклонений'].sum().reset_index()
+
+            fig = px.bar(
+                reason_data,
+                x='period',
+                y='Всего дней отклонений',
+                color='reason of deviation',
+                title='Дни отклонений по периоду и причинам',
+                labels={'period': '', 'Всего дней отклонений': 'Дни отклонений'},
+                text='Всего дней отклонений',
+                template=None
+            )
+            # Используем накопление (stack) для отображения секторов причин в одном столбце
+            fig.update_layout(
+                barmode='stack'
+                # plot_bgcolor  = "hsl(216,28%,7%)",
+                # paper_bgcolor = "hsl(216,28%,7%)"
+            )
+            fig.update_xaxes(tickangle=-45, title_text='')
+            # Убираем текст внутри столбцов, так как итоговые значения выводятся над столбцами через аннотации
+            fig.update_traces(
+                textposition='none',
+                textfont=dict(size=12, color='white')
+            )
+            # Explicitly set textangle to 0 for all traces to ensure horizontal text
+            # In Plotly, textangle is set per trace
+            for i, trace in enumerate(fig.data):
+                # Update trace with textangle=0 to ensure horizontal text
+                fig.data[i].update(textangle=0)
+
+            # Добавляем суммарные значения над столбцами
+            annotations = []
+            for idx, row in period_totals.iterrows():
+                period = row['period']
+                total = row['Всего дней отклонений']
+                # Для положительных значений - над столбцом (от верхней точки)
+                # Для отрицательных значений - над столбцом (от верхней точки, которая находится внизу на y=0)
+                if total >= 0:
+                    # Положительное значение: аннотация над столбцом
+                    y_coord = total
+                    y_anchor = 'bottom'
+                    y_shift = 20  # Фиксированное расстояние 20px от верхней точки столбца
+                else:
+                    # Отрицательное значение: аннотация над столбцом (который идет вниз)
+                    # Верхняя точка отрицательного столбца находится на y=0, нижняя - на y=total
+                    y_coord = 0  # Позиционируем относительно верхней точки (y=0)
+                    y_anchor = 'bottom'
+                    y_shift = 20  # Фиксированное расстояние 20px от верхней точки столбца
+
+                annotations.append(
+                    dict(
+                        x=period,
+                        y=y_coord,
+                        text=format_number(total, truncate=True),
+                        showarrow=False,
+                        xanchor='center',
+                        yanchor=y_anchor,
+                        yshift=y_shift,
+                        font=dict(size=14, color='white', weight='bold')
+                    )
+                )
+            fig.update_layout(
+                annotations=annotations
+                # plot_bgcolor  = "hsl(216,28%,7%)",
+                # paper_bgcolor = "hsl(216,28%,7%)"
+            )
+
+            st.plotly_chart(fig, use_container_width=True, theme=None)
+
+    # Summary table
+    # If project is in group, show summary grouped by project overall (aggregate across all periods)
+    if 'project name' in group_cols:
+        # Create project-level summary (aggregate across all periods, not by day/period)
+        project_summary_cols = ['project name']
+        if 'reason of deviation' in group_cols:
+            project_summary_cols.append('reason of deviation')
+
+        # Получаем доступные периоды из grouped_data для фильтра
+        available_periods = []
+        if 'period' in grouped_data.columns:
+            available_periods = period_labels.ordered_labels(period_keys)
+
+        st.subheader(f"Сводная таблица (группировка: {', '.join(project_summary_cols)})")
+
+        # Добавляем селекторы для фильтрации таблицы
+        filter_cols = st.columns(3)
+        filtered_df_for_summary = filtered_df.copy()
+
+        with filter_cols[0]:
+            if 'project name' in filtered_df_for_summary.columns:
+                available_projects = ['Все'] + sorted(filtered_df_for_summary['project name'].dropna().unique().tolist())
+                selected_project_filter = st.selectbox(
+                    "Фильтр по проекту",
+                    available_projects,
+                    key='summary_project_filter'
+                )
+                if selected_project_filter != 'Все':
+                    filtered_df_for_summary = filtered_df_for_summary[filtered_df_for_summary['project name'] == selected_project_filter]
+
+        with filter_cols[1]:
+            if 'reason of deviation' in filtered_df_for_summary.columns:
+                available_reasons = ['Все'] + sorted(filtered_df_for_summary['reason of deviation'].dropna().unique().tolist())
+                selected_reason_filter = st.selectbox(
+                    "Фильтр по причине отклонения",
+                    available_reasons,
+                    key='summary_reason_filter'
+                )
+                if selected_reason_filter != 'Все':
+                    filtered_df_for_summary = filtered_df_for_summary[filtered_df_for_summary['reason of deviation'] == selected_reason_filter]
+
+        with filter_cols[2]:
+            # Фильтр по периоду
+            period_options = ['Весь период'] + available_periods
+            selected_period_filter = st.selectbox(
+                "Фильтр по периоду",
+                period_options,
+                key='summary_period_filter'
+            )
+
+            # Применяем фильтр по периоду
+            if selected_period_filter != 'Весь период' and 'period' in filtered_df_for_summary.columns:
+                # Фильтруем по отформатированному периоду
+                if 'plan end' in filtered_df_for_summary.columns:
+                    # Создаем временную колонку с отформатированными периодами для фильтрации
+                    filtered_df_for_summary = filtered_df_for_summary.copy()
+                    mask = filtered_df_for_summary['plan end'].notna()
+                    filtered_df_for_summary['temp_period'] = period_column(filtered_df_for_summary, period_column_name)
+
+                    # Форматируем периоды для сравнения
+                    filtered_df_for_summary.loc[mask, 'temp_period_formatted'] = period_labels.format_periods(filtered_df_for_summary.loc[mask, 'temp_period'])
+                    # Фильтруем по выбранному периоду
+                    period_mask = filtered_df_for_summary['temp_period_formatted'] == selected_period_filter
+                    filtered_df_for_summary = filtered_df_for_summary[period_mask]
+                    # Удаляем временные колонки
+                    filtered_df_for_summary = filtered_df_for_summary.drop(columns=['temp_period', 'temp_period_formatted'], errors='ignore')
+
+        # Aggregate by project (and reason if present) - sum across selected periods
+        project_summary = filtered_df_for_summary.groupby(project_summary_cols, observed=True).agg({
+            'deviation': 'count',  # Count tasks
+            'deviation in days': 'sum' if 'deviation in days' in filtered_df_for_summary.columns else 'count'
+        }).reset_index()
+
+        # Rename columns
+        period_col_name = f'Дни отклонений ({selected_period_filter})' if selected_period_filter != 'Весь период' else 'Всего дней отклонений'
+        project_summary = project_summary.rename(columns={
+            'deviation': 'Количество отклонений',
+            'deviation in days': period_col_name
+        })
+
+        # Если нет данных по дням отклонений, добавляем нулевую колонку
+        if period_col_name not in project_summary.columns:
+            project_summary[period_col_name] = 0
+
+        # Sort by total deviation days (descending)
+        if period_col_name in project_summary.columns:
+            project_summary = project_summary.sort_values(period_col_name, ascending=False)
+
+        # Добавляем строку "Итого"
+        total_row = {}
+        for col in project_summary.columns:
+            if col in project_summary_cols:
+                total_row[col] = 'Итого'
+            elif col == 'Количество отклонений':
+                total_row[col] = int(project_summary[col].sum())
+            elif col == period_col_name:
+                total_row[col] = int(project_summary[col].sum())
+            else:
+                total_row[col] = ''
+
+        # Создаем DataFrame для строки "Итого"
+        total_df = pd.DataFrame([total_row])
+        # Объединяем с основным DataFrame
+        project_summary = pd.concat([project_summary, total_df], ignore_index=True)
+
+        st.dataframe(project_summary, use_container_width=True)
+    else:
+        # No project in group, show regular summary by period
+        group_desc = [period_label] + [c for c in group_cols if c != 'period']
+        st.subheader(f"Сводная таблица (группировка: {', '.join(group_desc)})")
+        st.dataframe(grouped_data, use_container_width=True)
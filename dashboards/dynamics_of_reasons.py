@@ -0,0 +1,264 @@
+"""Дашборд "Динамика причин отклонений": причины отклонений по периодам"""
+
+import streamlit as st
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+import filter_index
+import period_labels
+import query_engine
+
+
+# ==================== DASHBOARD 5: Dynamics of Reasons by Month ====================
+def dashboard_dynamics_of_reasons(df):
+    st.header("📉 Динамика причин отклонений")
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        period_type = st.selectbox("Группировать по", ['Месяц', 'Квартал', 'Год'], key='reasons_period')
+        period_map = {'Месяц': 'Month', 'Квартал': 'Quarter', 'Год': 'Year'}
+        period_type_en = period_map.get(period_type, 'Month')
+
+    with col2:
+        if 'reason of deviation' in df.columns:
+            reasons = ['Все'] + filter_index.options(df, 'reason of deviation')
+            selected_reason = st.selectbox("Фильтр по причине", reasons, key='reasons_reason')
+        else:
+            selected_reason = 'Все'
+
+    with col3:
+        if 'project name' in df.columns:
+            projects = ['Все'] + filter_index.options(df, 'project name')
+            selected_project = st.selectbox("Фильтр по проекту", projects, key='reasons_project')
+        else:
+            selected_project = 'Все'
+
+    with col4:
+        if 'section' in df.columns:
+            sections = ['Все'] + filter_index.options(df, 'section')
+            selected_section = st.selectbox("Фильтр по разделу", sections, key='reasons_section')
+        else:
+            selected_section = 'Все'
+
+    # Additional filter row: Block
+    col5 = st.columns(1)[0]
+    with col5:
+        if 'block' in df.columns:
+            blocks = ['Все'] + filter_index.options(df, 'block')
+            selected_block = st.selectbox("Фильтр по блоку", blocks, key='reasons_block')
+        else:
+            selected_block = 'Все'
+
+    # View type selector
+    view_type = st.selectbox("Вид отображения", ['По причинам', 'По месяцам'], key='reasons_view_type')
+
+    # Apply filters (engine: DuckDB or pandas) - only tasks with deviations
+    filters = {}
+    if selected_reason != 'Все':
+        filters['reason of deviation'] = selected_reason
+    if selected_project != 'Все':
+        filters['project name'] = selected_project
+    if selected_section != 'Все':
+        filters['section'] = selected_section
+    if selected_block != 'Все':
+        filters['block'] = selected_block
+
+    if len(query_engine.filter_positions(df, filters, deviation_only=True)) == 0:
+        st.info("Нет данных для выбранных фильтров.")
+        return
+
+    # Determine period column - use plan_month for month grouping
+    if period_type_en == 'Month':
+        period_col = 'plan_month'
+        period_label = 'Месяц'
+    elif period_type_en == 'Quarter':
+        period_col = 'plan_quarter'
+        period_label = 'Квартал'
+    else:
+        period_col = 'plan_year'
+        period_label = 'Год'
+
+    # Period columns are built at load time from plan end; without them there is nothing to group
+    if period_col not in df.columns and 'plan end' not in df.columns:
+        st.warning(f"Столбец периода '{period_col}' не найден.")
+        return
+
+    # Group by period and reason - ensure we have both project name and reason
+    if 'reason of deviation' in df.columns:
+        # Rows without period data are dropped by the engine
+        reason_dynamics = query_engine.aggregate(
+            df, [period_col, 'reason of deviation'], filters,
+            count_name='Количество', deviation_only=True
+        )
+
+        # Format period for display; labels keep the chronological order of the period keys
+        reason_dynamics[period_col] = period_labels.label_categories(reason_dynamics[period_col])
+
+        # Checkbox to show/hide trend line
+        show_trend = st.checkbox("Показывать линию тренда", value=False, key='show_trend_line')
+
+        # Build visualization based on view type
+        if view_type == 'По причинам':
+            # View 1: By reasons - reason on X-axis, count on Y-axis
+            # Group by reason and sum across all periods
+            reason_summary = reason_dynamics.groupby('reason of deviation', observed=True)['Количество'].sum().reset_index()
+            reason_summary = reason_summary.sort_values('Количество', ascending=False)
+
+            # Visualization - vertical bar chart with reasons on X-axis
+            fig = px.bar(
+                reason_summary,
+                x='reason of deviation',
+                y='Количество',
+                title='Динамика причин отклонений по причинам',
+                labels={'reason of deviation': 'Причина отклонения', 'Количество': 'Количество отклонений'},
+                text='Количество',
+                color_discrete_sequence=['#1f77b4'],
+                template=None
+            )
+            fig.update_xaxes(tickangle=-45)
+            fig.update_traces(
+                textposition='outside',
+                textfont=dict(size=12, color='white')
+            )
+        else:
+            # View 2: By months - month on X-axis, count on Y-axis, reasons as colors (stacked)
+            # If "Все" projects selected, show aggregated view (one column per period)
+            if selected_project == 'Все':
+                # For chart: group only by period (sum all reasons)
+                chart_data = reason_dynamics.groupby(period_col, observed=True)['Количество'].sum().reset_index()
+                chart_data['reason of deviation'] = 'Все проекты'  # Dummy column for consistency
+
+                # Visualization - vertical bar chart with single column per period
+                fig = px.bar(
+                    chart_data,
+                    x=period_col,
+                    y='Количество',
+                    title='Динамика причин отклонений по периодам',
+                    labels={period_col: period_label, 'Количество': 'Количество отклонений'},
+                    text='Количество',
+                    color_discrete_sequence=['#1f77b4'],  # Single color for all bars
+                    template=None
+                )
+            else:
+                # Visualization - vertical bar chart with stacked reasons
+                # Use period_col for x-axis and reason for color (legend)
+                # Use stacked mode to show all reasons in one column per period
+                fig = px.bar(
+                    reason_dynamics,
+                    x=period_col,
+                    y='Количество',
+                    color='reason of deviation',
+                    title='Динамика причин отклонений по периодам',
+                    labels={period_col: period_label, 'reason of deviation': 'Причина отклонения', 'Количество': 'Количество отклонений'},
+                    text='Количество',
+                    barmode='stack',  # Stacked bars: all reasons in one column per period
+                    template=None
+                )
+        # Update layout based on view type
+        if view_type == 'По причинам':
+            # For "По причинам" view, no additional annotations needed
+            pass
+        else:
+            # For "По месяцам" view, add annotations and trend line
+            fig.update_xaxes(tickangle=-45)
+            # Show values inside bars for each reason - horizontal text (same as other charts)
+            fig.update_traces(
+                textposition='inside',
+                textfont=dict(size=12, color='white')
+            )
+            # Set text angle to horizontal (0 degrees) for inside bar labels - same as other charts
+            for i, trace in enumerate(fig.data):
+                fig.data[i].update(textangle=0)
+
+            # Add total values above bars and trend line
+            if selected_project == 'Все':
+                # For "Все проекты": use chart_data for annotations and trend
+                total_by_period = chart_data.groupby(period_col, observed=True)['Количество'].sum().reset_index()
+                periods = list(chart_data[period_col].unique().sort_values())
+                max_y_value = chart_data['Количество'].max()
+            else:
+                # Calculate total deviations per period for annotations
+                total_by_period = reason_dynamics.groupby(period_col, observed=True)['Количество'].sum().reset_index()
+                total_by_period_dict = dict(zip(total_by_period[period_col], total_by_period['Количество']))
+                periods = list(reason_dynamics[period_col].unique().sort_values())
+                max_y_value = reason_dynamics['Количество'].max()
+
+                # Add annotations for individual project view
+                for period in periods:
+                    total = total_by_period_dict.get(period, 0)
+                    if total > 0:
+                        # Get all bars for this period to find max height
+                        period_bars = reason_dynamics[reason_dynamics[period_col] == period]
+                        if not period_bars.empty:
+                            # Find the maximum height among all bars in this period group
+                            max_bar_height = period_bars['Количество'].max()
+
+                            # Calculate offset
+                            if max_y_value > 0:
+                                y_offset = max_y_value * 0.10
+                            else:
+                                y_offset = max_bar_height * 0.10
+
+                            # Position annotation
+                            x_position = period
+                            y_position = max_bar_height + y_offset
+
+                            fig.add_annotation(
+                                x=x_position,
+                                y=y_position,
+                                text=f'<b>{int(total)}</b>',
+                                showarrow=False,
+                                font=dict(size=14, color='white'),
+                                xanchor='center',
+                                yanchor='bottom',
+                                bgcolor='rgba(0,0,0,0.5)',
+                                xshift=10
+                            )
+
+            # Add trend line if checkbox is checked
+            if show_trend:
+                # Calculate overall trend across all reasons (sum by period)
+                total_by_period_sorted = total_by_period.sort_values(period_col)
+                if len(total_by_period_sorted) > 1:
+                    # Use period values as x positions
+                    x_positions = total_by_period_sorted[period_col].tolist()
+                    y_values = total_by_period_sorted['Количество'].values
+
+                    # Create numeric x values for trend calculation (for fitting)
+                    x_numeric = range(len(y_values))
+
+                    # Calculate linear trend
+                    z = np.polyfit(x_numeric, y_values, 1)
+                    p = np.poly1d(z)
+                    trend_y = p(x_numeric)
+
+                    # Add single trend line across all data
+                    fig.add_trace(go.Scatter(
+                        x=x_positions,
+                        y=trend_y,
+                        mode='lines',
+                        name='Линия тренда',
+                        line=dict(dash='dash', width=3, color='white'),
+                        showlegend=True,
+                        hoverinfo='skip'
+                    ))
+
+        # fig.update_layout(
+        #     plot_bgcolor  = "hsl(216,28%,7%)",
+        #     paper_bgcolor = "hsl(216,28%,7%)"
+        # )
+
+        st.plotly_chart(fig, use_container_width=True, theme=None)
+
+        # Summary table - always show by reason (summarized values)
+        # Group by reason and sum across all periods
+        summary_by_reason = reason_dynamics.groupby('reason of deviation', observed=True)['Количество'].sum().reset_index()
+        summary_by_reason.columns = ['Причина отклонения', 'Суммарное количество']
+        summary_by_reason = summary_by_reason.sort_values('Суммарное количество', ascending=False)
+
+        st.subheader(f"Сводная таблица по {period_label.lower()}")
+        st.dataframe(summary_by_reason, use_container_width=True)
+    else:
+        st.warning("Столбец 'reason of deviation' не найден в данных.")
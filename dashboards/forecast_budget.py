@@ -0,0 +1,276 @@
+"""Дашборд "Прогнозный бюджет" с редактированием дат и бюджета задач"""
+
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+
+from budget_engine import calculate_approved_budget, IncrementalApprovedBudget
+import filter_index
+from label_format import format_numbers
+import period_labels
+import query_engine
+
+
+# ==================== DASHBOARD: Forecast Budget ====================
+def calculate_forecast_budget(df, edited_data=None, rule_name='default', tracker=None):
+    """
+    Рассчитывает прогнозный бюджет на основе утвержденного бюджета с учетом возможных изменений.
+
+    Args:
+        df: DataFrame с исходными данными проектов
+        edited_data: DataFrame с отредактированными данными (даты, утвержденный бюджет)
+        rule_name: название правила распределения
+        tracker: IncrementalApprovedBudget - пересчитываются только измененные задачи
+
+    Returns:
+        DataFrame с распределением прогнозного бюджета по месяцам
+    """
+    # Используем отредактированные данные, если они есть, иначе исходные
+    work_df = edited_data if edited_data is not None else df
+
+    # Рассчитываем утвержденный бюджет на основе текущих данных
+    if tracker is not None:
+        approved_budget_df, error = tracker.update(work_df)
+    else:
+        approved_budget_df, error = calculate_approved_budget(work_df, rule_name=rule_name)
+
+    if error:
+        return pd.DataFrame(), error
+
+    # Прогнозный бюджет = утвержденный бюджет (но может быть изменен пользователем)
+    # Если пользователь изменил утвержденный бюджет вручную, используем эти значения
+    forecast_budget_df = approved_budget_df.copy()
+
+    # Переименовываем колонку для ясности
+    if 'approved budget' in forecast_budget_df.columns:
+        forecast_budget_df['forecast budget'] = forecast_budget_df['approved budget']
+
+    return forecast_budget_df, None
+
+def dashboard_forecast_budget(df):
+    """Панель для отображения и редактирования прогнозного бюджета"""
+    st.header("📈 Прогнозный бюджет")
+
+    # Информация о прогнозном бюджете
+    with st.expander("ℹ️ О прогнозном бюджете", expanded=False):
+        st.markdown("""
+        **Прогнозный бюджет** рассчитывается на основе утвержденного бюджета и может быть скорректирован:
+        - При изменении плановых дат начала и окончания этапов
+        - При изменении утвержденного бюджета по задачам
+
+        Прогнозный бюджет автоматически пересчитывается при любых изменениях.
+        """)
+
+    # Фильтр по проекту (обязательный для прогнозного бюджета)
+    if 'project name' not in df.columns:
+        st.warning("Колонка 'project name' не найдена. Необходима для работы с прогнозным бюджетом.")
+        return
+
+    projects = filter_index.options(df, 'project name')
+    if not projects:
+        st.warning("Проекты не найдены в данных.")
+        return
+
+    selected_project = st.selectbox("Выберите проект", projects, key='forecast_budget_project')
+
+    # Фильтруем данные по выбранному проекту
+    project_df = query_engine.filter_frame(df, {'project name': selected_project})
+
+    if project_df.empty:
+        st.info("Нет данных для выбранного проекта.")
+        return
+
+    # Проверяем наличие необходимых колонок
+    required_cols = ['budget plan', 'plan start', 'plan end', 'task name']
+    missing_cols = [col for col in required_cols if col not in project_df.columns]
+    if missing_cols:
+        st.warning(f"Отсутствуют необходимые колонки: {', '.join(missing_cols)}")
+        return
+
+    # Инициализируем session_state для хранения отредактированных данных
+    if f'forecast_edited_data_{selected_project}' not in st.session_state:
+        st.session_state[f'forecast_edited_data_{selected_project}'] = project_df.copy()
+
+    # Инициализируем session_state для хранения отредактированной таблицы (для отображения)
+    if f'forecast_edit_table_{selected_project}' not in st.session_state:
+        # Подготавливаем данные для редактирования в первый раз
+        current_data = project_df.copy()
+        edit_df = current_data[['task name', 'section', 'plan start', 'plan end', 'budget plan']].copy()
+
+        # Конвертируем даты в datetime для корректного отображения
+        edit_df['plan start'] = pd.to_datetime(edit_df['plan start'], errors='coerce', dayfirst=True)
+        edit_df['plan end'] = pd.to_datetime(edit_df['plan end'], errors='coerce', dayfirst=True)
+
+        # Форматируем для отображения
+        edit_df['plan start'] = edit_df['plan start'].dt.date
+        edit_df['plan end'] = edit_df['plan end'].dt.date
+
+        # Переименовываем колонки для удобства
+        edit_df.columns = ['Задача', 'Раздел', 'План. начало', 'План. окончание', 'Плановый бюджет']
+
+        st.session_state[f'forecast_edit_table_{selected_project}'] = edit_df.copy()
+
+    # Получаем текущую таблицу для редактирования
+    edit_df = st.session_state[f'forecast_edit_table_{selected_project}'].copy()
+
+    st.subheader("📝 Редактирование данных задач")
+    st.info("Измените даты начала/окончания или плановый бюджет. Изменения применяются автоматически при нажатии 'Применить изменения'.")
+
+    # Используем st.data_editor для редактирования данных
+    edited_df = st.data_editor(
+        edit_df,
+        column_config={
+            "Задача": st.column_config.TextColumn("Задача", disabled=True),
+            "Раздел": st.column_config.TextColumn("Раздел", disabled=True),
+            "План. начало": st.column_config.DateColumn("План. начало", format="DD.MM.YYYY"),
+            "План. окончание": st.column_config.DateColumn("План. окончание", format="DD.MM.YYYY"),
+            "Плановый бюджет": st.column_config.NumberColumn("Плановый бюджет", format="%d", step=1000),
+        },
+        use_container_width=True,
+        num_rows="fixed",
+        key=f'forecast_data_editor_{selected_project}'
+    )
+
+    # Кнопка для применения изменений
+    col_apply, col_reset = st.columns(2)
+    with col_apply:
+        apply_changes = st.button("✅ Применить изменения", key=f'apply_forecast_{selected_project}', type='primary')
+    with col_reset:
+        reset_changes = st.button("🔄 Сбросить изменения", key=f'reset_forecast_{selected_project}')
+
+    # Обрабатываем сброс изменений
+    if reset_changes:
+        # Сбрасываем данные
+        st.session_state[f'forecast_edited_data_{selected_project}'] = project_df.copy()
+        edit_df_reset = project_df[['task name', 'section', 'plan start', 'plan end', 'budget plan']].copy()
+        edit_df_reset['plan start'] = pd.to_datetime(edit_df_reset['plan start'], errors='coerce', dayfirst=True)
+        edit_df_reset['plan end'] = pd.to_datetime(edit_df_reset['plan end'], errors='coerce', dayfirst=True)
+        edit_df_reset['plan start'] = edit_df_reset['plan start'].dt.date
+        edit_df_reset['plan end'] = edit_df_reset['plan end'].dt.date
+        edit_df_reset.columns = ['Задача', 'Раздел', 'План. начало', 'План. окончание', 'Плановый бюджет']
+        st.session_state[f'forecast_edit_table_{selected_project}'] = edit_df_reset.copy()
+        st.success("🔄 Изменения сброшены!")
+        st.rerun()
+
+    # Сохраняем отредактированную таблицу в session_state
+    st.session_state[f'forecast_edit_table_{selected_project}'] = edited_df.copy()
+
+    # Получаем исходные данные проекта
+    current_data = st.session_state[f'forecast_edited_data_{selected_project}'].copy()
+
+    # Обновляем исходные данные с учетом изменений из отредактированной таблицы
+    updated_data = current_data.copy().reset_index(drop=True)
+    edited_df_reset = edited_df.reset_index(drop=True)
+
+    # Обновляем даты и бюджет по индексам
+    if len(updated_data) == len(edited_df_reset):
+        # Обновляем даты - конвертируем из date обратно в datetime
+        if 'План. начало' in edited_df_reset.columns:
+            updated_data['plan start'] = pd.to_datetime(edited_df_reset['План. начало'], errors='coerce')
+        if 'План. окончание' in edited_df_reset.columns:
+            updated_data['plan end'] = pd.to_datetime(edited_df_reset['План. окончание'], errors='coerce')
+        if 'Плановый бюджет' in edited_df_reset.columns:
+            updated_data['budget plan'] = pd.to_numeric(edited_df_reset['Плановый бюджет'], errors='coerce')
+
+    # Применяем изменения при нажатии кнопки
+    if apply_changes:
+        # Сохраняем обновленные данные в session_state
+        st.session_state[f'forecast_edited_data_{selected_project}'] = updated_data
+        st.success("✅ Изменения применены! График обновлен.")
+
+    # ВСЕГДА используем актуальные данные из отредактированной таблицы для расчета
+    # Это позволяет видеть изменения сразу после применения
+    current_data = updated_data
+
+    # Рассчитываем прогнозный бюджет с актуальными данными: после первого расчета
+    # пересчитываются только задачи, у которых изменились даты или бюджет
+    tracker_key = f'forecast_budget_tracker_{selected_project}'
+    if tracker_key not in st.session_state:
+        st.session_state[tracker_key] = IncrementalApprovedBudget(current_data, rule_name='default')
+    forecast_budget_df, error = calculate_forecast_budget(
+        df, edited_data=current_data, rule_name='default', tracker=st.session_state[tracker_key]
+    )
+
+    # Перезапускаем только после применения изменений
+    if apply_changes:
+        st.rerun()
+
+    if error:
+        st.error(error)
+        return
+
+    if forecast_budget_df.empty:
+        st.info("Нет данных для построения графика прогнозного бюджета.")
+        return
+
+    # Группируем по месяцам для графика
+    monthly_forecast = forecast_budget_df.groupby('month').agg({
+        'forecast budget': 'sum',
+        'budget plan': 'sum'  # Для сравнения
+    }).reset_index()
+
+    # Сортируем по месяцам
+    monthly_forecast = monthly_forecast.sort_values('month')
+
+    # Форматируем месяц для отображения
+    monthly_forecast['Месяц'] = period_labels.format_periods(monthly_forecast['month'])
+
+    # Создаем график
+    fig = go.Figure()
+
+    # Добавляем прогнозный бюджет
+    fig.add_trace(go.Bar(
+        x=monthly_forecast['Месяц'],
+        y=monthly_forecast['forecast budget'],
+        name='Прогнозный бюджет',
+        marker_color='#06A77D',
+        text=format_numbers(monthly_forecast['forecast budget']),
+        textposition='outside',
+        textfont=dict(size=14, color='white')
+    ))
+
+    # Добавляем плановый бюджет для сравнения (линия)
+    fig.add_trace(go.Scatter(
+        x=monthly_forecast['Месяц'],
+        y=monthly_forecast['budget plan'],
+        name='Плановый бюджет (сумма)',
+        mode='lines+markers',
+        line=dict(color='#F18F01', width=2),
+        marker=dict(size=8, color='#F18F01')
+    ))
+
+    fig.update_layout(
+        title=f'Прогнозный бюджет по месяцам (Проект: {selected_project})',
+        xaxis_title='Месяц',
+        yaxis_title='Бюджет',
+        hovermode='x unified',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        height=600
+        # plot_bgcolor  = "hsl(216,28%,7%)",
+        # paper_bgcolor = "hsl(216,28%,7%)"
+    )
+
+    st.plotly_chart(fig, use_container_width=True, theme=None)
+
+    # Сводная таблица
+    st.subheader("Сводная таблица прогнозного бюджета по месяцам")
+    summary_table = monthly_forecast[['Месяц', 'forecast budget', 'budget plan']].copy()
+    summary_table.columns = ['Месяц', 'Прогнозный бюджет', 'Плановый бюджет (сумма)']
+    summary_table['Прогнозный бюджет'] = format_numbers(summary_table['Прогнозный бюджет'], na='0')
+    summary_table['Плановый бюджет (сумма)'] = format_numbers(summary_table['Плановый бюджет (сумма)'], na='0')
+    st.dataframe(summary_table, use_container_width=True)
+
+    # Детальная таблица (опционально)
+    with st.expander("📋 Детальная таблица распределения прогнозного бюджета", expanded=False):
+        detail_table = forecast_budget_df[['project name', 'section', 'task name', 'month', 'budget plan', 'forecast budget']].copy()
+        detail_table['month'] = period_labels.format_periods(detail_table['month'])
+        detail_table.columns = ['Проект', 'Раздел', 'Задача', 'Месяц', 'Плановый бюджет', 'Прогнозный бюджет']
+        detail_table['Плановый бюджет'] = format_numbers(detail_table['Плановый бюджет'], na='0')
+        detail_table['Прогнозный бюджет'] = format_numbers(detail_table['Прогнозный бюджет'], na='0')
+        st.dataframe(detail_table, use_container_width=True)
@@ -0,0 +1,318 @@
+"""Дашборд "Отклонение текущего срока от базового плана": диаграммы Ганта план/факт"""
+
+import streamlit as st
+import pandas as pd
+
+import filter_index
+import gantt_engine
+import query_engine
+from dashboards.common import chart_window_controls, show_cached_chart
+
+
+# ==================== DASHBOARD 3: Plan/Fact Dates for Tasks ====================
+def dashboard_plan_fact_dates(df):
+    st.header("📅 Отклонение текущего срока от базового плана")
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        if 'project name' in df.columns:
+            projects = ['Все'] + filter_index.options(df, 'project name')
+            selected_project = st.selectbox("Фильтр по проекту", projects, key='dates_project')
+        else:
+            selected_project = 'Все'
+
+    with col2:
+        if 'task name' in df.columns:
+            tasks = ['Все'] + filter_index.options(df, 'task name')
+            selected_task = st.selectbox("Фильтр по задаче", tasks, key='dates_task')
+        else:
+            selected_task = 'Все'
+
+    with col3:
+        if 'section' in df.columns:
+            sections = ['Все'] + filter_index.options(df, 'section')
+            selected_section = st.selectbox("Фильтр по разделу", sections, key='dates_section')
+        else:
+            selected_section = 'Все'
+
+    with col4:
+        if 'block' in df.columns:
+            blocks = ['Все'] + filter_index.options(df, 'block')
+            selected_block = st.selectbox("Фильтр по блоку", blocks, key='dates_block')
+        else:
+            selected_block = 'Все'
+
+    # Apply filters; plan/fact bars and the figure are cached per filter combination
+    filters = {}
+    if selected_project != 'Все':
+        filters['project name'] = selected_project
+    if selected_task != 'Все':
+        filters['task name'] = selected_task
+    if selected_section != 'Все':
+        filters['section'] = selected_section
+    if selected_block != 'Все':
+        filters['block'] = selected_block
+    schedule = gantt_engine.get_schedule(df, filters)
+
+    if schedule.n_filtered == 0:
+        st.info("Нет данных для выбранных фильтров.")
+        return
+
+    # Rows with at least plan OR fact dates, with date differences for tasks that have both
+    filtered_df = schedule.tasks
+    if filtered_df.empty:
+        st.info("Нет задач с плановыми или фактическими датами для выбранных фильтров.")
+        return
+
+    if schedule.bars.empty:
+        st.info("Нет данных для отображения графика.")
+        return
+
+    # Checkbox to show/hide completion percentage
+    show_completion = st.checkbox("Показать процент выполнения", value=False, key='show_completion_percent_dates')
+
+    # Формируем название графика с учетом выбранного проекта
+    if selected_project == 'Все':
+        chart_title = 'Срок работ план/факт (все проекты)'
+    else:
+        chart_title = f'Срок работ план/факт - {selected_project}'
+
+    # Long task lists: one page of tasks (by deviation) or section/block summary bars
+    levels = [(label, col) for label, col in [('Разделы', 'section'), ('Блоки', 'block')]
+              if col in schedule.tasks.columns]
+    level, page = chart_window_controls(schedule.n_items, levels, key='dates_chart')
+    chart_state = dict(filters, show_completion=show_completion, level=level, page=page)
+    show_cached_chart(df, 'plan_fact_dates', chart_state, 'gantt',
+                      lambda: schedule.figure(chart_title, show_completion, level=level, page=page))
+
+    # Форматирование даты для отображения
+    def format_date_display(date_val):
+        if pd.isna(date_val):
+            return 'Н/Д'
+        if isinstance(date_val, pd.Timestamp):
+            return date_val.strftime('%d.%m.%Y')
+        try:
+            dt = pd.to_datetime(date_val, errors='coerce', dayfirst=True)
+            if pd.notna(dt):
+                return dt.strftime('%d.%m.%Y')
+        except:
+            pass
+        return str(date_val) if date_val else 'Н/Д'
+
+    # Селектор задачи для метрик окончания проекта (только при выборе конкретного проекта)
+    selected_task_for_metrics = None
+    if selected_project != 'Все' and 'task name' in df.columns and 'project name' in df.columns:
+        # Получаем список задач выбранного проекта
+        available_tasks = filter_index.options(df, 'task name', within={'project name': selected_project})
+        if available_tasks:
+            # По умолчанию используем "Разрешение на ввод в эксплуатацию", если она есть
+            default_task = "Разрешение на ввод в эксплуатацию" if "Разрешение на ввод в эксплуатацию" in available_tasks else available_tasks[0]
+            selected_task_for_metrics = st.selectbox(
+                "Задача для расчета окончания проекта",
+                available_tasks,
+                index=available_tasks.index(default_task) if default_task in available_tasks else 0,
+                key='task_for_project_end_metrics'
+            )
+
+    # Найти задачу для метрик (либо выбранную через селектор, либо "Разрешение на ввод в эксплуатацию" по умолчанию)
+    task_name_to_find = selected_task_for_metrics if selected_task_for_metrics else "Разрешение на ввод в эксплуатацию"
+    task_row = None
+
+    if 'task name' in df.columns:
+        # Ищем задачу в исходных данных (не в отфильтрованных)
+        task_positions = query_engine.filter_positions(df, {'task name': task_name_to_find})
+        if len(task_positions) > 0:
+            # Если выбран конкретный проект, ищем задачу только в этом проекте
+            if selected_project != 'Все' and 'project name' in df.columns:
+                task_row = query_engine.filter_frame(
+                    df, {'task name': task_name_to_find, 'project name': selected_project}
+                )
+                if not task_row.empty:
+                    task_row = task_row.iloc[0]
+            else:
+                task_row = df.iloc[task_positions[0]]
+
+    # Add comparison metrics
+    col1, col2, col3 = st.columns(3)
+
+    # Максимальное отклонение (дней) - отклонение факта от плана для выбранной задачи
+    with col1:
+        if task_row is not None:
+            # Преобразуем даты в datetime если нужно
+            plan_end = task_row.get('plan end')
+            base_end = task_row.get('base end')
+
+            if pd.notna(plan_end):
+                plan_end = pd.to_datetime(plan_end, errors='coerce', dayfirst=True)
+            if pd.notna(base_end):
+                base_end = pd.to_datetime(base_end, errors='coerce', dayfirst=True)
+
+            if pd.notna(plan_end) and pd.notna(base_end):
+                deviation_days = (base_end - plan_end).days
+                deviation_str = f"{deviation_days:.0f}"
+
+                # Цвет: отрицательное = зеленый, положительное = красный
+                # Используем delta_color="inverse": отрицательные значения = зеленый, положительные = красный
+                st.metric("Максимальное отклонение (дней)", deviation_str, delta=f"{deviation_days:.0f}", delta_color="inverse")
+            else:
+                st.metric("Максимальное отклонение (дней)", "Н/Д")
+        else:
+            st.metric("Максимальное отклонение (дней)", "Н/Д")
+
+    # План окончания проекта - дата из задачи "Разрешение на ввод в эксплуатацию"
+    with col2:
+        if task_row is not None:
+            plan_end = task_row.get('plan end')
+            if pd.notna(plan_end):
+                plan_end = pd.to_datetime(plan_end, errors='coerce', dayfirst=True)
+                plan_end_str = format_date_display(plan_end)
+            else:
+                plan_end_str = "Н/Д"
+            st.metric("План окончания проекта", plan_end_str)
+        else:
+            st.metric("План окончания проекта", "Н/Д")
+
+    # Факт окончания проекта - дата из задачи "Разрешение на ввод в эксплуатацию"
+    with col3:
+        if task_row is not None:
+            base_end = task_row.get('base end')
+            if pd.notna(base_end):
+                base_end = pd.to_datetime(base_end, errors='coerce', dayfirst=True)
+                fact_end_str = format_date_display(base_end)
+            else:
+                fact_end_str = "Н/Д"
+            st.metric("Факт окончания проекта", fact_end_str)
+        else:
+            st.metric("Факт окончания проекта", "Н/Д")
+
+    # Добавляем разделитель и аналогичные метрики для задачи "Разрешение на строительство"
+    st.markdown("---")
+    col1_construction, col2_construction, col3_construction = st.columns(3)
+
+    # Найти задачу "Разрешение на строительство"
+    task_name_construction = "Разрешение на строительство"
+    task_row_construction = None
+
+    if 'task name' in df.columns:
+        # Ищем задачу в исходных данных (не в отфильтрованных)
+        construction_positions = query_engine.filter_positions(df, {'task name': task_name_construction})
+        if len(construction_positions) > 0:
+            task_row_construction = df.iloc[construction_positions[0]]
+
+    # Максимальное отклонение (дней) - отклонение факта от плана для задачи "Разрешение на строительство"
+    with col1_construction:
+        if task_row_construction is not None:
+            # Преобразуем даты в datetime если нужно
+            plan_end_construction = task_row_construction.get('plan end')
+            base_end_construction = task_row_construction.get('base end')
+
+            if pd.notna(plan_end_construction):
+                plan_end_construction = pd.to_datetime(plan_end_construction, errors='coerce', dayfirst=True)
+            if pd.notna(base_end_construction):
+                base_end_construction = pd.to_datetime(base_end_construction, errors='coerce', dayfirst=True)
+
+            if pd.notna(plan_end_construction) and pd.notna(base_end_construction):
+                deviation_days_construction = (base_end_construction - plan_end_construction).days
+                deviation_str_construction = f"{deviation_days_construction:.0f}"
+
+                # Цвет: отрицательное = зеленый, положительное = красный
+                # Используем delta_color="inverse": отрицательные значения = зеленый, положительные = красный
+                st.metric("Максимальное отклонение (дней)", deviation_str_construction, delta=f"{deviation_days_construction:.0f}", delta_color="inverse")
+            else:
+                st.metric("Максимальное отклонение (дней)", "Н/Д")
+        else:
+            st.metric("Максимальное отклонение (дней)", "Н/Д")
+
+    # План окончания проекта - дата из задачи "Разрешение на строительство"
+    with col2_construction:
+        if task_row_construction is not None:
+            plan_end_construction = task_row_construction.get('plan end')
+            if pd.notna(plan_end_construction):
+                plan_end_construction = pd.to_datetime(plan_end_construction, errors='coerce', dayfirst=True)
+                plan_end_str_construction = format_date_display(plan_end_construction)
+            else:
+                plan_end_str_construction = "Н/Д"
+            st.metric("План окончания проекта", plan_end_str_construction)
+        else:
+            st.metric("План окончания проекта", "Н/Д")
+
+    # Факт окончания проекта - дата из задачи "Разрешение на строительство"
+    with col3_construction:
+        if task_row_construction is not None:
+            base_end_construction = task_row_construction.get('base end')
+            if pd.notna(base_end_construction):
+                base_end_construction = pd.to_datetime(base_end_construction, errors='coerce', dayfirst=True)
+                fact_end_str_construction = format_date_display(base_end_construction)
+            else:
+                fact_end_str_construction = "Н/Д"
+            st.metric("Факт окончания проекта", fact_end_str_construction)
+        else:
+            st.metric("Факт окончания проекта", "Н/Д")
+
+    # Summary table - format dates properly, sorted by difference (ties by task name)
+    filtered_df = filtered_df.sort_values('task name', kind='stable')
+
+    def format_date_column(col):
+        if col not in filtered_df.columns:
+            return 'Н/Д'
+        return filtered_df[col].dt.strftime('%d.%m.%Y').fillna('Н/Д')
+
+    def text_column(col):
+        if col not in filtered_df.columns:
+            return 'Н/Д'
+        return filtered_df[col].astype(object)
+
+    summary_df = pd.DataFrame({
+        'Проект': text_column('project name'),
+        'Задача': text_column('task name'),
+        'Раздел': text_column('section'),
+        'План Начало': format_date_column('plan start'),
+        'План Конец': format_date_column('plan end'),
+        'Факт Начало': format_date_column('base start'),
+        'Факт Конец': format_date_column('base end'),
+        'Отклонение начала (дней)': filtered_df['plan_start_diff'],
+        'Отклонение конца (дней)': filtered_df['plan_end_diff']
+    }).reset_index(drop=True)
+
+    # If "Все" projects selected, add summary column with totals per task
+    if selected_project == 'Все' and 'Задача' in summary_df.columns:
+        # Calculate totals per task
+        task_totals = summary_df.groupby('Задача', observed=True).agg({
+            'Отклонение начала (дней)': 'sum',
+            'Отклонение конца (дней)': 'sum'
+        }).reset_index()
+        task_totals.columns = ['Задача', 'Сумма отклонения начала (дней)', 'Сумма отклонения конца (дней)']
+
+        # Calculate total deviation per task (sum of start and end deviations)
+        task_totals['Суммарное отклонение (дней)'] = (
+            task_totals['Сумма отклонения начала (дней)'].fillna(0) +
+            task_totals['Сумма отклонения конца (дней)'].fillna(0)
+        )
+
+        # Merge totals back to summary_df
+        summary_df = summary_df.merge(task_totals, on='Задача', how='left')
+
+        # Reorder columns to put summary columns after deviation columns
+        cols = summary_df.columns.tolist()
+        # Remove summary columns from their current position
+        cols.remove('Сумма отклонения начала (дней)')
+        cols.remove('Сумма отклонения конца (дней)')
+        cols.remove('Суммарное отклонение (дней)')
+        # Add them after deviation columns
+        end_idx = cols.index('Отклонение конца (дней)')
+        cols.insert(end_idx + 1, 'Сумма отклонения начала (дней)')
+        cols.insert(end_idx + 2, 'Сумма отклонения конца (дней)')
+        cols.insert(end_idx + 3, 'Суммарное отклонение (дней)')
+        summary_df = summary_df[cols]
+
+    # Sort by end date difference (largest first, descending order)
+    # Handle NaN values by placing them at the end
+    summary_df = summary_df.sort_values(
+        'Отклонение конца (дней)',
+        ascending=False,
+        na_position='last',
+        kind='stable'
+    )
+    st.subheader("Детальные даты задач")
+    st.dataframe(summary_df, use_container_width=True)
@@ -0,0 +1,100 @@
+"""
+Фоновый прогрев кешируемых входных данных дашбордов
+
+Входные данные дашборда (массивы проекции query_engine, куб бюджета,
+расписание Ганта, сетка месяцев утвержденного бюджета) хранятся в
+реестрах своих модулей, пока жив DataFrame. После вывода дашборда
+входные данные следующего по меню дашборда строятся в одном фоновом
+потоке, и переход к нему берет готовый результат из реестра.
+
+Имена входных данных: 'budget_cube', 'gantt_schedule', 'month_grid' и
+'view:<имя массива query_engine>' ('view:deviation', 'view:key:project name').
+Прогрев отключается переменной окружения DASHBOARD_PREFETCH=0.
+"""
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import budget_cube
+import budget_engine
+import gantt_engine
+import query_engine
+
+PREFETCH_ENABLED = os.getenv('DASHBOARD_PREFETCH', '1') != '0'
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dashboard-prefetch')
+
+# id(df) -> входные данные, уже поставленные в очередь для набора
+_submitted = {}
+_submitted_lock = threading.Lock()
+
+
+def _warm_view(df: pd.DataFrame, name: str):
+    """Массив проекции query_engine; для колонок фильтров - также списки строк"""
+    column = name.partition(':')[2]
+    if (column and column not in df.columns) or (name == 'deviation' and 'deviation' not in df.columns):
+        return
+    view = query_engine.get_view(df)
+    if name.startswith(('key:', 'period:')):
+        view.postings(name)
+    else:
+        view.array(name)
+
+
+# Вид входных данных -> функция (df, аргумент после ':')
+WARMERS = {
+    'view': _warm_view,
+    'budget_cube': lambda df, _: budget_cube.get_cube(df),
+    # Расписание без фильтров - состояние дашборда при открытии
+    'gantt_schedule': lambda df, _: gantt_engine.get_schedule(df, {}),
+    'month_grid': lambda df, _: budget_engine.build_month_grid(df),
+}
+
+
+def _unregister(key: int):
+    with _submitted_lock:
+        _submitted.pop(key, None)
+
+
+def _warm(df_ref: weakref.ref, inputs: list):
+    for name in inputs:
+        df = df_ref()
+        if df is None:
+            return
+        kind, _, argument = name.partition(':')
+        try:
+            WARMERS[kind](df, argument)
+        except Exception:
+            # Прогрев необязателен: та же ошибка будет показана при выводе дашборда
+            pass
+
+
+def prefetch(df: pd.DataFrame, inputs) -> bool:
+    """
+    Ставит построение входных данных набора в очередь фонового потока
+
+    Args:
+        df: Набор данных дашборда из session_state
+        inputs: Имена входных данных (ключи WARMERS, для проекции - 'view:<имя>')
+
+    Returns:
+        True, если в очередь поставлены новые входные данные
+    """
+    if not PREFETCH_ENABLED or df is None:
+        return False
+    key = id(df)
+    with _submitted_lock:
+        submitted = _submitted.get(key)
+        if submitted is None:
+            submitted = _submitted[key] = set()
+            weakref.finalize(df, _unregister, key)
+        pending = [name for name in inputs if name not in submitted]
+        submitted.update(pending)
+    if not pending:
+        return False
+    # Поток держит только слабую ссылку: набор, удаленный из сессии, не прогревается
+    _executor.submit(_warm, weakref.ref(df), pending)
+    return True
@@ -0,0 +1,226 @@
+"""Дашборд "Динамика отклонений по месяцам": причины отклонений за месяц по проектам"""
+
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+
+import filter_index
+import period_labels
+import query_engine
+from dashboards.common import show_cached_chart
+
+
+# ==================== DASHBOARD 1: Reasons of Deviation ====================
+def dashboard_reasons_of_deviation(df):
+    st.header("📋 Динамика отклонений по месяцам")
+
+    # Add CSS to force filters in one row
+    st.markdown("""
+    <style>
+    div[data-testid="column"] {
+        flex: 1 1 0%;
+        min-width: 0;
+    }
+    </style>
+    """, unsafe_allow_html=True)
+
+    # All filters in one row - use compact layout
+    col1, col2, col3, col4, col5, col6 = st.columns(6)
+
+    with col1:
+        if 'project name' in df.columns:
+            projects = ['Все'] + filter_index.options(df, 'project name')
+            selected_project = st.selectbox("Проект", projects, key='reason_project')
+        else:
+            selected_project = 'Все'
+
+    with col2:
+        if 'task name' in df.columns:
+            tasks = ['Все'] + filter_index.options(df, 'task name')
+            selected_task = st.selectbox("Задача", tasks, key='reason_task')
+        else:
+            selected_task = 'Все'
+
+    with col3:
+        if 'section' in df.columns:
+            sections = ['Все'] + filter_index.options(df, 'section')
+            selected_section = st.selectbox("Раздел", sections, key='reason_section')
+        else:
+            selected_section = 'Все'
+
+    with col4:
+        if 'block' in df.columns:
+            blocks = ['Все'] + filter_index.options(df, 'block')
+            selected_block = st.selectbox("Блок", blocks, key='reason_block')
+        else:
+            selected_block = 'Все'
+
+    with col5:
+        if 'reason of deviation' in df.columns:
+            reasons = ['Все'] + filter_index.options(df, 'reason of deviation')
+            selected_reason = st.selectbox("Причина", reasons, key='reason_filter')
+        else:
+            selected_reason = 'Все'
+
+    with col6:
+        available_months = []
+        if 'plan_month' in df.columns:
+            available_months = period_labels.ordered_labels(filter_index.options(df, 'plan_month'))
+        elif 'plan end' in df.columns:
+            available_months = period_labels.ordered_labels(df['plan end'].dt.to_period('M'))
+
+        if len(available_months) > 0:
+            months = ['Все'] + available_months
+            selected_month = st.selectbox("Месяц", months, key='reason_month')
+        else:
+            selected_month = 'Все'
+            st.selectbox("Месяц", ['Все'], key='reason_month', disabled=True)
+
+    # Apply all filters (engine: DuckDB or pandas) - only tasks with deviations
+    filters = {}
+    if selected_project != 'Все':
+        filters['project name'] = selected_project
+    if selected_reason != 'Все':
+        filters['reason of deviation'] = selected_reason
+    if selected_task != 'Все':
+        filters['task name'] = selected_task
+    if selected_section != 'Все':
+        filters['section'] = selected_section
+    if selected_block != 'Все':
+        filters['block'] = selected_block
+
+    selected_period = None
+    if selected_month != 'Все' and 'plan_month' in df.columns:
+        # Convert selected month back to Period format for comparison
+        selected_period = period_labels.parse_month_label(selected_month)
+        if selected_period is not None:
+            filters['plan_month'] = selected_period
+
+    filtered_df = query_engine.filter_frame(df, filters, deviation_only=True)
+
+    if selected_month != 'Все' and 'plan_month' in filtered_df.columns and selected_period is None:
+        # Fallback: try to match formatted string
+        filtered_df = filtered_df[period_labels.format_periods(filtered_df['plan_month']) == selected_month]
+
+    if filtered_df.empty:
+        st.info("Нет данных для выбранных фильтров.")
+        return
+
+    # Summary metrics
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Всего задач с отклонениями", len(filtered_df))
+    with col2:
+        if 'deviation in days' in filtered_df.columns:
+            avg_dev = pd.to_numeric(filtered_df['deviation in days'], errors='coerce').mean()
+            st.metric("Среднее отклонение (дней)", f"{avg_dev:.1f}" if pd.notna(avg_dev) else "Н/Д")
+    with col3:
+        if 'reason of deviation' in filtered_df.columns:
+            unique_reasons = filtered_df['reason of deviation'].nunique()
+            st.metric("Уникальных причин", unique_reasons)
+
+    # Reasons breakdown
+    if 'reason of deviation' in filtered_df.columns:
+        st.subheader("Распределение по причинам")
+
+        def count_reasons():
+            # Called from the figure builds, i.e. only on a figure cache miss;
+            # astype(str): value_counts of a category column would also list reasons with zero rows
+            reason_counts = filtered_df['reason of deviation'].astype(str).value_counts().reset_index()
+            reason_counts.columns = ['Причина', 'Количество']
+            return reason_counts
+
+        chart_state = dict(filters, month=selected_month)
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+
+            def build_reasons_bar():
+                fig = px.bar(
+                    count_reasons(),
+                    x='Причина',
+                    y='Количество',
+                    title='Количество задач по причинам',
+                    labels={'Причина': 'Причина отклонения', 'Количество': 'Количество задач'},
+                    text='Количество',
+                    template=None
+                )
+
+                fig.update_layout(
+                    plot_bgcolor = "hsl(216,28%,7%)",
+                    paper_bgcolor = "hsl(216,28%,7%)",
+                    font_color = "hsl(210,67%,96%)",
+                    title_font_color = "hsl(210,67%,96%)",
+                    legend_font_color = "hsl(210,67%,96%)",
+                    xaxis_tickfont_color = "hsl(210,67%,96%)",
+                    yaxis_tickfont_color = "hsl(210,67%,96%)",
+                    xaxis_title_font_color = "hsl(210,67%,96%)",
+                    yaxis_title_font_color = "hsl(210,67%,96%)"
+                )
+
+                fig.update_xaxes(tickangle=-45)
+                fig.update_traces(textposition='outside', textfont=dict(size=14, color='hsl(210,67%,96%)'))
+                return fig
+
+            show_cached_chart(df, 'reasons_of_deviation', chart_state, 'reasons_bar', build_reasons_bar)
+
+        with col2:
+
+            def build_reasons_pie():
+                fig = px.pie(
+                    count_reasons(),
+                    values='Количество',
+                    names='Причина',
+                    title='Причины отклонений'
+                )
+
+                fig.update_layout(
+                    plot_bgcolor = "hsl(216,28%,7%)",
+                    paper_bgcolor = "hsl(216,28%,7%)",
+                    font_color = "hsl(210,67%,96%)",
+                    title_font_color = "hsl(210,67%,96%)",
+                    legend_font_color = "hsl(210,67%,96%)",
+                    xaxis_tickfont_color = "hsl(210,67%,96%)",
+                    yaxis_tickfont_color = "hsl(210,67%,96%)",
+                    xaxis_title_font_color = "hsl(210,67%,96%)",
+                    yaxis_title_font_color = "hsl(210,67%,96%)"
+                )
+
+                fig.update_traces(
+                    texttemplate='%{label}<br>%{value}<br>(%{percent:.0%})',
+                    textposition='auto',
+                    textfont=dict(color='hsl(210,67%,96%)')
+                )
+
+                return fig
+
+            show_cached_chart(df, 'reasons_of_deviation', chart_state, 'reasons_pie', build_reasons_pie)
+
+    # Detailed table
+    # with st.expander("📊 Просмотр детальных данных"):
+    #     display_cols = ['project name', 'task name', 'section', 'deviation in days', 'reason of deviation']
+    #     if 'plan end' in filtered_df.columns:
+    #         display_cols.insert(-1, 'plan end')
+    #     if 'base end' in filtered_df.columns:
+    #         display_cols.insert(-1, 'base end')
+    #
+    #     available_cols = [col for col in display_cols if col in filtered_df.columns]
+    #     st.dataframe(filtered_df[available_cols], use_container_width=True)
+
+    # Детальные данные — всегда видны
+    st.subheader("Детальные данные")
+
+    display_cols = ['project name', 'task name', 'section', 'deviation in days', 'reason of deviation']
+
+    if 'plan end' in filtered_df.columns:
+        display_cols.insert(-1, 'plan end')
+    if 'base end' in filtered_df.columns:
+        display_cols.insert(-1, 'base end')
+
+    available_cols = [col for col in display_cols if col in filtered_df.columns]
+
+    st.dataframe(
+        filtered_df[available_cols],
+        use_container_width=True
+    )
@@ -0,0 +1,455 @@
+"""Дашборд "СКУД стройка": численность по данным СКУД"""
+
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+
+import column_schema
+import filter_index
+from label_format import format_numbers
+import period_labels
+
+
+# ==================== DASHBOARD 8.6: SKUD Stroyka ====================
+def dashboard_skud_stroyka(df):
+    st.header("🏗️ СКУД стройка")
+
+    # Get resources data from session state
+    resources_df = st.session_state.get('resources_data', None)
+
+    if resources_df is None or resources_df.empty:
+        st.warning("⚠️ Для отображения графика СКУД стройка необходимо загрузить файл с данными о ресурсах.")
+        st.info("📋 Ожидаемые колонки в файле: Проект, Контрагент, Период, Среднее за неделю или Среднее за месяц")
+        # Debug info
+        if 'loaded_files_info' in st.session_state:
+            st.info(f"Загруженные файлы: {list(st.session_state.loaded_files_info.keys())}")
+        return
+
+    # Create working copy
+    work_df = resources_df.copy()
+
+    # Debug: Show data info (can be removed later)
+    with st.expander("🔍 Отладочная информация", expanded=False):
+        st.write(f"**Количество строк в исходных данных:** {len(work_df)}")
+        st.write(f"**Колонки:** {', '.join(work_df.columns.tolist())}")
+        if len(work_df) > 0:
+            st.write("**Первые строки данных:**")
+            st.dataframe(work_df.head(), use_container_width=True)
+            if 'Среднее_numeric' in work_df.columns:
+                st.write("**Среднее_numeric статистика:**")
+                st.write(f"- Не пустых значений: {work_df['Среднее_numeric'].notna().sum()}")
+                st.write(f"- Среднее значение: {work_df['Среднее_numeric'].mean():.2f}")
+                st.write(f"- Минимум: {work_df['Среднее_numeric'].min():.2f}")
+                st.write(f"- Максимум: {work_df['Среднее_numeric'].max():.2f}")
+
+    # Column names vary between exports; the schema is resolved once per set of columns
+    schema = column_schema.column_map(work_df)
+
+    # Find required columns
+    project_col = schema['Проект']
+    contractor_col = schema['Контрагент']
+    period_col = schema['Период']
+
+    # Find average column (Среднее за неделю or Среднее за месяц)
+    avg_col = schema['Среднее']
+
+    if not avg_col:
+        st.error("❌ Не найдена колонка со средним значением (Среднее за неделю или Среднее за месяц)")
+        st.info(f"Доступные колонки: {', '.join(work_df.columns)}")
+        st.info(f"Количество строк в данных: {len(work_df)}")
+        return
+
+    # Period column is optional - we can work without it
+    if not period_col:
+        st.info("ℹ️ Колонка с периодом не найдена. Данные будут отображаться без временной группировки.")
+        st.info(f"Доступные колонки: {', '.join(work_df.columns)}")
+
+    # Process average column to numeric
+    work_df['Среднее_numeric'] = pd.to_numeric(
+        work_df[avg_col].astype(str).str.replace(',', '.').str.replace(' ', ''),
+        errors='coerce'
+    )
+
+    # Check if we have any valid numeric values
+    if work_df['Среднее_numeric'].isna().all():
+        st.error("❌ Все значения в колонке со средним значением не являются числами.")
+        st.info(f"Примеры значений из колонки '{avg_col}': {work_df[avg_col].head(10).tolist()}")
+        return
+
+    # Fill NaN with 0 only for display purposes, but keep track of valid data
+    work_df['Среднее_numeric'] = work_df['Среднее_numeric'].fillna(0)
+
+    # Process period column - try to convert to datetime/period
+    if period_col and period_col in work_df.columns:
+        # Try to parse period as date
+        work_df['period_parsed'] = pd.to_datetime(work_df[period_col], errors='coerce', dayfirst=True)
+        # If parsing failed, try to extract month/year from string
+        mask = work_df['period_parsed'].isna()
+        if mask.any():
+            # Try to extract month and year from period string
+            def extract_period(val):
+                if pd.isna(val):
+                    return None
+                val_str = str(val)
+                # Try patterns like "2025-01", "01.2025", "январь 2025", etc.
+                try:
+                    # Try YYYY-MM format
+                    if '-' in val_str:
+                        parts = val_str.split('-')
+                        if len(parts) >= 2:
+                            year = int(parts[0])
+                            month = int(parts[1])
+                            return pd.Period(f'{year}-{month:02d}', freq='M')
+                    # Try DD.MM.YYYY or MM.YYYY
+                    if '.' in val_str:
+                        parts = val_str.split('.')
+                        if len(parts) >= 2:
+                            if len(parts) == 3:  # DD.MM.YYYY
+                                year = int(parts[2])
+                                month = int(parts[1])
+                            else:  # MM.YYYY
+                                year = int(parts[1])
+                                month = int(parts[0])
+                            return pd.Period(f'{year}-{month:02d}', freq='M')
+                except:
+                    pass
+                return None
+
+            work_df.loc[mask, 'period_parsed'] = work_df.loc[mask, period_col].apply(extract_period)
+
+        # Convert to Period if possible
+        work_df['period_month'] = work_df['period_parsed'].apply(
+            lambda x: x.to_period('M') if pd.notna(x) and isinstance(x, pd.Timestamp) else (x if isinstance(x, pd.Period) else None)
+        )
+    else:
+        work_df['period_month'] = None
+
+    # Filters
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        # Grouping filter
+        grouping_options = ['По проектам', 'По контрагентам', 'По проектам и контрагентам', 'Без группировки']
+        selected_grouping = st.selectbox("Группировка", grouping_options, key='skud_grouping')
+
+    with col2:
+        # Month filter
+        if 'period_month' in work_df.columns and work_df['period_month'].notna().any():
+            available_months = sorted(work_df[work_df['period_month'].notna()]['period_month'].unique())
+            month_options = ['Все месяцы'] + [str(m) for m in available_months]
+            selected_month = st.selectbox("Месяц", month_options, key='skud_month')
+        else:
+            selected_month = 'Все месяцы'
+            st.info("Периоды не найдены")
+
+    with col3:
+        # Project filter
+        if project_col and project_col in work_df.columns:
+            projects = ['Все'] + filter_index.options(resources_df, project_col)
+            selected_project = st.selectbox("Фильтр по проекту", projects, key='skud_project')
+        else:
+            selected_project = 'Все'
+            st.info("Проекты не найдены")
+
+    with col4:
+        # Contractor filter
+        if contractor_col and contractor_col in work_df.columns:
+            contractors = ['Все'] + filter_index.options(resources_df, contractor_col)
+            selected_contractor = st.selectbox("Фильтр по контрагенту", contractors, key='skud_contractor')
+        else:
+            selected_contractor = 'Все'
+            st.info("Контрагенты не найдены")
+
+    # Apply filters
+    filtered_df = work_df.copy()
+
+    if selected_project != 'Все' and project_col and project_col in filtered_df.columns:
+        # More robust filtering - handle NaN values and case-insensitive comparison
+        project_mask = filtered_df[project_col].astype(str).str.strip().str.lower() == str(selected_project).strip().lower()
+        filtered_df = filtered_df[project_mask]
+
+    if selected_contractor != 'Все' and contractor_col and contractor_col in filtered_df.columns:
+        # More robust filtering - handle NaN values and case-insensitive comparison
+        contractor_mask = filtered_df[contractor_col].astype(str).str.strip().str.lower() == str(selected_contractor).strip().lower()
+        filtered_df = filtered_df[contractor_mask]
+
+    if selected_month != 'Все месяцы' and 'period_month' in filtered_df.columns:
+        try:
+            selected_period = pd.Period(selected_month, freq='M')
+            filtered_df = filtered_df[filtered_df['period_month'] == selected_period]
+        except Exception as e:
+            st.warning(f"Ошибка при фильтрации по месяцу: {e}")
+
+    if filtered_df.empty:
+        st.warning("⚠️ Нет данных для отображения с выбранными фильтрами.")
+        with st.expander("🔍 Информация о фильтрах", expanded=False):
+            st.write(f"**Исходных строк:** {len(work_df)}")
+            st.write(f"**Строк после фильтрации:** {len(filtered_df)}")
+            st.write(f"**Выбранный проект:** {selected_project}")
+            st.write(f"**Выбранный контрагент:** {selected_contractor}")
+            st.write(f"**Выбранный месяц:** {selected_month}")
+            if project_col and project_col in work_df.columns:
+                unique_projects = work_df[project_col].dropna().unique()
+                st.write(f"**Доступные проекты:** {', '.join(map(str, unique_projects[:10]))}")
+            if contractor_col and contractor_col in work_df.columns:
+                unique_contractors = work_df[contractor_col].dropna().unique()
+                st.write(f"**Доступные контрагенты:** {', '.join(map(str, unique_contractors[:10]))}")
+        return
+
+    # Group data based on selected grouping
+    group_cols = []
+    if selected_grouping == 'По проектам' and project_col and project_col in filtered_df.columns:
+        group_cols.append(project_col)
+    elif selected_grouping == 'По контрагентам' and contractor_col and contractor_col in filtered_df.columns:
+        group_cols.append(contractor_col)
+    elif selected_grouping == 'По проектам и контрагентам':
+        if project_col and project_col in filtered_df.columns:
+            group_cols.append(project_col)
+        if contractor_col and contractor_col in filtered_df.columns:
+            group_cols.append(contractor_col)
+
+    # Always group by period_month for time series (only if not filtering by specific month)
+    # Only add period_month if it has valid (non-NaN) values
+    if selected_month == 'Все месяцы' and 'period_month' in filtered_df.columns and filtered_df['period_month'].notna().any():
+        group_cols.append('period_month')
+
+    if group_cols:
+        # Filter out rows where any grouping column is NaN before grouping
+        mask = pd.Series([True] * len(filtered_df))
+        for col in group_cols:
+            if col in filtered_df.columns:
+                mask = mask & filtered_df[col].notna()
+
+        if mask.any():
+            grouped_data = filtered_df[mask].groupby(group_cols, observed=True)['Среднее_numeric'].mean().reset_index()
+            grouped_data.columns = list(group_cols) + ['Среднее за месяц']
+        else:
+            # All grouping columns are NaN, aggregate without grouping
+            grouped_data = pd.DataFrame({
+                'Среднее за месяц': [filtered_df['Среднее_numeric'].mean()]
+            })
+    else:
+        # No grouping, just aggregate by period if available
+        if 'period_month' in filtered_df.columns and filtered_df['period_month'].notna().any():
+            grouped_data = filtered_df.groupby('period_month', observed=True)['Среднее_numeric'].mean().reset_index()
+            grouped_data.columns = ['period_month', 'Среднее за месяц']
+        else:
+            # No period available, just aggregate all data
+            mean_value = filtered_df['Среднее_numeric'].mean()
+            if pd.isna(mean_value):
+                mean_value = 0
+            grouped_data = pd.DataFrame({
+                'Среднее за месяц': [mean_value]
+            })
+
+    # Format period for display
+    if 'period_month' in grouped_data.columns:
+        grouped_data['period_display'] = period_labels.format_periods(grouped_data['period_month'])
+
+    # Check if we have data to display
+    if grouped_data.empty:
+        st.warning("⚠️ Нет данных для отображения после применения фильтров.")
+        with st.expander("🔍 Детали проблемы", expanded=True):
+            st.write(f"**Исходных строк:** {len(work_df)}")
+            st.write(f"**Строк после фильтрации:** {len(filtered_df)}")
+            st.write(f"**Строк после группировки:** {len(grouped_data)}")
+            st.write(f"**Выбранная группировка:** {selected_grouping}")
+            st.write(f"**Колонки для группировки:** {group_cols}")
+            st.write(f"**Выбранный проект:** {selected_project}")
+            st.write(f"**Выбранный контрагент:** {selected_contractor}")
+            st.write(f"**Выбранный месяц:** {selected_month}")
+            if len(filtered_df) > 0:
+                st.write("**Данные после фильтрации (первые 10 строк):**")
+                st.dataframe(filtered_df.head(10), use_container_width=True)
+                if 'Среднее_numeric' in filtered_df.columns:
+                    st.write("**Среднее_numeric в отфильтрованных данных:**")
+                    st.write(f"- Не пустых значений: {filtered_df['Среднее_numeric'].notna().sum()}")
+                    st.write(f"- Среднее значение: {filtered_df['Среднее_numeric'].mean():.2f}")
+                    st.write(f"- Сумма: {filtered_df['Среднее_numeric'].sum():.2f}")
+            else:
+                st.write("**Проблема:** После применения фильтров не осталось ни одной строки.")
+                st.write("**Возможные причины:**")
+                st.write("- Фильтры слишком строгие")
+                st.write("- Данные не соответствуют выбранным фильтрам")
+                st.write("- Проблемы с типами данных при сравнении")
+        return
+
+    # Check if all values are NaN (but allow zeros - zeros are valid data)
+    if 'Среднее за месяц' in grouped_data.columns:
+        if grouped_data['Среднее за месяц'].isna().all():
+            st.warning("⚠️ Все значения среднего равны NaN после группировки.")
+            with st.expander("🔍 Детали проблемы", expanded=True):
+                st.write(f"**Строк после группировки:** {len(grouped_data)}")
+                st.dataframe(grouped_data, use_container_width=True)
+            return
+
+    # Create visualization
+    has_period = 'period_month' in grouped_data.columns or 'period_display' in grouped_data.columns
+
+    if selected_grouping == 'Без группировки':
+        if has_period:
+            # Simple line chart with time series
+            x_col = 'period_display' if 'period_display' in grouped_data.columns else 'period_month'
+            fig = px.line(
+                grouped_data,
+                x=x_col,
+                y='Среднее за месяц',
+                title='Среднее за месяц по людям в динамике',
+                labels={x_col: 'Месяц', 'Среднее за месяц': 'Среднее за месяц (чел.)'},
+                markers=True
+            )
+
+            # fig.update_layout(
+            #     plot_bgcolor = "hsl(216,28%,7%)",
+            #     paper_bgcolor = "hsl(216,28%,7%)"
+            # )
+
+            fig.update_xaxes(tickangle=-45)
+            st.plotly_chart(fig, use_container_width=True, theme=None)
+        else:
+            # Single value bar chart
+            fig = px.bar(
+                grouped_data,
+                y='Среднее за месяц',
+                title='Среднее за месяц по людям',
+                labels={'Среднее за месяц': 'Среднее за месяц (чел.)'},
+                text='Среднее за месяц',
+                template=None
+            )
+
+            # fig.update_layout(
+            #     plot_bgcolor = "hsl(216,28%,7%)",
+            #     paper_bgcolor = "hsl(216,28%,7%)"
+            # )
+
+            fig.update_traces(
+                textposition='outside',
+                textfont=dict(size=12, color='white')
+            )
+            st.plotly_chart(fig, use_container_width=True, theme=None)
+    else:
+        # Grouped visualization
+        grouping_cols = [col for col in group_cols if col != 'period_month']
+
+        if has_period and len(grouping_cols) > 0:
+            # Grouped bar chart with time series
+            x_col = 'period_display' if 'period_display' in grouped_data.columns else 'period_month'
+            color_col = grouping_cols[0] if len(grouping_cols) == 1 else None
+
+            if color_col:
+                fig = px.bar(
+                    grouped_data,
+                    x=x_col,
+                    y='Среднее за месяц',
+                    color=color_col,
+                    title='Среднее за месяц по людям в динамике',
+                    labels={x_col: 'Месяц', 'Среднее за месяц': 'Среднее за месяц (чел.)'},
+                    text='Среднее за месяц',
+                    template=None
+                )
+                fig.update_layout(
+                    barmode='group'
+                    # plot_bgcolor  = "hsl(216,28%,7%)",
+                    # paper_bgcolor = "hsl(216,28%,7%)"
+                )
+                fig.update_xaxes(tickangle=-45)
+                fig.update_traces(
+                    textposition='outside',
+                    textfont=dict(size=12, color='white')
+                )
+                st.plotly_chart(fig, use_container_width=True, theme=None)
+            elif len(grouping_cols) > 1:
+                # Multiple grouping columns - use first for color, show others in hover
+                fig = px.bar(
+                    grouped_data,
+                    x=x_col,
+                    y='Среднее за месяц',
+                    color=grouping_cols[0],
+                    title='Среднее за месяц по людям в динамике',
+                    labels={x_col: 'Месяц', 'Среднее за месяц': 'Среднее за месяц (чел.)'},
+                    text='Среднее за месяц',
+                    facet_col=grouping_cols[1] if len(grouping_cols) > 1 else None,
+                    template=None
+                )
+                fig.update_layout(
+                    barmode='group'
+                    # plot_bgcolor  = "hsl(216,28%,7%)",
+                    # paper_bgcolor = "hsl(216,28%,7%)"
+                )
+                fig.update_xaxes(tickangle=-45)
+                fig.update_traces(
+                    textposition='outside',
+                    textfont=dict(size=12, color='white')
+                )
+                st.plotly_chart(fig, use_container_width=True, theme=None)
+            else:
+                # Fallback to line chart
+                fig = px.line(
+                    grouped_data,
+                    x=x_col,
+                    y='Среднее за месяц',
+                    title='Среднее за месяц по людям в динамике',
+                    labels={x_col: 'Месяц', 'Среднее за месяц': 'Среднее за месяц (чел.)'},
+                    markers=True
+                )
+
+                # fig.update_layout(
+                #     plot_bgcolor = "hsl(216,28%,7%)",
+                #     paper_bgcolor = "hsl(216,28%,7%)"
+                # )
+
+                fig.update_xaxes(tickangle=-45)
+                st.plotly_chart(fig, use_container_width=True, theme=None)
+        elif len(grouping_cols) > 0:
+            # Grouped bar chart without time series (single month selected)
+            color_col = grouping_cols[0] if len(grouping_cols) == 1 else None
+            if color_col:
+                fig = px.bar(
+                    grouped_data,
+                    x=color_col,
+                    y='Среднее за месяц',
+                    title='Среднее за месяц по людям',
+                    labels={'Среднее за месяц': 'Среднее за месяц (чел.)'},
+                    text='Среднее за месяц',
+                    template=None
+                )
+                fig.update_traces(
+                    textposition='outside',
+                    textfont=dict(size=12, color='white')
+                )
+
+                # fig.update_layout(
+                #     plot_bgcolor = "hsl(216,28%,7%)",
+                #     paper_bgcolor = "hsl(216,28%,7%)"
+                # )
+
+                fig.update_xaxes(tickangle=-45)
+                st.plotly_chart(fig, use_container_width=True, theme=None)
+            else:
+                st.info("Не удалось построить график с выбранной группировкой.")
+        else:
+            st.info("Не удалось построить график с выбранной группировкой.")
+
+    # Summary table
+    if not grouped_data.empty:
+        st.subheader("📋 Сводная таблица")
+        display_cols = []
+
+        # Add period column only if not filtering by specific month
+        if selected_month == 'Все месяцы' and ('period_display' in grouped_data.columns or 'period_month' in grouped_data.columns):
+            display_cols.append('period_display' if 'period_display' in grouped_data.columns else 'period_month')
+
+        # Add grouping columns
+        if selected_grouping != 'Без группировки':
+            for col in group_cols:
+                if col != 'period_month' and col in grouped_data.columns:
+                    display_cols.append(col)
+
+        display_cols.append('Среднее за месяц')
+
+        # Filter to only existing columns
+        display_cols = [col for col in display_cols if col in grouped_data.columns]
+
+        summary_table = grouped_data[display_cols].copy()
+        summary_table['Среднее за месяц'] = format_numbers(summary_table['Среднее за месяц'], decimals=2, na='0')
+        st.dataframe(summary_table, use_container_width=True)
@@ -0,0 +1,592 @@
+"""Дашборд "Аналитика по технике": работа техники по проектам и периодам"""
+
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+import column_schema
+import filter_index
+from label_format import format_numbers
+
+
+# ==================== DASHBOARD 8.6.5: Technique Visualization ====================
+def dashboard_technique(df):
+    st.header("🔧 Аналитика по технике")
+
+    # Get technique data from session state
+    technique_df = st.session_state.get('technique_data', None)
+
+    if technique_df is None or technique_df.empty:
+        st.warning("⚠️ Для отображения аналитики по технике необходимо загрузить файл с данными о технике.")
+        st.info("📋 Ожидаемые колонки в файле: Проект, Контрагент, Период, План, Среднее за месяц, недели, Дельта")
+        return
+
+    # Create working copy
+    work_df = technique_df.copy()
+
+    # Column names vary between exports; the schema is resolved once per set of columns
+    schema = column_schema.column_map(work_df)
+
+    # Expected columns: Проект, Контрагент, Период, План, Среднее за месяц, 1 неделя, 2 неделя, 3 неделя, 4 неделя, 5 неделя, Дельта, Дельта (%)
+    # Use Russian column names directly
+
+    # Check required columns - Контрагент is essential
+    if 'Контрагент' not in work_df.columns:
+        # The contractor column may come under another header
+        contractor_col = schema['Контрагент']
+        if contractor_col:
+            work_df['Контрагент'] = work_df[contractor_col]
+        else:
+            st.error("❌ Отсутствует необходимая колонка 'Контрагент'")
+            st.info(f"Доступные колонки: {', '.join(work_df.columns)}")
+            return
+
+    # Week columns under their usual or alternative headers
+    week_columns = []
+    for week_num in range(1, 6):
+        found_col = schema[f'{week_num} неделя']
+        if found_col:
+            week_columns.append(found_col)
+
+    # Check if we have any data
+    if work_df.empty:
+        st.warning("⚠️ Данные пусты после обработки.")
+        return
+
+    # Process numeric columns
+    # Process План
+    if 'План' in work_df.columns:
+        work_df['План_numeric'] = pd.to_numeric(
+            work_df['План'].astype(str).str.replace(',', '.').str.replace(' ', ''),
+            errors='coerce'
+        ).fillna(0)
+    else:
+        work_df['План_numeric'] = 0
+
+    # Process week columns - convert to numeric, handle empty strings
+    for week_col in week_columns:
+        work_df[f'{week_col}_numeric'] = pd.to_numeric(
+            work_df[week_col].astype(str).str.replace(',', '.').str.replace(' ', '').replace('', '0'),
+            errors='coerce'
+        ).fillna(0)
+
+    # Calculate sum of weeks (fact for the month = среднее за месяц)
+    # Handle "Среднее за месяц" for technique
+    if 'Среднее за месяц' in work_df.columns:
+        # If we have Среднее за месяц (technique), use it directly as week_sum
+        work_df['Среднее_за_месяц_numeric'] = pd.to_numeric(
+            work_df['Среднее за месяц'].astype(str).str.replace(',', '.').str.replace(' ', ''),
+            errors='coerce'
+        ).fillna(0)
+        work_df['week_sum'] = work_df['Среднее_за_месяц_numeric']
+    elif week_columns:
+        # Calculate from week columns if available
+        week_numeric_cols = [f'{col}_numeric' for col in week_columns]
+        work_df['week_sum'] = work_df[week_numeric_cols].sum(axis=1)
+    else:
+        work_df['week_sum'] = 0
+
+    # Process Дельта (Delta) if available
+    delta_col = schema['Дельта']
+
+    if delta_col and delta_col in work_df.columns:
+        work_df['Дельта_numeric'] = pd.to_numeric(
+            work_df[delta_col].astype(str).str.replace(',', '.').str.replace(' ', ''),
+            errors='coerce'
+        ).fillna(0)
+    else:
+        # Calculate delta as plan - fact (week_sum)
+        work_df['Дельта_numeric'] = work_df['План_numeric'] - work_df['week_sum']
+
+    # Process Дельта (%) (Delta %) if available - extract numeric value from percentage string
+    delta_pct_col = schema['Дельта (%)']
+
+    if delta_pct_col and delta_pct_col in work_df.columns:
+        def extract_percentage(value):
+            """Extract numeric value from percentage string like '-90%' or '90%', or numeric value"""
+            if pd.isna(value):
+                return 0
+            # If already numeric, return as is
+            if isinstance(value, (int, float)):
+                return float(value)
+            # Otherwise, try to extract from string
+            value_str = str(value).strip()
+            # Remove % sign and convert to float
+            value_str = value_str.replace('%', '').replace(',', '.').replace(' ', '')
+            try:
+                return float(value_str)
+            except:
+                return 0
+
+        work_df['Дельта_процент_numeric'] = work_df[delta_pct_col].apply(extract_percentage)
+    else:
+        # Calculate delta percentage if we have delta and plan
+        work_df['Дельта_процент_numeric'] = 0
+        if 'Дельта_numeric' in work_df.columns and 'План_numeric' in work_df.columns:
+            mask = work_df['План_numeric'] != 0
+            work_df.loc[mask, 'Дельта_процент_numeric'] = (work_df.loc[mask, 'Дельта_numeric'] / work_df.loc[mask, 'План_numeric']) * 100
+        work_df['Дельта_процент_numeric'] = work_df['Дельта_процент_numeric'].fillna(0)
+
+    # Find Проект column
+    period_col = schema['Период']
+
+    if period_col:
+        # Parse period format like "дек.25" or "декабрь 2025"
+        def parse_period(period_val):
+            if pd.isna(period_val):
+                return None
+            period_str = str(period_val).strip()
+            # Try to extract year and month
+            # Format: "дек.25" -> period="дек.2025"
+            # Format: "декабрь 2025" -> period="декабрь 2025"
+            if '.' in period_str:
+                parts = period_str.split('.')
+                if len(parts) >= 2:
+                    month_part = parts[0].strip()
+                    year_part = parts[1].strip()
+                    try:
+                        year = int(year_part)
+                        if year < 100:
+                            year = 2000 + year
+                        return f"{month_part}.{year}"
+                    except:
+                        pass
+            return period_str
+
+        work_df['period_display'] = work_df[period_col].apply(parse_period)
+    else:
+        work_df['period_display'] = 'Н/Д'
+
+    # Find Проект column
+    project_col = schema['Проект']
+
+    # Filters - project and contractor filters
+    col1, col2 = st.columns(2)
+
+    with col1:
+        # Project filter - multiselect для выбора нескольких проектов
+        if project_col and project_col in work_df.columns:
+            all_projects = filter_index.options(technique_df, project_col)
+            selected_projects = st.multiselect(
+                "Фильтр по проектам (можно выбрать несколько)",
+                all_projects,
+                default=all_projects if len(all_projects) <= 3 else all_projects[:3],
+                key='technique_projects'
+            )
+        else:
+            selected_projects = []
+            st.info("Колонка 'Проект' не найдена")
+
+    with col2:
+        # Contractor filter
+        if 'Контрагент' in work_df.columns:
+            if 'Контрагент' in technique_df.columns:
+                contractors = ['Все'] + filter_index.options(technique_df, 'Контрагент')
+            else:
+                # Колонка скопирована в рабочую копию из найденной колонки контрагента
+                contractors = ['Все'] + sorted(work_df['Контрагент'].dropna().unique().tolist())
+            selected_contractor = st.selectbox("Фильтр по контрагенту", contractors, key='technique_contractor')
+        else:
+            selected_contractor = 'Все'
+            st.info("Колонка 'Контрагент' не найдена")
+
+    # Apply filters
+    filtered_df = work_df.copy()
+    if selected_projects and project_col and project_col in filtered_df.columns:
+        # Фильтруем по выбранным проектам
+        project_mask = filtered_df[project_col].astype(str).str.strip().isin([str(p).strip() for p in selected_projects])
+        filtered_df = filtered_df[project_mask]
+    if selected_contractor != 'Все' and 'Контрагент' in filtered_df.columns:
+        # Use string comparison with strip to handle whitespace
+        filtered_df = filtered_df[filtered_df['Контрагент'].astype(str).str.strip() == str(selected_contractor).strip()]
+
+    if filtered_df.empty:
+        st.info("Нет данных для отображения с выбранными фильтрами.")
+        return
+
+    # Ensure Контрагент column exists and has values
+    if 'Контрагент' not in filtered_df.columns or filtered_df['Контрагент'].isna().all():
+        st.error("❌ Колонка 'Контрагент' отсутствует или пуста после фильтрации.")
+        return
+
+    # Remove rows where Контрагент is NaN before grouping
+    filtered_df = filtered_df[filtered_df['Контрагент'].notna()].copy()
+
+    if filtered_df.empty:
+        st.info("Нет данных с указанными контрагентами после фильтрации.")
+        return
+
+    # Определяем список проектов для обработки
+    if selected_projects and project_col and project_col in filtered_df.columns:
+        projects_to_process = selected_projects
+    else:
+        # Если проекты не выбраны или колонка не найдена, обрабатываем все проекты
+        if project_col and project_col in filtered_df.columns:
+            projects_to_process = sorted(filtered_df[project_col].dropna().unique().tolist())
+        else:
+            projects_to_process = ['Все проекты']
+
+    # Обрабатываем каждый проект отдельно
+    for project_name in projects_to_process:
+        # Фильтруем данные по проекту
+        project_filtered_df = filtered_df.copy()
+        if project_col and project_col in project_filtered_df.columns and project_name != 'Все проекты':
+            project_filtered_df = project_filtered_df[
+                project_filtered_df[project_col].astype(str).str.strip() == str(project_name).strip()
+            ]
+
+        if project_filtered_df.empty:
+            continue
+
+        # Заголовок для проекта
+        if len(projects_to_process) > 1:
+            st.markdown("---")
+            st.subheader(f"📊 Проект: {project_name}")
+
+        # ========== Chart 1: Pie Chart by Contractor (Delta %) ==========
+        st.subheader("📊 Круговая диаграмма: Распределение дельты (%) по контрагентам")
+
+        # Group by Контрагент and aggregate for pie chart (Delta %)
+        # Ensure Дельта_процент_numeric exists - check if it was created in work_df
+        if 'Дельта_процент_numeric' not in project_filtered_df.columns:
+            # Дельта (%) column from the dataset schema
+            delta_pct_col = schema['Дельта (%)']
+
+            if delta_pct_col and delta_pct_col in project_filtered_df.columns:
+                # Extract percentage values from the column
+                def extract_percentage(value):
+                    """Extract numeric value from percentage string like '-90%' or '90%', or numeric value"""
+                    if pd.isna(value):
+                        return 0
+                    # If already numeric, return as is
+                    if isinstance(value, (int, float)):
+                        return float(value)
+                    # Otherwise, try to extract from string
+                    value_str = str(value).strip()
+                    # Remove % sign and convert to float
+                    value_str = value_str.replace('%', '').replace(',', '.').replace(' ', '')
+                    try:
+                        return float(value_str)
+                    except:
+                        return 0
+
+                project_filtered_df['Дельта_процент_numeric'] = project_filtered_df[delta_pct_col].apply(extract_percentage)
+            else:
+                # Try to calculate from Дельта and План if available
+                if 'Дельта_numeric' in project_filtered_df.columns and 'План_numeric' in project_filtered_df.columns:
+                    project_filtered_df['Дельта_процент_numeric'] = 0
+                    mask = project_filtered_df['План_numeric'] != 0
+                    project_filtered_df.loc[mask, 'Дельта_процент_numeric'] = (project_filtered_df.loc[mask, 'Дельта_numeric'] / project_filtered_df.loc[mask, 'План_numeric']) * 100
+                    project_filtered_df['Дельта_процент_numeric'] = project_filtered_df['Дельта_процент_numeric'].fillna(0)
+                else:
+                    st.error("❌ Не удалось найти или рассчитать Дельта (%). Отсутствуют необходимые колонки.")
+                    st.info(f"Доступные колонки: {', '.join(project_filtered_df.columns)}")
+                    contractor_delta_pct = pd.DataFrame(columns=['Контрагент', 'Дельта (%)'])
+
+        # Group by contractor and aggregate
+        if 'Дельта_процент_numeric' in project_filtered_df.columns:
+            # Check if we have any data before grouping
+            if not project_filtered_df.empty and 'Контрагент' in project_filtered_df.columns:
+                contractor_delta_pct = project_filtered_df.groupby('Контрагент', observed=True).agg({
+                    'Дельта_процент_numeric': 'sum'  # Sum of delta percentages
+                }).reset_index()
+
+                contractor_delta_pct.columns = ['Контрагент', 'Дельта (%)']
+            else:
+                contractor_delta_pct = pd.DataFrame(columns=['Контрагент', 'Дельта (%)'])
+    else:
+        contractor_delta_pct = pd.DataFrame(columns=['Контрагент', 'Дельта (%)'])
+
+    # Check if we have data
+    if contractor_delta_pct.empty or len(contractor_delta_pct) == 0:
+        st.info("Нет данных для отображения круговой диаграммы.")
+    else:
+        # Ensure Дельта (%) is numeric
+        contractor_delta_pct['Дельта (%)'] = pd.to_numeric(contractor_delta_pct['Дельта (%)'], errors='coerce').fillna(0)
+
+        # Check if we have any non-zero values
+        total_abs_sum = contractor_delta_pct['Дельта (%)'].abs().sum()
+
+        if total_abs_sum == 0:
+            st.info("Все значения дельты (%) равны нулю. Диаграмма не может быть построена.")
+        else:
+            # Remove only exactly zero values (not small values)
+            non_zero_data = contractor_delta_pct[contractor_delta_pct['Дельта (%)'] != 0].copy()
+
+            # Use non-zero data if available
+            if not non_zero_data.empty:
+                contractor_delta_pct = non_zero_data
+
+            # Sort by absolute value for better visualization
+            contractor_delta_pct = contractor_delta_pct.sort_values('Дельта (%)', key=abs, ascending=False)
+
+            # Create a copy with absolute values for pie chart (pie charts don't support negative values)
+            contractor_delta_pct_abs = contractor_delta_pct.copy()
+            contractor_delta_pct_abs['Дельта (%)_abs'] = contractor_delta_pct_abs['Дельта (%)'].abs()
+
+            # Store original values for display
+            original_values = contractor_delta_pct_abs['Дельта (%)'].tolist()
+
+            # Create pie chart using absolute values
+            fig_pie = px.pie(
+                contractor_delta_pct_abs,
+                values='Дельта (%)_abs',
+                names='Контрагент',
+                title='Распределение дельты (%) по контрагентам',
+                color_discrete_sequence=px.colors.qualitative.Set3
+            )
+
+            fig_pie.update_layout(
+                height=600,
+                showlegend=True,
+                legend=dict(
+                    orientation="v",
+                    yanchor="middle",
+                    y=0.5,
+                    xanchor="left",
+                    x=1.1
+                ),
+                title_font_size=16
+                # plot_bgcolor  = "hsl(216,28%,7%)",
+                # paper_bgcolor = "hsl(216,28%,7%)"
+            )
+
+            # Update traces to show original (signed) values in text and hover
+            fig_pie.update_traces(
+                textposition='inside',
+                textinfo='percent+label',
+                texttemplate='%{label}<br>%{customdata:.0f}%<br>(%{percent})',
+                textfont=dict(size=12, color='white'),
+                customdata=original_values,
+                hovertemplate='<b>%{label}</b><br>Дельта (%): %{customdata:.0f}%<br>Процент: %{percent}<br><extra></extra>'
+            )
+
+            st.plotly_chart(fig_pie, use_container_width=True, theme=None)
+
+        # ========== Chart 2: Bar Chart by Contractor (Plan, Average, Delta) ==========
+        st.subheader("📊 Столбчатая диаграмма: План, Среднее за месяц, Дельта (группировка по контрагенту)")
+
+        # Group by Контрагент and aggregate
+        # Ensure Дельта_numeric exists
+        if 'Дельта_numeric' not in project_filtered_df.columns:
+            # Try to calculate if missing
+            if 'План_numeric' in project_filtered_df.columns and 'week_sum' in project_filtered_df.columns:
+                project_filtered_df['Дельта_numeric'] = project_filtered_df['План_numeric'] - project_filtered_df['week_sum']
+            else:
+                project_filtered_df['Дельта_numeric'] = 0
+
+        contractor_data = project_filtered_df.groupby('Контрагент', observed=True).agg({
+            'План_numeric': 'sum',  # Sum of plans
+            'week_sum': 'sum',  # Sum of weeks = среднее за месяц
+            'Дельта_numeric': 'sum'  # Sum of deltas
+        }).reset_index()
+
+        contractor_data.columns = ['Контрагент', 'План', 'Среднее за месяц', 'Дельта']
+
+        # Ensure Дельта column has numeric values
+        contractor_data['Дельта'] = pd.to_numeric(contractor_data['Дельта'], errors='coerce').fillna(0)
+
+        # Sort by contractor name
+        contractor_data = contractor_data.sort_values('Контрагент')
+
+        # Create bar chart
+        fig_bar = go.Figure()
+
+        # Add bars for Plan
+        fig_bar.add_trace(go.Bar(
+            name='План',
+            x=contractor_data['Контрагент'],
+            y=contractor_data['План'],
+            marker_color='#3498db',
+            text=format_numbers(contractor_data['План'], na='0', truncate=True),
+            textposition='outside',
+            textfont=dict(size=12, color='white')
+        ))
+
+        # Add bars for Average
+        fig_bar.add_trace(go.Bar(
+            name='Среднее за месяц',
+            x=contractor_data['Контрагент'],
+            y=contractor_data['Среднее за месяц'],
+            marker_color='#2ecc71',
+            text=format_numbers(contractor_data['Среднее за месяц'], na='0', truncate=True),
+            textposition='outside',
+            textfont=dict(size=12, color='white')
+        ))
+
+        # Add bars for Delta - ensure values are properly formatted
+        # Разделяем на положительные и отрицательные значения для разных цветов
+        delta_values = contractor_data['Дельта'].fillna(0)
+        delta_abs = delta_values.abs()  # Абсолютные значения для отображения
+
+        # Положительные значения дельты (зеленый)
+        positive_mask = delta_values > 0
+        if positive_mask.any():
+            fig_bar.add_trace(go.Bar(
+                name='Дельта (+)',
+                x=contractor_data.loc[positive_mask, 'Контрагент'],
+                y=delta_abs[positive_mask],
+                marker_color='#2ecc71',  # Зеленый для положительных
+                text=format_numbers(delta_abs[positive_mask], na='0', truncate=True),
+                textposition='outside',
+                textfont=dict(size=12, color='white'),
+                showlegend=False
+            ))
+
+        # Отрицательные значения дельты (красный)
+        negative_mask = delta_values < 0
+        if negative_mask.any():
+            fig_bar.add_trace(go.Bar(
+                name='Дельта (-)',
+                x=contractor_data.loc[negative_mask, 'Контрагент'],
+                y=delta_abs[negative_mask],
+                marker_color='#e74c3c',  # Красный для отрицательных
+                text=format_numbers(delta_abs[negative_mask], na='0', truncate=True),
+                textposition='outside',
+                textfont=dict(size=12, color='white'),
+                showlegend=False
+            ))
+
+        # Нулевые значения (если есть)
+        zero_mask = delta_values == 0
+        if zero_mask.any():
+            fig_bar.add_trace(go.Bar(
+                name='Дельта (0)',
+                x=contractor_data.loc[zero_mask, 'Контрагент'],
+                y=delta_abs[zero_mask],
+                marker_color='#95a5a6',  # Серый для нулевых
+                text=format_numbers(delta_abs[zero_mask], na='0', truncate=True),
+                textposition='outside',
+                textfont=dict(size=12, color='white'),
+                showlegend=False
+            ))
+
+        # Update layout
+        fig_bar.update_layout(
+            title='План, Среднее за месяц и Дельта по контрагентам',
+            xaxis_title='Контрагент',
+            yaxis_title='Значение',
+            barmode='group',
+            height=600,
+            legend=dict(
+                orientation="h",
+                yanchor="bottom",
+                y=1.02,
+                xanchor="right",
+                x=1
+            ),
+            xaxis=dict(tickangle=-45)
+            # plot_bgcolor  = "hsl(216,28%,7%)",
+            # paper_bgcolor = "hsl(216,28%,7%)"
+        )
+
+        st.plotly_chart(fig_bar, use_container_width=True, theme=None)
+
+        # ========== Chart 3: Pie Chart by Contractor (Plan + Average) ==========
+        st.subheader("📊 Круговая диаграмма: Распределение суммы Плана и Среднего за месяц по контрагентам")
+
+        # Group by Контрагент and aggregate for pie chart (Plan + Average)
+        contractor_plan_avg = project_filtered_df.groupby('Контрагент', observed=True).agg({
+            'План_numeric': 'sum',  # Sum of plans
+            'week_sum': 'sum',  # Sum of weeks = среднее за месяц
+            'Дельта_numeric': 'sum'  # Sum of deltas
+        }).reset_index()
+
+        contractor_plan_avg.columns = ['Контрагент', 'План', 'Среднее за месяц', 'Дельта']
+
+        # Calculate sum of Plan + Average for each contractor
+        contractor_plan_avg['Сумма'] = contractor_plan_avg['План'] + contractor_plan_avg['Среднее за месяц']
+
+        # Calculate доля факта (Среднее за месяц / Сумма * 100) and доля отклонения (Дельта / План * 100)
+        contractor_plan_avg['Доля факта (%)'] = 0
+        contractor_plan_avg['Доля отклонения (%)'] = 0
+        mask_sum = contractor_plan_avg['Сумма'] != 0
+        contractor_plan_avg.loc[mask_sum, 'Доля факта (%)'] = (contractor_plan_avg.loc[mask_sum, 'Среднее за месяц'] / contractor_plan_avg.loc[mask_sum, 'Сумма']) * 100
+        mask_plan = contractor_plan_avg['План'] != 0
+        contractor_plan_avg.loc[mask_plan, 'Доля отклонения (%)'] = (contractor_plan_avg.loc[mask_plan, 'Дельта'] / contractor_plan_avg.loc[mask_plan, 'План']) * 100
+
+        # Remove zero values for pie chart
+        contractor_plan_avg = contractor_plan_avg[contractor_plan_avg['Сумма'] != 0].copy()
+
+        if contractor_plan_avg.empty:
+            st.info("Нет данных для отображения.")
+        else:
+            # Sort by sum value for better visualization
+            contractor_plan_avg = contractor_plan_avg.sort_values('Сумма', ascending=False)
+
+            # Create pie chart
+            fig_pie_plan_avg = px.pie(
+                contractor_plan_avg,
+                values='Сумма',
+                names='Контрагент',
+                title='Распределение суммы Плана и Среднего за месяц по контрагентам',
+                color_discrete_sequence=px.colors.qualitative.Set2
+            )
+
+            fig_pie_plan_avg.update_layout(
+                height=600,
+                showlegend=True,
+                legend=dict(
+                    orientation="v",
+                    yanchor="middle",
+                    y=0.5,
+                    xanchor="left",
+                    x=1.1
+                ),
+                title_font_size=16
+                # plot_bgcolor  = "hsl(216,28%,7%)",
+                # paper_bgcolor = "hsl(216,28%,7%)"
+            )
+
+            # Prepare custom text with доля факта and доля отклонения
+            total_sum = contractor_plan_avg['Сумма'].sum()
+            custom_texts = []
+            for idx, row in contractor_plan_avg.iterrows():
+                fact_pct = row['Доля факта (%)']
+                delta_pct = row['Доля отклонения (%)']
+                percent_val = (row['Сумма'] / total_sum * 100) if total_sum > 0 else 0
+                text = f"{row['Контрагент']}<br>Факт: {fact_pct:.0f}%<br>Отклонение: {delta_pct:.0f}%<br>({percent_val:.0f}%)"
+                custom_texts.append(text)
+
+            fig_pie_plan_avg.update_traces(
+                textposition='inside',
+                textinfo='label',
+                texttemplate='%{label}',
+                textfont=dict(size=11, color='white'),
+                customdata=list(zip(contractor_plan_avg['Доля факта (%)'], contractor_plan_avg['Доля отклонения (%)'], contractor_plan_avg['Сумма'])),
+                hovertemplate='<b>%{label}</b><br>Сумма: %{customdata[2]:.0f}<br>Процент: %{percent}<br>Доля факта: %{customdata[0]:.0f}%<br>Доля отклонения: %{customdata[1]:.0f}%<br><extra></extra>'
+            )
+
+            # Update text manually to show факт and отклонение
+            for i, trace in enumerate(fig_pie_plan_avg.data):
+                if i < len(custom_texts):
+                    trace.text = [custom_texts[i]]
+
+            st.plotly_chart(fig_pie_plan_avg, use_container_width=True, theme=None)
+
+        # ========== Summary Table ==========
+        st.subheader("📋 Сводная таблица по контрагентам")
+
+        # Format numbers for display
+        summary_table = contractor_data.copy()
+        summary_table['План'] = format_numbers(summary_table['План'], na='0', truncate=True)
+        summary_table['Среднее за месяц'] = format_numbers(summary_table['Среднее за месяц'], na='0', truncate=True)
+        summary_table['Дельта'] = format_numbers(summary_table['Дельта'], na='0', truncate=True)
+
+        st.dataframe(summary_table, use_container_width=True)
+
+        # Summary metrics
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            total_plan = contractor_data['План'].sum()
+            st.metric("Общий план", f"{int(total_plan)}")
+
+        with col2:
+            total_average = contractor_data['Среднее за месяц'].sum()
+            st.metric("Общее среднее за месяц", f"{int(total_average)}")
+
+        with col3:
+            total_delta = contractor_data['Дельта'].sum()
+            st.metric("Общая дельта", f"{int(total_delta)}")
@@ -0,0 +1,801 @@
+"""
+Загрузка и нормализация файлов с данными (CSV / Excel)
+
+Разбор файла выполняется один раз на процесс: результат кешируется
+по хешу содержимого и версии парсера, поэтому один и тот же файл,
+загруженный разными пользователями, повторно не разбирается.
+Разобранные файлы дополнительно сохраняются в dataset_store и
+после перезапуска сервера читаются оттуда без повторного разбора.
+
+Колонки периодов (день, месяц, квартал, год) вычисляются из дат целыми
+ключами; в таблицу добавляются только периоды окончания по плану, которые
+используют дашборды, остальные строятся по запросу (period_column).
+
+После нормализации текстовые колонки с небольшим числом значений
+хранятся как category, целые числа - в наименьшем безопасном типе,
+а английские псевдонимы русских колонок ссылаются на те же данные.
+"""
+import codecs
+import copy
+import csv
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+import column_schema
+import dataset_store
+
+# Версия логики разбора. Увеличивайте при изменении нормализации,
+# чтобы старые записи кеша перестали совпадать
+PARSER_VERSION = 4
+
+# Ограничения кеша разобранных файлов
+PARSE_CACHE_MAX_ENTRIES = 32
+PARSE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Объем начала файла, по которому определяются кодировка и разделитель
+SNIFF_SAMPLE_BYTES = 64 * 1024
+
+CSV_DELIMITERS = [';', ',', '\t']
+
+# Байты cp1251 вне ASCII и байты кириллических букв: в однобайтовой кодировке
+# доля кириллицы считается по байтам образца без декодирования и регулярных выражений
+CP1251_NON_ASCII_BYTES = bytes(range(0x80, 0x100))
+CP1251_CYRILLIC_BYTES = bytes(
+    byte for byte in CP1251_NON_ASCII_BYTES
+    if '\u0400' <= bytes([byte]).decode('cp1251', errors='replace') <= '\u04FF'
+)
+
+# Соответствие русских названий колонок английским
+COLUMN_MAPPING = {
+    'Проект': 'project name',
+    'Аббревиатура': 'abbreviation',
+    'Блок': 'block',
+    'Раздел': 'section',
+    'Задача': 'task name',
+    'Старт Факт': 'base start',
+    'Конец Факт': 'base end',
+    'Старт План': 'plan start',
+    'Конец План': 'plan end',
+    'Отклонение': 'deviation',
+    'Отклонений в днях': 'deviation in days',
+    'Причина отклонений': 'reason of deviation',
+    'Бюджет План': 'budget plan',
+    'Бюджет Факт': 'budget fact',
+    'Резерв': 'reserve'
+}
+
+DATE_COLUMNS = ['base start', 'base end', 'plan start', 'plan end']
+
+# Уровни периодов: суффикс колонки -> частота pandas
+PERIOD_LEVELS = {'day': 'D', 'month': 'M', 'quarter': 'Q', 'year': 'Y'}
+# Префикс колонок периодов -> колонка даты, из которой они вычисляются
+PERIOD_PREFIXES = {
+    'plan_start': 'plan start',
+    'plan': 'plan end',
+    'base_start': 'base start',
+    'base': 'base end',
+    'actual': 'base end',
+}
+# Производные колонки периодов: название -> (колонка даты, частота)
+PERIOD_COLUMNS = {
+    f'{prefix}_{level}': (date_col, freq)
+    for prefix, date_col in PERIOD_PREFIXES.items()
+    for level, freq in PERIOD_LEVELS.items()
+    if not (prefix == 'actual' and level == 'day')
+}
+# Колонки периодов, которые добавляются в таблицу при загрузке
+MATERIALIZED_PERIOD_COLUMNS = ('plan_month', 'plan_quarter', 'plan_year')
+
+# Текстовая колонка хранится как category, если уникальных значений не больше этой доли строк
+CATEGORY_MAX_SHARE = 0.5
+# Колонка считается числовой (и не переводится в category), если число - не меньше этой доли значений
+NUMERIC_TEXT_SHARE = 0.5
+# Числовые колонки: если они прочитаны как текст из одних чисел, хранятся числом,
+# как их приводят дашборды (pd.to_numeric); остальной текст из цифр не меняется
+NUMERIC_COLUMNS = ('budget plan', 'budget fact', 'reserve', 'deviation in days')
+# Целые типы для понижения разрядности (по возрастанию)
+INTEGER_DTYPES = (np.int8, np.int16, np.int32)
+
+
+def content_hash(data: bytes) -> str:
+    """Хеш содержимого файла (ключ кеша)"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def detect_data_type(df, file_name=None):
+    """Detect the type of data based on column structure and filename"""
+    columns = [str(col).lower() for col in df.columns]
+    file_name_lower = str(file_name).lower() if file_name else ''
+
+    # Check for project data (has task name, plan start/end, budget plan)
+    if any(col in columns for col in ['задача', 'task name']) and \
+       any(col in columns for col in ['старт план', 'plan start']) and \
+       any(col in columns for col in ['бюджет план', 'budget plan']):
+        return 'project'
+
+    # Check for resources/technique data (has Контрагент/Подразделение, недели, План)
+    # Check for contractor column (Контрагент or Подразделение)
+    has_contractor = any(col in columns for col in ['контрагент', 'подразделение', 'contractor'])
+    # Check for week columns
+    has_weeks = (any(col in columns for col in ['1 неделя', '2 неделя', '3 неделя']) or \
+                 any('неделя' in col for col in columns))
+    # Check for plan column (План, План на месяц, etc.)
+    has_plan = any(col in columns for col in ['план', 'план на месяц', 'plan'])
+    # Check for delta column (Дельта, Отклонение)
+    has_delta = any(col in columns for col in ['дельта', 'отклонение', 'deviation', 'delta'])
+
+    if has_contractor and has_weeks and (has_plan or has_delta):
+        # Check filename first for better accuracy
+        if 'ресурс' in file_name_lower or 'resource' in file_name_lower:
+            return 'resources'
+        elif 'техник' in file_name_lower or 'technique' in file_name_lower:
+            return 'technique'
+        # If filename doesn't help, check column names more carefully
+        elif 'ресурс' in ' '.join(columns) or 'resource' in ' '.join(columns):
+            return 'resources'
+        elif 'техник' in ' '.join(columns) or 'technique' in ' '.join(columns):
+            return 'technique'
+        # Check for "Среднее за неделю" (resources) vs "Среднее за месяц" (technique)
+        elif any('среднее за неделю' in col for col in columns):
+            return 'resources'
+        elif any('среднее за месяц' in col for col in columns):
+            return 'technique'
+        else:
+            # Default to resources if we can't determine (most common case)
+            return 'resources'
+
+    # Default to project if we can't determine
+    return 'project'
+
+
+def sniff_csv(data: bytes, sample_size: int = SNIFF_SAMPLE_BYTES) -> dict:
+    """
+    Определяет кодировку и разделитель CSV по первым килобайтам файла
+
+    Кодировка: BOM -> utf-8-sig, корректный UTF-8 -> utf-8, иначе cp1251.
+    Разделитель выбирается по устойчивости количества полей в строках образца.
+
+    Args:
+        data: Содержимое файла
+        sample_size: Размер анализируемого образца в байтах
+
+    Returns:
+        Словарь {'encoding', 'delimiter', 'encoding_confidence', 'delimiter_confidence'}
+    """
+    sample = data[:sample_size]
+    truncated = len(data) > sample_size
+
+    if sample.startswith(codecs.BOM_UTF8):
+        encoding, encoding_confidence = 'utf-8-sig', 1.0
+        text = sample[len(codecs.BOM_UTF8):].decode('utf-8', errors='replace')
+    else:
+        try:
+            # final=False: образец может обрываться посреди многобайтового символа
+            text = codecs.getincrementaldecoder('utf-8')().decode(sample, final=not truncated)
+            encoding = 'utf-8'
+            encoding_confidence = 1.0
+            if truncated and sample.isascii():
+                # Образец из чистого ASCII не различает кодировки: проверяем весь файл
+                # (декодирование в C намного дешевле лишнего разбора CSV)
+                if not data.isascii():
+                    data.decode('utf-8')
+        except UnicodeDecodeError:
+            text = sample.decode('cp1251', errors='replace')
+            encoding = 'cp1251'
+            # Доля кириллицы среди не-ASCII символов образца
+            non_ascii = len(sample) - len(sample.translate(None, CP1251_NON_ASCII_BYTES))
+            cyrillic = len(sample) - len(sample.translate(None, CP1251_CYRILLIC_BYTES))
+            encoding_confidence = round(cyrillic / non_ascii, 3) if non_ascii else 0.5
+
+    lines = text.splitlines()
+    if truncated and len(lines) > 1:
+        # Последняя строка образца может быть неполной
+        lines = lines[:-1]
+    lines = [line for line in lines if line.strip()][:200]
+
+    delimiter, delimiter_confidence = ';', 0.0
+    for candidate in CSV_DELIMITERS:
+        field_counts = [len(row) for row in csv.reader(lines, delimiter=candidate, quotechar='"')]
+        if not field_counts:
+            continue
+        mode = max(set(field_counts), key=field_counts.count)
+        if mode < 2:
+            continue
+        # Доля строк с типичным количеством полей
+        score = field_counts.count(mode) / len(field_counts)
+        # При равенстве сохраняется приоритет ';' (порядок CSV_DELIMITERS)
+        if score > delimiter_confidence:
+            delimiter, delimiter_confidence = candidate, round(score, 3)
+
+    return {
+        'encoding': encoding,
+        'delimiter': delimiter,
+        'encoding_confidence': encoding_confidence,
+        'delimiter_confidence': delimiter_confidence
+    }
+
+
+def read_csv_probing(data: bytes) -> pd.DataFrame:
+    """
+    Чтение CSV перебором кодировок и разделителей
+
+    Используется как запасной вариант, если разбор по результатам
+    sniff_csv не удался (каждая попытка заново читает весь файл).
+    """
+    # Try different encodings and delimiters
+    # Priority: UTF-8 first (most common), then UTF-8 with BOM, then Windows encodings
+    encodings = ['utf-8', 'utf-8-sig', 'windows-1251', 'cp1251']
+    for encoding in encodings:
+        try:
+            # First try with semicolon delimiter (common in European CSV files)
+            return pd.read_csv(io.BytesIO(data), sep=';', encoding=encoding,
+                               quoting=csv.QUOTE_MINIMAL, quotechar='"', doublequote=True)
+        except (UnicodeDecodeError, pd.errors.ParserError):
+            try:
+                # If semicolon fails, try comma delimiter
+                return pd.read_csv(io.BytesIO(data), sep=',', encoding=encoding,
+                                   quoting=csv.QUOTE_MINIMAL, quotechar='"', doublequote=True)
+            except (UnicodeDecodeError, pd.errors.ParserError):
+                continue
+    # Last resort: try with UTF-8 and default settings
+    try:
+        return pd.read_csv(io.BytesIO(data), encoding='utf-8')
+    except:
+        return pd.read_csv(io.BytesIO(data))
+
+
+def read_csv_sniffed(data: bytes) -> pd.DataFrame:
+    """Чтение CSV за один полный проход по результатам sniff_csv"""
+    dialect = sniff_csv(data)
+    try:
+        return pd.read_csv(io.BytesIO(data), sep=dialect['delimiter'], encoding=dialect['encoding'],
+                           quoting=csv.QUOTE_MINIMAL, quotechar='"', doublequote=True)
+    except UnicodeDecodeError:
+        # Образец оказался валидным UTF-8, а дальше в файле - нет
+        if dialect['encoding'] != 'cp1251':
+            try:
+                return pd.read_csv(io.BytesIO(data), sep=dialect['delimiter'], encoding='cp1251',
+                                   quoting=csv.QUOTE_MINIMAL, quotechar='"', doublequote=True)
+            except (UnicodeDecodeError, pd.errors.ParserError):
+                pass
+    except pd.errors.ParserError:
+        pass
+    return read_csv_probing(data)
+
+
+def read_table(data: bytes, file_name: str) -> pd.DataFrame:
+    """
+    Читает CSV или Excel файл из байтов
+
+    Args:
+        data: Содержимое файла
+        file_name: Имя файла (по расширению определяется формат)
+
+    Returns:
+        DataFrame без нормализации
+
+    Raises:
+        ValueError: если формат файла не поддерживается
+    """
+    if file_name.endswith('.csv'):
+        return read_csv_sniffed(data)
+    elif file_name.endswith(('.xlsx', '.xls')):
+        return pd.read_excel(io.BytesIO(data))
+    raise ValueError(f"Неподдерживаемый формат файла: {file_name}")
+
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Нормализует загруженный DataFrame: названия колонок, даты и периоды
+
+    Args:
+        df: DataFrame, прочитанный из файла
+
+    Returns:
+        Нормализованный DataFrame
+    """
+    # Normalize column names: remove newlines and extra spaces from column names
+    # This handles cases where CSV headers are split across multiple lines
+    df.columns = [str(col).replace('\n', ' ').replace('\r', ' ').strip() for col in df.columns]
+
+    # Create aliases for Russian column names if they exist and English names don't
+    for russian_name, english_name in COLUMN_MAPPING.items():
+        if russian_name in df.columns and english_name not in df.columns:
+            df[english_name] = df[russian_name]
+
+    # Convert date columns - handle DD.MM.YYYY format
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            # Convert to string first if needed, then parse
+            if df[col].dtype == 'object':
+                # Try parsing with dayfirst=True for DD.MM.YYYY format
+                df[col] = pd.to_datetime(df[col], errors='coerce', dayfirst=True, format='mixed')
+            else:
+                df[col] = pd.to_datetime(df[col], errors='coerce', dayfirst=True)
+
+    # Periods used by the dashboards (plan end month/quarter/year); the other
+    # period columns are built on request by period_column
+    for name in MATERIALIZED_PERIOD_COLUMNS:
+        column = period_column(df, name)
+        if column is not None:
+            df[name] = column
+
+    return df
+
+
+def period_keys(dates: pd.Series, freq: str) -> pd.arrays.IntegerArray:
+    """
+    Целые ключи периодов для колонки дат (без создания объектов Period)
+
+    Ключ совпадает с ординалом pandas Period: для месяцев это
+    (год - 1970) * 12 + месяц - 1, для кварталов и лет - номер квартала
+    или года от 1970, для дней - число дней от 1970-01-01.
+
+    Args:
+        dates: Колонка datetime64
+        freq: Частота периода ('D', 'M', 'Q' или 'Y')
+
+    Returns:
+        Int32 с пропусками там, где нет даты
+    """
+    values = dates.to_numpy(dtype='datetime64[ns]')
+    missing = np.isnat(values)
+    if freq == 'D':
+        keys = values.astype('datetime64[D]').astype(np.int64)
+    else:
+        keys = values.astype('datetime64[M]').astype(np.int64)
+        if freq == 'Q':
+            keys = keys // 3
+        elif freq == 'Y':
+            keys = keys // 12
+    return pd.arrays.IntegerArray(np.where(missing, 0, keys).astype(np.int32), missing)
+
+
+def periods_from_keys(keys: pd.arrays.IntegerArray, freq: str):
+    """
+    Значения колонки периода по ключам period_keys
+
+    Returns:
+        PeriodArray (для дней - даты datetime.date, как dt.date)
+    """
+    missing = np.asarray(keys.isna())
+    ordinals = keys.to_numpy(dtype=np.int64, na_value=0)
+    if freq == 'D':
+        # datetime64[D] -> object дает datetime.date
+        dates = ordinals.astype('datetime64[D]').astype(object)
+        dates[missing] = np.nan
+        return dates
+    ordinals[missing] = np.iinfo(np.int64).min
+    return pd.PeriodIndex.from_ordinals(ordinals, freq=freq).array
+
+
+def period_column(df: pd.DataFrame, name: str) -> Optional[pd.Series]:
+    """
+    Колонка периода по названию (plan_month, base_quarter, plan_start_day, ...)
+
+    Если колонка уже есть в таблице, возвращается она; иначе вычисляется из
+    колонки даты. Для неизвестного названия или таблицы без дат - None.
+    """
+    if name in df.columns:
+        return df[name]
+    if name not in PERIOD_COLUMNS:
+        return None
+    date_col, freq = PERIOD_COLUMNS[name]
+    if date_col not in df.columns or not pd.api.types.is_datetime64_any_dtype(df[date_col]):
+        return None
+    keys = period_keys(df[date_col], freq)
+    if keys.isna().all():
+        return None
+    return pd.Series(periods_from_keys(keys, freq), index=df.index, name=name)
+
+
+def with_period_columns(df: pd.DataFrame, names) -> pd.DataFrame:
+    """Поверхностная копия таблицы с добавленными колонками периодов names (если их можно вычислить)"""
+    missing = [name for name in names if name not in df.columns]
+    if not missing:
+        return df
+    df = df.copy(deep=False)
+    for name in missing:
+        column = period_column(df, name)
+        if column is not None:
+            df[name] = column
+    return df
+
+
+def _arrow_buffers(values) -> list:
+    chunked = values.__arrow_array__()
+    return [buffer.address for chunk in chunked.chunks for buffer in chunk.buffers() if buffer is not None]
+
+
+def _shares_data(left: pd.Series, right: pd.Series) -> bool:
+    """Ссылаются ли две колонки на одни и те же данные (псевдоним, а не копия)"""
+    left_values, right_values = left.array, right.array
+    if left.dtype != right.dtype:
+        return False
+    if isinstance(left.dtype, pd.CategoricalDtype):
+        return np.shares_memory(left_values.codes, right_values.codes)
+    if hasattr(left_values, '__arrow_array__'):
+        left_buffers = _arrow_buffers(left_values)
+        return bool(left_buffers) and left_buffers == _arrow_buffers(right_values)
+    left_numpy, right_numpy = left.to_numpy(copy=False), right.to_numpy(copy=False)
+    return left_numpy.dtype != object and np.shares_memory(left_numpy, right_numpy)
+
+
+def alias_columns(df: pd.DataFrame) -> dict:
+    """
+    Английские колонки, которые являются псевдонимами русских
+
+    Returns:
+        {английское название: русское название}
+    """
+    return {
+        english_name: russian_name
+        for russian_name, english_name in COLUMN_MAPPING.items()
+        if russian_name in df.columns and english_name in df.columns
+        and _shares_data(df[russian_name], df[english_name])
+    }
+
+
+def link_aliases(df: pd.DataFrame, aliases: dict) -> pd.DataFrame:
+    """Заменяет колонки-псевдонимы ссылками на исходные колонки (без копирования данных)"""
+    for english_name, russian_name in aliases.items():
+        if english_name in df.columns and russian_name in df.columns:
+            df[english_name] = df[russian_name]
+    return df
+
+
+def frame_memory(df: pd.DataFrame) -> int:
+    """Объем памяти DataFrame в байтах; псевдонимы колонок не учитываются повторно"""
+    usage = df.memory_usage(deep=True)
+    return int(usage.sum() - usage[list(alias_columns(df))].sum())
+
+
+def _is_text(series: pd.Series) -> bool:
+    if pd.api.types.is_string_dtype(series.dtype) and series.dtype != object:
+        return True
+    if series.dtype != object:
+        return False
+    sample = series.dropna()
+    return len(sample) > 0 and all(isinstance(value, str) for value in sample.iloc[:100])
+
+
+def _downcast_integers(series: pd.Series) -> pd.Series:
+    """
+    Целая колонка в наименьшем типе, в котором помещается сумма всех значений
+
+    Запас по сумме нужен, чтобы накопительные итоги (cumsum) и разности
+    колонок не переполнялись в уменьшенном типе.
+    """
+    if len(series) == 0:
+        return series
+    bound = int(np.abs(series.to_numpy(dtype=np.int64)).max()) * max(len(series), 2)
+    for dtype in INTEGER_DTYPES:
+        if bound <= np.iinfo(dtype).max:
+            return series.astype(dtype)
+    return series
+
+
+def _optimize_column(series: pd.Series, numeric: bool = False) -> pd.Series:
+    """
+    Колонка в компактном представлении с теми же значениями
+
+    Args:
+        series: Колонка
+        numeric: Колонка из NUMERIC_COLUMNS: текст из одних чисел переводится в число
+    """
+    if pd.api.types.is_integer_dtype(series.dtype) and isinstance(series.dtype, np.dtype):
+        return _downcast_integers(series)
+    if not _is_text(series):
+        return series
+
+    # Разбор чисел выполняется по уникальным значениям, доли считаются по строкам
+    codes, uniques = pd.factorize(series)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    if counts.sum() == 0:
+        return series
+    is_number = pd.to_numeric(pd.Series(uniques), errors='coerce').notna().to_numpy()
+    if numeric and is_number.all():
+        # Числа, прочитанные как текст: хранятся числом, как их приводят дашборды
+        converted = pd.to_numeric(series, errors='coerce')
+        if pd.api.types.is_integer_dtype(converted.dtype):
+            return _downcast_integers(converted)
+        return converted
+    if counts[is_number].sum() >= counts.sum() * NUMERIC_TEXT_SHARE:
+        # В основном числа с отдельными нечисловыми значениями: оставляем текст
+        return series
+    if len(uniques) <= len(series) * CATEGORY_MAX_SHARE:
+        return series.astype('category')
+    return series
+
+
+def optimize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Уменьшает объем памяти нормализованного DataFrame
+
+    Текстовые колонки с небольшим числом значений переводятся в category,
+    целые числа - в наименьший безопасный тип, колонки из NUMERIC_COLUMNS,
+    прочитанные как текст из одних чисел, - в числовой тип; псевдонимы колонок
+    ссылаются на исходные данные.
+    Объем до и после записывается в df.attrs['memory'].
+
+    Args:
+        df: Нормализованный DataFrame
+
+    Returns:
+        Тот же DataFrame с уменьшенными колонками
+    """
+    before = int(df.memory_usage(deep=True).sum())
+    aliases = alias_columns(df)
+    for column in df.columns:
+        if column in aliases:
+            continue
+        numeric = column in NUMERIC_COLUMNS or COLUMN_MAPPING.get(column) in NUMERIC_COLUMNS
+        optimized = _optimize_column(df[column], numeric)
+        if optimized is not df[column]:
+            df[column] = optimized
+    link_aliases(df, aliases)
+    df.attrs['memory'] = {'before': before, 'after': frame_memory(df)}
+    return df
+
+
+def concat_frames(frames: list) -> pd.DataFrame:
+    """
+    Объединяет наборы данных одного типа, сохраняя category и псевдонимы колонок
+
+    pd.concat превращает category с разными наборами значений в текст, поэтому
+    такие колонки объединяются через union_categoricals. Хеш содержимого
+    объединенного набора строится из хешей частей, схема колонок - заново.
+    """
+    common_aliases = alias_columns(frames[0])
+    for frame in frames[1:]:
+        frame_aliases = alias_columns(frame)
+        common_aliases = {alias: source for alias, source in common_aliases.items()
+                          if frame_aliases.get(alias) == source}
+
+    df = pd.concat(frames, ignore_index=True)
+    for column in df.columns:
+        if column in common_aliases or isinstance(df[column].dtype, pd.CategoricalDtype):
+            continue
+        parts = [frame[column] for frame in frames if column in frame.columns]
+        if len(parts) == len(frames) and all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            df[column] = pd.Series(union_categoricals(parts, sort_categories=True), index=df.index, name=column)
+    part_hashes = [frame.attrs.get('content_hash') for frame in frames]
+    if all(part_hashes):
+        df.attrs['content_hash'] = content_hash('+'.join(part_hashes).encode('ascii'))
+    column_schema.column_map(df)
+    return _mark_loaded(link_aliases(df, common_aliases))
+
+
+def parse_file(data: bytes, file_name: str) -> pd.DataFrame:
+    """Полный разбор файла: чтение, нормализация и уменьшение объема (без кеша)"""
+    return optimize_frame(normalize_frame(read_table(data, file_name)))
+
+
+class ParseCache:
+    """
+    LRU-кеш разобранных файлов с ограничением по количеству и объему памяти
+
+    Ключ - хеш содержимого, расширение файла и версия парсера.
+    Кеш общий для всех сессий процесса, доступ защищен блокировкой.
+    """
+
+    def __init__(self, max_entries: int = PARSE_CACHE_MAX_ENTRIES,
+                 max_bytes: int = PARSE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        # Блокировки по ключу, чтобы одновременные загрузки одного файла разбирались один раз
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(data_hash: str, file_name: str) -> tuple:
+        extension = file_name.rsplit('.', 1)[-1].lower() if '.' in file_name else ''
+        return (data_hash, extension, PARSER_VERSION)
+
+    def get(self, key: tuple, producer: Callable[[], Optional[pd.DataFrame]]) -> Optional[pd.DataFrame]:
+        """
+        Возвращает DataFrame из кеша или строит его вызовом producer
+
+        Args:
+            key: Ключ из make_key
+            producer: Функция, возвращающая нормализованный DataFrame (или None)
+
+        Returns:
+            Закешированный DataFrame (не изменять на месте) или None
+        """
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Файл мог быть разобран другим потоком, пока мы ждали
+            with self._lock:
+                cached = self._entries.get(key)
+                if cached is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return cached
+
+            try:
+                df = producer()
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+            if df is None:
+                return None
+            size = frame_memory(df)
+
+            with self._lock:
+                self.misses += 1
+                if size <= self.max_bytes:
+                    self._entries[key] = df
+                    self._sizes[key] = size
+                    self._total_bytes += size
+                    self._evict()
+            return df
+
+    def get_or_parse(self, data: bytes, file_name: str, data_hash: Optional[str] = None) -> pd.DataFrame:
+        """
+        Возвращает нормализованный DataFrame из кеша, хранилища или разбирает файл
+
+        Args:
+            data: Содержимое файла
+            file_name: Имя файла
+            data_hash: Готовый хеш содержимого (если уже посчитан)
+
+        Returns:
+            Закешированный DataFrame (не изменять на месте)
+        """
+        key = self.make_key(data_hash or content_hash(data), file_name)
+
+        def produce():
+            # Файл мог быть разобран до перезапуска сервера
+            df = dataset_store.read_frame(key)
+            if df is None:
+                df = parse_file(data, file_name)
+                dataset_store.write_frame(key, df, alias_columns(df))
+            return df
+
+        return self.get(key, produce)
+
+    def _evict(self):
+        """Удаляет самые давно использованные записи сверх лимитов"""
+        while self._entries and (len(self._entries) > self.max_entries or
+                                 self._total_bytes > self.max_bytes):
+            key, _ = self._entries.popitem(last=False)
+            self._total_bytes -= self._sizes.pop(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        """Статистика кеша"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# Общий для процесса кеш (модуль импортируется один раз, в отличие от скрипта страницы)
+parse_cache = ParseCache()
+
+
+def load_file(data: bytes, file_name: str, original_name: Optional[str] = None,
+              data_hash: Optional[str] = None) -> pd.DataFrame:
+    """
+    Загружает файл через кеш разбора и проставляет метаданные
+
+    Args:
+        data: Содержимое файла
+        file_name: Имя загруженного файла
+        original_name: Отображаемое имя файла (по умолчанию file_name)
+        data_hash: Готовый хеш содержимого (если уже посчитан)
+
+    Returns:
+        DataFrame с атрибутами data_type, file_name и content_hash
+    """
+    original_name = original_name or file_name
+    data_hash = data_hash or content_hash(data)
+    cached = parse_cache.get_or_parse(data, file_name, data_hash)
+    return _with_metadata(cached, original_name, data_hash)
+
+
+class _LoadedToken:
+    """
+    Отметка набора в том виде, в каком его вернул загрузчик (df.attrs['loaded_token'])
+
+    Производные наборы (копии, срезы, фильтры, concat) наследуют df.attrs
+    вместе с content_hash. pandas копирует атрибуты через deepcopy, а копия
+    отметки недействительна; кроме того, отметка помнит объект, число строк
+    и колонки набора, так что колонка, добавленная на месте, тоже ее снимает.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.frame_id = id(df)
+        self.n_rows = len(df)
+        self.columns = tuple(df.columns)
+        self.valid = True
+
+    def __deepcopy__(self, memo):
+        token = copy.copy(self)
+        token.valid = False
+        return token
+
+    def matches(self, df: pd.DataFrame) -> bool:
+        return (self.valid and self.frame_id == id(df) and self.n_rows == len(df)
+                and self.columns == tuple(df.columns))
+
+
+def _mark_loaded(df: pd.DataFrame) -> pd.DataFrame:
+    df.attrs['loaded_token'] = _LoadedToken(df)
+    return df
+
+
+def loaded_hash(df: pd.DataFrame) -> Optional[str]:
+    """
+    Хеш содержимого, если df - набор в том виде, в каком его вернул загрузчик
+
+    Отфильтрованные и дополненные копии наследуют df.attrs['content_hash'],
+    хотя их содержимое уже другое: для них возвращается None.
+    """
+    data_hash = df.attrs.get('content_hash')
+    token = df.attrs.get('loaded_token')
+    if not data_hash or not isinstance(token, _LoadedToken) or not token.matches(df):
+        return None
+    return data_hash
+
+
+def _with_metadata(cached: pd.DataFrame, original_name: str, data_hash: str) -> pd.DataFrame:
+    """Поверхностная копия из кеша: данные общие для всех сессий, атрибуты - свои"""
+    df = cached.copy(deep=False)
+    df.attrs = {
+        'data_type': detect_data_type(df, original_name),
+        'file_name': original_name,
+        'content_hash': data_hash,
+        'memory': dict(cached.attrs.get('memory') or {})
+    }
+    # Схема колонок строится при загрузке, дашборды берут ее из кеша
+    column_schema.column_map(df)
+    return _mark_loaded(df)
+
+
+def restore_file(data_hash: str, file_name: str, original_name: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """
+    Загружает ранее разобранный файл по хешу без исходных байтов (из кеша или хранилища)
+
+    Args:
+        data_hash: Хеш содержимого файла
+        file_name: Имя файла
+        original_name: Отображаемое имя файла (по умолчанию file_name)
+
+    Returns:
+        DataFrame с метаданными или None, если файла нет в хранилище
+    """
+    key = parse_cache.make_key(data_hash, file_name)
+    cached = parse_cache.get(key, lambda: dataset_store.read_frame(key))
+    if cached is None:
+        return None
+    return _with_metadata(cached, original_name or file_name, data_hash)
+
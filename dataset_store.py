@@ -0,0 +1,207 @@
+"""
+Постоянное хранилище нормализованных наборов данных (Arrow IPC)
+
+Каждый разобранный файл записывается один раз в локальный каталог
+в формате Arrow IPC без сжатия и читается обратно через memory map.
+Хранилище переживает перезапуск сервера; для каждого пользователя
+запоминается набор последних загруженных файлов.
+
+Колонки-псевдонимы (английские названия русских колонок) в файл не
+пишутся: при чтении они снова ссылаются на исходные колонки.
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    ARROW_AVAILABLE = True
+except ImportError:
+    # Без pyarrow хранилище отключается, данные живут только в памяти
+    ARROW_AVAILABLE = False
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_STORE_DIR = os.path.join(BASE_DIR, 'data_store')
+MANIFESTS_DIR = os.path.join(DATA_STORE_DIR, 'manifests')
+
+# Ограничение объема каталога; файлы из манифестов пользователей не удаляются
+DATA_STORE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+# Ключи метаданных схемы Arrow
+ALIASES_METADATA_KEY = b'column_aliases'
+COLUMNS_METADATA_KEY = b'column_order'
+ATTRS_METADATA_KEY = b'frame_attrs'
+
+_write_lock = threading.Lock()
+
+
+def _frame_path(key: tuple) -> str:
+    data_hash, extension, parser_version = key
+    return os.path.join(DATA_STORE_DIR, f"{data_hash}.{extension}.v{parser_version}.arrow")
+
+
+def _manifest_path(username: str) -> str:
+    user_id = hashlib.sha256(username.encode('utf-8')).hexdigest()[:32]
+    return os.path.join(MANIFESTS_DIR, f"{user_id}.json")
+
+
+def _atomic_write(path: str, payload: bytes):
+    """Запись через временный файл, чтобы читатели не видели частичный файл"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def has_frame(key: tuple) -> bool:
+    """Есть ли набор данных в хранилище"""
+    return ARROW_AVAILABLE and os.path.exists(_frame_path(key))
+
+
+def write_frame(key: tuple, df: pd.DataFrame, aliases: Optional[dict] = None) -> bool:
+    """
+    Сохраняет нормализованный DataFrame в хранилище (если его там еще нет)
+
+    Args:
+        key: Ключ кеша разбора (хеш, расширение, версия парсера)
+        df: Нормализованный DataFrame
+        aliases: Колонки-псевдонимы {псевдоним: исходная колонка}, которые не записываются
+
+    Returns:
+        True, если набор данных есть в хранилище после вызова
+    """
+    if not ARROW_AVAILABLE:
+        return False
+    path = _frame_path(key)
+    if os.path.exists(path):
+        return True
+    try:
+        aliases = aliases or {}
+        table = pa.Table.from_pandas(df.drop(columns=list(aliases)))
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            ALIASES_METADATA_KEY: json.dumps(aliases, ensure_ascii=False).encode('utf-8'),
+            COLUMNS_METADATA_KEY: json.dumps([str(column) for column in df.columns], ensure_ascii=False).encode('utf-8'),
+            ATTRS_METADATA_KEY: json.dumps(df.attrs, ensure_ascii=False, default=str).encode('utf-8'),
+        })
+        sink = pa.BufferOutputStream()
+        # Без сжатия: файл читается через memory map без распаковки
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        with _write_lock:
+            _atomic_write(path, sink.getvalue().to_pybytes())
+            _prune()
+        return True
+    except Exception:
+        # Хранилище - оптимизация: ошибка записи не должна мешать работе с данными
+        return False
+
+
+def read_frame(key: tuple) -> Optional[pd.DataFrame]:
+    """
+    Читает набор данных из хранилища через memory map
+
+    Args:
+        key: Ключ кеша разбора (хеш, расширение, версия парсера)
+
+    Returns:
+        DataFrame или None, если набора нет в хранилище
+    """
+    if not has_frame(key):
+        return None
+    path = _frame_path(key)
+    try:
+        source = pa.memory_map(path, 'r')
+        table = pa.ipc.open_file(source).read_all()
+        # split_blocks: числовые колонки без пропусков ссылаются на отображенный файл без копирования
+        df = table.to_pandas(split_blocks=True)
+        metadata = table.schema.metadata or {}
+        if ALIASES_METADATA_KEY in metadata:
+            for alias, source in json.loads(metadata[ALIASES_METADATA_KEY]).items():
+                df[alias] = df[source]
+            df = df[json.loads(metadata[COLUMNS_METADATA_KEY])]
+        if ATTRS_METADATA_KEY in metadata:
+            df.attrs = json.loads(metadata[ATTRS_METADATA_KEY])
+        os.utime(path)
+        return df
+    except Exception:
+        return None
+
+
+def save_manifest(username: str, files: list):
+    """
+    Запоминает набор файлов, загруженных пользователем
+
+    Args:
+        username: Имя пользователя
+        files: Список словарей {'file_name', 'hash', 'type'}
+    """
+    payload = json.dumps(files, ensure_ascii=False).encode('utf-8')
+    try:
+        _atomic_write(_manifest_path(username), payload)
+    except OSError:
+        pass
+
+
+def load_manifest(username: str) -> list:
+    """Набор файлов, загруженных пользователем ранее (пустой список, если нет)"""
+    try:
+        with open(_manifest_path(username), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def clear_manifest(username: str):
+    """Забывает набор файлов пользователя (сами данные удаляются при очистке каталога)"""
+    try:
+        os.remove(_manifest_path(username))
+    except OSError:
+        pass
+
+
+def _referenced_hashes() -> set:
+    """Хеши файлов, на которые ссылаются манифесты пользователей"""
+    hashes = set()
+    if not os.path.isdir(MANIFESTS_DIR):
+        return hashes
+    for name in os.listdir(MANIFESTS_DIR):
+        try:
+            with open(os.path.join(MANIFESTS_DIR, name), 'r', encoding='utf-8') as f:
+                hashes.update(item.get('hash') for item in json.load(f))
+        except (OSError, ValueError):
+            continue
+    return hashes
+
+
+def _prune():
+    """Удаляет самые старые неиспользуемые наборы сверх DATA_STORE_MAX_BYTES"""
+    entries = []
+    for name in os.listdir(DATA_STORE_DIR):
+        if not name.endswith('.arrow'):
+            continue
+        path = os.path.join(DATA_STORE_DIR, name)
+        stat = os.stat(path)
+        entries.append((stat.st_mtime, stat.st_size, name, path))
+
+    total = sum(size for _, size, _, _ in entries)
+    if total <= DATA_STORE_MAX_BYTES:
+        return
+
+    referenced = _referenced_hashes()
+    for _, size, name, path in sorted(entries):
+        if total <= DATA_STORE_MAX_BYTES:
+            break
+        if name.split('.', 1)[0] in referenced:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            continue
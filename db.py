@@ -0,0 +1,210 @@
+"""
+Общий слой доступа к базе пользователей (SQLite)
+
+Соединения не открываются на каждый запрос, а берутся из пула: поток
+получает соединение на время вызова и возвращает его обратно. Streamlit
+выполняет перезапуски скрипта в разных потоках, поэтому пул общий для
+процесса, а не привязан к потоку. Каждое соединение работает в режиме WAL
+(читатели не блокируют писателя) с busy_timeout и собственным кешем
+подготовленных выражений, который живет вместе с соединением.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: блокировка файла через msvcrt
+    fcntl = None
+    import msvcrt
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, 'users.db')
+
+# Ожидание снятия блокировки другим писателем вместо "database is locked"
+BUSY_TIMEOUT_MS = 5000
+# Число свободных соединений, которые пул держит открытыми
+POOL_SIZE = 8
+# Размер кеша подготовленных выражений на соединение
+STATEMENT_CACHE_SIZE = 256
+
+
+class ConnectionPool:
+    """
+    Пул соединений SQLite к одному файлу базы
+
+    Соединение используется одним потоком в каждый момент времени, но между
+    вызовами может переходить к другому потоку (check_same_thread=False).
+    """
+
+    def __init__(self, path: str, size: int = POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+        conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+        conn.execute('PRAGMA journal_mode = WAL')
+        # В режиме WAL NORMAL не теряет целостность, но не синхронизирует диск на каждый commit
+        conn.execute('PRAGMA synchronous = NORMAL')
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Свободное соединение из пула или новое"""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._open()
+
+    def release(self, conn: sqlite3.Connection):
+        """Возвращает соединение в пул (лишние соединения закрываются)"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        """Закрывает все свободные соединения"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path: Optional[str] = None) -> ConnectionPool:
+    """Пул соединений для файла базы (по умолчанию DB_PATH)"""
+    path = path or DB_PATH
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(path, ConnectionPool(path))
+    return pool
+
+
+@contextmanager
+def connection(path: Optional[str] = None):
+    """
+    Соединение из пула на время блока with
+
+    Изменения фиксируются при выходе из блока и откатываются при исключении.
+
+    Args:
+        path: Файл базы (по умолчанию DB_PATH)
+
+    Yields:
+        sqlite3.Connection
+    """
+    pool = get_pool(path)
+    conn = pool.acquire()
+    try:
+        with conn:
+            yield conn
+    finally:
+        pool.release(conn)
+
+
+def fetch_one(sql: str, params: tuple = ()) -> Optional[tuple]:
+    """Первая строка результата запроса (или None)"""
+    with connection() as conn:
+        return conn.execute(sql, params).fetchone()
+
+
+def fetch_all(sql: str, params: tuple = ()) -> list:
+    """Все строки результата запроса"""
+    with connection() as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def execute(sql: str, params: tuple = ()) -> int:
+    """
+    Выполняет изменяющий запрос и фиксирует его
+
+    Returns:
+        Число измененных строк
+    """
+    with connection() as conn:
+        return conn.execute(sql, params).rowcount
+
+
+def database_exists(path: Optional[str] = None) -> bool:
+    """Создан ли файл базы (чтение из пула создало бы пустую базу)"""
+    return os.path.exists(path or DB_PATH)
+
+
+@contextmanager
+def file_lock(lock_path: str):
+    """Межпроцессная блокировка на файле lock_path (ждет освобождения)"""
+    with open(lock_path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    """Текущая версия схемы базы (0 для новой базы)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    return conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+
+def migrate(migrations: list, path: Optional[str] = None) -> int:
+    """
+    Применяет миграции схемы, которых еще нет в таблице schema_version
+
+    Процессы, стартующие одновременно, выполняют миграции по очереди под
+    файловой блокировкой; каждая миграция идет в своей транзакции вместе
+    с записью о версии.
+
+    Args:
+        migrations: Список (версия, функция(conn))
+        path: Файл базы (по умолчанию DB_PATH)
+
+    Returns:
+        Версия схемы после миграций
+    """
+    path = path or DB_PATH
+    with file_lock(f"{path}.lock"):
+        with connection(path) as conn:
+            current = schema_version(conn)
+        for version, migration in sorted(migrations, key=lambda item: item[0]):
+            if version <= current:
+                continue
+            with connection(path) as conn:
+                # DDL в sqlite3 не открывает транзакцию сам
+                conn.execute('BEGIN')
+                migration(conn)
+                conn.execute('INSERT INTO schema_version (version) VALUES (?)', (version,))
+            current = version
+    return current
+
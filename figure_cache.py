@@ -0,0 +1,197 @@
+"""
+Кеш построенных графиков дашбордов
+
+Фигура хранится под явным ключом: хеш набора данных, имя дашборда,
+нормализованный кортеж состояния фильтров и имя графика. При попадании
+возвращается тот же объект go.Figure без повторной сборки, поэтому
+возврат к уже показанному сочетанию фильтров не пересчитывает график.
+Функция сборки вызывается только при промахе, поэтому фильтрация и
+агрегация, нужные только графику, выполняются внутри нее.
+
+Кеш общий для процесса, ограничен числом записей и приблизительным
+объемом данных фигур и вытесняет давно не использованные записи.
+Счетчики попаданий и промахов выводятся на странице администратора.
+"""
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+FIGURE_CACHE_MAX_ENTRIES = 512
+FIGURE_CACHE_MAX_BYTES = int(os.getenv('FIGURE_CACHE_MAX_MB', '64')) * 1024 * 1024
+
+_fingerprints = {}
+_fingerprints_lock = threading.Lock()
+
+
+def _unregister(key: int):
+    with _fingerprints_lock:
+        _fingerprints.pop(key, None)
+
+
+def dataset_hash(df: Optional[pd.DataFrame]) -> str:
+    """
+    Хеш содержимого набора данных
+
+    Для набора, возвращенного загрузчиком, берется хеш файла
+    (data_loader.loaded_hash). Производные наборы наследуют df.attrs
+    вместе с content_hash, поэтому для них и для наборов без хеша файла
+    хеш считается по значениям один раз на объект.
+    """
+    if df is None:
+        return ''
+    from data_loader import loaded_hash
+    data_hash = loaded_hash(df)
+    if data_hash:
+        return data_hash
+
+    key = id(df)
+    with _fingerprints_lock:
+        cached = _fingerprints.get(key)
+        if cached is not None and cached[0]() is df and cached[1] == len(df):
+            return cached[2]
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(repr(list(df.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy().view(np.uint8))
+    fingerprint = digest.hexdigest()
+    with _fingerprints_lock:
+        _fingerprints[key] = (weakref.ref(df), len(df), fingerprint)
+    weakref.finalize(df, _unregister, key)
+    return fingerprint
+
+
+def normalize_state(state: Optional[dict]) -> tuple:
+    """Состояние фильтров как отсортированный кортеж (значения - строки)"""
+    return tuple(sorted((str(name), str(value)) for name, value in (state or {}).items()))
+
+
+def make_key(df: Optional[pd.DataFrame], dashboard: str, state: Optional[dict] = None, chart: str = '') -> tuple:
+    """
+    Ключ графика
+
+    Args:
+        df: Набор данных дашборда
+        dashboard: Имя дашборда
+        state: Все значения, от которых зависит график (фильтры, флажки, режимы)
+        chart: Имя графика внутри дашборда
+
+    Returns:
+        (хеш набора данных, дашборд, состояние, график)
+    """
+    return (dataset_hash(df), dashboard, normalize_state(state), chart)
+
+
+def figure_bytes(fig: go.Figure) -> int:
+    """
+    Приблизительный объем фигуры (байты данных трасс и макета)
+
+    Считается по словарю фигуры без сериализации в JSON: числовые массивы
+    plotly хранит в base64, строки учитываются по длине.
+    """
+    def size(value) -> int:
+        if isinstance(value, dict):
+            return sum(len(key) + size(item) for key, item in value.items())
+        if isinstance(value, (list, tuple)):
+            return sum(size(item) for item in value)
+        if isinstance(value, np.ndarray):
+            if value.dtype == object:
+                return sum(len(str(item)) for item in value.ravel().tolist())
+            return value.nbytes
+        return len(str(value))
+
+    return size(fig.to_dict())
+
+
+class FigureCache:
+    """
+    LRU-кеш фигур с ограничением по числу записей и объему
+
+    Доступ защищен блокировкой; сборка фигуры при промахе выполняется вне нее.
+    Фигура из кеша общая для всех сессий: ее нельзя изменять на месте
+    (st.plotly_chart сериализует копию).
+    """
+
+    def __init__(self, max_entries: int = FIGURE_CACHE_MAX_ENTRIES,
+                 max_bytes: int = FIGURE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple, build: Callable[[], go.Figure]) -> go.Figure:
+        """
+        Фигура из кеша или после сборки вызовом build
+
+        Args:
+            key: Ключ из make_key
+            build: Функция, возвращающая go.Figure
+
+        Returns:
+            Закешированная фигура (не изменять на месте)
+        """
+        with self._lock:
+            fig = self._entries.get(key)
+            if fig is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return fig
+
+        fig = build()
+        size = figure_bytes(fig)
+        with self._lock:
+            self.misses += 1
+            if key not in self._entries and size <= self.max_bytes:
+                self._entries[key] = fig
+                self._sizes[key] = size
+                self._total_bytes += size
+                self._evict()
+        return fig
+
+    def _evict(self):
+        """Удаляет самые давно использованные записи сверх лимитов"""
+        while self._entries and (len(self._entries) > self.max_entries or
+                                 self._total_bytes > self.max_bytes):
+            key, _ = self._entries.popitem(last=False)
+            self._total_bytes -= self._sizes.pop(key, 0)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        """Статистика кеша"""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / requests if requests else 0.0
+            }
+
+
+# Общий для процесса кеш (модуль импортируется один раз, в отличие от скрипта страницы)
+figure_cache = FigureCache()
+
+
+def cached_figure(df: Optional[pd.DataFrame], dashboard: str, state: Optional[dict],
+                  chart: str, build: Callable[[], go.Figure]) -> go.Figure:
+    """Фигура графика дашборда через общий кеш (см. make_key)"""
+    return figure_cache.get(make_key(df, dashboard, state, chart), build)
@@ -0,0 +1,189 @@
+"""
+Индекс значений фильтров для наборов данных
+
+Для каждой колонки-измерения (проект, раздел, блок, задача, причина)
+один раз на набор данных вычисляются отсортированный список значений,
+коды строк и количество строк по значению. Совместная встречаемость
+измерений (какие разделы есть в проекте) строится при первом запросе
+пары колонок, поэтому зависимые списки не просматривают строки заново.
+
+Списки совпадают с прежними sorted(df[col].dropna().unique().tolist()),
+а условия within сравниваются так же, как фильтры query_engine
+(строка после strip).
+"""
+import threading
+import weakref
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+import query_engine
+
+# Колонки, индекс которых строится сразу при загрузке файла
+DIMENSION_COLUMNS = (
+    'project name', 'task name', 'section', 'block', 'reason of deviation',
+    'Проект', 'Контрагент',
+)
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class Dimension:
+    """Значения одной колонки: отсортированный список, коды строк и частоты"""
+
+    def __init__(self, series: pd.Series):
+        codes, uniques = pd.factorize(series)
+        uniques = uniques.tolist()
+        self.values = sorted(uniques)
+        # Код строки - позиция значения в self.values, -1 для пропусков
+        rank = np.empty(len(uniques), dtype=np.int32)
+        rank[pd.Index(uniques, dtype=object).get_indexer(self.values)] = np.arange(len(uniques), dtype=np.int32)
+        self.codes = np.where(codes >= 0, rank[codes], -1)
+        self.counts = np.bincount(self.codes[self.codes >= 0], minlength=len(self.values))
+
+
+class DimensionIndex:
+    """Индекс значений фильтров одного набора данных"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df_ref = weakref.ref(df)
+        self.n_rows = len(df)
+        self.columns = tuple(df.columns)
+        self._dimensions = {}
+        self._pairs = {}
+        self._lock = threading.RLock()
+
+    def matches(self, df: pd.DataFrame) -> bool:
+        return self.df_ref() is df and len(df) == self.n_rows and tuple(df.columns) == self.columns
+
+    def _frame(self) -> pd.DataFrame:
+        df = self.df_ref()
+        if df is None:
+            raise RuntimeError("Набор данных уже удален")
+        return df
+
+    def dimension(self, column: str) -> Dimension:
+        with self._lock:
+            if column not in self._dimensions:
+                self._dimensions[column] = Dimension(self._frame()[column])
+            return self._dimensions[column]
+
+    def _key_codes(self, column: str) -> tuple:
+        """Коды строк по значению после strip и словарь кодов (общие с фильтрами query_engine)"""
+        postings = query_engine.get_view(self._frame()).postings(f'key:{column}')
+        return postings.codes, postings.code_of
+
+    def _pair(self, filter_column: str, column: str) -> tuple:
+        """
+        Совместная встречаемость: для каждого кода filter_column - коды column
+
+        Returns:
+            (коды filter_column по возрастанию, коды column) - пары без повторов
+        """
+        with self._lock:
+            pair_key = (filter_column, column)
+            if pair_key not in self._pairs:
+                filter_codes, _ = self._key_codes(filter_column)
+                target = self.dimension(column)
+                valid = (filter_codes >= 0) & (target.codes >= 0)
+                n_values = max(len(target.values), 1)
+                pairs = np.unique(filter_codes[valid].astype(np.int64) * n_values + target.codes[valid])
+                self._pairs[pair_key] = (pairs // n_values, pairs % n_values)
+            return self._pairs[pair_key]
+
+    def options(self, column: str, within: Optional[dict] = None) -> list:
+        """
+        Отсортированные значения колонки без пропусков
+
+        Args:
+            column: Колонка-измерение
+            within: Условия {колонка: значение}; остаются значения, которые
+                встречаются в строках, удовлетворяющих всем условиям
+
+        Returns:
+            Список значений (новый список на каждый вызов)
+        """
+        target = self.dimension(column)
+        constraints = [(filter_column, value) for filter_column, value in (within or {}).items()
+                       if value is not None]
+        if not constraints:
+            return list(target.values)
+
+        matched = []
+        for filter_column, value in constraints:
+            _, key_map = self._key_codes(filter_column)
+            code = key_map.get(str(value).strip())
+            if code is None:
+                return []
+            matched.append((filter_column, code))
+
+        if len(matched) == 1:
+            filter_column, code = matched[0]
+            filter_codes, target_codes = self._pair(filter_column, column)
+            start, end = np.searchsorted(filter_codes, [code, code + 1])
+            selected = target_codes[start:end]
+        else:
+            # Несколько условий: пересечение по строкам (целочисленные коды, без строк)
+            mask = target.codes >= 0
+            for filter_column, code in matched:
+                mask &= self._key_codes(filter_column)[0] == code
+            selected = np.unique(target.codes[mask])
+        return [target.values[i] for i in selected]
+
+    def value_counts(self, column: str) -> dict:
+        """Количество строк по каждому значению колонки (в порядке options)"""
+        target = self.dimension(column)
+        return dict(zip(target.values, target.counts.tolist()))
+
+
+def _unregister(key: int):
+    with _registry_lock:
+        _registry.pop(key, None)
+
+
+def get_index(df: pd.DataFrame) -> DimensionIndex:
+    """
+    Индекс значений фильтров для DataFrame (один на объект на процесс)
+
+    Индекс хранится, пока жив DataFrame; изменение числа строк или набора
+    колонок приводит к построению нового индекса.
+    """
+    key = id(df)
+    with _registry_lock:
+        index = _registry.get(key)
+        if index is not None and index.matches(df):
+            return index
+        index = DimensionIndex(df)
+        _registry[key] = index
+    weakref.finalize(df, _unregister, key)
+    return index
+
+
+def build(df: pd.DataFrame, columns=DIMENSION_COLUMNS) -> DimensionIndex:
+    """Строит индекс для колонок-измерений при загрузке набора данных"""
+    index = get_index(df)
+    for column in columns:
+        if column in df.columns:
+            index.dimension(column)
+    return index
+
+
+def options(df: pd.DataFrame, column: str, within: Optional[dict] = None) -> list:
+    """Отсортированные значения колонки без пропусков (см. DimensionIndex.options)"""
+    return get_index(df).options(column, within)
+
+
+def merged_options(frames, column: str) -> list:
+    """Отсортированное объединение значений колонки из нескольких наборов данных"""
+    values = set()
+    for df in frames:
+        if df is not None and column in df.columns:
+            values.update(get_index(df).options(column))
+    return sorted(values)
+
+
+def value_counts(df: pd.DataFrame, column: str) -> dict:
+    """Количество строк по каждому значению колонки"""
+    return get_index(df).value_counts(column)
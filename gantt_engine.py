@@ -0,0 +1,338 @@
+"""
+Диаграмма Ганта план/факт для дашборда сроков работ
+
+Задачи раскладываются в длинную таблицу (задача, тип, начало, окончание)
+одним concat по парам колонок плана и факта, без обхода строк; порядок
+задач на оси считается одной группировкой по раннему началу.
+
+Таблица полос кешируется для каждого набора данных по сочетанию
+фильтров, готовые фигуры - в общем кеше графиков (figure_cache). Для
+длинных списков задач фигура строится по странице задач или по сводным
+срокам разделов / блоков (chart_window).
+"""
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import chart_window
+from label_format import format_numbers
+import query_engine
+
+DATE_COLUMNS = ['plan start', 'plan end', 'base start', 'base end']
+# Колонки задачи, которые нужны графику и таблице дат
+SCHEDULE_COLUMNS = ['project name', 'task name', 'section', 'block'] + DATE_COLUMNS
+
+# Пары (тип полосы, колонка начала, колонка окончания)
+BAR_KINDS = (
+    ('План', 'plan start', 'plan end'),
+    ('Факт', 'base start', 'base end'),
+)
+BAR_COLORS = {'План': '#2E86AB', 'Факт': '#FF6347'}
+
+# Число сочетаний фильтров, которые держатся в памяти для одного набора данных
+SCHEDULE_CACHE_SIZE = 16
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def prepare_tasks(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Задачи с датами плана или факта и отклонениями сроков
+
+    Args:
+        df: Отфильтрованные задачи
+
+    Returns:
+        DataFrame из SCHEDULE_COLUMNS (какие есть) с датами datetime и колонками
+        plan_start_diff / plan_end_diff (дней, пропуск без плана или факта) и
+        total_diff_days (модуль отклонения окончания, 0 без плана или факта)
+    """
+    tasks = df[[col for col in SCHEDULE_COLUMNS if col in df.columns]]
+    tasks = tasks.assign(**{
+        col: pd.to_datetime(tasks[col], errors='coerce', dayfirst=True)
+        for col in DATE_COLUMNS if not pd.api.types.is_datetime64_any_dtype(tasks[col])
+    })
+
+    has_plan = tasks['plan start'].notna() & tasks['plan end'].notna()
+    has_fact = tasks['base start'].notna() & tasks['base end'].notna()
+    both = has_plan & has_fact
+
+    start_diff = (tasks['base start'] - tasks['plan start']).dt.days.where(both).astype('Int64')
+    end_diff = (tasks['base end'] - tasks['plan end']).dt.days.where(both).astype('Int64')
+    tasks = tasks.assign(
+        plan_start_diff=start_diff,
+        plan_end_diff=end_diff,
+        total_diff_days=end_diff.abs().fillna(0).astype(np.int64),
+    )
+    return tasks[has_plan | has_fact]
+
+
+def aggregate_tasks(tasks: pd.DataFrame, column: str) -> pd.DataFrame:
+    """
+    Сводные сроки по колонке column (раздел, блок) внутри проекта
+
+    Начала берутся самые ранние, окончания - самые поздние, отклонение -
+    наибольшее по задачам группы.
+
+    Args:
+        tasks: Результат prepare_tasks
+        column: Колонка группировки
+
+    Returns:
+        DataFrame с колонками группировки, DATE_COLUMNS и total_diff_days
+    """
+    keys = [col for col in ('project name', column) if col in tasks.columns]
+    aggregations = {col: (col, 'min' if col.endswith('start') else 'max') for col in DATE_COLUMNS}
+    aggregations['total_diff_days'] = ('total_diff_days', 'max')
+    return tasks.groupby(keys, sort=False, observed=True).agg(**aggregations).reset_index()
+
+
+def bar_frame(tasks: pd.DataFrame, per_project: bool = True, label_column: str = 'task name') -> pd.DataFrame:
+    """
+    Длинная таблица полос графика: одна строка на пару (задача, тип)
+
+    Args:
+        tasks: Результат prepare_tasks или aggregate_tasks
+        per_project: Каждая строка задачи отдельно ("Все" проекты); иначе
+            только первая строка каждой задачи
+        label_column: Колонка с именем полосы (задача, раздел, блок)
+
+    Returns:
+        DataFrame с колонками Задача, Тип, Дата начала, Дата окончания,
+        Длительность, Отклонение; задачи по возрастанию раннего начала,
+        внутри задачи план перед фактом
+    """
+    tasks = tasks[tasks[label_column].notna()]
+    if not per_project:
+        tasks = tasks.drop_duplicates(label_column)
+
+    if 'project name' in tasks.columns:
+        project = tasks['project name'].astype(str).fillna('Неизвестно')
+    else:
+        project = 'Неизвестно'
+    display_name = tasks[label_column].astype(str) + ' (' + project + ')'
+
+    parts = []
+    for kind, start_col, end_col in BAR_KINDS:
+        has_dates = (tasks[start_col].notna() & tasks[end_col].notna()).to_numpy()
+        starts = tasks[start_col][has_dates]
+        ends = tasks[end_col][has_dates]
+        parts.append(pd.DataFrame({
+            'Задача': display_name[has_dates],
+            'Тип': kind,
+            'Дата начала': starts,
+            'Дата окончания': ends,
+            'Длительность': (ends - starts).dt.days,
+            'Отклонение': tasks['total_diff_days'][has_dates],
+        }))
+    bars = pd.concat(parts, ignore_index=True)
+
+    # Порядок задач - по раннему началу (одна группировка), при равенстве по имени
+    bars['sort_order'] = bars.groupby('Задача', sort=False)['Дата начала'].transform('min')
+    bars = bars.sort_values(['sort_order', 'Задача', 'Тип'], kind='stable')
+    return bars.drop(columns='sort_order').reset_index(drop=True)
+
+
+def completion_labels(bars: pd.DataFrame) -> pd.Series:
+    """
+    Процент выполнения (длительность факта / длительность плана) для полос факта
+
+    Процент ставится на первую полосу факта задачи, у которой есть план
+    с положительной длительностью (для повторяющихся задач берется последний
+    план); остальные полосы получают пустую строку.
+    """
+    is_plan = (bars['Тип'] == 'План').to_numpy()
+    plan = bars[is_plan & (bars['Длительность'] > 0).to_numpy()].drop_duplicates('Задача', keep='last')
+    fact = bars[~is_plan].drop_duplicates('Задача')
+
+    plan_duration = fact['Задача'].map(pd.Series(plan['Длительность'].to_numpy(), index=plan['Задача']))
+    percent = (fact['Длительность'] / plan_duration * 100).dropna()
+
+    labels = pd.Series('', index=bars.index, dtype=object)
+    labels[percent.index] = format_numbers(percent, decimals=1) + '%'
+    return labels
+
+
+def _iso_dates(dates: pd.Series) -> np.ndarray:
+    """
+    Даты строками ISO, как их сериализует plotly
+
+    Массив строк проверяется plotly целиком, а не поэлементно, как список
+    Timestamp, что и занимает основное время построения большой фигуры.
+    """
+    return np.datetime_as_string(dates.to_numpy(dtype='datetime64[s]'), unit='s').astype(object)
+
+
+def gantt_figure(bars: pd.DataFrame, title: str, show_completion: bool = False) -> go.Figure:
+    """
+    Горизонтальные полосы от даты начала до даты окончания
+
+    Args:
+        bars: Результат bar_frame
+        title: Заголовок графика
+        show_completion: Показать процент выполнения у полос факта
+            (полосы плана при этом не выводятся)
+
+    Returns:
+        go.Figure
+    """
+    fig = go.Figure()
+    # Подписи форматируются по уникальным датам окончания
+    codes, end_dates = pd.factorize(bars['Дата окончания'])
+    end_labels = pd.Series(np.asarray(end_dates.strftime('%d.%m.%Y'), dtype=object)[codes], index=bars.index)
+    if show_completion:
+        percent = completion_labels(bars)
+        has_percent = percent != ''
+        end_labels[has_percent] = end_labels[has_percent] + ' (' + percent[has_percent] + ')'
+
+    for kind, _, _ in BAR_KINDS:
+        if kind == 'План' and show_completion:
+            continue
+        kind_bars = bars['Тип'] == kind
+        if not kind_bars.any():
+            continue
+        fig.add_trace(go.Bar(
+            x=_iso_dates(bars.loc[kind_bars, 'Дата окончания']),  # End dates on X-axis
+            base=_iso_dates(bars.loc[kind_bars, 'Дата начала']),  # Start dates as base
+            y=bars.loc[kind_bars, 'Задача'].to_numpy(dtype=object),
+            orientation='h',
+            name=kind,
+            marker_color=BAR_COLORS[kind],
+            text=end_labels[kind_bars].to_numpy(dtype=object),
+            textposition='outside',
+            textfont=dict(size=12, color='white'),
+            hovertemplate=f'<b>%{{y}}</b><br>Тип: {kind}<br>Начало: %{{base|%d.%m.%Y}}<br>Окончание: %{{x|%d.%m.%Y}}<br><extra></extra>'
+        ))
+
+    tasks = bars['Задача'].unique().tolist()
+    fig.update_layout(
+        title=title,
+        xaxis_title='Дата',
+        yaxis_title='Задача',
+        height=max(600, len(tasks) * 50),
+        barmode='group',
+        hovermode='closest',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        xaxis=dict(
+            type='date',
+            tickformat='%d.%m.%Y'
+        ),
+        yaxis=dict(
+            categoryorder='array',
+            categoryarray=list(reversed(tasks))
+        )
+    )
+    return fig
+
+
+class Schedule:
+    """Задачи и полосы графика для одного сочетания фильтров"""
+
+    def __init__(self, filtered: pd.DataFrame, per_project: bool):
+        self.n_filtered = len(filtered)
+        self.per_project = per_project
+        self.tasks = prepare_tasks(filtered)
+        self._bars = {}
+        self._lock = threading.RLock()
+        self.bars = self.level_bars()
+
+    def level_bars(self, level=None) -> pd.DataFrame:
+        """Полосы по задачам (level=None) или сводные по колонке level ('section', 'block')"""
+        with self._lock:
+            if level not in self._bars:
+                if self.tasks.empty or (level is not None and level not in self.tasks.columns):
+                    bars = pd.DataFrame()
+                elif level is None:
+                    bars = bar_frame(self.tasks, self.per_project)
+                else:
+                    bars = bar_frame(aggregate_tasks(self.tasks, level), self.per_project, label_column=level)
+                self._bars[level] = bars
+            return self._bars[level]
+
+    def n_items(self, level=None) -> int:
+        """Число строк на оси графика для уровня детализации"""
+        bars = self.level_bars(level)
+        return 0 if bars.empty else bars['Задача'].nunique()
+
+    def figure(self, title: str, show_completion: bool = False, level=None, page=None) -> go.Figure:
+        """
+        Фигура графика
+
+        Args:
+            title: Заголовок графика
+            show_completion: Показать процент выполнения
+            level: None - по задачам, иначе колонка сводки ('section', 'block')
+            page: Номер страницы строк (по убыванию отклонения); None - все строки
+        """
+        bars = self.level_bars(level)
+        if page is not None:
+            window = chart_window.top_window(bars['Задача'], bars['Отклонение'], page)
+            bars = bars[bars['Задача'].isin(window)]
+        return gantt_figure(bars, title, show_completion)
+
+
+class ScheduleCache:
+    """Расписания одного набора данных по сочетаниям фильтров (LRU)"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df_ref = weakref.ref(df)
+        self.n_rows = len(df)
+        self.columns = tuple(df.columns)
+        self._schedules = OrderedDict()
+        self._lock = threading.Lock()
+
+    def matches(self, df: pd.DataFrame) -> bool:
+        return self.df_ref() is df and len(df) == self.n_rows and tuple(df.columns) == self.columns
+
+    def get(self, df: pd.DataFrame, filters: dict) -> Schedule:
+        key = tuple(sorted((column, str(value)) for column, value in filters.items()))
+        with self._lock:
+            if key in self._schedules:
+                self._schedules.move_to_end(key)
+                return self._schedules[key]
+
+        schedule = Schedule(query_engine.filter_frame(df, filters), per_project='project name' not in filters)
+        with self._lock:
+            self._schedules[key] = schedule
+            while len(self._schedules) > SCHEDULE_CACHE_SIZE:
+                self._schedules.popitem(last=False)
+        return schedule
+
+
+def _unregister(key, cache):
+    with _registry_lock:
+        if _registry.get(key) is cache:
+            del _registry[key]
+
+
+def get_schedule(df: pd.DataFrame, filters: dict) -> Schedule:
+    """
+    Расписание задач набора данных для фильтров (кешируется, пока жив DataFrame)
+
+    Args:
+        df: Нормализованный DataFrame из session_state
+        filters: {колонка: значение}, как в query_engine.filter_frame; без
+            фильтра по проекту каждая задача выводится отдельно по проектам
+
+    Returns:
+        Schedule
+    """
+    key = id(df)
+    with _registry_lock:
+        cache = _registry.get(key)
+        if cache is None or not cache.matches(df):
+            cache = ScheduleCache(df)
+            _registry[key] = cache
+            weakref.finalize(df, _unregister, key, cache)
+    return cache.get(df, filters)
@@ -0,0 +1,119 @@
+"""
+Векторное форматирование чисел для подписей графиков и таблиц
+
+Подписи столбцов (text / customdata) раньше строились поэлементно через
+Series.apply с f-строкой, часто дважды на трассу. Здесь весь массив
+форматируется арифметикой NumPy: символы каждой позиции строки (знак,
+цифры, разделители групп разрядов, десятичная запятая) вычисляются сразу
+для всех чисел, матрица кодов символов читается как массив строк.
+
+Формат русский: группы разрядов через неразрывный пробел, десятичная
+запятая. Результат - массив dtype=object: plotly принимает его без
+поэлементной проверки, pandas - как столбец строк.
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Разделитель групп разрядов (неразрывный пробел, чтобы подпись не переносилась)
+THOUSANDS_SEPARATOR = '\u00a0'
+DECIMAL_SEPARATOR = ','
+
+_POWERS_OF_TEN = 10 ** np.arange(19, dtype=np.int64)
+
+
+def _render(integer: np.ndarray, fraction: np.ndarray, negative: np.ndarray, decimals: int) -> np.ndarray:
+    """
+    Строки чисел по целой части, дробной части (в единицах 10^-decimals) и знаку
+
+    Числа раскладываются в матрицу кодов символов с выравниванием по
+    правому краю: при нем каждая цифра разряда, разделитель групп и дробная
+    часть стоят в одном столбце для всех чисел. Затем строки сдвигаются
+    влево на число пустых позиций и читаются как массив строк.
+    """
+    n_digits = np.maximum(np.searchsorted(_POWERS_OF_TEN, integer, side='right'), 1)
+    max_digits = int(n_digits.max())
+    # Последний столбец целой части; слева от старшей группы - место под знак
+    integer_end = max_digits + (max_digits - 1) // 3
+    width = integer_end + 1 + (decimals + 1 if decimals else 0)
+
+    # Строки матрицы - позиции символов; лишняя нулевая позиция справа - конец строки после сдвига
+    chars = np.zeros((width + 1, len(integer)), dtype=np.uint32)
+    rest = integer.copy()
+    for exponent in range(max_digits):
+        position = integer_end - exponent - exponent // 3
+        present = exponent < n_digits
+        rest, digit = np.divmod(rest, 10)
+        chars[position] = np.where(present, digit + ord('0'), 0)
+        if exponent and exponent % 3 == 0:
+            chars[position + 1] = np.where(present, ord(THOUSANDS_SEPARATOR), 0)
+    integer_width = n_digits + (n_digits - 1) // 3
+    rows = np.flatnonzero(negative)
+    chars[integer_end - integer_width[rows], rows] = ord('-')
+    if decimals:
+        chars[integer_end + 1] = ord(DECIMAL_SEPARATOR)
+        for position in range(1, decimals + 1):
+            chars[integer_end + 1 + position] = fraction // _POWERS_OF_TEN[decimals - position] % 10 + ord('0')
+
+    leading = integer_end + 1 - integer_width - negative
+    index = np.minimum(np.arange(width) + leading[:, None], width)
+    return np.ascontiguousarray(np.take_along_axis(chars.T, index, axis=1)).view(f'U{width}').ravel()
+
+
+def _as_float(values) -> np.ndarray:
+    """Значения как float64 (нечисловые - NaN)"""
+    return pd.to_numeric(pd.Series(values, copy=False), errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+
+def format_numbers(values, decimals: int = 0, na: str = '', zero: Optional[str] = None,
+                   truncate: bool = False) -> np.ndarray:
+    """
+    Форматирует массив чисел в строки
+
+    Args:
+        values: Series, массив или список чисел (NaN / None / inf - пропуски)
+        decimals: Число знаков после запятой (округление значения, умноженного
+            на 10^decimals, поэтому на половинах последнего знака возможно
+            расхождение с f-строкой)
+        na: Строка для пропусков
+        zero: Строка для нулевых после округления значений (None - форматировать как число)
+        truncate: Отбрасывать дробную часть вместо округления, как f'{int(x)}'
+            (999.5 -> "999", -0.7 -> "0")
+
+    Returns:
+        Массив строк dtype=object той же длины
+    """
+    numbers = _as_float(values)
+    result = np.full(len(numbers), na, dtype=object)
+    valid = np.flatnonzero(np.isfinite(numbers))
+    if not valid.size:
+        return result
+
+    scale = 10 ** decimals
+    scaled = np.abs(numbers[valid]) * scale
+    scaled = (np.trunc(scaled) if truncate else np.rint(scaled)).astype(np.int64)
+    negative = (numbers[valid] < 0) & (scaled > 0)
+    result[valid] = _render(scaled // scale, scaled % scale, negative, decimals).astype(object)
+    if zero is not None:
+        result[valid[scaled == 0]] = zero
+    return result
+
+
+def format_number(value, decimals: int = 0, na: str = '', zero: Optional[str] = None,
+                  truncate: bool = False) -> str:
+    """Одно число в формате format_numbers"""
+    return format_numbers([value], decimals=decimals, na=na, zero=zero, truncate=truncate)[0]
+
+
+def bar_labels(values, decimals: int = 0, truncate: bool = False) -> tuple:
+    """
+    Подписи столбцов и подсказок за одно форматирование
+
+    Returns:
+        (text - без подписей только у точных нулей, customdata - все значения)
+    """
+    labels = format_numbers(values, decimals=decimals, truncate=truncate)
+    text = labels.copy()
+    text[_as_float(values) == 0] = ''
+    return text, labels
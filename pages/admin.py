@@ -9,7 +9,9 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import sqlite3
+
+import db
+from figure_cache import figure_cache
 
 from auth import (
     check_authentication, 
@@ -19,7 +21,6 @@ from auth import (
     get_user_role_display,
     ROLES,
     init_db,
-    DB_PATH,
     render_sidebar_menu
 )
 from logger import log_action, get_logs, get_logs_count
@@ -253,18 +254,12 @@ if user is not None:
     # Список пользователей
     st.markdown("### Список пользователей")
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
+    users = db.fetch_all('''
         SELECT id, username, role, email, created_at, last_login, is_active
         FROM users
         ORDER BY created_at DESC
     ''')
     
-    users = cursor.fetchall()
-    conn.close()
-    
     if users:
         # Таблица пользователей
         users_data = []
@@ -318,11 +313,7 @@ if user is not None:
     # Изменение роли пользователя
     st.markdown("### Изменить роль пользователя")
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, username, role FROM users WHERE is_active = 1 ORDER BY username')
-    active_users = cursor.fetchall()
-    conn.close()
+    active_users = db.fetch_all('SELECT id, username, role FROM users WHERE is_active = 1 ORDER BY username')
     
     if active_users:
         with st.form("change_role_form"):
@@ -349,11 +340,7 @@ if user is not None:
             
             if submitted:
                 if new_role != current_role:
-                    conn = sqlite3.connect(DB_PATH)
-                    cursor = conn.cursor()
-                    cursor.execute('UPDATE users SET role = ? WHERE id = ?', (new_role, selected_user_id))
-                    conn.commit()
-                    conn.close()
+                    db.execute('UPDATE users SET role = ? WHERE id = ?', (new_role, selected_user_id))
                     
                     log_action(
                         user['username'], 
@@ -371,33 +358,23 @@ if user is not None:
     with tab2:
         st.subheader("Статистика системы")
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Общая статистика
-    cursor.execute('SELECT COUNT(*) FROM users')
-    total_users = cursor.fetchone()[0]
-    
-    cursor.execute('SELECT COUNT(*) FROM users WHERE is_active = 1')
-    active_users = cursor.fetchone()[0]
-    
-    cursor.execute('SELECT COUNT(*) FROM users WHERE last_login IS NOT NULL')
-    users_with_login = cursor.fetchone()[0]
-    
-    # Статистика по ролям
-    cursor.execute('''
-        SELECT role, COUNT(*) as count
-        FROM users
-        GROUP BY role
-    ''')
-    role_stats = cursor.fetchall()
+    with db.connection() as conn:
+        # Общая статистика
+        total_users = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+        active_users = conn.execute('SELECT COUNT(*) FROM users WHERE is_active = 1').fetchone()[0]
+        users_with_login = conn.execute('SELECT COUNT(*) FROM users WHERE last_login IS NOT NULL').fetchone()[0]
+        
+        # Статистика по ролям
+        role_stats = conn.execute('''
+            SELECT role, COUNT(*) as count
+            FROM users
+            GROUP BY role
+        ''').fetchall()
     
     # Статистика логов
     total_logs = get_logs_count()
     recent_logs = get_logs_count(action='login')
     
-    conn.close()
-    
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.metric("Всего пользователей", total_users)
@@ -419,6 +396,29 @@ if user is not None:
     else:
         st.info("Нет данных")
     
+    # Кеш графиков дашбордов (общий для процесса)
+    with tab2:
+        st.markdown("---")
+        st.markdown("### Кеш графиков")
+        cache_stats = figure_cache.stats()
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Попаданий", cache_stats['hits'])
+        with col2:
+            st.metric("Промахов", cache_stats['misses'])
+        with col3:
+            st.metric("Доля попаданий", f"{cache_stats['hit_rate']:.0%}")
+        with col4:
+            st.metric("Записей", cache_stats['entries'])
+        st.caption(
+            f"Объем: {cache_stats['bytes'] / 1024 / 1024:.1f} из {cache_stats['max_bytes'] / 1024 / 1024:.0f} МБ, "
+            f"вытеснено записей: {cache_stats['evictions']}"
+        )
+        if st.button("Очистить кеш графиков", key="clear_figure_cache"):
+            figure_cache.clear()
+            st.success("Кеш графиков очищен")
+            st.rerun()
+    
     # ==================== TAB 3: Настройки системы ====================
     with tab3:
         st.subheader("Настройки путей к файлам данных")
@@ -497,11 +497,7 @@ if user is not None:
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('SELECT DISTINCT username FROM user_activity_logs ORDER BY username')
-        usernames = [row[0] for row in cursor.fetchall()]
-        conn.close()
+        usernames = [row[0] for row in db.fetch_all('SELECT DISTINCT username FROM user_activity_logs ORDER BY username')]
         
         filter_username = st.selectbox(
             "Фильтр по пользователю",
@@ -509,11 +505,7 @@ if user is not None:
         )
     
     with col2:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('SELECT DISTINCT action FROM user_activity_logs ORDER BY action')
-        actions = [row[0] for row in cursor.fetchall()]
-        conn.close()
+        actions = [row[0] for row in db.fetch_all('SELECT DISTINCT action FROM user_activity_logs ORDER BY action')]
         
         filter_action = st.selectbox(
             "Фильтр по действию",
@@ -638,11 +630,7 @@ if user is not None:
         col1, col2 = st.columns(2)
         
         with col1:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute('SELECT id, username FROM users WHERE is_active = 1 ORDER BY username')
-            active_users_list = cursor.fetchall()
-            conn.close()
+            active_users_list = db.fetch_all('SELECT id, username FROM users WHERE is_active = 1 ORDER BY username')
             
             user_options = {f"{u[1]}": u[0] for u in active_users_list}
             selected_user_display = st.selectbox("Выберите пользователя", options=list(user_options.keys()))
@@ -0,0 +1,151 @@
+"""
+Подписи периодов для графиков, таблиц и фильтров
+
+Дашборды форматировали периоды вложенными функциями (ветвление по
+freqstr, get_russian_month_name, разбор строк в try/except), вызывая их
+поэлементно через Series.apply. Здесь период задается целым ключом
+(ординалом pandas) и частотой: подписи диапазона ординалов строятся один
+раз и дальше берутся из таблицы индексированием массива. Таблица
+расширяется, если следующий набор данных выходит за ее диапазон.
+
+Форматы: месяц - "Январь 2025", квартал - "Q1 2025", год - "2025",
+день - "01.01.2025". Порядок подписей задается ключом периода, а не
+сравнением строк (ordered_labels, label_categories).
+"""
+import threading
+from datetime import date
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+RUSSIAN_MONTHS = {
+    1: 'Январь', 2: 'Февраль', 3: 'Март', 4: 'Апрель',
+    5: 'Май', 6: 'Июнь', 7: 'Июль', 8: 'Август',
+    9: 'Сентябрь', 10: 'Октябрь', 11: 'Ноябрь', 12: 'Декабрь'
+}
+MONTH_NUMBERS = {name: number for number, name in RUSSIAN_MONTHS.items()}
+
+MISSING_LABEL = 'Н/Д'
+
+# Частоты с таблицей подписей (первая буква freqstr: 'Q-DEC' -> 'Q')
+SUPPORTED_FREQS = ('M', 'Q', 'Y', 'D')
+
+# Частота -> (первый ординал таблицы, подписи)
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def _freq_key(freqstr: str) -> Optional[str]:
+    key = freqstr.split('-')[0][:1]
+    return key if key in SUPPORTED_FREQS else None
+
+
+def _build_labels(freq: str, first: int, last: int) -> np.ndarray:
+    """Подписи периодов с ординалами first..last"""
+    periods = pd.PeriodIndex.from_ordinals(np.arange(first, last + 1, dtype=np.int64), freq=freq)
+    if freq == 'M':
+        labels = [f"{RUSSIAN_MONTHS[month]} {year}" for year, month in zip(periods.year, periods.month)]
+    elif freq == 'Q':
+        labels = [f"Q{quarter} {year}" for year, quarter in zip(periods.year, periods.quarter)]
+    elif freq == 'Y':
+        labels = [str(year) for year in periods.year]
+    else:
+        labels = list(periods.strftime('%d.%m.%Y'))
+    return np.array(labels, dtype=object)
+
+
+def _label_table(freq: str, first: int, last: int) -> tuple:
+    """Таблица подписей частоты, покрывающая ординалы first..last: (первый ординал, подписи)"""
+    with _tables_lock:
+        table = _tables.get(freq)
+        if table is not None and table[0] <= first and last < table[0] + len(table[1]):
+            return table
+        if table is not None:
+            first = min(first, table[0])
+            last = max(last, table[0] + len(table[1]) - 1)
+        table = (first, _build_labels(freq, first, last))
+        _tables[freq] = table
+        return table
+
+
+def _format_scalar(value, na: str) -> str:
+    """Подпись значения, которое не является колонкой периодов"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return na
+    if isinstance(value, pd.Period):
+        if not _freq_key(value.freqstr):
+            return str(value)
+        return format_periods(pd.PeriodIndex([value]), na=na)[0]
+    if isinstance(value, (pd.Timestamp, date)):
+        return value.strftime('%d.%m.%Y')
+    text = str(value)
+    # Строки вида "2025-01" и "2025-01-15" - месяц
+    parts = text.split('-')
+    if len(parts) >= 2 and parts[0].isdigit() and parts[1][:2].isdigit():
+        month = int(parts[1][:2])
+        if month in RUSSIAN_MONTHS:
+            return f"{RUSSIAN_MONTHS[month]} {parts[0]}"
+    return text
+
+
+def format_periods(values, na: str = MISSING_LABEL) -> np.ndarray:
+    """
+    Подписи периодов
+
+    Args:
+        values: Series, PeriodIndex, массив или список периодов (колонка
+            периодов форматируется по таблице; иначе подпись строится один раз
+            на уникальное значение: периоды, даты, строки "2025-01")
+        na: Подпись пропусков
+
+    Returns:
+        Массив строк dtype=object той же длины
+    """
+    array = pd.array(values) if isinstance(values, (list, tuple)) else pd.Series(values, copy=False).array
+    if isinstance(array.dtype, pd.PeriodDtype) and _freq_key(array.dtype.freq.freqstr):
+        freq = _freq_key(array.dtype.freq.freqstr)
+        missing = np.asarray(array.isna())
+        result = np.full(len(array), na, dtype=object)
+        if missing.all():
+            return result
+        ordinals = array.asi8[~missing]
+        first, labels = _label_table(freq, int(ordinals.min()), int(ordinals.max()))
+        result[~missing] = labels[ordinals - first]
+        return result
+
+    # Метод массива: pd.factorize для NumpyExtensionArray в pandas 2 выдает FutureWarning
+    codes, uniques = array.factorize()
+    labels = np.array([_format_scalar(value, na) for value in uniques] + [na], dtype=object)
+    return labels[codes]
+
+
+def format_period(value, na: str = MISSING_LABEL) -> str:
+    """Подпись одного периода (формат format_periods)"""
+    return _format_scalar(value, na)
+
+
+def ordered_labels(values) -> list:
+    """Подписи уникальных периодов без пропусков в порядке ключей периода"""
+    unique = pd.Series(values, copy=False).dropna().drop_duplicates().sort_values()
+    return list(dict.fromkeys(format_periods(unique)))
+
+
+def label_categories(values, na: str = MISSING_LABEL) -> pd.Categorical:
+    """
+    Подписи периодов как упорядоченные категории
+
+    Группировка и сортировка по такой колонке идут в порядке периодов,
+    а не строк подписей ("Август 2025" после "Июль 2025").
+    """
+    labels = format_periods(values, na=na)
+    return pd.Categorical(labels, categories=ordered_labels(values) + ([na] if (labels == na).any() else []),
+                          ordered=True)
+
+
+def parse_month_label(label: str) -> Optional[pd.Period]:
+    """Месяц по подписи "Январь 2025" (None, если подпись не разобрана)"""
+    parts = str(label).split()
+    if len(parts) != 2 or parts[0] not in MONTH_NUMBERS or not parts[1].isdigit():
+        return None
+    return pd.Period(year=int(parts[1]), month=MONTH_NUMBERS[parts[0]], freq='M')
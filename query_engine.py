@@ -0,0 +1,419 @@
+"""
+Движок фильтрации и агрегации для дашбордов
+
+Нормализованная таблица регистрируется один раз на процесс: колонки
+для фильтров (строка после strip), числовые меры, признак отклонения
+и периоды (целые ординалы) вычисляются при первом обращении и
+переиспользуются на каждом перезапуске скрипта Streamlit.
+
+Фильтры по значению отвечают по спискам строк: для каждой колонки
+фильтра значения кодируются целыми числами один раз, а для каждого
+значения хранятся позиции его строк. Выборка по нескольким фильтрам
+начинается с самого короткого списка и сужается по кодам остальных
+колонок, без сравнения строк.
+
+Группировка выполняется во встроенной DuckDB, если она установлена и
+таблица достаточно большая, иначе в pandas. Оба пути работают с одной
+и той же проекцией и возвращают одинаковый результат.
+"""
+import threading
+import weakref
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    # Без duckdb все запросы выполняются в pandas
+    DUCKDB_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+# На небольших таблицах накладные расходы DuckDB больше выигрыша
+DUCKDB_MIN_ROWS = 200_000
+
+# Производные меры: имя -> (уменьшаемое, вычитаемое), считаются построчно до суммирования
+DERIVED_MEASURES = {
+    'reserve budget': ('budget plan', 'budget fact'),
+}
+
+_registry = {}
+_registry_lock = threading.Lock()
+_local = threading.local()
+
+
+def is_period_column(series: pd.Series) -> bool:
+    """Колонка с периодами pandas (period dtype или объекты Period)"""
+    if isinstance(series.dtype, pd.PeriodDtype):
+        return True
+    if series.dtype == object:
+        sample = series.dropna()
+        return len(sample) > 0 and isinstance(sample.iloc[0], pd.Period)
+    return False
+
+
+class DatasetView:
+    """Проекция набора данных, вычисленная один раз для всех запросов"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df_ref = weakref.ref(df)
+        self.n_rows = len(df)
+        self.columns = tuple(df.columns)
+        self.period_dtypes = {}
+        self._arrays = {}
+        self._arrow = {}
+        self._postings = {}
+        self._lock = threading.RLock()
+
+    def matches(self, df: pd.DataFrame) -> bool:
+        return self.df_ref() is df and len(df) == self.n_rows and tuple(df.columns) == self.columns
+
+    def _frame(self) -> pd.DataFrame:
+        df = self.df_ref()
+        if df is None:
+            raise RuntimeError("Набор данных уже удален")
+        return df
+
+    def array(self, name: str):
+        """
+        Колонка проекции по внутреннему имени
+
+        Имена: 'key:<col>' - строка после strip для фильтров, 'num:<col>' - число,
+        'period:<col>' - ординал периода (Int64), 'raw:<col>' - исходные значения,
+        'deviation' - признак отклонения, 'pos' - позиция строки
+        """
+        with self._lock:
+            if name not in self._arrays:
+                self._arrays[name] = self._compute(name)
+            return self._arrays[name]
+
+    def arrow(self, name: str):
+        with self._lock:
+            cached = self._arrow.get(name)
+        if cached is None:
+            cached = pa.array(self.array(name), from_pandas=True)
+            if isinstance(cached, pa.ChunkedArray):
+                # После pd.concat строковые колонки состоят из множества мелких кусков
+                cached = cached.combine_chunks()
+            with self._lock:
+                self._arrow[name] = cached
+        return cached
+
+    def postings(self, name: str) -> 'Postings':
+        """Коды значений и списки строк для колонки фильтра ('key:<col>' или 'period:<col>')"""
+        with self._lock:
+            if name not in self._postings:
+                self._postings[name] = Postings(self.array(name))
+            return self._postings[name]
+
+    def _compute(self, name: str):
+        df = self._frame()
+        kind, _, column = name.partition(':')
+        if kind == 'pos':
+            return np.arange(len(df), dtype=np.int64)
+        if kind == 'deviation':
+            deviation = df['deviation']
+            # Те же форматы, что и в дашбордах: True, 1, 'True', '1'
+            mask = (
+                (deviation == True) |
+                (deviation == 1) |
+                (deviation.astype(str).str.lower() == 'true') |
+                (deviation.astype(str).str.strip() == '1')
+            )
+            return mask.to_numpy(dtype=bool)
+        if kind == 'key':
+            series = df[column]
+            if isinstance(series.dtype, pd.CategoricalDtype) and len(series.cat.categories):
+                # strip выполняется один раз на значение, строки собираются по кодам
+                stripped = series.cat.categories.astype(str).str.strip()
+                codes = series.cat.codes.to_numpy()
+                keys = pd.Series(stripped.take(np.maximum(codes, 0)), index=series.index)
+                return keys.where(codes >= 0).array
+            return series.astype(str).str.strip().array
+        if kind == 'num':
+            if column in DERIVED_MEASURES:
+                minuend, subtrahend = DERIVED_MEASURES[column]
+                return self.array(f'num:{minuend}') - self.array(f'num:{subtrahend}')
+            return pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64)
+        if kind == 'period':
+            series = df[column]
+            if isinstance(series.dtype, pd.PeriodDtype):
+                periods = pd.PeriodIndex(series)
+            else:
+                freq = series.dropna().iloc[0].freq
+                periods = pd.PeriodIndex(series, freq=freq)
+            self.period_dtypes[column] = periods.dtype
+            missing = np.asarray(periods.isna())
+            return pd.arrays.IntegerArray(np.where(missing, 0, periods.asi8), missing)
+        if kind == 'raw':
+            return df[column].array
+        raise KeyError(name)
+
+
+class Postings:
+    """
+    Коды значений колонки фильтра и позиции строк по каждому значению
+
+    Позиции одного значения идут по возрастанию (устойчивая сортировка
+    кодов), поэтому результат выборки не нужно сортировать.
+    """
+
+    def __init__(self, values):
+        # Метод массива: pd.factorize в pandas 2.x предупреждает о NumpyExtensionArray
+        codes, uniques = values.factorize()
+        self.codes = codes.astype(np.int32)
+        self.code_of = {value: code for code, value in enumerate(uniques.tolist())}
+        self._order = None
+        self._starts = None
+        self._lock = threading.Lock()
+
+    def code(self, value) -> int:
+        """Код значения (-1, если значения нет в колонке)"""
+        return self.code_of.get(value, -1)
+
+    def rows(self, code: int) -> np.ndarray:
+        """Позиции строк со значением code (по возрастанию)"""
+        if code < 0:
+            return np.empty(0, dtype=np.int64)
+        with self._lock:
+            if self._order is None:
+                valid = self.codes >= 0
+                self._order = np.flatnonzero(valid)[np.argsort(self.codes[valid], kind='stable')]
+                counts = np.bincount(self.codes[valid], minlength=len(self.code_of))
+                self._starts = np.concatenate(([0], np.cumsum(counts)))
+        return self._order[self._starts[code]:self._starts[code + 1]]
+
+
+def get_view(df: pd.DataFrame) -> DatasetView:
+    """
+    Возвращает зарегистрированную проекцию набора данных
+
+    Набор идентифицируется самим объектом DataFrame из session_state:
+    пока он жив, проекция переиспользуется между перезапусками.
+    """
+    key = id(df)
+    with _registry_lock:
+        view = _registry.get(key)
+        if view is not None and view.matches(df):
+            return view
+        view = DatasetView(df)
+        _registry[key] = view
+    weakref.finalize(df, _unregister, key, view)
+    return view
+
+
+def _unregister(key, view):
+    with _registry_lock:
+        if _registry.get(key) is view:
+            del _registry[key]
+
+
+def _use_duckdb(view: DatasetView) -> bool:
+    return DUCKDB_AVAILABLE and ARROW_AVAILABLE and view.n_rows >= DUCKDB_MIN_ROWS
+
+
+def _connection():
+    """Отдельное in-memory соединение DuckDB на поток"""
+    con = getattr(_local, 'con', None)
+    if con is None:
+        con = duckdb.connect()
+        _local.con = con
+    return con
+
+
+def _filter_terms(view: DatasetView, df: pd.DataFrame, filters: Optional[dict], deviation_only: bool):
+    """
+    Условия фильтра в виде (внутреннее имя колонки, значение)
+
+    Фильтры по отсутствующим колонкам пропускаются, как и в дашбордах.
+    """
+    terms = []
+    for column, value in (filters or {}).items():
+        if column not in df.columns:
+            continue
+        if isinstance(value, pd.Period):
+            name = f'period:{column}'
+            view.array(name)
+            terms.append((name, int(value.ordinal)))
+        else:
+            terms.append((f'key:{column}', str(value).strip()))
+    if deviation_only and 'deviation' in df.columns:
+        terms.append(('deviation', True))
+    return terms
+
+
+def _term_positions(view: DatasetView, terms: list) -> np.ndarray:
+    """
+    Позиции строк, удовлетворяющих всем условиям (по возрастанию)
+
+    Берется самый короткий список строк среди условий по значению, затем
+    он сужается по кодам остальных колонок и признаку отклонения.
+    """
+    if not terms:
+        return view.array('pos')
+    coded = []
+    deviation = False
+    for name, value in terms:
+        if name == 'deviation':
+            deviation = True
+            continue
+        postings = view.postings(name)
+        coded.append((postings, postings.code(value)))
+    if any(code < 0 for _, code in coded):
+        return np.empty(0, dtype=np.int64)
+
+    if coded:
+        coded.sort(key=lambda item: len(item[0].rows(item[1])))
+        first, first_code = coded[0]
+        positions = first.rows(first_code)
+        for postings, code in coded[1:]:
+            positions = positions[postings.codes[positions] == code]
+    else:
+        positions = view.array('pos')
+    if deviation:
+        positions = positions[view.array('deviation')[positions]]
+    return positions
+
+
+def _duckdb_query(view: DatasetView, names: list, terms: list, select: str,
+                  conditions: tuple = (), tail: str = ''):
+    """
+    Выполняет запрос к проекции через Arrow без копирования данных
+
+    В select, conditions и tail колонки из names подставляются как {a0}, {a1}, ...
+    """
+    aliases = {}
+    for name in names + [name for name, _ in terms]:
+        aliases.setdefault(name, f'c{len(aliases)}')
+    table = pa.table({alias: view.arrow(name) for name, alias in aliases.items()})
+
+    where = []
+    params = []
+    for name, value in terms:
+        if name == 'deviation':
+            where.append(aliases[name])
+        else:
+            where.append(f'{aliases[name]} = ?')
+            params.append(value)
+    placeholders = {f'a{i}': aliases[name] for i, name in enumerate(names)}
+    where += [condition.format(**placeholders) for condition in conditions]
+    sql = select.format(**placeholders) + ' FROM view_table'
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += tail.format(**placeholders)
+
+    con = _connection()
+    con.register('view_table', table)
+    try:
+        result = con.execute(sql, params)
+        # to_arrow_table появился в новых версиях DuckDB, fetch_arrow_table устарел
+        fetch = getattr(result, 'to_arrow_table', None) or result.fetch_arrow_table
+        return fetch()
+    finally:
+        con.unregister('view_table')
+
+
+def filter_positions(df: pd.DataFrame, filters: Optional[dict] = None, deviation_only: bool = False) -> np.ndarray:
+    """
+    Позиции строк, прошедших фильтры
+
+    Args:
+        df: Нормализованный DataFrame
+        filters: {колонка: значение}; строки сравниваются после strip, pd.Period - по периоду
+        deviation_only: Оставить только задачи с отклонением
+
+    Returns:
+        Массив позиций строк (по возрастанию)
+    """
+    view = get_view(df)
+    return _term_positions(view, _filter_terms(view, df, filters, deviation_only))
+
+
+def filter_frame(df: pd.DataFrame, filters: Optional[dict] = None, deviation_only: bool = False) -> pd.DataFrame:
+    """Копия строк DataFrame, прошедших фильтры (см. filter_positions)"""
+    return df.iloc[filter_positions(df, filters, deviation_only)]
+
+
+def aggregate(df: pd.DataFrame, group_by: list, filters: Optional[dict] = None,
+              sums: tuple = (), count_name: Optional[str] = None,
+              deviation_only: bool = False) -> pd.DataFrame:
+    """
+    Фильтр + группировка с суммами и количеством строк
+
+    Результат совпадает с filtered.groupby(group_by).agg(...).reset_index():
+    строки с пропуском в ключах отбрасываются, группы отсортированы по ключам,
+    сумма пустой группы равна 0.
+
+    Args:
+        df: Нормализованный DataFrame
+        group_by: Колонки группировки (периоды группируются по периоду, остальные по значению)
+        filters: Фильтры, как в filter_positions
+        sums: Колонки для суммирования (приводятся к числу; допускаются DERIVED_MEASURES)
+        count_name: Имя колонки с количеством строк в группе (None - не считать)
+        deviation_only: Оставить только задачи с отклонением
+
+    Returns:
+        DataFrame: ключи группировки, затем суммы, затем количество
+    """
+    columns = list(group_by) + list(sums) + ([count_name] if count_name else [])
+    if any(column not in df.columns for column in group_by):
+        return pd.DataFrame(columns=columns)
+
+    view = get_view(df)
+    terms = _filter_terms(view, df, filters, deviation_only)
+    key_names = [f'period:{c}' if is_period_column(df[c]) else f'raw:{c}' for c in group_by]
+    sum_names = [f'num:{c}' for c in sums]
+
+    if _use_duckdb(view):
+        n_keys = len(key_names)
+        keys_sql = ', '.join(f'{{a{i}}}' for i in range(n_keys))
+        select = ['SELECT ' + keys_sql]
+        select += [f'COALESCE(SUM({{a{n_keys + i}}}), 0)' for i in range(len(sum_names))]
+        if count_name:
+            select.append('COUNT(*)')
+        # Ключи с пропусками отбрасываются, как в groupby(dropna=True)
+        not_null = tuple(f'{{a{i}}} IS NOT NULL' for i in range(n_keys))
+        table = _duckdb_query(
+            view, key_names + sum_names, terms, ', '.join(select), not_null,
+            f' GROUP BY {keys_sql} ORDER BY {keys_sql}'
+        )
+        result = table.to_pandas()
+        result.columns = columns
+    else:
+        positions = _term_positions(view, terms)
+        data = {column: view.array(name)[positions] for column, name in zip(group_by, key_names)}
+        for column, name in zip(sums, sum_names):
+            data[column] = view.array(name)[positions]
+        frame = pd.DataFrame(data)
+        # observed=True: категориальные ключи дают только встречающиеся группы,
+        # как GROUP BY в DuckDB (в pandas 2.x по умолчанию observed=False)
+        grouped = frame.groupby(list(group_by), sort=True, observed=True)
+        if sums:
+            result = grouped[list(sums)].sum()
+            if count_name:
+                result[count_name] = grouped.size()
+        else:
+            result = grouped.size().to_frame(count_name or 'size')
+        result = result.reset_index()
+        if not count_name and not sums:
+            result = result[list(group_by)]
+
+    # Ключи возвращаются в исходных типах (периоды из ординалов, строки в dtype исходной колонки)
+    for column, name in zip(group_by, key_names):
+        if name.startswith('period:'):
+            ordinals = pd.to_numeric(result[column]).to_numpy(dtype=np.int64)
+            result[column] = pd.PeriodIndex.from_ordinals(ordinals, freq=view.period_dtypes[column].freq)
+        else:
+            result[column] = result[column].astype(df[column].dtype)
+    for column in sums:
+        result[column] = result[column].astype(np.float64)
+    if count_name:
+        result[count_name] = result[count_name].astype(np.int64)
+    return result
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""Regression test: vectorized calculate_approved_budget vs the original loop"""
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+from budget_engine import (
+    BUDGET_RULES, calculate_approved_budget, calculate_approved_budget_for_rules,
+    compile_rule, rule_weights, IncrementalApprovedBudget
+)
+
+
+def calculate_approved_budget_reference(df, rule_name='default'):
+    """
+    Исходный (построчный) расчет утвержденного бюджета.
+
+    Перенесен из budget_engine как эталон для проверки calculate_approved_budget
+    и замеров (benchmarks.py approved_budget).
+
+    Логика расчета:
+    1. Группируем задачи по проекту/разделу/задаче
+    2. Для каждой группы находим все месяцы этапа (от минимальной даты начала до максимальной даты окончания)
+    3. Для каждого месяца находим все задачи, активные в этом месяце
+    4. Суммируем плановый бюджет активных задач - это 100% для месяца
+    5. Распределяем эту сумму по правилу между месяцами этапа
+
+    Правила распределения:
+    - default: 50% - первый месяц, 45% - равномерно по промежуточным месяцам, 5% - последний месяц
+
+    Args:
+        df: DataFrame с данными проектов
+        rule_name: название правила из справочника
+
+    Returns:
+        DataFrame с распределением утвержденного бюджета по месяцам
+    """
+    budget_rules = BUDGET_RULES
+
+    # Получаем правило
+    if rule_name not in budget_rules:
+        rule_name = 'default'
+    rule = budget_rules[rule_name]
+
+    # Проверяем наличие необходимых колонок
+    required_cols = ['budget plan', 'plan start', 'plan end']
+    missing_cols = [col for col in required_cols if col not in df.columns]
+    if missing_cols:
+        return pd.DataFrame(), f"Отсутствуют необходимые колонки: {', '.join(missing_cols)}"
+
+    # Копируем данные для работы
+    work_df = df.copy()
+
+    # Конвертируем даты
+    work_df['plan start'] = pd.to_datetime(work_df['plan start'], errors='coerce', dayfirst=True)
+    work_df['plan end'] = pd.to_datetime(work_df['plan end'], errors='coerce', dayfirst=True)
+    work_df['budget plan'] = pd.to_numeric(work_df['budget plan'], errors='coerce')
+
+    # Фильтруем строки с валидными данными
+    valid_mask = (
+        work_df['plan start'].notna() &
+        work_df['plan end'].notna() &
+        work_df['budget plan'].notna() &
+        (work_df['budget plan'] > 0) &
+        (work_df['plan start'] <= work_df['plan end'])
+    )
+    work_df = work_df[valid_mask].copy()
+
+    if work_df.empty:
+        return pd.DataFrame(), "Нет данных с валидными датами и бюджетом"
+
+    # Определяем группировку: группируем по комбинации project + section + task
+    # Это позволяет правильно обрабатывать случаи, когда выбраны разные уровни фильтрации
+    grouping_cols = []
+    if 'project name' in work_df.columns:
+        grouping_cols.append('project name')
+    if 'section' in work_df.columns:
+        grouping_cols.append('section')
+    if 'task name' in work_df.columns:
+        grouping_cols.append('task name')
+
+    # Если нет колонок для группировки, обрабатываем все задачи вместе
+    if not grouping_cols:
+        # Создаем фиктивную группу для всех задач
+        work_df['_group'] = 'all'
+        grouping_cols = ['_group']
+
+    # Список для хранения результатов
+    approved_budget_rows = []
+
+    # Группируем задачи
+    if grouping_cols:
+        grouped = work_df.groupby(grouping_cols, observed=True)
+    else:
+        # Если нет колонок для группировки, создаем одну группу
+        grouped = [('all', work_df)]
+
+    for group_key, group_df in grouped:
+        # Находим минимальную дату начала и максимальную дату окончания для группы
+        min_start = group_df['plan start'].min()
+        max_end = group_df['plan end'].max()
+
+        if pd.isna(min_start) or pd.isna(max_end):
+            continue
+
+        # Генерируем все месяцы этапа
+        current_date = min_start.replace(day=1)
+        end_month = max_end.replace(day=1)
+
+        months = []
+        while current_date <= end_month:
+            months.append(current_date.to_period('M'))
+            # Переходим к следующему месяцу
+            if current_date.month == 12:
+                current_date = current_date.replace(year=current_date.year + 1, month=1)
+            else:
+                current_date = current_date.replace(month=current_date.month + 1)
+
+        if len(months) == 0:
+            continue
+
+        # Для каждого месяца находим активные задачи и суммируем их плановый бюджет
+        monthly_budgets = {}
+        for month in months:
+            month_start = month.start_time
+            month_end = month.end_time
+
+            # Находим задачи, активные в этом месяце
+            active_tasks = group_df[
+                (group_df['plan start'] <= month_end) &
+                (group_df['plan end'] >= month_start)
+            ]
+
+            # Суммируем плановый бюджет активных задач - это 100% для месяца
+            total_budget = active_tasks['budget plan'].sum()
+            monthly_budgets[month] = total_budget
+
+        # Рассчитываем распределение бюджета по правилу
+        num_months = len(months)
+
+        if num_months == 1:
+            # Если только один месяц, весь бюджет идет туда
+            first_month_percent = 1.0
+            middle_months_percent = 0.0
+            last_month_percent = 0.0
+        elif num_months == 2:
+            # Если два месяца: 50% на первый, 50% на последний
+            first_month_percent = rule['first_month_percent']
+            middle_months_percent = 0.0
+            last_month_percent = rule['middle_months_percent'] + rule['last_month_percent']
+        else:
+            # Если больше двух месяцев: 50% на первый, 45% равномерно на промежуточные, 5% на последний
+            first_month_percent = rule['first_month_percent']
+            last_month_percent = rule['last_month_percent']
+            middle_months_percent = rule['middle_months_percent'] / (num_months - 2)
+
+        # Распределяем бюджет по месяцам
+        for i, month in enumerate(months):
+            # Берем бюджет для этого месяца (100%)
+            month_total_budget = monthly_budgets.get(month, 0)
+
+            if month_total_budget == 0:
+                continue
+
+            # Определяем процент для этого месяца
+            if i == 0:
+                # Первый месяц
+                month_percent = first_month_percent
+            elif i == len(months) - 1:
+                # Последний месяц
+                month_percent = last_month_percent
+            else:
+                # Промежуточные месяцы
+                month_percent = middle_months_percent
+
+            # Рассчитываем утвержденный бюджет для месяца
+            approved_budget = month_total_budget * month_percent
+
+            # Получаем значения группировки
+            group_dict = {}
+            if grouping_cols:
+                if isinstance(group_key, tuple):
+                    group_dict = dict(zip(grouping_cols, group_key))
+                elif len(grouping_cols) == 1:
+                    group_dict = {grouping_cols[0]: group_key}
+                else:
+                    # Если group_key не кортеж и колонок несколько, возможно это одна группа
+                    for col in grouping_cols:
+                        if col in group_df.columns:
+                            # Берем первое значение из группы
+                            group_dict[col] = group_df[col].iloc[0] if len(group_df) > 0 else ''
+
+            # Создаем строку с данными
+            approved_row = {
+                'month': month,
+                'approved budget': approved_budget,
+                'budget plan': month_total_budget,  # Плановый бюджет для месяца (100%)
+                'rule_name': rule_name
+            }
+
+            # Добавляем значения группировки (исключаем фиктивную колонку _group)
+            for col in grouping_cols:
+                if col != '_group':
+                    approved_row[col] = group_dict.get(col, '')
+
+            approved_budget_rows.append(approved_row)
+
+    # Создаем DataFrame из результатов
+    if not approved_budget_rows:
+        return pd.DataFrame(), "Нет данных для расчета утвержденного бюджета"
+
+    approved_budget_df = pd.DataFrame(approved_budget_rows)
+
+    return approved_budget_df, None
+
+
+def make_tasks(n_tasks, seed=0):
+    """Random tasks: several projects/sections, overlapping intervals, gaps and invalid rows"""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 900, n_tasks), unit='D')
+    end = start + pd.to_timedelta(rng.integers(-10, 400, n_tasks), unit='D')
+    budget = rng.integers(0, 500, n_tasks) * 1000.0
+    budget[rng.random(n_tasks) < 0.05] = np.nan
+    df = pd.DataFrame({
+        'project name': rng.choice(['Проект А', 'Проект Б', 'Проект В'], n_tasks),
+        'section': rng.choice(['Раздел 1', 'Раздел 2', None], n_tasks),
+        'task name': rng.choice([f'Задача {i}' for i in range(40)], n_tasks),
+        'plan start': start,
+        'plan end': end,
+        'budget plan': budget,
+    })
+    df.loc[rng.random(n_tasks) < 0.03, 'plan end'] = pd.NaT
+    return df
+
+
+def assert_same(df, rule_name='default'):
+    expected, expected_error = calculate_approved_budget_reference(df, rule_name)
+    result, error = calculate_approved_budget(df, rule_name)
+    assert error == expected_error, (error, expected_error)
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+
+
+def test_random_tasks():
+    for seed in range(3):
+        assert_same(make_tasks(1000, seed))
+
+
+def test_fractional_budgets():
+    df = make_tasks(1000, seed=7)
+    df['budget plan'] = df['budget plan'] / 7.3
+    assert_same(df)
+
+
+def test_single_and_two_month_stages():
+    df = pd.DataFrame({
+        'project name': ['П1', 'П1', 'П2', 'П3', 'П3'],
+        'task name': ['Т1', 'Т1', 'Т2', 'Т3', 'Т3'],
+        'plan start': pd.to_datetime(['2025-01-05', '2025-01-20', '2025-03-01', '2025-05-01', '2025-08-01']),
+        'plan end': pd.to_datetime(['2025-01-10', '2025-01-31', '2025-04-30', '2025-05-31', '2025-09-15']),
+        'budget plan': [100.0, 50.0, 300.0, 10.0, 20.0],
+    })
+    assert_same(df)
+
+
+def test_without_grouping_columns():
+    assert_same(make_tasks(500)[['plan start', 'plan end', 'budget plan']])
+
+
+def test_missing_columns_and_empty_data():
+    assert_same(make_tasks(10).drop(columns=['plan end']))
+    df = make_tasks(10)
+    df['budget plan'] = 0.0
+    assert_same(df)
+
+
+def test_rule_kernels():
+    assert np.allclose(rule_weights(compile_rule({'kind': 'uniform'}), 4), [0.25] * 4)
+    default_key = compile_rule({'first_month_percent': 0.5, 'middle_months_percent': 0.45,
+                                'last_month_percent': 0.05})
+    assert rule_weights(default_key, 5) is rule_weights(default_key, 5)
+    assert np.isclose(rule_weights(default_key, 5).sum(), 1.0)
+
+
+def test_several_rules_share_one_grid():
+    df = make_tasks(500, seed=3)
+    results = calculate_approved_budget_for_rules(df, ['default', 'uniform'])
+    pd.testing.assert_frame_equal(results['default'][0], calculate_approved_budget_reference(df)[0],
+                                  check_exact=True)
+    uniform = results['uniform'][0]
+    assert (uniform['rule_name'] == 'uniform').all()
+    pd.testing.assert_series_equal(uniform['budget plan'], results['default'][0]['budget plan'])
+
+
+def test_incremental_updates_match_full_recompute():
+    rng = np.random.default_rng(11)
+    df = make_tasks(1500, seed=5)
+    tracker = IncrementalApprovedBudget(df)
+    for step in range(20):
+        df = df.copy()
+        rows = rng.choice(len(df), size=rng.integers(1, 4), replace=False)
+        column = ['plan start', 'plan end', 'budget plan'][step % 3]
+        if column == 'budget plan':
+            df.loc[rows, column] = rng.choice([0.0, np.nan, 12345.0, 5e5])
+        else:
+            df.loc[rows, column] = df.loc[rows, column] + pd.Timedelta(days=int(rng.integers(-60, 60)))
+        result, error = tracker.update(df)
+        expected, expected_error = calculate_approved_budget(df)
+        assert error == expected_error
+        assert tracker.last_changed_groups <= len(rows)
+        pd.testing.assert_frame_equal(result, expected, check_exact=True)
+
+
+def test_incremental_no_changes_and_invalidated_project():
+    df = make_tasks(200, seed=2)
+    tracker = IncrementalApprovedBudget(df)
+    result, _ = tracker.update(df.copy())
+    assert tracker.last_changed_groups == 0
+    df = df.copy()
+    df['budget plan'] = np.nan
+    result, error = tracker.update(df)
+    assert result.empty and error == calculate_approved_budget(df)[1]
+
+
+def test_optimized_frame():
+    # Категориальные ключи группировки после data_loader.optimize_frame: только встречающиеся
+    # группы, тот же порядок и те же суммы, что и для текстовых колонок
+    df = make_tasks(2000, seed=4)
+    optimized = data_loader.optimize_frame(df.copy())
+    assert isinstance(optimized['project name'].dtype, pd.CategoricalDtype)
+    assert isinstance(optimized['section'].dtype, pd.CategoricalDtype)
+    optimized['project name'] = optimized['project name'].cat.add_categories(['Не используется'])
+    assert_same(optimized)
+    expected, _ = calculate_approved_budget(df)
+    result, _ = calculate_approved_budget(optimized)
+    pd.testing.assert_frame_equal(result, expected, check_exact=True, check_dtype=False,
+                                  check_categorical=False)
+
+    tracker = IncrementalApprovedBudget(optimized)
+    changed = optimized.copy()
+    changed.loc[:10, 'budget plan'] = 777.0
+    result, _ = tracker.update(changed)
+    pd.testing.assert_frame_equal(result, calculate_approved_budget(changed)[0], check_exact=True)
+
+
+def test_sample_project_file():
+    with open('sample_project_data_fixed.csv', 'rb') as f:
+        assert_same(data_loader.load_file(f.read(), 'sample_project_data_fixed.csv'))
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"[OK] {name}")
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""Regression test: BudgetCube.slice, cumulative and PrefixSums vs the original groupby and cumsum chains"""
+
+import numpy as np
+import pandas as pd
+
+import budget_cube
+import data_loader
+
+PERIODS = list(budget_cube.PERIOD_LEVELS)
+
+
+def load_sample():
+    with open('sample_project_data_fixed.csv', 'rb') as f:
+        return data_loader.load_file(f.read(), 'sample_project_data_fixed.csv')
+
+
+def sample_with_gaps(adjusted=False):
+    """Пример, размноженный с пропусками в ключах, месяцах без дат и нечисловыми суммами"""
+    df = pd.concat([load_sample()] * 3, ignore_index=True)
+    rng = np.random.default_rng(0)
+    for column in ['project name', 'section', 'block']:
+        df[column] = df[column].cat.add_categories(['Не используется'])
+        df.loc[rng.random(len(df)) < 0.1, column] = np.nan
+    no_month = rng.random(len(df)) < 0.1
+    for period_col in PERIODS:
+        df.loc[no_month, period_col] = pd.NaT
+    df.loc[rng.random(len(df)) < 0.1, 'budget plan'] = None
+    df.loc[rng.random(len(df)) < 0.05, 'budget fact'] = 'нет данных'
+    if adjusted:
+        df['budget adjusted'] = rng.integers(0, 1000, len(df)).astype(float)
+        df.loc[rng.random(len(df)) < 0.1, 'budget adjusted'] = np.nan
+    return df
+
+
+def filter_rows(df, filters):
+    """Исходный фильтр дашбордов: сравнение строк после strip"""
+    for column, value in (filters or {}).items():
+        df = df[df[column].astype(str).str.strip() == str(value).strip()]
+    return df.copy()
+
+
+def numeric_rows(df, filters):
+    filtered = filter_rows(df, filters)
+    filtered['budget plan'] = pd.to_numeric(filtered['budget plan'], errors='coerce')
+    filtered['budget fact'] = pd.to_numeric(filtered['budget fact'], errors='coerce')
+    filtered['reserve budget'] = filtered['budget plan'] - filtered['budget fact']
+    return filtered
+
+
+def old_slice(df, group_by, period_col, filters, measures):
+    """Исходная группировка бюджетных дашбордов по периоду и измерениям"""
+    filtered = numeric_rows(df, filters)
+    keys = ([period_col] if period_col else []) + group_by
+    if not keys:
+        return filtered[measures].sum().astype(np.float64).to_frame().T
+    return filtered.groupby(keys, sort=True, observed=True)[measures].sum().astype(np.float64).reset_index()
+
+
+def frames():
+    return [load_sample(), sample_with_gaps(), sample_with_gaps(adjusted=True)]
+
+
+def filter_cases(df):
+    project = df['project name'].dropna().iloc[0]
+    section = df.loc[df['project name'] == project, 'section'].dropna().iloc[0]
+    return [
+        None,
+        {'project name': project},
+        {'project name': f' {project} '},
+        {'project name': project, 'section': section},
+        {'block': df['block'].dropna().iloc[-1]},
+        {'task name': df['task name'].iloc[0]},
+        {'project name': 'Нет такого'},
+        {'project name': project, 'section': 'Нет такого'},
+    ]
+
+
+def test_slice_matches_groupby():
+    for df in frames():
+        cube = budget_cube.BudgetCube(df)
+        measures = list(cube.measures)
+        for period_col in PERIODS + [None]:
+            for group_by in [[], ['project name'], ['section'], ['project name', 'section']]:
+                for filters in filter_cases(df):
+                    result = cube.slice(group_by, period_col, filters, measures)
+                    expected = old_slice(df, group_by, period_col, filters, measures)
+                    label = f'{period_col} {group_by} {filters}'
+                    if expected.empty:
+                        assert result.empty and list(result.columns) == list(expected.columns), label
+                        continue
+                    pd.testing.assert_frame_equal(result, expected, check_categorical=False, obj=label)
+
+
+def test_slice_keeps_key_dtypes():
+    df = sample_with_gaps()
+    result = budget_cube.get_cube(df).slice(['project name', 'section'], 'plan_quarter')
+    assert result['project name'].dtype == df['project name'].dtype
+    assert result['plan_quarter'].dtype == df['plan_quarter'].dtype
+    # Неиспользуемые категории и пропуски в ключах в результат не попадают
+    assert 'Не используется' not in result['project name'].tolist()
+    assert not result[['plan_quarter', 'project name', 'section']].isna().any().any()
+
+
+def test_month_gaps_are_not_filled():
+    df = load_sample()
+    months = budget_cube.BudgetCube(df).slice([], 'plan_month', measures=['budget plan'])['plan_month']
+    assert months.tolist() == sorted(df['plan_month'].dropna().unique().tolist())
+    assert pd.Period('2025-02', freq='M') not in months.tolist()
+
+
+def test_unsupported_filter_and_registry():
+    df = load_sample()
+    cube = budget_cube.get_cube(df)
+    assert budget_cube.get_cube(df) is cube
+    try:
+        cube.slice(['project name'], filters={'reason of deviation': 'x'})
+    except KeyError:
+        pass
+    else:
+        raise AssertionError('фильтр по колонке вне куба должен вызывать KeyError')
+    df['extra'] = 1
+    assert budget_cube.get_cube(df) is not cube
+
+
+def old_cumulative(df, period_col, filters, measures, start=None):
+    """Исходный накопительный БДДС: группировка по периоду и проекту, сумма по периоду, cumsum"""
+    filtered = numeric_rows(df, filters)
+    by_project = filtered.groupby([period_col, 'project name'], sort=True, observed=True)[measures].sum()
+    by_period = by_project.groupby(level=0).sum().astype(np.float64)
+    if start is not None:
+        by_period = by_period[by_period.index >= start]
+    return by_period.cumsum().reset_index()
+
+
+def test_cumulative_matches_cumsum():
+    for df in frames():
+        cube = budget_cube.BudgetCube(df)
+        measures = list(cube.measures)
+        for period_col in PERIODS:
+            periods = old_cumulative(df, period_col, None, measures)[period_col].tolist()
+            # Начало накопления: первый период, середина, последний, до и после данных
+            starts = [None, periods[0], periods[len(periods) // 2], periods[-1],
+                      periods[0] - 5, periods[-1] + 5]
+            for filters in filter_cases(df):
+                for start in starts:
+                    result = cube.cumulative(period_col, filters, measures, start=start)
+                    expected = old_cumulative(df, period_col, filters, measures, start)
+                    label = f'{period_col} {filters} {start}'
+                    if expected.empty:
+                        assert result.empty and list(result.columns) == list(expected.columns), label
+                        continue
+                    pd.testing.assert_frame_equal(result, expected, obj=label)
+
+
+def test_cumulative_skips_rows_without_project():
+    df = load_sample()
+    df['project name'] = df['project name'].cat.add_categories(['Не используется'])
+    # Единственная строка последнего месяца остается без проекта
+    last_month = df['plan_month'].max()
+    df.loc[df['plan_month'] == last_month, 'project name'] = np.nan
+    result = budget_cube.BudgetCube(df).cumulative('plan_month', measures=['budget plan'])
+    assert last_month not in result['plan_month'].tolist()
+    expected = old_cumulative(df, 'plan_month', None, ['budget plan'])
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_prefix_sums_per_series():
+    df = sample_with_gaps()
+    cube = budget_cube.BudgetCube(df)
+    prefix = cube.prefix_sums()
+    assert cube.prefix_sums() is prefix
+    months = pd.period_range(df['plan_month'].min(), df['plan_month'].max(), freq='M')
+    assert prefix.n_months == len(months)
+    assert prefix.first_month == months[0].ordinal
+    assert (prefix.values[:, 0] == 0).all()
+
+    rows = numeric_rows(df, None)
+    rows = rows[rows['plan_month'].notna()]
+    measures = list(cube.measures)
+    for series in range(len(prefix.values)):
+        codes = {column: prefix.series_codes[column][series] for column in budget_cube.SERIES_DIMENSIONS}
+        mask = pd.Series(True, index=rows.index)
+        for column, code in codes.items():
+            values = cube._values[column]
+            mask &= rows[column].isna() if code < 0 else rows[column] == values[code]
+        # Месяцы без строк повторяют предыдущую сумму
+        by_month = rows[mask].groupby('plan_month')[measures].sum().reindex(months, fill_value=0)
+        expected = by_month.cumsum().to_numpy(dtype=np.float64)
+        np.testing.assert_allclose(prefix.values[series, 1:, :len(measures)], expected, err_msg=str(codes))
+        counts = rows[mask].groupby('plan_month').size().reindex(months, fill_value=0).cumsum()
+        np.testing.assert_array_equal(prefix.values[series, 1:, -1], counts.to_numpy())
+
+
+def test_prefix_sums_totals():
+    df = sample_with_gaps()
+    cube = budget_cube.BudgetCube(df)
+    prefix = cube.prefix_sums()
+    project = df['project name'].dropna().iloc[0]
+    np.testing.assert_allclose(prefix.totals(), prefix.values.sum(axis=0))
+    selected = prefix.totals({'project name': f' {project} '})
+    code = cube._values['project name'].get_loc(project)
+    np.testing.assert_allclose(selected, prefix.values[prefix.series_codes['project name'] == code].sum(axis=0))
+    assert not prefix.totals({'project name': 'Нет такого'}).any()
+    with_project = prefix.totals(required=('project name',))
+    np.testing.assert_allclose(with_project, prefix.values[prefix.series_codes['project name'] >= 0].sum(axis=0))
+
+
+def test_empty_frame():
+    df = load_sample().iloc[:0]
+    cube = budget_cube.BudgetCube(df)
+    assert cube.prefix_sums().n_months == 0
+    result = cube.cumulative('plan_month', measures=['budget plan'])
+    assert result.empty and list(result.columns) == ['plan_month', 'budget plan']
+    assert cube.slice(['project name'], 'plan_month').empty
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"[OK] {name}")
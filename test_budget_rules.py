@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Tests for budget rules stored in report_parameters: save, read back, override, delete and malformed rows"""
+
+import json
+import os
+import tempfile
+
+import auth
+import budget_engine
+import db
+from budget_engine import (
+    BUDGET_RULE_PREFIX, BUDGET_RULES, BUDGET_RULES_REPORT,
+    compile_rule, delete_budget_rule, get_budget_rules, save_budget_rule
+)
+
+
+class TemporaryDatabase:
+    """Переключает базу во временный файл со схемой приложения на время теста"""
+
+    def __enter__(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._saved = db.DB_PATH
+        db.DB_PATH = os.path.join(self._tmp.name, 'users.db')
+        db.migrate(auth.MIGRATIONS)
+        return db.DB_PATH
+
+    def __exit__(self, *exc_info):
+        db.get_pool().close_all()
+        db._pools.pop(db.DB_PATH, None)
+        db.DB_PATH = self._saved
+        self._tmp.cleanup()
+
+
+def insert_raw(rule_name, value):
+    """Записывает значение правила в базу в обход проверки save_budget_rule"""
+    db.execute('INSERT INTO report_parameters (report_name, parameter_key, parameter_value, parameter_type) '
+               "VALUES (?, ?, ?, 'json')", (BUDGET_RULES_REPORT, BUDGET_RULE_PREFIX + rule_name, value))
+
+
+def assert_invalid(spec):
+    try:
+        compile_rule(spec)
+    except ValueError:
+        return
+    raise AssertionError(f'правило должно быть отклонено: {spec!r}')
+
+
+# Правила, которые не должны попадать в справочник
+MALFORMED_RULES = {
+    'missing_share': {'kind': 'first_middle_last', 'first_month_percent': 0.5},
+    'list': [0.5, 0.45, 0.05],
+    'number': 0.5,
+    'null': None,
+    'unknown_kind': {'kind': 'weekly'},
+    'text_share': {'first_month_percent': 'половина', 'middle_months_percent': 0.45, 'last_month_percent': 0.05},
+    'null_share': {'first_month_percent': None, 'middle_months_percent': 0.45, 'last_month_percent': 0.05},
+    'negative_share': {'first_month_percent': 1.5, 'middle_months_percent': -0.55, 'last_month_percent': 0.05},
+    'shares_over_one': {'first_month_percent': 0.6, 'middle_months_percent': 0.45, 'last_month_percent': 0.05},
+    'shares_under_one': {'first_month_percent': 0.5, 'middle_months_percent': 0.4, 'last_month_percent': 0.05},
+    'nan_share': {'first_month_percent': float('nan'), 'middle_months_percent': 0.45, 'last_month_percent': 0.05},
+}
+
+
+def test_compile_rule_validation():
+    for spec in MALFORMED_RULES.values():
+        assert_invalid(spec)
+    for spec in BUDGET_RULES.values():
+        compile_rule(spec)
+    # Округление долей из формы не мешает правилу
+    assert compile_rule({'first_month_percent': 0.1, 'middle_months_percent': 0.2,
+                         'last_month_percent': 0.7}) == ('first_middle_last', 0.1, 0.2, 0.7)
+    assert compile_rule({'kind': 'uniform', 'description': ''}) == ('uniform',)
+
+
+def test_without_database():
+    with tempfile.TemporaryDirectory() as tmp:
+        saved = db.DB_PATH
+        db.DB_PATH = os.path.join(tmp, 'users.db')
+        try:
+            assert get_budget_rules() == BUDGET_RULES
+            # Чтение справочника не создает базу
+            assert not os.path.exists(db.DB_PATH)
+        finally:
+            db.DB_PATH = saved
+
+
+def test_save_read_override_delete():
+    rule = {'kind': 'first_middle_last', 'first_month_percent': 0.3, 'middle_months_percent': 0.6,
+            'last_month_percent': 0.1, 'description': '30/60/10'}
+    override = {'kind': 'first_middle_last', 'first_month_percent': 0.4, 'middle_months_percent': 0.4,
+                'last_month_percent': 0.2, 'description': 'Новое правило по умолчанию'}
+    with TemporaryDatabase():
+        assert get_budget_rules() == BUDGET_RULES
+        assert save_budget_rule('thirds', rule, updated_by='analyst')
+        assert get_budget_rules() == {**BUDGET_RULES, 'thirds': rule}
+        row = db.fetch_one('SELECT parameter_type, description, updated_by FROM report_parameters '
+                           'WHERE report_name = ? AND parameter_key = ?',
+                           (BUDGET_RULES_REPORT, BUDGET_RULE_PREFIX + 'thirds'))
+        assert row == ('json', '30/60/10', 'analyst')
+
+        # Повторное сохранение обновляет строку, а не добавляет новую
+        rule = {**rule, 'first_month_percent': 0.2, 'middle_months_percent': 0.7}
+        assert save_budget_rule('thirds', rule)
+        assert get_budget_rules()['thirds'] == rule
+        assert db.fetch_one('SELECT COUNT(*) FROM report_parameters')[0] == 1
+
+        # Правило из базы перекрывает встроенное, удаление возвращает встроенное
+        assert save_budget_rule('default', override)
+        assert get_budget_rules()['default'] == override
+        assert budget_engine.BUDGET_RULES['default']['first_month_percent'] == 0.50
+        assert delete_budget_rule('default')
+        assert get_budget_rules()['default'] == BUDGET_RULES['default']
+
+        assert delete_budget_rule('thirds')
+        assert get_budget_rules() == BUDGET_RULES
+        # Удаление отсутствующего правила не является ошибкой
+        assert delete_budget_rule('thirds')
+
+
+def test_save_rejects_malformed_rule():
+    with TemporaryDatabase():
+        for spec in MALFORMED_RULES.values():
+            try:
+                save_budget_rule('broken', spec)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError(f'правило должно быть отклонено: {spec!r}')
+        assert db.fetch_one('SELECT COUNT(*) FROM report_parameters')[0] == 0
+
+
+def test_malformed_rows_are_skipped():
+    valid = {'kind': 'uniform', 'description': 'Равномерно'}
+    with TemporaryDatabase():
+        for rule_name, spec in MALFORMED_RULES.items():
+            insert_raw(rule_name, json.dumps(spec))
+        insert_raw('not_json', '{first_month_percent: 0.5')
+        insert_raw('empty', '')
+        # Некорректная строка не перекрывает встроенное правило
+        insert_raw('default', json.dumps(MALFORMED_RULES['missing_share']))
+        insert_raw('valid', json.dumps(valid, ensure_ascii=False))
+        assert get_budget_rules() == {**BUDGET_RULES, 'valid': valid}
+
+
+def test_missing_table_keeps_builtin_rules():
+    with tempfile.TemporaryDirectory() as tmp:
+        saved = db.DB_PATH
+        db.DB_PATH = os.path.join(tmp, 'users.db')
+        try:
+            db.execute('CREATE TABLE unrelated (id INTEGER)')
+            assert get_budget_rules() == BUDGET_RULES
+            assert not save_budget_rule('thirds', {'kind': 'uniform'})
+        finally:
+            db.get_pool().close_all()
+            db._pools.pop(db.DB_PATH, None)
+            db.DB_PATH = saved
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"[OK] {name}")
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Tests for chart_window: page bounds, empty and short data, totals kept by pages and section/block summaries"""
+
+import pandas as pd
+
+import chart_window
+import data_loader
+import gantt_engine
+
+
+def load_sample():
+    with open('sample_project_data_fixed.csv', 'rb') as f:
+        return data_loader.load_file(f.read(), 'sample_project_data_fixed.csv')
+
+
+def long_sample(copies=6):
+    """Пример с задачами, размноженными под разными именами (больше MAX_CHART_ROWS задач)"""
+    parts = []
+    for copy in range(copies):
+        part = load_sample()
+        part['task name'] = part['task name'].astype(str) + f' #{copy}'
+        part['base end'] = part['base end'] + pd.Timedelta(days=copy)
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+def detail_deviations(df, level=None):
+    """Группировка детализации отклонений из dashboards/deviation_by_tasks.py"""
+    keys = ['section', 'task name'] if level is None else [level]
+    grouped = df.groupby(keys, observed=True).agg({'deviation in days': 'sum'}).reset_index()
+    return grouped.sort_values('deviation in days', ascending=False)
+
+
+def all_pages(n_items, page_size):
+    return [chart_window.page_bounds(page, n_items, page_size)
+            for page in range(chart_window.page_count(n_items, page_size))]
+
+
+def test_page_bounds_cover_all_items():
+    for page_size in [1, 7, 100]:
+        for n_items in [1, page_size - 1, page_size, page_size + 1, 5 * page_size, 5 * page_size + 3]:
+            if n_items < 1:
+                continue
+            pages = all_pages(n_items, page_size)
+            assert len(pages) == -(-n_items // page_size), (n_items, page_size)
+            # Страницы идут подряд, без пропусков и наложений, и не длиннее page_size
+            assert pages[0][0] == 0 and pages[-1][1] == n_items
+            assert all(end == next_start for (_, end), (next_start, _) in zip(pages, pages[1:]))
+            assert all(0 < end - start <= page_size for start, end in pages)
+            # Номер страницы вне диапазона приводится к первой / последней
+            assert chart_window.page_bounds(-1, n_items, page_size) == pages[0]
+            assert chart_window.page_bounds(len(pages) + 5, n_items, page_size) == pages[-1]
+    assert chart_window.page_bounds(2, 250) == (200, 250)
+    assert chart_window.page_count(250) == 3
+
+
+def test_empty_data():
+    assert chart_window.page_count(0) == 1
+    assert chart_window.page_bounds(0, 0) == (0, 0)
+    assert chart_window.page_bounds(3, 0) == (0, 0)
+    window = chart_window.top_window(pd.Series([], dtype=object), pd.Series([], dtype=float), 0)
+    assert len(window) == 0
+
+    empty = load_sample().iloc[:0]
+    schedule = gantt_engine.Schedule(empty, per_project=True)
+    assert schedule.tasks.empty and schedule.bars.empty
+    for level in [None, 'section', 'block']:
+        assert schedule.n_items(level) == 0
+    assert detail_deviations(empty).empty
+
+    # Задачи без дат дают пустой график и на уровне сводки
+    no_dates = load_sample().assign(**{col: pd.NaT for col in gantt_engine.DATE_COLUMNS})
+    schedule = gantt_engine.Schedule(no_dates, per_project=True)
+    assert schedule.n_filtered == len(no_dates)
+    assert schedule.n_items() == 0 and schedule.n_items('section') == 0
+
+
+def test_window_larger_than_data():
+    df = load_sample()
+    schedule = gantt_engine.Schedule(df, per_project=True)
+    bars = schedule.bars
+    n_items = schedule.n_items()
+    assert n_items < chart_window.MAX_CHART_ROWS
+    assert chart_window.page_count(n_items) == 1
+    assert chart_window.page_bounds(0, n_items) == (0, n_items)
+    assert chart_window.page_bounds(4, n_items) == (0, n_items)
+
+    window = chart_window.top_window(bars['Задача'], bars['Отклонение'], 0)
+    assert sorted(window) == sorted(bars['Задача'].unique())
+    # Единственная страница - та же фигура, что и без окна
+    full, paged = schedule.figure('График'), schedule.figure('График', page=0)
+    assert [(trace.name, list(trace.y), list(trace.x)) for trace in paged.data] == \
+        [(trace.name, list(trace.y), list(trace.x)) for trace in full.data]
+    assert paged.layout.yaxis.categoryarray == full.layout.yaxis.categoryarray
+
+
+def test_top_window_ranks_by_max_score():
+    keys = pd.Series(['a', 'b', 'c', 'a', 'd', 'e', 'c'])
+    scores = pd.Series([1, 5, 2, 7, 5, 0, 3])
+    # a=7, b=5, d=5 (при равенстве - порядок появления), c=3, e=0
+    assert chart_window.top_window(keys, scores, 0, page_size=2).tolist() == ['a', 'b']
+    assert chart_window.top_window(keys, scores, 1, page_size=2).tolist() == ['d', 'c']
+    assert chart_window.top_window(keys, scores, 2, page_size=2).tolist() == ['e']
+    assert chart_window.top_window(keys, scores, 9, page_size=2).tolist() == ['e']
+    assert chart_window.top_window(keys, scores, 0, page_size=10).tolist() == ['a', 'b', 'd', 'c', 'e']
+
+
+def test_pages_keep_all_tasks():
+    schedule = gantt_engine.Schedule(long_sample(), per_project=True)
+    bars = schedule.bars
+    n_items = schedule.n_items()
+    assert n_items > 2 * chart_window.MAX_CHART_ROWS
+    best = bars.groupby('Задача')['Отклонение'].max()
+    shown = []
+    deviations = []
+    for page in range(chart_window.page_count(n_items)):
+        fig = schedule.figure('График', level=None, page=page)
+        tasks = list(fig.layout.yaxis.categoryarray)
+        assert 0 < len(tasks) <= chart_window.MAX_CHART_ROWS
+        window = chart_window.top_window(bars['Задача'], bars['Отклонение'], page)
+        assert sorted(tasks) == sorted(window)
+        shown.extend(tasks)
+        deviations.extend(best[window].tolist())
+        page_bars = bars[bars['Задача'].isin(tasks)]
+        # На странице все полосы ее задач (и план, и факт)
+        assert sum(len(trace.y) for trace in fig.data) == len(page_bars)
+    assert sorted(shown) == sorted(bars['Задача'].unique())
+    # Страницы идут по убыванию отклонения
+    assert deviations == sorted(deviations, reverse=True)
+    assert sum(deviations) == best.sum()
+
+
+def project_totals(tasks):
+    """Ранние начала, поздние окончания и наибольшее отклонение по проектам"""
+    by_project = tasks.groupby('project name', observed=True)
+    return by_project.agg({'plan start': 'min', 'base start': 'min', 'plan end': 'max', 'base end': 'max',
+                           'total_diff_days': 'max'})
+
+
+def test_gantt_summary_keeps_totals():
+    df = long_sample()
+    schedule = gantt_engine.Schedule(df, per_project=True)
+    tasks = schedule.tasks
+    for level in ['section', 'block']:
+        summary = gantt_engine.aggregate_tasks(tasks, level)
+        assert schedule.n_items(level) == tasks.groupby(['project name', level], observed=True).ngroups
+        assert schedule.n_items(level) < chart_window.MAX_CHART_ROWS
+        # Сроки проекта и наибольшее отклонение после сводки не меняются
+        pd.testing.assert_frame_equal(project_totals(summary), project_totals(tasks), obj=level)
+        for _, row in summary.iterrows():
+            group = tasks[(tasks['project name'] == row['project name']) & (tasks[level] == row[level])]
+            assert row['plan start'] == group['plan start'].min()
+            assert row['base end'] == group['base end'].max()
+            assert row['total_diff_days'] == group['total_diff_days'].max()
+
+
+def test_detail_summary_keeps_totals():
+    df = long_sample()
+    df = df[df['deviation'] == 1]
+    by_task = detail_deviations(df)
+    total = by_task['deviation in days'].sum()
+    assert total == df['deviation in days'].sum()
+    for level in ['section', 'block']:
+        summary = detail_deviations(df, level)
+        assert summary['deviation in days'].sum() == total, level
+        assert len(summary) == df[level].nunique()
+    # Страницы задач вместе дают ту же сумму
+    page_sums = [by_task.iloc[start:end]['deviation in days'].sum() for start, end in all_pages(len(by_task), 10)]
+    assert len(page_sums) > 1 and sum(page_sums) == total
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"[OK] {name}")
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""Regression test: column_schema map vs the original find_column / find_column_by_partial lookups"""
+
+import importlib
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+import column_schema
+import data_loader
+
+
+def old_find_column(df, possible_names):
+    """Исходный поиск колонок в дашбордах документации и задержки РД"""
+    for col in df.columns:
+        col_lower = str(col).replace('\n', ' ').replace('\r', ' ').strip().lower()
+        for name in possible_names:
+            name_lower = name.lower().strip()
+            if name_lower == col_lower or name_lower in col_lower or col_lower in name_lower:
+                return col
+            name_words = [w for w in name_lower.split() if len(w) > 2]
+            if name_words and all(word in col_lower for word in name_words):
+                return col
+    if any('разделов' in n.lower() and 'рд' in n.lower() and 'договор' in n.lower() for n in possible_names):
+        for col in df.columns:
+            col_lower = str(col).lower().replace('\n', ' ').replace('\r', ' ')
+            if all(word in col_lower for word in ['разделов', 'рд', 'договор', 'количество'] if len(word) > 3):
+                return col
+    return None
+
+
+def old_find_column_by_partial(df, possible_names):
+    """Исходный поиск колонок в дашбордах ресурсов, техники и СКУД"""
+    for col in df.columns:
+        col_lower = str(col).lower().strip()
+        for name in possible_names:
+            name_lower = str(name).lower().strip()
+            if name_lower == col_lower or name_lower in col_lower or col_lower in name_lower:
+                return col
+    return None
+
+
+def exact_or(name, find, candidates):
+    return lambda df: name if name in df.columns else find(df, candidates)
+
+
+def old_rd_deviation(df):
+    if 'Отклонение разделов РД' in df.columns:
+        return 'Отклонение разделов РД'
+    found = old_find_column(df, ['Отклонение разделов РД', 'Отклонение разделов рд', 'отклонение разделов рд',
+                                 'Отклон. Количества разделов РД', 'Отклонение количества разделов РД',
+                                 'Отклон. разделов РД', 'Отклонение разделов РД по Договору'])
+    if found:
+        return found
+    for col in df.columns:
+        col_lower = str(col).lower().replace('\n', ' ').replace('\r', ' ')
+        if all(word in col_lower for word in ['отклон', 'раздел']):
+            return col
+    return None
+
+
+def old_average(df):
+    for name in ['Среднее за неделю', 'Среднее за месяц']:
+        if name in df.columns:
+            return name
+    return old_find_column_by_partial(df, ['Среднее за неделю', 'Среднее за месяц', 'среднее', 'average'])
+
+
+# Исходные правила поиска для каждого канонического имени
+OLD_LOOKUPS = {
+    'project name': exact_or('project name', old_find_column, ['Проект', 'project']),
+    'section': exact_or('section', old_find_column, ['Раздел', 'section']),
+    'task name': exact_or('task name', old_find_column, ['Задача', 'task']),
+    'plan start': exact_or('plan start', old_find_column, ['Старт План', 'План Старт']),
+    'plan end': exact_or('plan end', old_find_column, ['Конец План', 'План Конец']),
+    'base start': exact_or('base start', old_find_column, ['Старт Факт', 'Факт Старт']),
+    'base end': exact_or('base end', old_find_column, ['Конец Факт', 'Факт Конец']),
+    'Отклонение разделов РД': old_rd_deviation,
+    'Количество разделов РД по Договору': lambda df: old_find_column(df, [
+        'Количество разделов РД по Договору', 'Количество разделов РД', 'разделов РД',
+        'Количетсов разделов РД по Договору', 'Количество разделов РД по договору']),
+    'На согласовании': lambda df: old_find_column(df, ['На согласовании', 'согласовании']),
+    'Выдано в производство работ': lambda df: old_find_column(
+        df, ['Выдано в производство работ', 'производство работ', 'в производство']),
+    'Выдана подрядчику': lambda df: old_find_column(df, ['Выдана подрядчику', 'подрядчику']),
+    'На доработке': lambda df: old_find_column(df, ['На доработке', 'доработке']),
+    'Проект': exact_or('Проект', old_find_column_by_partial, ['Проект', 'проект', 'project', 'Project']),
+    'Контрагент': lambda df: old_find_column_by_partial(
+        df, ['Контрагент', 'контрагент', 'Подразделение', 'подразделение', 'contractor']),
+    'Период': exact_or('Период', old_find_column_by_partial, ['Период', 'период', 'period', 'Месяц', 'месяц', 'month']),
+    'Среднее': old_average,
+    'Дельта': exact_or('Дельта', old_find_column_by_partial, ['Дельта', 'дельта', 'delta', 'Delta', 'Дельта (без %)']),
+    'Дельта (%)': exact_or('Дельта (%)', old_find_column_by_partial,
+                           ['Дельта (%)', 'Дельта %', 'дельта (%)', 'дельта %', 'Delta %', 'delta %', 'Дельта(%)', 'Дельта%']),
+    **{f'{week} неделя': exact_or(f'{week} неделя', old_find_column_by_partial,
+                                  [f'{week} неделя', f'{week} недел', f'недел {week}', f'week {week}'])
+       for week in range(1, 6)},
+}
+
+# Варианты заголовков из выгрузок
+HEADER_SETS = [
+    ['Проект', 'Раздел', 'Задача', 'Старт План', 'Конец План', 'Старт Факт', 'Конец Факт'],
+    ['Project', 'Section', 'Task', 'План Старт', 'План Конец', 'Факт Старт', 'Факт Конец'],
+    ['project name', 'section', 'task name', 'plan start', 'plan end', 'base start', 'base end', 'Проект', 'Раздел'],
+    ['Проект', 'Старт\nПлан', 'Конец\r\nПлан', ' Старт Факт ', 'КОНЕЦ ФАКТ'],
+    ['Проект', 'Количество разделов РД по Договору', 'Отклонение разделов РД', 'Всего загружено',
+     'На согласовании', 'Выдана подрядчику', 'Выдано в производство работ', 'На доработке'],
+    ['Проект', 'Количетсов разделов РД по Договору', 'Отклон. Количества разделов РД', 'Статус\nНа согласовании',
+     'Выдано в\nпроизводство работ', 'Выдана подрядчику (шт)', 'На доработке, шт'],
+    ['Проект', 'Количество разделов\nРД по договору', 'Отклонение\nразделов РД', 'согласовании'],
+    ['Проект', 'РД разделов по договору, количество', 'Разделы: отклонение', 'Отклон. разделов РД'],
+    ['Проект', 'Подразделение', 'Период', 'План', 'Среднее за неделю', '1 неделя', '2 неделя', '3 неделя',
+     '4 неделя', '5 неделя', 'Дельта', 'Дельта (%)'],
+    ['проект', 'Контрагент', 'Месяц', 'Среднее за месяц', '1 недел', 'недел 2', 'Week 3', '4 неделя (факт)',
+     'Дельта (без %)', 'Delta %'],
+    ['Project', 'Contractor', 'period', 'Average', 'week 1', 'week 2', 'Дельта%'],
+    ['Проект', 'Подразделение', 'Период', 'Дельта (%)', 'Дельта'],
+    ['Колонка 1', 'Колонка 2'],
+]
+
+
+def frame(columns):
+    return pd.DataFrame(columns=columns)
+
+
+def test_map_matches_old_lookups():
+    for columns in HEADER_SETS:
+        df = frame(columns)
+        schema = column_schema.column_map(df)
+        for name, old_lookup in OLD_LOOKUPS.items():
+            assert schema[name] == old_lookup(df), (columns, name, schema[name])
+            assert column_schema.find_column(df, name) == schema[name]
+
+
+def test_delta_prefers_exact_synonym():
+    # Исходный поиск по подстроке путал дельту и дельту в процентах, если вторая
+    # стояла раньше; точное совпадение с синонимом теперь проверяется до подстрок
+    for columns, delta, delta_pct in [(['Delta %', 'Дельта (без %)'], 'Дельта (без %)', 'Delta %'),
+                                      (['Дельта%', 'delta'], 'delta', 'Дельта%')]:
+        df = frame(columns)
+        assert OLD_LOOKUPS['Дельта'](df) == delta_pct
+        assert column_schema.column_map(df)['Дельта'] == delta
+        assert column_schema.column_map(df)['Дельта (%)'] == delta_pct
+        reversed_df = frame(columns[::-1])
+        assert column_schema.column_map(reversed_df)['Дельта'] == delta
+        assert column_schema.column_map(reversed_df)['Дельта (%)'] == delta_pct
+
+
+def test_sample_files():
+    for file_name in ['sample_project_data_fixed.csv', 'sample_resources_data.csv', 'sample_technique_data.csv',
+                      'sample_resources_data.xlsx', 'sample_technique_data.xlsx']:
+        with open(file_name, 'rb') as f:
+            df = data_loader.load_file(f.read(), file_name)
+        schema = column_schema.column_map(df)
+        for name, old_lookup in OLD_LOOKUPS.items():
+            assert schema[name] == old_lookup(df), (file_name, name)
+
+
+def test_map_is_shared_and_read_only():
+    df = frame(HEADER_SETS[0])
+    schema = column_schema.column_map(df)
+    assert column_schema.column_map(frame(HEADER_SETS[0])) is schema
+    assert set(schema) == set(column_schema.COLUMN_SYNONYMS)
+    try:
+        schema['project name'] = 'x'
+    except TypeError:
+        pass
+    else:
+        raise AssertionError('схема должна быть неизменяемой')
+
+
+def test_synonyms_file_override():
+    variants = {'project name': ['Объект строительства'], 'Контрагент': ['Исполнитель', 'contractor'],
+                'Новая колонка': ['Новое имя']}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'synonyms.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(variants, f, ensure_ascii=False)
+        saved = os.environ.get('COLUMN_SYNONYMS_FILE')
+        os.environ['COLUMN_SYNONYMS_FILE'] = path
+        try:
+            module = importlib.reload(column_schema)
+            df = frame(['Объект строительства', 'Исполнитель', 'Новое имя (шт)'])
+            assert module.column_map(df)['project name'] == 'Объект строительства'
+            assert module.column_map(df)['Контрагент'] == 'Исполнитель'
+            assert module.column_map(df)['Новая колонка'] == 'Новое имя (шт)'
+            # Синонимы из файла добавляются после встроенных, без повторов
+            assert module.COLUMN_SYNONYMS['Контрагент'] == ['Подразделение', 'contractor', 'Исполнитель']
+        finally:
+            if saved is None:
+                os.environ.pop('COLUMN_SYNONYMS_FILE')
+            else:
+                os.environ['COLUMN_SYNONYMS_FILE'] = saved
+            module = importlib.reload(column_schema)
+    assert 'Новая колонка' not in module.COLUMN_SYNONYMS
+    # Файл по пути из переменной может отсутствовать
+    assert module._load_extra_synonyms(os.path.join(tmp, 'synonyms.json')) == {}
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"[OK] {name}")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Regression test: default dashboard for every combination of loaded datasets vs the original selection rules"""
+
+import itertools
+
+import pandas as pd
+
+import dashboards
+
+DATASETS = ['project', 'resources', 'technique']
+
+
+def old_default(has_project_data, has_resources_data, has_technique_data):
+    """Исходный выбор дашборда по умолчанию в приложении"""
+    if not (has_project_data or has_resources_data or has_technique_data):
+        return None
+    if has_technique_data and not has_project_data:
+        return "Аналитика по технике"
+    elif (has_resources_data or has_technique_data) and not has_project_data:
+        return "График движения рабочей силы"
+    return "Динамика отклонений по месяцам"
+
+
+def combinations():
+    """Все сочетания загруженных наборов; незагруженный набор - None или пустая таблица"""
+    for loaded in itertools.product([False, True], repeat=len(DATASETS)):
+        for missing in [None, pd.DataFrame()]:
+            frames = {dataset: pd.DataFrame({'a': [1]}) if is_loaded else missing
+                      for dataset, is_loaded in zip(DATASETS, loaded)}
+            yield loaded, frames
+
+
+def test_default_for_every_combination():
+    expected_names = {
+        (False, False, False): None,
+        (False, False, True): "Аналитика по технике",
+        (False, True, False): "График движения рабочей силы",
+        (False, True, True): "Аналитика по технике",
+    }
+    for loaded, frames in combinations():
+        expected = old_default(*loaded)
+        assert dashboards.default_dashboard(frames) == expected, loaded
+        if not loaded[0]:
+            assert expected == expected_names[loaded]
+        else:
+            assert expected == "Динамика отклонений по месяцам"
+
+
+def test_default_does_not_depend_on_menu_order():
+    registry = dashboards.DASHBOARDS
+    try:
+        dashboards.DASHBOARDS = dict(reversed(list(registry.items())))
+        for loaded, frames in combinations():
+            assert dashboards.default_dashboard(frames) == old_default(*loaded), loaded
+    finally:
+        dashboards.DASHBOARDS = registry
+
+
+def test_default_dashboards_use_loaded_dataset():
+    for dataset, name in dashboards.DEFAULT_DASHBOARDS:
+        assert dataset in dashboards.DASHBOARDS[name].datasets
+        frames = {dataset: pd.DataFrame({'a': [1]})}
+        assert dashboards.DASHBOARDS[name].frame(frames) is frames[dataset]
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"[OK] {name}")
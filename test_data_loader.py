@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""Tests for CSV dialect sniffing, the parse cache (content-hash hits, LRU eviction, parser version) and optimize_frame"""
+
+import codecs
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+from data_loader import ParseCache, content_hash, frame_memory, read_csv_probing, read_csv_sniffed, sniff_csv
+
+# Псевдонимы колонок разделяют данные только при copy-on-write (pandas 3 или включенная опция)
+COPY_ON_WRITE = int(pd.__version__.split('.')[0]) >= 3 or pd.get_option('mode.copy_on_write') is True
+
+ROWS = [
+    ['Проект', 'Задача', 'Бюджет'],
+    ['Проект А', 'Задача 1', '100'],
+    ['Проект Б', 'Задача 2', '200,5'],
+    ['Проект А', 'Задача "3"', '300'],
+]
+
+
+def make_csv(delimiter, encoding, rows=ROWS):
+    lines = []
+    for row in rows:
+        # Поле с разделителем или кавычкой берется в кавычки, как в выгрузках Excel
+        fields = [f'"{field.replace(chr(34), chr(34) * 2)}"' if delimiter in field or '"' in field else field
+                  for field in row]
+        lines.append(delimiter.join(fields))
+    return '\r\n'.join(lines).encode(encoding) + b'\r\n'
+
+
+def test_sniff_encodings_and_delimiters():
+    for encoding, expected_encoding in [('utf-8', 'utf-8'), ('utf-8-sig', 'utf-8-sig'), ('cp1251', 'cp1251')]:
+        for delimiter in [';', ',', '\t']:
+            dialect = sniff_csv(make_csv(delimiter, encoding))
+            assert dialect['encoding'] == expected_encoding, (encoding, delimiter, dialect)
+            assert dialect['delimiter'] == delimiter, (encoding, delimiter, dialect)
+            assert dialect['delimiter_confidence'] == 1.0
+            assert dialect['encoding_confidence'] == 1.0
+
+
+def test_sniff_bom():
+    data = make_csv(';', 'utf-8-sig')
+    assert data.startswith(codecs.BOM_UTF8)
+    assert sniff_csv(data)['encoding'] == 'utf-8-sig'
+    # Без BOM тот же текст - обычный utf-8
+    assert sniff_csv(data[len(codecs.BOM_UTF8):])['encoding'] == 'utf-8'
+
+
+def test_sniff_quoted_delimiters():
+    # Запятые внутри кавычек не сбивают выбор ';'
+    rows = [['Проект', 'Сумма'], ['А, Б', '1,5'], ['В, Г, Д', '2,5']]
+    assert sniff_csv(make_csv(';', 'utf-8', rows))['delimiter'] == ';'
+
+
+def test_sniff_ascii_sample_with_cp1251_tail():
+    # Образец без кириллицы, кириллица в cp1251 только за его пределами
+    head = make_csv(';', 'ascii', [['Project', 'Task', 'Budget']] + [['A', f'Task {i}', '1'] for i in range(200)])
+    tail = make_csv(';', 'cp1251', ROWS[1:])
+    dialect = sniff_csv(head + tail, sample_size=len(head) // 2)
+    assert dialect['encoding'] == 'cp1251'
+    assert dialect['delimiter'] == ';'
+
+
+def test_sniff_truncated_multibyte_sample():
+    # Образец обрывается посреди двухбайтового символа utf-8
+    data = make_csv(';', 'utf-8', ROWS * 20)
+    cut = data.index('Б'.encode('utf-8')) + 1
+    assert sniff_csv(data, sample_size=cut)['encoding'] == 'utf-8'
+
+
+def test_sniffed_read_matches_probing():
+    for encoding in ['utf-8', 'utf-8-sig', 'cp1251']:
+        data = make_csv(';', encoding)
+        pd.testing.assert_frame_equal(read_csv_sniffed(data), read_csv_probing(data))
+
+
+def test_sniffed_read_columns():
+    # Перебор читал ',' и табуляцию как одну колонку с разделителем ';'
+    for encoding in ['utf-8', 'utf-8-sig', 'cp1251']:
+        for delimiter in [';', ',', '\t']:
+            result = read_csv_sniffed(make_csv(delimiter, encoding))
+            assert list(result.columns) == ROWS[0], (encoding, delimiter)
+            assert result['Задача'].tolist() == ['Задача 1', 'Задача 2', 'Задача "3"']
+            assert result['Бюджет'].tolist() == ['100', '200,5', '300']
+
+
+def make_frame(n_rows, value=0):
+    return pd.DataFrame({'task name': [f'Задача {i}' for i in range(n_rows)], 'value': [value] * n_rows})
+
+
+def counting_producer(df, calls):
+    def produce():
+        calls.append(1)
+        return df
+    return produce
+
+
+def test_hit_on_same_content():
+    cache = ParseCache()
+    data = 'task name;value\nЗадача 1;1\n'.encode('utf-8')
+    calls = []
+    first = cache.get(cache.make_key(content_hash(data), 'a.csv'), counting_producer(make_frame(3), calls))
+    # Другое имя файла с тем же содержимым и расширением попадает в ту же запись
+    second = cache.get(cache.make_key(content_hash(data), 'renamed.CSV'), counting_producer(make_frame(3), calls))
+    assert second is first
+    assert len(calls) == 1
+    assert cache.stats() == {'entries': 1, 'bytes': frame_memory(first), 'hits': 1, 'misses': 1}
+
+
+def test_miss_on_changed_content_or_extension():
+    cache = ParseCache()
+    calls = []
+    cache.get(cache.make_key(content_hash(b'a'), 'a.csv'), counting_producer(make_frame(3), calls))
+    cache.get(cache.make_key(content_hash(b'b'), 'a.csv'), counting_producer(make_frame(3), calls))
+    cache.get(cache.make_key(content_hash(b'a'), 'a.xlsx'), counting_producer(make_frame(3), calls))
+    assert len(calls) == 3
+    assert cache.stats()['entries'] == 3
+
+
+def test_none_is_not_cached():
+    cache = ParseCache()
+    calls = []
+    key = cache.make_key('h', 'a.csv')
+    assert cache.get(key, counting_producer(None, calls)) is None
+    assert cache.get(key, counting_producer(None, calls)) is None
+    assert len(calls) == 2
+    assert cache.stats()['entries'] == 0
+
+
+def test_lru_eviction_by_count():
+    cache = ParseCache(max_entries=2)
+    calls = []
+    for name in ['a', 'b']:
+        cache.get(cache.make_key(name, 'f.csv'), counting_producer(make_frame(2), calls))
+    # Обращение к 'a' делает самой старой запись 'b'
+    cache.get(cache.make_key('a', 'f.csv'), counting_producer(make_frame(2), calls))
+    cache.get(cache.make_key('c', 'f.csv'), counting_producer(make_frame(2), calls))
+    assert len(calls) == 3
+
+    cache.get(cache.make_key('a', 'f.csv'), counting_producer(make_frame(2), calls))
+    assert len(calls) == 3
+    cache.get(cache.make_key('b', 'f.csv'), counting_producer(make_frame(2), calls))
+    assert len(calls) == 4
+    assert cache.stats()['entries'] == 2
+
+
+def test_lru_eviction_by_bytes():
+    size = frame_memory(make_frame(100))
+    cache = ParseCache(max_bytes=2 * size)
+    calls = []
+    for name in ['a', 'b', 'c']:
+        cache.get(cache.make_key(name, 'f.csv'), counting_producer(make_frame(100), calls))
+    stats = cache.stats()
+    assert stats['entries'] == 2
+    assert stats['bytes'] == 2 * size
+
+    cache.get(cache.make_key('a', 'f.csv'), counting_producer(make_frame(100), calls))
+    assert len(calls) == 4
+
+
+def test_frame_larger_than_limit_is_returned_but_not_cached():
+    cache = ParseCache(max_bytes=10)
+    calls = []
+    df = make_frame(100)
+    assert cache.get(cache.make_key('a', 'f.csv'), counting_producer(df, calls)) is df
+    assert cache.stats() == {'entries': 0, 'bytes': 0, 'hits': 0, 'misses': 1}
+
+
+def test_parser_version_change_invalidates_entries():
+    cache = ParseCache()
+    calls = []
+    old_key = cache.make_key('a', 'f.csv')
+    cache.get(old_key, counting_producer(make_frame(2), calls))
+
+    version = data_loader.PARSER_VERSION
+    data_loader.PARSER_VERSION = version + 1
+    try:
+        new_key = cache.make_key('a', 'f.csv')
+        assert new_key != old_key
+        result = cache.get(new_key, counting_producer(make_frame(2, value=1), calls))
+    finally:
+        data_loader.PARSER_VERSION = version
+    assert len(calls) == 2
+    assert (result['value'] == 1).all()
+
+
+def test_clear():
+    cache = ParseCache()
+    calls = []
+    cache.get(cache.make_key('a', 'f.csv'), counting_producer(make_frame(2), calls))
+    cache.clear()
+    assert cache.stats()['entries'] == 0 and cache.stats()['bytes'] == 0
+    cache.get(cache.make_key('a', 'f.csv'), counting_producer(make_frame(2), calls))
+    assert len(calls) == 2
+
+
+def assert_same_values(before, after):
+    """Колонка после уменьшения хранит те же значения (сравнение как объектов)"""
+    assert after.isna().tolist() == before.isna().tolist(), before.name
+    assert after.dropna().astype(object).tolist() == before.dropna().astype(object).tolist(), before.name
+
+
+def test_optimize_text_to_category():
+    n_rows = 40
+    df = pd.DataFrame({
+        'Проект': [f'Проект {i % 3}' if i % 7 else None for i in range(n_rows)],
+        'Задача': [f'Задача {i}' for i in range(n_rows)],
+        # Ровно половина уникальных значений - граница CATEGORY_MAX_SHARE
+        'Раздел': [f'Раздел {i // 2}' for i in range(n_rows)],
+        'Причина': [f'Причина {i // 2}' if i else 'Причина x' for i in range(n_rows)],
+    })
+    original = df.copy()
+    optimized = data_loader.optimize_frame(df)
+    assert isinstance(optimized['Проект'].dtype, pd.CategoricalDtype)
+    assert list(optimized['Проект'].cat.categories) == ['Проект 0', 'Проект 1', 'Проект 2']
+    assert isinstance(optimized['Раздел'].dtype, pd.CategoricalDtype)
+    assert not isinstance(optimized['Задача'].dtype, pd.CategoricalDtype)
+    assert not isinstance(optimized['Причина'].dtype, pd.CategoricalDtype)
+    for column in original.columns:
+        assert_same_values(original[column], optimized[column])
+    memory = optimized.attrs['memory']
+    assert memory['after'] < memory['before']
+    assert memory['after'] == frame_memory(optimized)
+
+
+def test_optimize_integer_downcast_bounds():
+    # Тип выбирается по max|x| * число строк, чтобы сумма и cumsum не переполнялись
+    cases = [
+        ([63, -1], np.int8),          # 63 * 2 = 126
+        ([64, 0], np.int16),          # 128
+        ([-64, 0], np.int16),
+        ([127, 0, 0], np.int16),
+        ([16383, 0], np.int16),       # 32766
+        ([16384, 0], np.int32),       # 32768
+        ([2 ** 30, 0], np.int64),     # 2^31 не помещается в int32
+        ([5], np.int8),               # одна строка считается как две
+        ([], np.int64),
+    ]
+    for values, expected in cases:
+        series = pd.Series(np.array(values, dtype=np.int64), name='Количество')
+        optimized = data_loader._optimize_column(series)
+        assert optimized.dtype == expected, (values, optimized.dtype)
+        assert optimized.tolist() == values
+        assert optimized.sum() == sum(values) and optimized.cumsum().tolist() == np.cumsum(values).tolist()
+    # Nullable Int, вещественные и даты не меняются
+    for series in [pd.Series([1, None, 3], dtype='Int64'), pd.Series([1.5, 2.0]),
+                   pd.Series(pd.to_datetime(['2025-01-01', None]))]:
+        assert data_loader._optimize_column(series) is series
+
+
+def test_optimize_keeps_text_values():
+    n_rows = 12
+    df = pd.DataFrame({
+        # Коды с ведущими нулями и номера только похожи на числа
+        'Шифр': ['007', '010', '1e3', '42'] * (n_rows // 4),
+        'Номер договора': [f'{i:05d}' for i in range(n_rows)],
+        # В основном числа с отдельными словами
+        'Отклонение': ['1', '2', 'нет', '3'] * (n_rows // 4),
+        'Бюджет План': ['100', '200.5', None, '007'] * (n_rows // 4),
+        'Бюджет Факт': ['100', 'нет данных', '300', '400'] * (n_rows // 4),
+        'Отклонений в днях': ['1', '-2', '3', '0'] * (n_rows // 4),
+    })
+    original = df.copy()
+    optimized = data_loader.optimize_frame(df)
+    for column in ['Шифр', 'Номер договора', 'Отклонение', 'Бюджет Факт']:
+        assert not pd.api.types.is_numeric_dtype(optimized[column].dtype), column
+        assert_same_values(original[column], optimized[column])
+    assert optimized['Шифр'].tolist() == ['007', '010', '1e3', '42'] * (n_rows // 4)
+    assert optimized['Номер договора'].tolist() == [f'{i:05d}' for i in range(n_rows)]
+
+    # Бюджет и отклонение в днях из одних чисел хранятся числом, как их приводят дашборды
+    for column in ['Бюджет План', 'Отклонений в днях']:
+        expected = pd.to_numeric(original[column], errors='coerce')
+        np.testing.assert_array_equal(optimized[column].to_numpy(dtype=np.float64), expected.to_numpy(dtype=np.float64))
+    assert optimized['Бюджет План'].dtype == np.float64
+    assert optimized['Отклонений в днях'].dtype == np.int8
+
+
+def test_optimize_aliases_share_storage():
+    with open('sample_project_data_fixed.csv', 'rb') as f:
+        df = data_loader.load_file(f.read(), 'sample_project_data_fixed.csv')
+    aliases = data_loader.alias_columns(df)
+    if COPY_ON_WRITE:
+        assert aliases['project name'] == 'Проект' and aliases['section'] == 'Раздел'
+    for russian_name, english_name in data_loader.COLUMN_MAPPING.items():
+        if russian_name in df.columns and english_name in df.columns and english_name not in data_loader.DATE_COLUMNS:
+            assert df[english_name].dtype == df[russian_name].dtype, english_name
+            assert_same_values(df[russian_name], df[english_name])
+    for english_name, russian_name in aliases.items():
+        assert data_loader._shares_data(df[english_name], df[russian_name]), english_name
+    # Псевдонимы не учитываются в объеме повторно
+    usage = df.memory_usage(deep=True)
+    assert frame_memory(df) == usage.sum() - usage[list(aliases)].sum()
+
+    # Псевдоним уменьшается вместе с русской колонкой, а не отдельно
+    frame = pd.DataFrame({'Проект': ['А', 'Б'] * 10, 'Бюджет План': np.arange(20, dtype=np.int64)})
+    frame['project name'] = frame['Проект']
+    frame['budget plan'] = frame['Бюджет План']
+    optimized = data_loader.optimize_frame(frame)
+    assert isinstance(optimized['project name'].dtype, pd.CategoricalDtype)
+    assert optimized['budget plan'].dtype == np.int16
+    assert_same_values(optimized['Проект'], optimized['project name'])
+    if COPY_ON_WRITE:
+        assert data_loader.alias_columns(optimized) == {'project name': 'Проект', 'budget plan': 'Бюджет План'}
+        assert optimized.attrs['memory']['after'] == frame_memory(optimized)
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"[OK] {name}")
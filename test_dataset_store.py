@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Tests for the Arrow IPC dataset store: round trip through memory map, pruning and user manifests"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+import dataset_store
+
+
+class TemporaryStore:
+    """Переключает хранилище во временный каталог на время теста"""
+
+    def __enter__(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._saved = (dataset_store.DATA_STORE_DIR, dataset_store.MANIFESTS_DIR, dataset_store.DATA_STORE_MAX_BYTES)
+        dataset_store.DATA_STORE_DIR = self._tmp.name
+        dataset_store.MANIFESTS_DIR = os.path.join(self._tmp.name, 'manifests')
+        return self._tmp.name
+
+    def __exit__(self, *exc_info):
+        dataset_store.DATA_STORE_DIR, dataset_store.MANIFESTS_DIR, dataset_store.DATA_STORE_MAX_BYTES = self._saved
+        self._tmp.cleanup()
+
+
+def make_frame(n_rows=50):
+    rng = np.random.default_rng(0)
+    project = pd.Series(rng.choice(['Проект А', 'Проект Б', None], n_rows), dtype='category')
+    df = pd.DataFrame({
+        'Проект': project,
+        'Длительность': pd.array(rng.integers(0, 400, n_rows), dtype='Int32'),
+        'Бюджет': rng.random(n_rows) * 1000,
+        'plan_month': pd.period_range('2024-11', periods=n_rows, freq='M'),
+        'plan end': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 300, n_rows), unit='D'),
+    })
+    df.loc[::7, 'Длительность'] = pd.NA
+    # Псевдоним ссылается на те же данные, что и русская колонка
+    df['project name'] = df['Проект']
+    df.attrs = {'data_type': 'project', 'memory': {'before': 10, 'after': 5}}
+    return df
+
+
+def test_round_trip_keeps_dtypes_aliases_and_attrs():
+    df = make_frame()
+    aliases = {'project name': 'Проект'}
+    key = ('hash1', 'csv', data_loader.PARSER_VERSION)
+    with TemporaryStore() as store_dir:
+        assert not dataset_store.has_frame(key)
+        assert dataset_store.write_frame(key, df, aliases)
+        assert dataset_store.has_frame(key)
+        assert os.listdir(store_dir) == [f'hash1.csv.v{data_loader.PARSER_VERSION}.arrow']
+
+        result = dataset_store.read_frame(key)
+    pd.testing.assert_frame_equal(result, df)
+    assert result.attrs == df.attrs
+    assert isinstance(result['Проект'].dtype, pd.CategoricalDtype)
+    assert result['Длительность'].dtype == 'Int32'
+    assert isinstance(result['plan_month'].dtype, pd.PeriodDtype)
+    # Псевдоним восстановлен ссылкой на исходную колонку (как в исходной таблице)
+    assert data_loader.alias_columns(result) == data_loader.alias_columns(df)
+
+
+def test_round_trip_sample_file():
+    with open('sample_project_data_fixed.csv', 'rb') as f:
+        data = f.read()
+    df = data_loader.parse_file(data, 'sample_project_data_fixed.csv')
+    key = (data_loader.content_hash(data), 'csv', data_loader.PARSER_VERSION)
+    with TemporaryStore():
+        dataset_store.write_frame(key, df, data_loader.alias_columns(df))
+        result = dataset_store.read_frame(key)
+    pd.testing.assert_frame_equal(result, df)
+    assert list(result.dtypes) == list(df.dtypes)
+
+
+def test_missing_frame_and_existing_file():
+    key = ('hash1', 'csv', data_loader.PARSER_VERSION)
+    with TemporaryStore():
+        assert dataset_store.read_frame(key) is None
+        assert dataset_store.write_frame(key, make_frame(10))
+        # Повторная запись того же ключа не переписывает файл
+        assert dataset_store.write_frame(key, make_frame(20))
+        assert len(dataset_store.read_frame(key)) == 10
+        # Другая версия парсера - другой файл
+        assert dataset_store.read_frame(('hash1', 'csv', data_loader.PARSER_VERSION + 1)) is None
+
+
+def test_prune_keeps_files_from_manifests():
+    df = make_frame(200)
+    with TemporaryStore() as store_dir:
+        keys = [(f'hash{i}', 'csv', 1) for i in range(4)]
+        dataset_store.write_frame(keys[0], df)
+        size = os.path.getsize(os.path.join(store_dir, 'hash0.csv.v1.arrow'))
+        dataset_store.DATA_STORE_MAX_BYTES = int(size * 3.5)
+        dataset_store.save_manifest('user', [{'file_name': 'a.csv', 'hash': 'hash0', 'type': 'project'}])
+        for i, key in enumerate(keys[1:], start=1):
+            path = os.path.join(store_dir, f'hash{i - 1}.csv.v1.arrow')
+            # Порядок по времени изменения: hash0 - самый старый
+            os.utime(path, (i, i))
+            dataset_store.write_frame(key, df)
+
+        # hash0 старше всех, но упомянут в манифесте; удален следующий по возрасту hash1
+        assert [dataset_store.has_frame(key) for key in keys] == [True, False, True, True]
+
+        dataset_store.clear_manifest('user')
+        dataset_store.write_frame(('hash4', 'csv', 1), df)
+        assert not dataset_store.has_frame(keys[0])
+
+
+def test_manifest_round_trip():
+    files = [{'file_name': 'Проект.csv', 'hash': 'abc', 'type': 'project'},
+             {'file_name': 'res.xlsx', 'hash': 'def', 'type': 'resources'}]
+    with TemporaryStore():
+        assert dataset_store.load_manifest('user') == []
+        dataset_store.save_manifest('user', files)
+        assert dataset_store.load_manifest('user') == files
+        assert dataset_store.load_manifest('other') == []
+        dataset_store.clear_manifest('user')
+        assert dataset_store.load_manifest('user') == []
+
+
+def test_restore_file_from_store():
+    with open('sample_project_data_fixed.csv', 'rb') as f:
+        data = f.read()
+    data_hash = data_loader.content_hash(data)
+    with TemporaryStore():
+        data_loader.parse_cache.clear()
+        loaded = data_loader.load_file(data, 'sample_project_data_fixed.csv', 'Проект.csv')
+        # После перезапуска сервера кеш в памяти пуст, файл читается из хранилища
+        data_loader.parse_cache.clear()
+        restored = data_loader.restore_file(data_hash, 'sample_project_data_fixed.csv', 'Проект.csv')
+        assert data_loader.restore_file('unknown', 'sample_project_data_fixed.csv') is None
+        data_loader.parse_cache.clear()
+    pd.testing.assert_frame_equal(restored, loaded)
+    assert restored.attrs['content_hash'] == data_hash
+    assert restored.attrs['file_name'] == 'Проект.csv'
+    assert restored.attrs['data_type'] == loaded.attrs['data_type']
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"[OK] {name}")
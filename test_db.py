@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""Tests for the pooled SQLite layer: WAL and busy_timeout, release after errors, concurrent writers"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import db
+
+
+class TemporaryDatabase:
+    """Переключает базу по умолчанию во временный файл на время теста"""
+
+    def __enter__(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._saved = db.DB_PATH
+        db.DB_PATH = os.path.join(self._tmp.name, 'users.db')
+        db.execute('CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT UNIQUE, thread INTEGER)')
+        db.execute('CREATE TABLE counter (value INTEGER)')
+        db.execute('INSERT INTO counter VALUES (0)')
+        return db.DB_PATH
+
+    def __exit__(self, *exc_info):
+        db.get_pool().close_all()
+        db._pools.pop(db.DB_PATH, None)
+        db.DB_PATH = self._saved
+        self._tmp.cleanup()
+
+
+def count(table='items'):
+    return db.fetch_one(f'SELECT COUNT(*) FROM {table}')[0]
+
+
+def test_connection_pragmas():
+    with TemporaryDatabase() as path:
+        with db.connection() as conn:
+            assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+            assert conn.execute('PRAGMA busy_timeout').fetchone()[0] == db.BUSY_TIMEOUT_MS
+            # synchronous = NORMAL
+            assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1
+        assert os.path.exists(f'{path}-wal')
+        # Режим WAL записан в файл базы и виден обычному соединению
+        plain = sqlite3.connect(path)
+        try:
+            assert plain.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        finally:
+            plain.close()
+
+
+def test_connections_are_reused():
+    with TemporaryDatabase():
+        pool = db.get_pool()
+        assert db.get_pool(db.DB_PATH) is pool
+        with db.connection() as first:
+            pass
+        with db.connection() as second:
+            assert second is first
+            # Вложенный блок получает другое соединение
+            with db.connection() as nested:
+                assert nested is not first
+        assert sorted(map(id, pool._idle)) == sorted([id(first), id(nested)])
+        assert db.execute("INSERT INTO items (name) VALUES ('a')") == 1
+        assert db.fetch_all('SELECT name FROM items') == [('a',)]
+        assert db.fetch_one("SELECT name FROM items WHERE name = 'b'") is None
+
+
+def test_pool_keeps_at_most_size_connections():
+    with TemporaryDatabase() as path:
+        pool = db.ConnectionPool(path, size=2)
+        conns = [pool.acquire() for _ in range(4)]
+        assert len({id(conn) for conn in conns}) == 4
+        for conn in conns:
+            pool.release(conn)
+        assert pool._idle == conns[:2]
+        # Лишние соединения закрыты
+        for conn in conns[2:]:
+            try:
+                conn.execute('SELECT 1')
+            except sqlite3.ProgrammingError:
+                continue
+            raise AssertionError('лишнее соединение должно быть закрыто')
+        pool.close_all()
+        assert pool._idle == []
+
+
+def test_rollback_and_release_after_exception():
+    with TemporaryDatabase():
+        pool = db.get_pool()
+        try:
+            with db.connection() as conn:
+                conn.execute("INSERT INTO items (name) VALUES ('lost')")
+                assert conn.in_transaction
+                raise RuntimeError('ошибка в середине транзакции')
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError('исключение должно проходить через connection()')
+        assert pool._idle == [conn]
+        assert not conn.in_transaction
+        assert count() == 0
+
+        # Ошибка SQLite внутри транзакции тоже откатывает уже выполненные запросы
+        db.execute("INSERT INTO items (name) VALUES ('kept')")
+        try:
+            with db.connection() as conn:
+                conn.execute("INSERT INTO items (name) VALUES ('lost')")
+                conn.execute("INSERT INTO items (name) VALUES ('kept')")
+        except sqlite3.IntegrityError:
+            pass
+        else:
+            raise AssertionError('повтор уникального имени должен вызывать IntegrityError')
+        assert pool._idle == [conn]
+        assert db.fetch_all('SELECT name FROM items') == [('kept',)]
+        try:
+            db.execute("INSERT INTO items (name) VALUES ('kept')")
+        except sqlite3.IntegrityError:
+            pass
+        assert len(pool._idle) == 1 and count() == 1
+
+
+def test_release_rolls_back_open_transaction():
+    with TemporaryDatabase():
+        pool = db.get_pool()
+        conn = pool.acquire()
+        conn.execute("INSERT INTO items (name) VALUES ('uncommitted')")
+        pool.release(conn)
+        assert not conn.in_transaction
+        assert count() == 0
+        # Следующий пользователь соединения не видит и не фиксирует чужую транзакцию
+        with db.connection() as reused:
+            assert reused is conn
+            reused.execute("INSERT INTO items (name) VALUES ('committed')")
+        assert db.fetch_all('SELECT name FROM items') == [('committed',)]
+
+
+def test_concurrent_writers():
+    n_threads, n_writes = 8, 40
+    errors = []
+    # Все писатели и читатель стартуют одновременно
+    barrier = threading.Barrier(n_threads + 1)
+
+    def writer(thread):
+        barrier.wait()
+        try:
+            for i in range(n_writes):
+                with db.connection() as conn:
+                    conn.execute('INSERT INTO items (name, thread) VALUES (?, ?)', (f'{thread}-{i}', thread))
+                    conn.execute('UPDATE counter SET value = value + 1')
+                    # Транзакция держит блокировку записи, остальные писатели ждут busy_timeout
+                    time.sleep(0.001)
+                db.fetch_one('SELECT COUNT(*) FROM items WHERE thread = ?', (thread,))
+        except sqlite3.Error as e:
+            errors.append(e)
+
+    def reader(stop):
+        barrier.wait()
+        try:
+            while not stop.is_set():
+                with db.connection() as conn:
+                    # Читатель в WAL видит согласованный снимок и не блокирует писателей
+                    items, value = conn.execute('SELECT (SELECT COUNT(*) FROM items), value FROM counter').fetchone()
+                    assert items == value, (items, value)
+        except (sqlite3.Error, AssertionError) as e:
+            errors.append(e)
+
+    with TemporaryDatabase():
+        stop = threading.Event()
+        threads = [threading.Thread(target=writer, args=(thread,)) for thread in range(n_threads)]
+        readers = [threading.Thread(target=reader, args=(stop,))]
+        for thread in threads + readers:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stop.set()
+        for thread in readers:
+            thread.join()
+        assert not errors, errors
+        assert count() == n_threads * n_writes
+        assert db.fetch_one('SELECT value FROM counter')[0] == n_threads * n_writes
+        assert len(db.get_pool()._idle) <= db.POOL_SIZE
+
+
+def test_database_exists_does_not_create_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'users.db')
+        assert not db.database_exists(path)
+        assert not os.path.exists(path)
+        with db.connection(path):
+            pass
+        assert db.database_exists(path)
+        db.get_pool(path).close_all()
+        db._pools.pop(path, None)
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"[OK] {name}")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Tests for the figure cache: hits without rebuilding, LRU limits and dataset keys of derived frames"""
+
+import pickle
+
+import pandas as pd
+import plotly.graph_objects as go
+
+import data_loader
+import figure_cache
+from figure_cache import FigureCache, dataset_hash, figure_bytes, make_key
+
+
+def load_sample():
+    with open('sample_project_data_fixed.csv', 'rb') as f:
+        return data_loader.load_file(f.read(), 'sample_project_data_fixed.csv')
+
+
+def make_figure(n_points=10):
+    return go.Figure(go.Bar(x=[f'Задача {i}' for i in range(n_points)], y=list(range(n_points))))
+
+
+def counting_build(calls, n_points=10):
+    def build():
+        calls.append(1)
+        return make_figure(n_points)
+    return build
+
+
+def test_hit_returns_cached_figure_without_build():
+    cache = FigureCache()
+    calls = []
+    first = cache.get(('h', 'dash', (), 'chart'), counting_build(calls))
+    second = cache.get(('h', 'dash', (), 'chart'), counting_build(calls))
+    assert second is first
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    assert stats['bytes'] == figure_bytes(first) > 0
+
+
+def test_lru_eviction_by_count_and_bytes():
+    cache = FigureCache(max_entries=2)
+    calls = []
+    for chart in ['a', 'b', 'a', 'c']:
+        cache.get(('h', 'dash', (), chart), counting_build(calls))
+    assert len(calls) == 3
+    cache.get(('h', 'dash', (), 'b'), counting_build(calls))
+    assert len(calls) == 4
+    assert cache.stats()['evictions'] == 2
+
+    size = figure_bytes(make_figure(100))
+    cache = FigureCache(max_bytes=int(size * 1.5))
+    for chart in ['a', 'b']:
+        cache.get(('h', 'dash', (), chart), counting_build(calls, 100))
+    assert cache.stats()['entries'] == 1
+    assert cache.stats()['bytes'] == size
+
+    # Фигура больше лимита возвращается, но не кешируется
+    cache = FigureCache(max_bytes=10)
+    fig = cache.get(('h', 'dash', (), 'a'), counting_build(calls, 100))
+    assert isinstance(fig, go.Figure) and cache.stats()['entries'] == 0
+
+
+def test_figure_bytes_follows_data_size():
+    # Шаблон макета одинаков, разница объемов - данные трасс
+    sizes = [figure_bytes(make_figure(n)) for n in (10, 1000, 2000)]
+    json_sizes = [len(make_figure(n).to_json()) for n in (10, 1000, 2000)]
+    assert sizes[0] < sizes[1] < sizes[2]
+    assert 0.5 < (sizes[2] - sizes[1]) / (json_sizes[2] - json_sizes[1]) < 2
+
+
+def test_state_order_does_not_matter():
+    df = load_sample()
+    assert make_key(df, 'dash', {'a': 1, 'b': 'x'}, 'c') == make_key(df, 'dash', {'b': 'x', 'a': 1}, 'c')
+    assert make_key(df, 'dash', {'a': 1}, 'c') != make_key(df, 'dash', {'a': 2}, 'c')
+
+
+def test_dataset_hash_of_loaded_and_derived_frames():
+    df = load_sample()
+    assert dataset_hash(df) == df.attrs['content_hash']
+    assert dataset_hash(load_sample()) == dataset_hash(df)
+
+    # Производные наборы наследуют attrs с content_hash, но ключ у них свой
+    changed = df.copy()
+    changed['deviation in days'] = changed['deviation in days'] + 1
+    assert changed.attrs['content_hash'] == df.attrs['content_hash']
+    assert dataset_hash(changed) != dataset_hash(df)
+
+    shuffled = df.iloc[::-1]
+    assert len(shuffled) == len(df)
+    assert dataset_hash(shuffled) not in (dataset_hash(df), dataset_hash(changed))
+
+    filtered = df[df['deviation'] == 1]
+    assert dataset_hash(filtered) != dataset_hash(df)
+    assert dataset_hash(filtered) == dataset_hash(filtered.copy())
+
+    # Колонка, добавленная на месте, тоже меняет ключ
+    df['extra'] = 1
+    assert dataset_hash(df) != df.attrs['content_hash']
+
+
+def test_loaded_token_is_not_inherited():
+    df = load_sample()
+    assert data_loader.loaded_hash(df) == df.attrs['content_hash']
+    # Копии, срезы и concat наследуют attrs с отметкой, но отметка у них недействительна
+    for derived in [df.copy(), df.copy(deep=False), df.iloc[::-1], df[df.columns], df.head(len(df)),
+                    pd.concat([df]), df.assign(extra=1)]:
+        assert derived.attrs['content_hash'] == df.attrs['content_hash']
+        assert data_loader.loaded_hash(derived) is None
+    assert data_loader.loaded_hash(df) == df.attrs['content_hash']
+
+    # Восстановленный из pickle набор - новый объект, ключ считается по значениям
+    restored = pickle.loads(pickle.dumps(df))
+    assert data_loader.loaded_hash(restored) is None
+    assert dataset_hash(restored) == dataset_hash(df.copy())
+
+    # Набор без отметки или с отметкой, прочитанной как текст, тоже не считается загруженным
+    df.attrs['loaded_token'] = str(df.attrs['loaded_token'])
+    assert data_loader.loaded_hash(df) is None
+    assert data_loader.loaded_hash(pd.DataFrame({'a': [1]})) is None
+
+
+def test_dataset_hash_of_concatenated_frames():
+    combined = data_loader.concat_frames([load_sample(), load_sample()])
+    assert dataset_hash(combined) == combined.attrs['content_hash']
+    assert dataset_hash(combined) != dataset_hash(load_sample())
+
+
+def test_cached_figure_uses_shared_cache():
+    df = load_sample()
+    figure_cache.figure_cache.clear()
+    calls = []
+    first = figure_cache.cached_figure(df, 'test', {'project name': 'Завод'}, 'chart', counting_build(calls))
+    again = figure_cache.cached_figure(load_sample(), 'test', {'project name': 'Завод'}, 'chart', counting_build(calls))
+    assert again is first and len(calls) == 1
+    figure_cache.cached_figure(df.iloc[:10], 'test', {'project name': 'Завод'}, 'chart', counting_build(calls))
+    assert len(calls) == 2
+    figure_cache.figure_cache.clear()
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"[OK] {name}")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Regression test: filter_index option lists vs the original dropna/unique/sorted lists"""
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+import filter_index
+
+COLUMNS = ['project name', 'section', 'block', 'task name', 'reason of deviation']
+
+
+def load_sample():
+    with open('sample_project_data_fixed.csv', 'rb') as f:
+        return data_loader.load_file(f.read(), 'sample_project_data_fixed.csv')
+
+
+def sample_with_gaps(categorical=True):
+    """Пример с пропусками, пробелами вокруг значений и неиспользуемой категорией"""
+    df = pd.concat([load_sample()] * 2, ignore_index=True)
+    rng = np.random.default_rng(1)
+    for column in ['project name', 'section', 'block', 'reason of deviation']:
+        values = df[column].astype(object)
+        values[rng.random(len(df)) < 0.15] = None
+        if column == 'project name':
+            # Фильтр сравнивает строки после strip: ' Завод' и 'Завод' - одно значение
+            values[(values == 'Завод') & (rng.random(len(df)) < 0.5)] = ' Завод'
+        df[column] = values.astype('category').cat.add_categories(['Не используется']) if categorical else values
+    return df
+
+
+def old_options(df, column, within=None):
+    """Исходный расчет списков в дашбордах"""
+    filtered = df
+    for filter_column, value in (within or {}).items():
+        if value is not None:
+            filtered = filtered[filtered[filter_column].astype(str).str.strip() == str(value).strip()]
+    return sorted(filtered[column].dropna().unique().tolist())
+
+
+def frames():
+    return [load_sample(), sample_with_gaps(), sample_with_gaps(categorical=False)]
+
+
+def test_options_without_conditions():
+    for df in frames():
+        for column in COLUMNS:
+            assert filter_index.options(df, column) == old_options(df, column), column
+        assert 'Не используется' not in filter_index.options(df, 'project name')
+
+
+def test_options_within_one_column():
+    for df in frames():
+        for project in old_options(df, 'project name') + [' Завод ', 'Нет такого', None]:
+            for column in ['section', 'block', 'task name', 'reason of deviation']:
+                within = {'project name': project}
+                assert filter_index.options(df, column, within) == old_options(df, column, within), (project, column)
+
+
+def test_options_within_several_columns():
+    for df in frames():
+        for project in old_options(df, 'project name'):
+            for section in old_options(df, 'section', {'project name': project}) + ['Нет такого']:
+                within = {'project name': project, 'section': section, 'block': None}
+                for column in ['block', 'task name']:
+                    assert filter_index.options(df, column, within) == old_options(df, column, within)
+
+
+def test_options_return_new_lists():
+    df = load_sample()
+    first = filter_index.options(df, 'project name')
+    first.append('изменено')
+    assert filter_index.options(df, 'project name') == old_options(df, 'project name')
+
+
+def test_value_counts_and_merged_options():
+    df, other = sample_with_gaps(), load_sample()
+    counts = filter_index.value_counts(df, 'project name')
+    assert list(counts) == old_options(df, 'project name')
+    assert counts == df['project name'].value_counts().loc[list(counts)].to_dict()
+    merged = filter_index.merged_options([df, None, other], 'section')
+    assert merged == sorted(set(old_options(df, 'section')) | set(old_options(other, 'section')))
+
+
+def test_new_index_after_frame_change():
+    df = load_sample()
+    index = filter_index.build(df)
+    assert filter_index.get_index(df) is index
+    df['extra'] = 1
+    assert filter_index.get_index(df) is not index
+    assert filter_index.options(df, 'project name') == old_options(df, 'project name')
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"[OK] {name}")
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Regression test: gantt_engine tasks, bars and bar labels vs the original row-by-row (iterrows) construction"""
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+import gantt_engine
+
+DATE_COLUMNS = ['plan start', 'plan end', 'base start', 'base end']
+
+
+def load_sample():
+    with open('sample_project_data_fixed.csv', 'rb') as f:
+        return data_loader.load_file(f.read(), 'sample_project_data_fixed.csv')
+
+
+def sample_with_gaps():
+    """Пример, где у части задач нет плана, факта или одной из дат, и с задачами без названия"""
+    df = pd.concat([load_sample()] * 2, ignore_index=True)
+    rng = np.random.default_rng(0)
+    for column in DATE_COLUMNS:
+        df.loc[(rng.random(len(df)) < 0.15) & (df.index > 5), column] = pd.NaT
+    # Только план и только факт
+    df.loc[[0, 1], ['base start', 'base end']] = pd.NaT
+    df.loc[[2, 3], ['plan start', 'plan end']] = pd.NaT
+    # Ни плана, ни факта
+    df.loc[4, DATE_COLUMNS] = pd.NaT
+    # Отличающиеся даты у второй копии, чтобы задачи не совпадали по срокам
+    second = df.index >= len(df) // 2
+    df.loc[second, 'base end'] = df.loc[second, 'base end'] + pd.Timedelta(days=3)
+    df.loc[5, 'task name'] = np.nan
+    return df
+
+
+def old_prepare_tasks(df):
+    """Исходная подготовка задач: маскированные присваивания отклонений"""
+    filtered_df = df.copy()
+    for col in DATE_COLUMNS:
+        filtered_df[col] = pd.to_datetime(filtered_df[col], errors='coerce', dayfirst=True)
+    has_plan_dates = filtered_df['plan start'].notna() & filtered_df['plan end'].notna()
+    has_fact_dates = filtered_df['base start'].notna() & filtered_df['base end'].notna()
+    filtered_df = filtered_df[has_plan_dates | has_fact_dates].copy()
+    both = (has_plan_dates & has_fact_dates)[filtered_df.index]
+    filtered_df['plan_start_diff'] = None
+    filtered_df['plan_end_diff'] = None
+    filtered_df['total_diff_days'] = 0
+    if both.any():
+        filtered_df.loc[both, 'plan_start_diff'] = (
+            filtered_df.loc[both, 'base start'] - filtered_df.loc[both, 'plan start']).dt.days
+        filtered_df.loc[both, 'plan_end_diff'] = (
+            filtered_df.loc[both, 'base end'] - filtered_df.loc[both, 'plan end']).dt.days
+        # Исходное присваивание object-колонки в int64 в pandas 3 падало; значения те же
+        filtered_df.loc[both, 'total_diff_days'] = filtered_df.loc[both, 'plan_end_diff'].abs().astype(np.int64)
+    # Исходная сортировка была нестабильной; для однозначного сравнения - stable
+    return filtered_df.sort_values('task name', ascending=True, kind='stable')
+
+
+def old_bar_entries(task_name, row):
+    entries = []
+    display_name = f"{task_name} ({row.get('project name', 'Неизвестно')})"
+    for kind, start_col, end_col in gantt_engine.BAR_KINDS:
+        start, end = row.get(start_col), row.get(end_col)
+        if pd.notna(start) and pd.notna(end):
+            entries.append({
+                'Задача': display_name,
+                'Тип': kind,
+                'Дата начала': start,
+                'Дата окончания': end,
+                'Длительность': (end - start).days,
+                'Отклонение': row.get('total_diff_days', 0),
+            })
+    return entries
+
+
+def old_bars(filtered_df, all_projects):
+    """Исходное построение полос: цикл по задачам, iterrows и сортировка по раннему началу"""
+    bar_data = []
+    for task_name in filtered_df['task name'].unique().tolist():
+        task_rows = filtered_df[filtered_df['task name'] == task_name]
+        if task_rows.empty:
+            continue
+        if all_projects:
+            for _, row in task_rows.iterrows():
+                bar_data.extend(old_bar_entries(task_name, row))
+        else:
+            bar_data.extend(old_bar_entries(task_name, task_rows.iloc[0]))
+    bar_df = pd.DataFrame(bar_data)
+    # Исходный порядок: groupby (по имени) и сортировка по началу; при равных началах - stable
+    task_start_dates = bar_df.groupby('Задача')['Дата начала'].min().sort_values(kind='stable')
+    bar_df['sort_order'] = bar_df['Задача'].map({task: idx for idx, task in enumerate(task_start_dates.index)})
+    bar_df = bar_df.sort_values(['sort_order', 'Тип'], ascending=[True, True])
+    return bar_df.drop('sort_order', axis=1).reset_index(drop=True)
+
+
+def russian_percent(value):
+    """Исходная f-строка f'{x:.1f}%' в русском формате подписей (label_format)"""
+    return f"{value:,.1f}".replace(',', '\u00a0').replace('.', ',') + '%'
+
+
+def old_completion(bar_df):
+    """Исходный процент выполнения: для каждой полосы плана - первая полоса факта той же задачи"""
+    bar_df = bar_df.copy()
+    for idx, row in bar_df.iterrows():
+        if row['Тип'] == 'План' and row['Длительность'] > 0:
+            fact_row = bar_df[(bar_df['Задача'] == row['Задача']) & (bar_df['Тип'] == 'Факт')]
+            if not fact_row.empty:
+                completion_pct_str = russian_percent((fact_row.iloc[0]['Длительность'] / row['Длительность']) * 100)
+                bar_df.loc[idx, 'Процент выполнения'] = completion_pct_str
+                bar_df.loc[fact_row.index[0], 'Процент выполнения'] = completion_pct_str
+            else:
+                bar_df.loc[idx, 'Процент выполнения'] = "Н/Д"
+        elif row['Тип'] == 'Факт' and 'Процент выполнения' not in bar_df.columns:
+            bar_df.loc[idx, 'Процент выполнения'] = ""
+    return bar_df
+
+
+def old_traces(bar_df, show_completion):
+    """Исходные трассы графика: (тип, задачи, начала, окончания, подписи) циклом по полосам"""
+    if show_completion:
+        bar_df = old_completion(bar_df)
+    traces = []
+    for kind in ['План', 'Факт']:
+        if kind == 'План' and show_completion:
+            continue
+        tasks, starts, ends, texts = [], [], [], []
+        for _, row in bar_df[bar_df['Тип'] == kind].iterrows():
+            tasks.append(row['Задача'])
+            starts.append(row['Дата начала'])
+            ends.append(row['Дата окончания'])
+            text_label = row['Дата окончания'].strftime('%d.%m.%Y')
+            percent = row.get('Процент выполнения')
+            if show_completion and pd.notna(percent) and percent != "":
+                text_label = f"{text_label} ({percent})"
+            texts.append(text_label)
+        if tasks:
+            traces.append((kind, tasks, starts, ends, texts))
+    return traces
+
+
+def new_traces(fig):
+    return [(trace.name, list(trace.y), list(pd.to_datetime(trace.base)), list(pd.to_datetime(trace.x)),
+             list(trace.text)) for trace in fig.data]
+
+
+def cases():
+    for df in [load_sample(), sample_with_gaps()]:
+        yield df, True
+        for project in df['project name'].dropna().unique()[:2]:
+            yield df[df['project name'] == project], False
+
+
+def test_prepare_tasks_matches_masked_diffs():
+    for df, _ in cases():
+        tasks = gantt_engine.prepare_tasks(df)
+        old = old_prepare_tasks(df).sort_index()
+        assert tasks.index.equals(old.index)
+        for column in ['plan_start_diff', 'plan_end_diff']:
+            assert tasks[column].isna().tolist() == old[column].isna().tolist(), column
+            mask = old[column].notna()
+            assert tasks.loc[mask, column].tolist() == old.loc[mask, column].astype(int).tolist(), column
+        assert tasks['total_diff_days'].tolist() == old['total_diff_days'].astype(int).tolist()
+        for column in DATE_COLUMNS:
+            pd.testing.assert_series_equal(tasks[column], old[column], check_dtype=False)
+
+
+def test_bars_match_iterrows():
+    for df, all_projects in cases():
+        tasks = gantt_engine.prepare_tasks(df)
+        bars = gantt_engine.bar_frame(tasks, per_project=all_projects)
+        expected = old_bars(old_prepare_tasks(df), all_projects)
+        # Задачи без названия исходный цикл выводил как "nan (...)"; новые полосы их пропускают
+        expected = expected[~expected['Задача'].str.startswith('nan (')].reset_index(drop=True)
+        pd.testing.assert_frame_equal(bars, expected, check_dtype=False)
+
+
+def test_labels_match_iterrows():
+    for df, all_projects in cases():
+        tasks = gantt_engine.prepare_tasks(df)
+        bars = gantt_engine.bar_frame(tasks, per_project=all_projects)
+        for show_completion in [False, True]:
+            fig = gantt_engine.gantt_figure(bars, 'Срок работ план/факт', show_completion)
+            assert new_traces(fig) == old_traces(bars, show_completion), (all_projects, show_completion)
+
+
+def test_missing_dates_are_skipped():
+    df = sample_with_gaps()
+    tasks = gantt_engine.prepare_tasks(df)
+    assert 4 not in tasks.index
+    bars = gantt_engine.bar_frame(tasks)
+    assert not bars[['Дата начала', 'Дата окончания']].isna().any().any()
+    only_plan = gantt_engine.bar_frame(tasks.loc[[0, 1]])
+    assert only_plan['Тип'].tolist() == ['План', 'План']
+    only_fact = gantt_engine.bar_frame(tasks.loc[[2, 3]])
+    assert only_fact['Тип'].tolist() == ['Факт', 'Факт']
+    # Без пары дат план/факт отклонение не считается
+    assert tasks.loc[[0, 1, 2, 3], 'total_diff_days'].tolist() == [0, 0, 0, 0]
+    assert tasks.loc[[0, 1, 2, 3], 'plan_end_diff'].isna().all()
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"[OK] {name}")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Regression test: label_format strings vs the original f'{int(x)}' and f'{x:.0f}' labels"""
+
+import numpy as np
+import pandas as pd
+
+from label_format import THOUSANDS_SEPARATOR, bar_labels, format_number, format_numbers
+
+
+def plain(labels):
+    # Прежние подписи без разделителей групп разрядов
+    return [label.replace(THOUSANDS_SEPARATOR, '') for label in labels]
+
+
+def sample_values():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(3, 4, 5000) * rng.choice([-1, 1], 5000)
+    halves = np.arange(-20, 20) + 0.5
+    return np.concatenate([values, halves, [0.0, -0.0, 0.3, -0.3, 0.7, -0.7, 999.5, 1e15]])
+
+
+def test_truncate_matches_int_labels():
+    values = sample_values()
+    expected = [f'{int(x)}' for x in values]
+    assert plain(format_numbers(values, truncate=True)) == expected
+
+
+def test_round_matches_format_labels():
+    values = sample_values()
+    # round(...) + 0.0 убирает "-0" у значений, округляющихся до нуля
+    expected = [f'{round(x) + 0.0:.0f}' for x in values]
+    assert plain(format_numbers(values)) == expected
+
+
+def test_expected_strings():
+    values = [999.5, 1000.5, 0.3, -0.7, -1.5, 1234567.9, 2.5, np.nan, None, np.inf]
+    nbsp = THOUSANDS_SEPARATOR
+    assert format_numbers(values, truncate=True).tolist() == [
+        '999', '1' + nbsp + '000', '0', '0', '-1', '1' + nbsp + '234' + nbsp + '567', '2', '', '', '']
+    assert format_numbers(values).tolist() == [
+        '1' + nbsp + '000', '1' + nbsp + '000', '0', '-1', '-2', '1' + nbsp + '234' + nbsp + '568', '2', '', '', '']
+    assert format_numbers([12.345, -0.04, 1234.5], decimals=1).tolist() == ['12,3', '0,0', '1' + nbsp + '234,5']
+    assert format_numbers([5.996, np.nan], decimals=2, na='0').tolist() == ['6,00', '0']
+    assert format_numbers([0.2, 3], zero='-').tolist() == ['-', '3']
+    assert format_number(999.5, truncate=True) == '999'
+    assert format_number(None, na='0') == '0'
+
+
+def test_input_types():
+    series = pd.Series([1.9, None, 3], dtype='Float64')
+    assert format_numbers(series, truncate=True).tolist() == ['1', '', '3']
+    assert format_numbers(pd.Series(['5', 'нет'])).tolist() == ['5', '']
+    assert format_numbers([]).tolist() == []
+    assert format_numbers([np.nan], na='0').dtype == object
+
+
+def test_bar_labels_hide_only_exact_zeros():
+    values = pd.Series([0.0, 0.3, -0.3, 999.5, np.nan, 1500.0])
+    text, labels = bar_labels(values, truncate=True)
+    # Прежний вариант: f'{int(x)}' if x != 0 для подписи, f'{int(x)}' для подсказки
+    assert plain(text) == ['', '0', '0', '999', '', '1500']
+    assert plain(labels) == ['0', '0', '0', '999', '', '1500']
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"[OK] {name}")
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""Tests for schema migrations: idempotence, upgrade of the original users.db, init_db once per process"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+
+import auth
+import db
+
+TABLES = ['default_filters', 'file_paths_settings', 'password_reset_tokens', 'project_permissions',
+          'report_parameters', 'schema_version', 'user_activity_logs', 'users']
+INDEXES = ['idx_password_reset_tokens_username_used', 'idx_user_activity_logs_action',
+           'idx_user_activity_logs_username_created_at']
+
+
+class TemporaryDatabase:
+    """Переключает базу во временный файл и сбрасывает признак инициализации auth"""
+
+    def __enter__(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._saved = (db.DB_PATH, auth._db_initialized)
+        db.DB_PATH = os.path.join(self._tmp.name, 'users.db')
+        auth._db_initialized = False
+        return db.DB_PATH
+
+    def __exit__(self, *exc_info):
+        db.get_pool().close_all()
+        db._pools.pop(db.DB_PATH, None)
+        db.DB_PATH, auth._db_initialized = self._saved
+        self._tmp.cleanup()
+
+
+def old_init_db(path):
+    """Исходная init_db: схема без таблицы версий, отдельное соединение без WAL"""
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            role TEXT NOT NULL,
+            email TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_login TIMESTAMP,
+            is_active INTEGER DEFAULT 1
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS password_reset_tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            token TEXT UNIQUE NOT NULL,
+            expires_at TIMESTAMP NOT NULL,
+            used INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (username) REFERENCES users(username)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS file_paths_settings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            setting_key TEXT UNIQUE NOT NULL,
+            setting_value TEXT NOT NULL,
+            description TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_by TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_activity_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            action TEXT NOT NULL,
+            details TEXT,
+            ip_address TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (username) REFERENCES users(username)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS project_permissions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            project_name TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_by TEXT,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            UNIQUE(user_id, project_name)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS default_filters (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            role TEXT NOT NULL,
+            report_name TEXT NOT NULL,
+            filter_key TEXT NOT NULL,
+            filter_value TEXT,
+            filter_type TEXT DEFAULT 'string',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_by TEXT,
+            UNIQUE(role, report_name, filter_key)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS report_parameters (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            report_name TEXT NOT NULL,
+            parameter_key TEXT NOT NULL,
+            parameter_value TEXT,
+            parameter_type TEXT DEFAULT 'string',
+            description TEXT,
+            is_editable_by_analyst INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_by TEXT,
+            UNIQUE(report_name, parameter_key)
+        )
+    ''')
+    conn.commit()
+    cursor.execute('SELECT COUNT(*) FROM users WHERE role = ?', ('superadmin',))
+    if cursor.fetchone()[0] == 0:
+        cursor.execute('INSERT INTO users (username, password_hash, role, email) VALUES (?, ?, ?, ?)',
+                       ('admin', auth.hash_password('admin123'), 'superadmin', 'admin@example.com'))
+        conn.commit()
+    conn.close()
+
+
+def schema(path):
+    """Объекты схемы и их SQL (без служебных таблиц SQLite)"""
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT type, name, sql FROM sqlite_master "
+                            "WHERE name NOT LIKE 'sqlite_%' ORDER BY type, name").fetchall()
+    finally:
+        conn.close()
+
+
+def names(path, object_type):
+    return [name for kind, name, _ in schema(path) if kind == object_type]
+
+
+def versions():
+    return [row[0] for row in db.fetch_all('SELECT version FROM schema_version ORDER BY version')]
+
+
+def test_fresh_database():
+    with TemporaryDatabase() as path:
+        assert db.migrate(auth.MIGRATIONS) == 2
+        assert versions() == [1, 2]
+        assert names(path, 'table') == TABLES
+        assert names(path, 'index') == INDEXES
+        with db.connection() as conn:
+            assert db.schema_version(conn) == 2
+
+
+def test_migrations_are_idempotent():
+    with TemporaryDatabase() as path:
+        db.migrate(auth.MIGRATIONS)
+        db.execute("INSERT INTO users (username, password_hash, role) VALUES ('user', 'x', 'analyst')")
+        before = schema(path)
+        for _ in range(3):
+            assert db.migrate(auth.MIGRATIONS) == 2
+        assert schema(path) == before
+        assert versions() == [1, 2]
+        assert db.fetch_all('SELECT username FROM users') == [('user',)]
+
+        # Каждая миграция сама по себе повторяема (IF NOT EXISTS)
+        with db.connection() as conn:
+            for _, migration in auth.MIGRATIONS:
+                migration(conn)
+        assert schema(path) == before
+
+
+def test_upgrade_original_database():
+    with TemporaryDatabase() as path:
+        old_init_db(path)
+        conn = sqlite3.connect(path)
+        conn.execute("INSERT INTO users (username, password_hash, role) VALUES ('analyst', 'x', 'analyst')")
+        conn.execute("INSERT INTO report_parameters (report_name, parameter_key, parameter_value) "
+                     "VALUES ('Отчет', 'key', 'value')")
+        conn.commit()
+        # Исходная база не хранит версию схемы ни в таблице, ни в user_version
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == 0
+        conn.close()
+        assert 'schema_version' not in names(path, 'table')
+        original = schema(path)
+
+        assert db.migrate(auth.MIGRATIONS) == 2
+        assert versions() == [1, 2]
+        # Версия 1 совпадает с исходной схемой и ничего в ней не меняет
+        assert [row for row in schema(path) if row[1] != 'schema_version' and row[0] != 'index'] == original
+        assert names(path, 'index') == INDEXES
+        assert db.fetch_all('SELECT username, role FROM users ORDER BY id') == [('admin', 'superadmin'),
+                                                                               ('analyst', 'analyst')]
+        assert db.fetch_one('SELECT parameter_value FROM report_parameters')[0] == 'value'
+
+        auth.init_db()
+        assert db.fetch_one('SELECT COUNT(*) FROM users')[0] == 2
+
+
+def test_upgrade_from_version_one():
+    with TemporaryDatabase() as path:
+        assert db.migrate(auth.MIGRATIONS[:1]) == 1
+        assert names(path, 'index') == []
+        assert db.migrate(auth.MIGRATIONS) == 2
+        assert versions() == [1, 2]
+        assert names(path, 'index') == INDEXES
+
+
+def test_failed_migration_is_rolled_back():
+    def broken(conn):
+        conn.execute('CREATE TABLE extra (id INTEGER)')
+        conn.execute("INSERT INTO users (username, password_hash, role) VALUES ('ghost', 'x', 'analyst')")
+        raise sqlite3.OperationalError('ошибка в середине миграции')
+
+    def fixed(conn):
+        conn.execute('CREATE TABLE extra (id INTEGER)')
+
+    with TemporaryDatabase() as path:
+        db.migrate(auth.MIGRATIONS)
+        try:
+            db.migrate(auth.MIGRATIONS + [(3, broken)])
+        except sqlite3.OperationalError:
+            pass
+        else:
+            raise AssertionError('ошибка миграции должна передаваться вызывающему')
+        assert versions() == [1, 2]
+        assert 'extra' not in names(path, 'table')
+        assert db.fetch_one('SELECT COUNT(*) FROM users')[0] == 0
+
+        # Миграции применяются по номеру версии, а не по порядку в списке
+        assert db.migrate([(3, fixed)] + auth.MIGRATIONS) == 3
+        assert versions() == [1, 2, 3]
+        assert 'extra' in names(path, 'table')
+        assert db.migrate(auth.MIGRATIONS + [(3, broken)]) == 3
+
+
+def test_concurrent_migrations_run_once():
+    calls = []
+
+    def counted(conn):
+        calls.append(threading.get_ident())
+        conn.execute('CREATE TABLE extra (id INTEGER)')
+
+    with TemporaryDatabase():
+        errors = []
+
+        def run():
+            try:
+                assert db.migrate(auth.MIGRATIONS + [(3, counted)]) == 3
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors, errors
+        assert len(calls) == 1
+        assert versions() == [1, 2, 3]
+
+
+def test_init_db_runs_once_per_process():
+    with TemporaryDatabase():
+        migrate = db.migrate
+        calls = []
+
+        def counted_migrate(*args, **kwargs):
+            calls.append(args)
+            return migrate(*args, **kwargs)
+
+        db.migrate = counted_migrate
+        try:
+            threads = [threading.Thread(target=auth.init_db) for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert len(calls) == 1
+            assert auth._db_initialized
+            assert db.fetch_all("SELECT username FROM users WHERE role = 'superadmin'") == [('admin',)]
+
+            # Повторные вызовы (перезапуски скрипта) не трогают базу
+            db.execute("DELETE FROM users")
+            auth.init_db()
+            assert len(calls) == 1
+            assert db.fetch_one('SELECT COUNT(*) FROM users')[0] == 0
+
+            # Новый процесс снова проверяет схему и суперадминистратора
+            auth._db_initialized = False
+            auth.init_db()
+            assert len(calls) == 2
+            assert versions() == [1, 2]
+            assert db.fetch_all("SELECT username FROM users WHERE role = 'superadmin'") == [('admin',)]
+        finally:
+            db.migrate = migrate
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"[OK] {name}")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Regression test: period_keys / period_column vs the original masked dt.to_period and dt.date assignments"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+from data_loader import PERIOD_COLUMNS, period_column, period_keys, periods_from_keys
+
+FREQS = ['D', 'M', 'Q', 'Y']
+
+
+def load_sample():
+    with open('sample_project_data_fixed.csv', 'rb') as f:
+        return data_loader.load_file(f.read(), 'sample_project_data_fixed.csv')
+
+
+def old_period_columns(df):
+    """Исходный вывод периодов при загрузке: маскированные присваивания dt.date / dt.to_period"""
+    df = df.copy()
+    for date_col, prefix in [('plan start', 'plan_start'), ('plan end', 'plan'),
+                             ('base start', 'base_start'), ('base end', 'base')]:
+        mask = df[date_col].notna()
+        df.loc[mask, f'{prefix}_day'] = df.loc[mask, date_col].dt.date
+        for level, freq in [('month', 'M'), ('quarter', 'Q'), ('year', 'Y')]:
+            df.loc[mask, f'{prefix}_{level}'] = df.loc[mask, date_col].dt.to_period(freq)
+    mask = df['base end'].notna()
+    for level, freq in [('month', 'M'), ('quarter', 'Q'), ('year', 'Y')]:
+        df.loc[mask, f'actual_{level}'] = df.loc[mask, 'base end'].dt.to_period(freq)
+    return df
+
+
+def dates_with_gaps():
+    """Даты через границы лет, до 1970 года, 29 февраля, со временем суток и с пропусками"""
+    dates = pd.Series(pd.to_datetime([
+        '2024-02-29', '2023-12-31 23:59:59', '2024-01-01', None, '1969-12-31', '1968-03-01 12:00',
+        '1970-01-01', '2025-03-31', '2025-04-01', None, '1900-01-01', '2099-12-31', '2000-02-29',
+    ], format='ISO8601'))
+    return dates
+
+
+def sample_with_gaps():
+    """Пример с датами, удаленными в части строк до разбора (колонка факта старта - целиком)"""
+    with open('sample_project_data_fixed.csv', 'rb') as f:
+        table = data_loader.read_table(f.read(), 'sample_project_data_fixed.csv')
+    rng = np.random.default_rng(0)
+    for column in ['Старт План', 'Конец План', 'Конец Факт']:
+        table.loc[rng.random(len(table)) < 0.2, column] = None
+    table['Старт Факт'] = None
+    return data_loader.normalize_frame(table)
+
+
+def test_keys_match_period_ordinals():
+    dates = dates_with_gaps()
+    for freq in FREQS:
+        keys = period_keys(dates, freq)
+        assert keys.dtype == 'Int32'
+        expected = dates.dt.to_period(freq)
+        assert keys.isna().tolist() == dates.isna().tolist(), freq
+        mask = dates.notna().to_numpy()
+        np.testing.assert_array_equal(keys.to_numpy(dtype=np.int64, na_value=0)[mask],
+                                      expected.array.asi8[mask], err_msg=freq)
+
+
+def test_periods_from_keys_match_old_values():
+    dates = dates_with_gaps()
+    mask = dates.notna()
+    for freq in FREQS:
+        values = pd.Series(periods_from_keys(period_keys(dates, freq), freq))
+        old = dates[mask].dt.date if freq == 'D' else dates[mask].dt.to_period(freq)
+        assert values[mask].tolist() == old.tolist(), freq
+        assert values.isna().tolist() == (~mask).tolist(), freq
+        # Те же строки, что давал str() исходных значений (подписи и фильтры по строкам)
+        assert [str(value) for value in values[mask]] == [str(value) for value in old], freq
+        if freq == 'D':
+            assert all(type(value) is datetime.date for value in values[mask])
+        else:
+            assert values.dtype == pd.PeriodDtype(freq)
+    assert [str(value) for value in periods_from_keys(period_keys(dates[:3], 'M'), 'M')] == \
+        [date.strftime('%Y-%m') for date in dates[:3]]
+
+
+def test_period_column_matches_masked_assignment():
+    for df in [load_sample(), sample_with_gaps()]:
+        old = old_period_columns(df)
+        for name in PERIOD_COLUMNS:
+            result = period_column(df, name)
+            if old[name].isna().all():
+                # В исходной таблице колонка была пустой, теперь ее нет
+                assert result is None, name
+                continue
+            assert result.name == name and result.index.equals(df.index)
+            assert result.isna().tolist() == old[name].isna().tolist(), name
+            mask = old[name].notna()
+            assert result[mask].tolist() == old.loc[mask, name].tolist(), name
+
+
+def test_materialized_columns_and_missing_dates():
+    df = sample_with_gaps()
+    old = old_period_columns(df)
+    for name in data_loader.MATERIALIZED_PERIOD_COLUMNS:
+        assert name in df.columns
+        pd.testing.assert_series_equal(period_column(df, name), df[name])
+        assert df[name].isna().tolist() == old[name].isna().tolist(), name
+        mask = old[name].notna()
+        assert df.loc[mask, name].tolist() == old.loc[mask, name].tolist(), name
+    assert period_column(df, 'unknown_month') is None
+    assert period_column(df.drop(columns=['plan start']), 'plan_start_month') is None
+    text_dates = df.assign(**{'plan start': df['plan start'].astype(str)})
+    assert period_column(text_dates, 'plan_start_month') is None
+
+
+def old_dynamics_grouping(df, freq):
+    """Исходная группировка динамики отклонений: период масками, строки без периода отброшены"""
+    df = df.copy()
+    mask = df['plan end'].notna()
+    if freq == 'D':
+        df.loc[mask, 'period'] = df.loc[mask, 'plan end'].dt.date
+    else:
+        df.loc[mask, 'period'] = df.loc[mask, 'plan end'].dt.to_period(freq)
+    df = df[df['period'].notna()]
+    df['deviation in days'] = pd.to_numeric(df['deviation in days'], errors='coerce')
+    return df.groupby(['period', 'project name'], observed=True).agg(
+        {'deviation': 'count', 'deviation in days': 'sum'}).reset_index()
+
+
+def new_dynamics_grouping(df, name):
+    """Группировка в dashboards/dynamics_of_deviations.py через period_column"""
+    df = df.copy()
+    df['period'] = period_column(df, name)
+    df = df[df['period'].notna()]
+    df['deviation in days'] = pd.to_numeric(df['deviation in days'], errors='coerce')
+    return df.groupby(['period', 'project name'], observed=True).agg(
+        {'deviation': 'count', 'deviation in days': 'sum'}).reset_index()
+
+
+def test_dynamics_grouping_with_missing_dates():
+    df = sample_with_gaps()
+    # Строки без даты окончания не попадают ни в один период
+    assert df['plan end'].isna().any()
+    for freq, name in [('D', 'plan_day'), ('M', 'plan_month'), ('Q', 'plan_quarter'), ('Y', 'plan_year')]:
+        old = old_dynamics_grouping(df, freq)
+        new = new_dynamics_grouping(df, name)
+        assert new['period'].tolist() == old['period'].tolist(), freq
+        pd.testing.assert_frame_equal(new.drop(columns='period'), old.drop(columns='period'),
+                                      check_dtype=False, obj=freq)
+        assert new['deviation'].sum() == df.loc[df['plan end'].notna() & df['project name'].notna(), 'deviation'].count()
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"[OK] {name}")
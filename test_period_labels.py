@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Regression test: period_labels label tables vs the original format_period_display, round trips and period order"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import period_labels
+from period_labels import MISSING_LABEL, format_period, format_periods, label_categories, ordered_labels
+
+
+def old_format_period_display(period_val):
+    """Исходная подпись периода в дашбордах"""
+    if pd.isna(period_val):
+        return 'Н/Д'
+    if period_val.freqstr.startswith('M'):
+        return f"{period_labels.RUSSIAN_MONTHS[period_val.month]} {period_val.year}"
+    if period_val.freqstr.startswith('Q'):
+        return f"Q{period_val.quarter} {period_val.year}"
+    return str(period_val.year)
+
+
+def periods_across_years(freq, n_periods=40):
+    """Периоды в обратном порядке с повторами и пропуском, через границы лет"""
+    index = pd.period_range('2023-10', periods=n_periods, freq='M').asfreq(freq)
+    values = pd.Series(list(index[::-1]) + list(index[:5]), dtype=index.dtype)
+    values[3] = pd.NaT
+    return values
+
+
+def test_labels_match_old_format():
+    for freq in ['M', 'Q', 'Y']:
+        values = periods_across_years(freq)
+        expected = values.apply(old_format_period_display).to_numpy(dtype=object)
+        assert format_periods(values).tolist() == expected.tolist(), freq
+        assert [format_period(value) for value in values] == expected.tolist(), freq
+    days = pd.Series(pd.period_range('2024-12-30', periods=4, freq='D'))
+    assert format_periods(days).tolist() == ['30.12.2024', '31.12.2024', '01.01.2025', '02.01.2025']
+
+
+def test_month_label_round_trip():
+    months = pd.period_range('1999-11', '2031-02', freq='M')
+    labels = format_periods(months)
+    assert len(set(labels)) == len(months)
+    assert [period_labels.parse_month_label(label) for label in labels] == list(months)
+    assert period_labels.parse_month_label('Q1 2025') is None
+    assert period_labels.parse_month_label('Январь') is None
+    assert period_labels.parse_month_label(MISSING_LABEL) is None
+
+
+def test_ordered_labels_follow_periods_across_years():
+    values = periods_across_years('M', 5)
+    # По строкам "Январь 2024" шел бы раньше "Ноябрь 2023"
+    assert ordered_labels(values) == ['Октябрь 2023', 'Ноябрь 2023', 'Декабрь 2023', 'Январь 2024', 'Февраль 2024']
+    assert ordered_labels(periods_across_years('Q', 9)) == ['Q4 2023', 'Q1 2024', 'Q2 2024']
+    assert ordered_labels(periods_across_years('Y', 16)) == ['2023', '2024', '2025']
+    for freq in ['M', 'Q', 'Y']:
+        values = periods_across_years(freq)
+        expected = [old_format_period_display(value) for value in sorted(values.dropna().unique())]
+        assert ordered_labels(values) == expected, freq
+
+
+def test_label_categories_group_in_period_order():
+    values = periods_across_years('M')
+    categories = label_categories(values)
+    assert categories.ordered
+    assert list(categories.categories) == ordered_labels(values) + [MISSING_LABEL]
+    assert list(categories.astype(object)) == format_periods(values).tolist()
+    counts = pd.Series(1, index=categories).groupby(level=0, observed=True).size()
+    assert list(counts.index) == ordered_labels(values) + [MISSING_LABEL]
+    assert MISSING_LABEL not in label_categories(values.dropna()).categories
+
+
+def test_table_extends_in_both_directions():
+    later = pd.Series(pd.period_range('2100-01', periods=3, freq='Q'))
+    earlier = pd.Series(pd.period_range('1900-01', periods=3, freq='Q'))
+    assert format_periods(later).tolist() == ['Q1 2100', 'Q2 2100', 'Q3 2100']
+    assert format_periods(earlier).tolist() == ['Q1 1900', 'Q2 1900', 'Q3 1900']
+    assert format_periods(later).tolist() == ['Q1 2100', 'Q2 2100', 'Q3 2100']
+
+
+def test_scalar_values_without_warnings():
+    values = ['2025-01', None, pd.Timestamp('2024-02-03'), '2025-01-15', 'Итого', np.nan, '2025-01',
+              pd.Period('2024-12', freq='M'), pd.Period('2024Q4', freq='Q')]
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        labels = format_periods(values).tolist()
+        assert format_periods(pd.Series(values, dtype=object)).tolist() == labels
+    assert labels == ['Январь 2025', 'Н/Д', '03.02.2024', 'Январь 2025', 'Итого', 'Н/Д', 'Январь 2025',
+                      'Декабрь 2024', 'Q4 2024']
+    assert format_periods([None, None], na='-').tolist() == ['-', '-']
+    assert format_periods(pd.Series([pd.NaT], dtype='period[M]')).tolist() == [MISSING_LABEL]
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"[OK] {name}")
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Regression test: query_engine filters and aggregate (pandas and DuckDB paths) vs the original masks and groupby"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_loader
+import query_engine
+
+ENGINES = ['pandas', 'duckdb']
+SUMS = ('budget plan', 'budget fact', 'reserve budget')
+
+
+def load_sample():
+    with open('sample_project_data_fixed.csv', 'rb') as f:
+        return data_loader.load_file(f.read(), 'sample_project_data_fixed.csv')
+
+
+def sample_with_gaps():
+    """Пример, размноженный с пропусками в ключах и неиспользуемой категорией"""
+    df = pd.concat([load_sample()] * 3, ignore_index=True)
+    rng = np.random.default_rng(0)
+    for column in ['project name', 'section', 'reason of deviation']:
+        df[column] = df[column].cat.add_categories(['Не используется'])
+        df.loc[rng.random(len(df)) < 0.1, column] = np.nan
+    df.loc[rng.random(len(df)) < 0.1, 'plan_month'] = pd.NaT
+    df.loc[rng.random(len(df)) < 0.1, 'budget plan'] = None
+    return df
+
+
+def run(engine, *args, **kwargs):
+    if engine == 'duckdb' and not (query_engine.DUCKDB_AVAILABLE and query_engine.ARROW_AVAILABLE):
+        pytest.skip('duckdb не установлен')
+    default_min_rows = query_engine.DUCKDB_MIN_ROWS
+    query_engine.DUCKDB_MIN_ROWS = 0 if engine == 'duckdb' else float('inf')
+    try:
+        return query_engine.aggregate(*args, **kwargs)
+    finally:
+        query_engine.DUCKDB_MIN_ROWS = default_min_rows
+
+
+def reference(df, group_by, filters=None, sums=SUMS, count_name=None, deviation_only=False):
+    """Исходная цепочка дашбордов: фильтр по строкам, to_numeric, groupby"""
+    filtered = df.copy()
+    for column, value in (filters or {}).items():
+        if isinstance(value, pd.Period):
+            filtered = filtered[filtered[column] == value]
+        else:
+            filtered = filtered[filtered[column].astype(str).str.strip() == str(value).strip()]
+    if deviation_only:
+        filtered = filtered[(filtered['deviation'] == True) | (filtered['deviation'] == 1)]
+    filtered['budget plan'] = pd.to_numeric(filtered['budget plan'], errors='coerce')
+    filtered['budget fact'] = pd.to_numeric(filtered['budget fact'], errors='coerce')
+    filtered['reserve budget'] = filtered['budget plan'] - filtered['budget fact']
+    grouped = filtered.groupby(group_by, sort=True, observed=True)
+    # Движок возвращает суммы в float64 и для целочисленных колонок
+    result = grouped[list(sums)].sum().astype(np.float64)
+    if count_name:
+        result[count_name] = grouped.size().astype(np.int64)
+    return result.reset_index()
+
+
+CASES = [
+    (['plan_month', 'project name'], None, False),
+    (['project name'], None, True),
+    (['section', 'reason of deviation'], None, False),
+    (['plan_month'], {'project name': ' Завод '}, False),
+    (['reason of deviation'], {'plan_month': pd.Period('2024-12', freq='M')}, True),
+]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_sample_matches_groupby(engine):
+    df = load_sample()
+    for group_by, filters, deviation_only in CASES:
+        result = run(engine, df, group_by, filters, sums=SUMS, count_name='count', deviation_only=deviation_only)
+        expected = reference(df, group_by, filters, count_name='count', deviation_only=deviation_only)
+        pd.testing.assert_frame_equal(result, expected, check_categorical=False, obj=f'{engine} {group_by}')
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_categorical_and_missing_keys(engine):
+    df = sample_with_gaps()
+    for group_by, filters, deviation_only in CASES:
+        result = run(engine, df, group_by, filters, sums=SUMS, count_name='count', deviation_only=deviation_only)
+        expected = reference(df, group_by, filters, count_name='count', deviation_only=deviation_only)
+        # Строки с пропуском в ключе и неиспользуемые категории в результат не попадают
+        assert 'Не используется' not in result.astype(str).to_numpy()
+        assert not result[group_by].isna().any().any()
+        pd.testing.assert_frame_equal(result, expected, check_categorical=False, obj=f'{engine} {group_by}')
+    for column in ['project name', 'section']:
+        assert run(engine, df, [column], count_name='count')[column].dtype == df[column].dtype
+
+
+def test_engines_agree():
+    if not (query_engine.DUCKDB_AVAILABLE and query_engine.ARROW_AVAILABLE):
+        pytest.skip('duckdb не установлен')
+    df = sample_with_gaps()
+    for group_by, filters, deviation_only in CASES:
+        results = [run(engine, df, group_by, filters, sums=SUMS, count_name='count', deviation_only=deviation_only)
+                   for engine in ENGINES]
+        pd.testing.assert_frame_equal(results[0], results[1], check_exact=False)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_unknown_value_and_missing_column(engine):
+    df = load_sample()
+    empty = run(engine, df, ['project name'], {'project name': 'Нет такого'}, sums=SUMS, count_name='count')
+    assert empty.empty
+    assert list(empty.columns) == ['project name', *SUMS, 'count']
+    missing = run(engine, df, ['нет колонки'], sums=SUMS)
+    assert missing.empty and list(missing.columns) == ['нет колонки', *SUMS]
+
+
+def old_mask(df, filters=None, deviation_only=False):
+    """Исходный фильтр дашбордов: сравнение строк после strip по каждой колонке"""
+    mask = pd.Series(True, index=df.index)
+    for column, value in (filters or {}).items():
+        if column not in df.columns:
+            continue
+        if isinstance(value, pd.Period):
+            mask &= df[column] == value
+        else:
+            mask &= df[column].astype(str).str.strip() == str(value).strip()
+    if deviation_only and 'deviation' in df.columns:
+        deviation = df['deviation']
+        mask &= (
+            (deviation == True) |
+            (deviation == 1) |
+            (deviation.astype(str).str.lower() == 'true') |
+            (deviation.astype(str).str.strip() == '1')
+        )
+    return mask.to_numpy(dtype=bool)
+
+
+FILTERS = [
+    None,
+    {'project name': 'Завод'},
+    {'project name': ' Завод '},
+    {'project name': 'Завод', 'section': 'Нет такого'},
+    {'project name': 'Нет такого'},
+    {'нет колонки': 'Завод'},
+    {'plan_month': pd.Period('2024-12', freq='M')},
+    {'plan_month': pd.Period('2030-01', freq='M'), 'project name': 'Завод'},
+]
+
+
+def test_filter_positions_match_masks():
+    sample = sample_with_gaps()
+    frames = [load_sample(), sample, sample.astype({'project name': object, 'section': object})]
+    for df in frames:
+        sections = df['section'].dropna().unique().tolist()
+        cases = FILTERS + [{'project name': 'Завод', 'section': section} for section in sections]
+        for filters in cases:
+            for deviation_only in [False, True]:
+                positions = query_engine.filter_positions(df, filters, deviation_only)
+                expected = np.flatnonzero(old_mask(df, filters, deviation_only))
+                np.testing.assert_array_equal(positions, expected, err_msg=str((filters, deviation_only)))
+                pd.testing.assert_frame_equal(query_engine.filter_frame(df, filters, deviation_only),
+                                              df[old_mask(df, filters, deviation_only)])
+
+
+def test_deviation_formats():
+    df = pd.DataFrame({
+        'project name': ['А'] * 7,
+        'deviation': pd.Series([True, 1, 'True', ' 1', 'false', 0, None], dtype=object),
+    })
+    positions = query_engine.filter_positions(df, {'project name': 'А'}, deviation_only=True)
+    np.testing.assert_array_equal(positions, np.flatnonzero(old_mask(df, None, True)))
+    np.testing.assert_array_equal(positions, [0, 1, 2, 3])
+    # Без колонки deviation условие пропускается
+    no_deviation = df.drop(columns='deviation')
+    np.testing.assert_array_equal(query_engine.filter_positions(no_deviation, None, True), np.arange(7))
+
+
+def test_postings():
+    values = pd.array(['б', 'а', None, 'б', 'в', 'а', 'б'], dtype=object)
+    postings = query_engine.Postings(values)
+    assert postings.code(None) == -1 and postings.code('нет') == -1
+    assert postings.codes[2] == -1
+    np.testing.assert_array_equal(postings.rows(postings.code('б')), [0, 3, 6])
+    np.testing.assert_array_equal(postings.rows(postings.code('а')), [1, 5])
+    np.testing.assert_array_equal(postings.rows(postings.code('в')), [4])
+    assert len(postings.rows(-1)) == 0
+    for value in ['а', 'б', 'в']:
+        code = postings.code(value)
+        np.testing.assert_array_equal(postings.rows(code), np.flatnonzero(postings.codes == code))
+
+
+def test_postings_of_periods():
+    df = sample_with_gaps()
+    postings = query_engine.get_view(df).postings('period:plan_month')
+    for period in df['plan_month'].dropna().unique():
+        rows = postings.rows(postings.code(int(period.ordinal)))
+        np.testing.assert_array_equal(rows, np.flatnonzero((df['plan_month'] == period).to_numpy()))
+    assert (postings.codes[df['plan_month'].isna().to_numpy()] == -1).all()
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            for engine in ENGINES if 'engine' in test.__code__.co_varnames[:test.__code__.co_argcount] else [None]:
+                test(*([engine] if engine else []))
+            print(f"[OK] {name}")
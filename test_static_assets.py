@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""Tests for the cached font CSS and hashed static assets: stable names, rebuild on change, inline fallback"""
+
+import os
+import re
+import tempfile
+
+from streamlit import config
+from streamlit.testing.v1 import AppTest
+
+import utils
+
+FONT_CSS = """@import url('https://fonts.googleapis.com/icon?family=Material+Icons');
+@font-face{
+    font-family: 'Test';
+    src: url('../fonts/Test/Test_Regular.eot');
+    src: url('../fonts/Test/Test_Regular.eot?#iefix') format('embedded-opentype'),
+         url("../fonts/Test/Test_Regular.woff2") format('woff2'),
+         url(../fonts/Test/Test_Regular.woff) format('woff');
+    font-weight: 400;
+}
+@font-face{
+    font-family: 'Legacy';
+    src: url('../fonts/Legacy/Legacy.ttf') format('truetype');
+}
+"""
+
+STYLE_CSS = ":root { --themeBackground: #fff; }\n"
+
+
+class TemporaryProject:
+    """Переключает каталоги стилей во временный проект и очищает кеши сборки"""
+
+    def __enter__(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._saved = (utils.PROJECT_DIR, utils.FONTS_DIR, utils.STYLE_BUILD_DIR,
+                       dict(utils._style_cache), dict(utils._font_refs_cache))
+        root = self._tmp.name
+        utils.PROJECT_DIR = root
+        utils.FONTS_DIR = os.path.join(root, 'static', 'fonts')
+        utils.STYLE_BUILD_DIR = os.path.join(root, 'static', 'build')
+        utils._style_cache.clear()
+        utils._font_refs_cache.clear()
+        write(root, 'static/css/font_style.css', FONT_CSS)
+        write(root, 'static/css/style.css', STYLE_CSS)
+        for name, payload in [('Test/Test_Regular.eot', b'eot'), ('Test/Test_Regular.woff2', b'woff2-v1'),
+                              ('Test/Test_Regular.woff', b'woff'), ('Legacy/Legacy.ttf', b'ttf')]:
+            write(root, f'static/fonts/{name}', payload)
+        return root
+
+    def __exit__(self, *exc_info):
+        (utils.PROJECT_DIR, utils.FONTS_DIR, utils.STYLE_BUILD_DIR, style_cache, font_refs_cache) = self._saved
+        utils._style_cache.clear()
+        utils._style_cache.update(style_cache)
+        utils._font_refs_cache.clear()
+        utils._font_refs_cache.update(font_refs_cache)
+        self._tmp.cleanup()
+
+
+def write(root, relative_path, content):
+    """Записывает файл и сдвигает mtime, чтобы изменение было видно и при грубом таймере ФС"""
+    path = os.path.join(root, relative_path)
+    previous = os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content if isinstance(content, bytes) else content.encode('utf-8'))
+    mtime = max(os.stat(path).st_mtime_ns, previous + 1_000_000_000)
+    os.utime(path, ns=(mtime, mtime))
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def build_files(root):
+    build_dir = os.path.join(root, 'static', 'build')
+    return sorted(os.path.relpath(os.path.join(directory, name), build_dir).replace(os.sep, '/')
+                  for directory, _, names in os.walk(build_dir) for name in names)
+
+
+def test_font_css_is_cached_and_bundled():
+    with TemporaryProject() as root:
+        css = utils.build_font_css()
+        # В @font-face с woff2 остается только woff2, остальные шрифты встраиваются как есть
+        assert "url('data:font/woff2;base64,d29mZjItdjE=') format('woff2');" in css
+        assert 'embedded-opentype' not in css and 'font/woff;' not in css
+        assert "url('data:font/ttf;base64,dHRm')" in css
+        assert "@import url('https://fonts.googleapis.com/icon?family=Material+Icons')" in css
+        assert utils.build_font_css() is css
+        assert build_files(root) == ['font_style.inline.css', 'font_style.inline.css.json']
+
+        # Новый процесс берет собранный CSS с диска, не кодируя шрифты заново
+        utils._style_cache.clear()
+        utils._font_refs_cache.clear()
+        inline_fonts = utils._inline_fonts
+        utils._inline_fonts = None
+        try:
+            assert utils.build_font_css() == css
+        finally:
+            utils._inline_fonts = inline_fonts
+        assert utils.build_font_css(use_bundle=False) == css
+        assert utils.build_font_css('static/css/missing.css') is None
+
+
+def test_font_css_rebuilds_when_sources_change():
+    with TemporaryProject() as root:
+        css = utils.build_font_css()
+        write(root, 'static/fonts/Test/Test_Regular.woff2', b'woff2-v2')
+        changed_font = utils.build_font_css()
+        assert changed_font != css and 'd29mZjItdjI=' in changed_font
+
+        # Шрифт, на который ссылается только новый CSS, тоже отслеживается
+        write(root, 'static/css/font_style.css', FONT_CSS.replace('Legacy/Legacy.ttf', 'Legacy/Legacy2.ttf'))
+        assert "url('../fonts/Legacy/Legacy2.ttf')" in utils.build_font_css()
+        write(root, 'static/fonts/Legacy/Legacy2.ttf', b'ttf2')
+        assert "url('data:font/ttf;base64,dHRmMg==')" in utils.build_font_css()
+
+        # Подпись в файле сборки не совпадает - собранный CSS с диска не используется
+        utils._style_cache.clear()
+        write(root, 'static/fonts/Test/Test_Regular.woff2', b'woff2-v3')
+        assert 'd29mZjItdjM=' in utils.build_font_css()
+
+
+def test_static_css_names_are_stable():
+    with TemporaryProject() as root:
+        style_url = utils.build_static_css('static/css/style.css')
+        font_url = utils.build_static_css('static/css/font_style.css', with_fonts=True)
+        assert re.fullmatch(r'app/static/build/style\.[0-9a-f]{12}\.css', style_url)
+        assert re.fullmatch(r'app/static/build/font_style\.[0-9a-f]{12}\.css', font_url)
+        assert utils.build_static_css('static/css/style.css') == style_url
+        assert utils.build_static_css('static/css/font_style.css', with_fonts=True) == font_url
+
+        files = build_files(root)
+        assert len(files) == 4
+        font_files = [name for name in files if name.startswith('fonts/')]
+        assert [re.sub(r'\.[0-9a-f]{12}\.', '.', name) for name in font_files] == ['fonts/Legacy.ttf',
+                                                                                    'fonts/Test_Regular.woff2']
+        published_css = read(os.path.join(root, 'static', 'build', font_url.split('/')[-1])).decode('utf-8')
+        for name in font_files:
+            assert f"url('{name}')" in published_css
+            assert read(os.path.join(root, 'static', 'build', name)) in (b'ttf', b'woff2-v1')
+        assert 'Test_Regular.woff' not in published_css.replace('Test_Regular.woff2', '')
+
+        # Тот же контент в новом процессе (пустой кеш) дает те же имена
+        utils._style_cache.clear()
+        utils._font_refs_cache.clear()
+        assert utils.build_static_css('static/css/style.css') == style_url
+        assert utils.build_static_css('static/css/font_style.css', with_fonts=True) == font_url
+        assert build_files(root) == files
+        assert utils.build_static_css('static/css/missing.css') is None
+
+
+def test_static_css_rebuilds_when_sources_change():
+    with TemporaryProject() as root:
+        style_url = utils.build_static_css('static/css/style.css')
+        font_url = utils.build_static_css('static/css/font_style.css', with_fonts=True)
+
+        write(root, 'static/css/style.css', STYLE_CSS + 'body { margin: 0; }\n')
+        new_style_url = utils.build_static_css('static/css/style.css')
+        assert new_style_url != style_url
+        assert read(os.path.join(root, 'static', 'build', new_style_url.split('/')[-1])).endswith(b'margin: 0; }\n')
+
+        # Новый шрифт меняет имя файла шрифта, а через ссылку на него - и имя CSS
+        write(root, 'static/fonts/Test/Test_Regular.woff2', b'woff2-v2')
+        new_font_url = utils.build_static_css('static/css/font_style.css', with_fonts=True)
+        assert new_font_url != font_url
+        assert len([name for name in build_files(root) if name.startswith('fonts/Test_Regular.')]) == 2
+
+        # Возврат к прежнему содержимому возвращает прежние имена
+        write(root, 'static/css/style.css', STYLE_CSS)
+        assert utils.build_static_css('static/css/style.css') == style_url
+
+
+def run_app():
+    """Запускает load_all_styles в тестовом приложении Streamlit и возвращает тексты st.markdown"""
+    app = AppTest.from_string('import utils\nutils.load_all_styles()').run()
+    assert not app.exception
+    return [element.value for element in app.markdown]
+
+
+def with_static_serving(enabled):
+    saved = config.get_option('server.enableStaticServing')
+    config.set_option('server.enableStaticServing', enabled)
+    try:
+        assert utils.static_serving_enabled() is enabled
+        return run_app()
+    finally:
+        config.set_option('server.enableStaticServing', saved)
+
+
+def test_links_with_static_serving():
+    with TemporaryProject() as root:
+        blocks = with_static_serving(True)
+        links = blocks[0].split('\n')
+        assert links == [
+            '<link href="https://fonts.googleapis.com/icon?family=Material+Icons" rel="stylesheet">',
+            f'<link href="{utils.build_static_css("static/css/font_style.css", with_fonts=True)}" rel="stylesheet">',
+            f'<link href="{utils.build_static_css("static/css/style.css")}" rel="stylesheet">',
+        ]
+        # Стили и шрифты в страницу не встраиваются
+        assert not any(STYLE_CSS in block or 'base64' in block for block in blocks)
+        assert build_files(root)
+
+
+def test_inline_fallback_without_static_serving():
+    with TemporaryProject() as root:
+        blocks = with_static_serving(False)
+        assert blocks[0] == '<link href="https://fonts.googleapis.com/icon?family=Material+Icons" rel="stylesheet">'
+        # st.markdown убирает пробелы в пустых строках, поэтому сравниваются шрифты, а не весь текст
+        assert blocks[1].startswith('<style>@import') and blocks[1].endswith('</style>')
+        assert "url('data:font/woff2;base64,d29mZjItdjE=') format('woff2');" in blocks[1]
+        assert '../fonts/' not in blocks[1]
+        assert blocks[2] == f'<style>{STYLE_CSS}</style>'
+        assert not any('app/static/build' in block for block in blocks)
+        # Файлы с хешем не публикуются, есть только собранный CSS со шрифтами
+        assert build_files(root) == ['font_style.inline.css', 'font_style.inline.css.json']
+
+
+def test_inline_fallback_when_build_dir_is_not_writable():
+    with TemporaryProject() as root:
+        # Каталог сборки занят файлом: публикация падает с OSError
+        os.makedirs(os.path.join(root, 'static'), exist_ok=True)
+        write(root, 'static/build', 'not a directory')
+        blocks = with_static_serving(True)
+        assert blocks[0] == '<link href="https://fonts.googleapis.com/icon?family=Material+Icons" rel="stylesheet">'
+        assert blocks[2] == f'<style>{STYLE_CSS}</style>'
+        assert 'base64' in blocks[1]
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"[OK] {name}")
@@ -1,9 +1,285 @@
 """
 Утилиты для работы с приложением
 """
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+
 import streamlit as st
 import streamlit.components.v1 as components
-import os
+
+
+# Собранные стили: путь -> (подпись файлов, CSS). Сборка выполняется один раз
+# на процесс и повторяется только при изменении CSS или файлов шрифтов
+_style_cache = {}
+# Путь CSS со шрифтами -> (подпись CSS, список файлов шрифтов)
+_font_refs_cache = {}
+_style_cache_lock = threading.Lock()
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+FONTS_DIR = os.path.join(PROJECT_DIR, "static", "fonts")
+# Каталог заранее собранных стилей (шрифты уже встроены в base64)
+STYLE_BUILD_DIR = os.path.join(PROJECT_DIR, "static", "build")
+# URL каталога STYLE_BUILD_DIR при server.enableStaticServing (относительно страницы приложения)
+STATIC_BUILD_URL = "app/static/build"
+
+FONT_MIME_TYPES = {
+    '.woff2': 'font/woff2',
+    '.woff': 'font/woff',
+    '.ttf': 'font/ttf',
+    '.otf': 'font/otf',
+    '.eot': 'application/vnd.ms-fontobject',
+}
+
+# Поддерживаем разные форматы: url('../fonts/...'), url("../fonts/..."), url(../fonts/...)
+FONT_URL_PATTERN = re.compile(r"""url\(\s*(['"]?)\.\./fonts/([^'")]+)\1\s*\)""")
+FONT_FACE_PATTERN = re.compile(r"@font-face\s*\{[^}]*\}", re.IGNORECASE)
+FONT_SRC_PATTERN = re.compile(r"src\s*:[^;}]*;?", re.IGNORECASE)
+
+
+def _font_file_path(font_ref: str) -> str:
+    """Путь к файлу шрифта по ссылке из CSS (без ?#iefix и подобных суффиксов)"""
+    return os.path.join(FONTS_DIR, re.split(r'[?#]', font_ref, 1)[0])
+
+
+def _files_signature(paths) -> tuple:
+    """Подпись набора файлов: (путь, mtime, размер); отсутствующие файлы тоже учитываются"""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+def _select_woff2(css_content: str) -> str:
+    """
+    Оставляет в каждом @font-face только вариант woff2, если он есть на диске
+
+    Все поддерживаемые браузеры понимают woff2, поэтому остальные форматы
+    (woff, ttf, eot) только раздувают встроенный CSS.
+    """
+    def replace_face(match):
+        face = match.group(0)
+        woff2_refs = [
+            ref for _, ref in FONT_URL_PATTERN.findall(face)
+            if ref.split('?', 1)[0].endswith('.woff2') and os.path.exists(_font_file_path(ref))
+        ]
+        if not woff2_refs:
+            return face
+        # Все объявления src заменяются одним: только woff2
+        src_declaration = f"src: url('../fonts/{woff2_refs[0]}') format('woff2');"
+        parts = FONT_SRC_PATTERN.split(face)
+        return parts[0] + src_declaration + ''.join(parts[1:])
+    return FONT_FACE_PATTERN.sub(replace_face, css_content)
+
+
+def _inline_fonts(css_content: str) -> str:
+    """Заменяет ссылки на файлы шрифтов data URI в base64"""
+    def replace_font_path(match):
+        font_file = match.group(2)
+        try:
+            with open(_font_file_path(font_file), 'rb') as f:
+                font_base64 = base64.b64encode(f.read()).decode('utf-8')
+        except OSError:
+            # Если файл не найден или не читается, оставляем исходный путь
+            return match.group(0)
+        extension = os.path.splitext(re.split(r'[?#]', font_file, 1)[0])[1].lower()
+        mime_type = FONT_MIME_TYPES.get(extension, 'font/woff2')
+        return f"url('data:{mime_type};base64,{font_base64}')"
+    return FONT_URL_PATTERN.sub(replace_font_path, css_content)
+
+
+def _bundle_paths(css_path: str) -> tuple:
+    """Пути собранного CSS и файла с подписью исходников в STYLE_BUILD_DIR"""
+    name = os.path.splitext(os.path.basename(css_path))[0]
+    bundle_path = os.path.join(STYLE_BUILD_DIR, f"{name}.inline.css")
+    return bundle_path, f"{bundle_path}.json"
+
+
+def _signature_key(signature: tuple) -> list:
+    """Подпись в виде, пригодном для JSON (пути относительно корня проекта)"""
+    return [[os.path.relpath(path, PROJECT_DIR), mtime, size] for path, mtime, size in signature]
+
+
+def _read_bundle(css_path: str, signature: tuple):
+    """Собранный CSS с диска, если он построен из тех же версий файлов"""
+    bundle_path, meta_path = _bundle_paths(css_path)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            if json.load(f) != _signature_key(signature):
+                return None
+        with open(bundle_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except (OSError, ValueError):
+        return None
+
+
+def _atomic_write(path: str, payload: bytes):
+    """Запись через временный файл, чтобы читатели не видели частичный файл"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def _write_bundle(css_path: str, signature: tuple, css_content: str):
+    """Сохраняет собранный CSS на диск (ошибки записи не критичны)"""
+    bundle_path, meta_path = _bundle_paths(css_path)
+    try:
+        _atomic_write(bundle_path, css_content.encode('utf-8'))
+        _atomic_write(meta_path, json.dumps(_signature_key(signature)).encode('utf-8'))
+    except OSError:
+        pass
+
+
+def _font_signature(font_path: str) -> tuple:
+    """Подпись CSS со шрифтами и всех файлов шрифтов, на которые он ссылается"""
+    css_signature = _files_signature([font_path])
+    cached = _font_refs_cache.get(font_path)
+    if cached is None or cached[0] != css_signature:
+        # Список шрифтов разбирается заново только после изменения CSS
+        with open(font_path, 'r', encoding='utf-8') as f:
+            font_content = f.read()
+        font_files = sorted({_font_file_path(ref) for _, ref in FONT_URL_PATTERN.findall(font_content)})
+        cached = (css_signature, font_files)
+        _font_refs_cache[font_path] = cached
+    return css_signature + _files_signature(cached[1])
+
+
+def build_font_css(font_css_path: str = "static/css/font_style.css", use_bundle: bool = True):
+    """
+    Возвращает CSS со шрифтами, встроенными в base64 (только woff2)
+
+    Результат кешируется в памяти процесса по mtime и размерам CSS и файлов
+    шрифтов; при use_bundle он также сохраняется в STYLE_BUILD_DIR, чтобы
+    новый процесс не кодировал шрифты заново.
+
+    Args:
+        font_css_path: Путь к CSS файлу со шрифтами относительно корня проекта
+        use_bundle: Читать и записывать собранный CSS на диске
+
+    Returns:
+        Строка CSS или None, если файл со шрифтами не найден
+    """
+    font_path = os.path.join(PROJECT_DIR, font_css_path)
+    try:
+        signature = _font_signature(font_path)
+    except OSError:
+        return None
+
+    cached = _style_cache.get(font_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    with _style_cache_lock:
+        cached = _style_cache.get(font_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        font_content = _read_bundle(font_path, signature) if use_bundle else None
+        if font_content is None:
+            with open(font_path, 'r', encoding='utf-8') as f:
+                font_content = _inline_fonts(_select_woff2(f.read()))
+            if use_bundle:
+                _write_bundle(font_path, signature, font_content)
+        _style_cache[font_path] = (signature, font_content)
+        return font_content
+
+
+def _publish(relative_path: str, payload: bytes) -> str:
+    """
+    Кладет файл в STYLE_BUILD_DIR под именем с хешем содержимого
+
+    Имя меняется вместе с содержимым, поэтому браузер и прокси могут
+    кешировать такие файлы без ограничения срока.
+
+    Returns:
+        Путь файла относительно STYLE_BUILD_DIR (через '/')
+    """
+    directory, name = os.path.split(relative_path)
+    stem, extension = os.path.splitext(name)
+    digest = hashlib.blake2b(payload, digest_size=6).hexdigest()
+    hashed_path = os.path.join(directory, f"{stem}.{digest}{extension}")
+    path = os.path.join(STYLE_BUILD_DIR, hashed_path)
+    if not os.path.exists(path):
+        _atomic_write(path, payload)
+    return hashed_path.replace(os.sep, '/')
+
+
+def build_static_css(css_file_path: str, with_fonts: bool = False):
+    """
+    Публикует CSS файл в STYLE_BUILD_DIR для подключения через <link>
+
+    При with_fonts в каждом @font-face остается только woff2, а файлы
+    шрифтов копируются рядом под именами с хешем содержимого. Результат
+    кешируется по mtime и размерам исходных файлов.
+
+    Args:
+        css_file_path: Путь к CSS файлу относительно корня проекта
+        with_fonts: CSS ссылается на файлы из static/fonts
+
+    Returns:
+        URL опубликованного CSS или None, если файл не найден
+    """
+    css_path = os.path.join(PROJECT_DIR, css_file_path)
+    if not os.path.exists(css_path):
+        return None
+    signature = _font_signature(css_path) if with_fonts else _files_signature([css_path])
+
+    cache_key = ('static', css_path)
+    cached = _style_cache.get(cache_key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    with _style_cache_lock:
+        cached = _style_cache.get(cache_key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        with open(css_path, 'r', encoding='utf-8') as f:
+            css_content = f.read()
+        if with_fonts:
+            def replace_font_path(match):
+                font_path = _font_file_path(match.group(2))
+                try:
+                    with open(font_path, 'rb') as f:
+                        font_data = f.read()
+                except OSError:
+                    return match.group(0)
+                return f"url('{_publish(os.path.join('fonts', os.path.basename(font_path)), font_data)}')"
+            css_content = FONT_URL_PATTERN.sub(replace_font_path, _select_woff2(css_content))
+
+        url = f"{STATIC_BUILD_URL}/{_publish(os.path.basename(css_path), css_content.encode('utf-8'))}"
+        _style_cache[cache_key] = (signature, url)
+        return url
+
+
+def static_serving_enabled() -> bool:
+    """Включена ли раздача файлов из static/ (server.enableStaticServing)"""
+    try:
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+
+def _read_css(css_path: str) -> str:
+    """Содержимое CSS файла с кешем по mtime и размеру"""
+    signature = _files_signature([css_path])
+    cached = _style_cache.get(css_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with open(css_path, 'r', encoding='utf-8') as f:
+        css_content = f.read()
+    with _style_cache_lock:
+        _style_cache[css_path] = (signature, css_content)
+    return css_content
 
 
 def load_css(css_file_path: str = "static/css/style.css"):
@@ -14,21 +290,15 @@ def load_css(css_file_path: str = "static/css/style.css"):
         css_file_path: Путь к CSS файлу относительно корня проекта
     """
     try:
-        # Получаем путь к корню проекта
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        css_path = os.path.join(current_dir, css_file_path)
+        css_path = os.path.join(PROJECT_DIR, css_file_path)
         
         # Проверяем существование файла
         if not os.path.exists(css_path):
             st.warning(f"CSS файл не найден: {css_path}")
             return
         
-        # Читаем CSS файл
-        with open(css_path, 'r', encoding='utf-8') as f:
-            css_content = f.read()
-        
-        # Применяем стили
-        st.markdown(f"<style>{css_content}</style>", unsafe_allow_html=True)
+        # Применяем стили (файл перечитывается только после изменения)
+        st.markdown(f"<style>{_read_css(css_path)}</style>", unsafe_allow_html=True)
     except Exception as e:
         st.error(f"Ошибка при загрузке CSS: {e}")
 
@@ -36,69 +306,17 @@ def load_css(css_file_path: str = "static/css/style.css"):
 def load_fonts(font_css_path: str = "static/css/font_style.css"):
     """
     Загружает CSS файл со шрифтами и исправляет пути к файлам шрифтов
-    Использует base64 для встраивания шрифтов прямо в CSS
+    Использует base64 для встраивания шрифтов прямо в CSS (см. build_font_css)
     
     Args:
         font_css_path: Путь к CSS файлу со шрифтами относительно корня проекта
     """
     try:
-        import base64
-        import re
-        
-        # Получаем путь к корню проекта
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        font_path = os.path.join(current_dir, font_css_path)
-        
-        # Проверяем существование файла
-        if not os.path.exists(font_path):
-            # Не показываем предупреждение, если файл не найден (шрифты опциональны)
+        font_content = build_font_css(font_css_path)
+        # Не показываем предупреждение, если файл не найден (шрифты опциональны)
+        if font_content is None:
             return
         
-        # Читаем CSS файл
-        with open(font_path, 'r', encoding='utf-8') as f:
-            font_content = f.read()
-        
-        # Находим все пути к шрифтам и заменяем их на base64
-        def replace_font_path(match):
-            font_file = match.group(1)
-            font_full_path = os.path.join(current_dir, "static", "fonts", font_file)
-            
-            if os.path.exists(font_full_path):
-                try:
-                    with open(font_full_path, 'rb') as f:
-                        font_data = f.read()
-                        font_base64 = base64.b64encode(font_data).decode('utf-8')
-                        # Определяем формат по расширению и правильный MIME type
-                        if font_file.endswith('.woff2'):
-                            mime_type = 'font/woff2'
-                        elif font_file.endswith('.woff'):
-                            mime_type = 'font/woff'
-                        elif font_file.endswith('.ttf'):
-                            mime_type = 'font/ttf'
-                        elif font_file.endswith('.otf'):
-                            mime_type = 'font/otf'
-                        else:
-                            mime_type = 'font/woff2'
-                        
-                        return f"url('data:{mime_type};base64,{font_base64}')"
-                except Exception:
-                    # Если не удалось загрузить, возвращаем оригинальный путь
-                    return match.group(0)
-            else:
-                # Если файл не найден, возвращаем оригинальный путь
-                return match.group(0)
-        
-        # Заменяем все пути к шрифтам на base64
-        # Поддерживаем разные форматы: url('../fonts/...'), url("../fonts/..."), url(../fonts/...)
-        patterns = [
-            r"url\('\.\./fonts/([^']+)'\)",  # url('../fonts/...')
-            r'url\("\.\./fonts/([^"]+)"\)',   # url("../fonts/...")
-            r'url\(\.\./fonts/([^)]+)\)',     # url(../fonts/...)
-        ]
-        
-        for pattern in patterns:
-            font_content = re.sub(pattern, replace_font_path, font_content)
-        
         # Применяем стили
         st.markdown(f"<style>{font_content}</style>", unsafe_allow_html=True)
     except Exception as e:
@@ -110,14 +328,30 @@ def load_fonts(font_css_path: str = "static/css/font_style.css"):
 def load_all_styles():
     """
     Загружает все CSS файлы: сначала шрифты, затем основные стили
+
+    При server.enableStaticServing стили и шрифты подключаются через <link>
+    на файлы с хешем в имени: браузер скачивает их один раз, а в каждый
+    перезапуск скрипта уходят только ссылки. Иначе CSS встраивается в страницу.
     """
+    links = ['<link href="https://fonts.googleapis.com/icon?family=Material+Icons" rel="stylesheet">']
+    inline = True
+    if static_serving_enabled():
+        try:
+            font_url = build_static_css("static/css/font_style.css", with_fonts=True)
+            style_url = build_static_css("static/css/style.css")
+            if style_url is not None:
+                links += [f'<link href="{url}" rel="stylesheet">' for url in (font_url, style_url) if url]
+                inline = False
+        except OSError:
+            # Каталог сборки недоступен для записи - встраиваем стили как раньше
+            pass
+    
     # Загружаем Material Icons ПЕРВЫМ, чтобы они были доступны
-    st.markdown("""
-        <link href="https://fonts.googleapis.com/icon?family=Material+Icons" rel="stylesheet">
-    """, unsafe_allow_html=True)
+    st.markdown("\n".join(links), unsafe_allow_html=True)
     
-    load_fonts()
-    load_css()
+    if inline:
+        load_fonts()
+        load_css()
     
     # Стили для Material Icons
     st.markdown("""
@@ -272,3 +506,14 @@ def load_css_custom(css_content: str):
     """
     st.markdown(f"<style>{css_content}</style>", unsafe_allow_html=True)
 
+
+if __name__ == '__main__':
+    # Сборка стилей заранее (например, при деплое): python utils.py
+    for css_file_path, with_fonts in (("static/css/font_style.css", True), ("static/css/style.css", False)):
+        print(build_static_css(css_file_path, with_fonts=with_fonts))
+    bundle = build_font_css()
+    if bundle is None:
+        print("CSS со шрифтами не найден")
+    else:
+        print(f"{_bundle_paths(os.path.join(PROJECT_DIR, 'static/css/font_style.css'))[0]}: "
+              f"{len(bundle) / 1024:.0f} КБ")